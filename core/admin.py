@@ -3,6 +3,8 @@ from django.contrib.auth.admin import UserAdmin
 from .models import School, User, Parent, Message
 from .models import AlertRecipient
 from .models import SupportTicket
+from .models import SuppressedNumber
+from .models import DeliveryArchive
 
 @admin.register(School)
 class SchoolAdmin(admin.ModelAdmin):
@@ -30,3 +32,18 @@ class AlertRecipientAdmin(admin.ModelAdmin):
 	search_fields = ("provider_message_id", "parent__phone_number", "message__content")
 	list_filter = ("status",)
 admin.site.register(SupportTicket)
+
+
+@admin.register(SuppressedNumber)
+class SuppressedNumberAdmin(admin.ModelAdmin):
+	list_display = ("phone_number", "organization", "reason", "created_at")
+	search_fields = ("phone_number", "note")
+	list_filter = ("reason", ("organization", admin.EmptyFieldListFilter))
+
+
+@admin.register(DeliveryArchive)
+class DeliveryArchiveAdmin(admin.ModelAdmin):
+	list_display = ("kind", "organization", "school", "month", "row_count", "sent_count", "failed_count", "path")
+	list_filter = ("kind",)
+	search_fields = ("path",)
+	readonly_fields = ("path", "first_id", "last_id", "created_at")
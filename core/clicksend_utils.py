@@ -4,6 +4,7 @@ from clicksend_client.rest import ApiException
 from core.models import School
 from django.conf import settings
 from core.utils.crypto_utils import decrypt_value
+import json
 import logging
 
 logger = logging.getLogger(__name__)
@@ -183,4 +184,32 @@ def get_sms_delivery_status(message_id, school: School):
         raise Exception(f"ClickSend API exception: {str(e)}")
     except Exception as e:
         logger.exception("Unexpected error during status check")
-        raise Exception(f"Error checking delivery status: {str(e)}")
\ No newline at end of file
+        raise Exception(f"Error checking delivery status: {str(e)}")
+
+
+def get_delivery_receipt_with_credentials(message_id, username=None, api_key=None):
+    """
+    Fetch the delivery receipt of one message using explicit ClickSend credentials (for sender pool).
+
+    Returns:
+        dict: the receipt's ``data`` (``status``, ``status_code``, ``status_text``, ...),
+        empty when ClickSend has no receipt for the message yet
+    """
+    if not (username and api_key):
+        raise Exception("ClickSend credentials not provided")
+
+    configuration = clicksend_client.Configuration()
+    configuration.username = username
+    configuration.password = api_key
+    api_instance = SMSApi(clicksend_client.ApiClient(configuration))
+
+    try:
+        api_response = api_instance.sms_receipts_by_message_id_get(message_id)
+        response = json.loads(api_response) if isinstance(api_response, str) else api_response
+        return (response or {}).get('data') or {}
+    except ApiException as e:
+        logger.exception("ClickSend API exception during receipt lookup")
+        raise Exception(f"ClickSend API exception: {str(e)}")
+    except Exception as e:
+        logger.exception("Unexpected error during receipt lookup")
+        raise Exception(f"Error fetching delivery receipt: {str(e)}")
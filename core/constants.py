@@ -26,10 +26,40 @@ PAYSTACK_BASE_URL = 'https://api.paystack.co'
 # File Upload Limits
 MAX_FILE_SIZE = 10 * 1024 * 1024  # 10MB
 ALLOWED_FILE_TYPES = ['text/csv', 'application/pdf', 'text/plain']
+CONTACT_IMPORT_BATCH_SIZE = 1000  # Contacts inserted per bulk_create during imports
+CONTACT_IMPORT_BUDGET_SECONDS = 30  # Wall-clock time one process_contact_imports run may spend importing before jobs pause
+CONTACT_IMPORT_STALE_MINUTES = 10  # A running import whose progress has not been saved this long lost its worker and is queued again
+CONTACTS_PAGE_SIZE = 50  # Contacts per keyset page on the contacts page and search API
+MESSAGE_LOGS_PAGE_SIZE = 50  # Recipient rows per keyset page on the message log pages
+GROUP_MEMBERSHIP_CHUNK_SIZE = 1000  # Group members inserted/deleted per through-table query
+SEGMENT_COUNT_MAX_AGE = 900  # Seconds before a segment's estimated audience size is recounted
+SUPPRESSION_RECHECK_SECONDS = 5  # How often workers check whether their in-memory suppression sets changed
+EXPORT_ITERATOR_CHUNK_SIZE = 2000  # Rows fetched per round trip by streaming CSV exports
+RECIPIENT_PARTITIONS_AHEAD = 3  # Monthly OrgAlertRecipient partitions kept created ahead of the current month (Postgres)
+DELIVERY_ARCHIVE_RETENTION_MONTHS = 12  # Whole months of recipient/audit rows kept in the database before archive_delivery_history moves them to files
+DELIVERY_ARCHIVE_BATCH_SIZE = 10000  # Rows per archive file
+ERROR_DETAIL_SAMPLE_EVERY = 100  # Failed recipients keep their raw error text only when id % this == 0; the rest keep just the error code
+DELIVERY_RECEIPT_BATCH_SIZE = 2000  # Buffered delivery receipts applied per transaction by apply_delivery_receipts
+DELIVERY_RECEIPT_RETRY_SECONDS = 600  # How long a receipt matching no recipient yet stays buffered before it is dropped
+DELIVERY_STATUS_POLL_AFTER_MINUTES = 30  # A sent recipient with no receipt this long after sending gets its status polled (again after 2x, 4x, ... as long)
+DELIVERY_STATUS_POLL_HORIZON_HOURS = 48  # Recipients sent longer ago than this are no longer polled
+DELIVERY_STATUS_POLL_BATCH_SIZE = 200  # Status queries per sender per poll_delivery_statuses run
+DELIVERY_STATUS_POLL_EVERY_MINUTES = 10  # How often run_scheduler runs poll_delivery_statuses
+DELIVERY_STATUS_POLL_BUDGET_SECONDS = 20  # Wall-clock time one poll_delivery_statuses run may spend querying gateways
 
 # Cache Timeouts (in seconds)
 CACHE_TIMEOUT_DASHBOARD = 300  # 5 minutes
 CACHE_TIMEOUT_CONTACTS = 600   # 10 minutes
+PLATFORM_METRICS_FRESH_SECONDS = 60  # Super admin dashboard snapshot is served as-is this long
+PLATFORM_METRICS_STALE_SECONDS = 3600  # ...then served stale while one request recomputes it, up to this age
+DASHBOARD_STALE_SECONDS = 86400  # Org dashboard snapshots outlive CACHE_TIMEOUT_DASHBOARD so a stale one can be served during a refresh
+DASHBOARD_REFRESH_WAIT_SECONDS = 2  # With no snapshot cached, how long other requests wait for the one computing it
+
+# Per-network sender routing (core.utils.sender_utils)
+SENDER_ROUTING_POLICY = 'cost'  # 'cost': cheapest sender per network first; 'health': best recent delivery rate first
+SENDER_HEALTH_WINDOW_HOURS = 24  # Window of sent/failed recipients used to score sender health
+SENDER_HEALTH_MIN_SAMPLE = 20  # Fewer finished messages than this and a sender counts as healthy
+SENDER_HEALTH_CACHE_SECONDS = 60  # Seconds sender health scores are cached
 
 # UI Constants
 DEFAULT_PAGE_SIZE = 25
@@ -183,10 +183,20 @@ def get_sms_delivery_status(message_id, tenant: School):
     """
     Query Hubtel for delivery status.
     """
+    return get_sms_delivery_status_with_credentials(
+        message_id,
+        api_url=getattr(settings, 'HUBTEL_API_URL', None),
+        api_key=getattr(settings, 'HUBTEL_API_KEY', None),
+    )
 
-    api_url = getattr(settings, 'HUBTEL_API_URL', None)
-    api_key = getattr(settings, 'HUBTEL_API_KEY', None)
 
+def get_sms_delivery_status_with_credentials(message_id, api_url=None, api_key=None):
+    """
+    Query Hubtel for delivery status using explicit credentials (for sender pool).
+
+    Returns:
+        dict: the status response
+    """
     if not api_url:
         raise Exception("Hubtel API URL not configured (HUBTEL_API_URL)")
 
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from core.utils.receipts import apply_receipts
+
+
+class Command(BaseCommand):
+    help = 'Apply buffered provider delivery receipts to their recipients in batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=None, help='Receipts per batch (defaults to DELIVERY_RECEIPT_BATCH_SIZE)')
+
+    def handle(self, *args, **options):
+        totals = apply_receipts(limit=options.get('batch_size'))
+        self.stdout.write(self.style.SUCCESS(
+            f"Applied {totals['received']} receipt(s): {totals['updated']} recipient(s) updated, "
+            f"{totals['unchanged']} already up to date, {totals['duplicates']} duplicate(s), "
+            f"{totals['waiting']} waiting for their recipient, {totals['dropped']} dropped"
+        ))
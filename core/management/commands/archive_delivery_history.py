@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core.models import DeliveryArchive
+from core.utils.archive import SPECS, archive_before, get_archive_root, get_retention_months, retention_cutoff
+
+
+class Command(BaseCommand):
+    help = 'Move recipient and audit rows older than the retention window into gzipped JSONL files'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--months', type=int, help='Whole months to keep in the database (default DELIVERY_ARCHIVE_RETENTION_MONTHS)')
+        parser.add_argument('--kind', action='append', choices=list(SPECS), help='Only archive this kind of row (repeatable)')
+
+    def handle(self, *args, **options):
+        months = options.get('months')
+        months = get_retention_months() if months is None else months
+        if months < 1:
+            raise CommandError('--months must be at least 1')
+        cutoff = retention_cutoff(months)
+        self.stdout.write(f'Archiving rows created before {cutoff:%Y-%m-%d} to {get_archive_root()}')
+
+        written = archive_before(cutoff, kinds=options.get('kind'))
+        total = 0
+        for kind, archives in written.items():
+            rows = sum(archive.row_count for archive in archives)
+            total += rows
+            for archive in archives:
+                self.stdout.write(f'{archive.path}: {archive.row_count} row(s)')
+            self.stdout.write(f'{dict(DeliveryArchive.KIND_CHOICES)[kind]}: {rows} row(s) in {len(archives)} file(s)')
+        self.stdout.write(self.style.SUCCESS(f'Archived {total} row(s)'))
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from core.models import OrgAlertRecipient
+from core.utils.delivery_errors import compact_errors
+
+
+class Command(BaseCommand):
+    help = 'Give failed recipients written before the error catalogue an error code and drop unsampled error text'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--org', type=str, help='Optional org slug to limit the backfill')
+        parser.add_argument('--chunk-size', type=int, default=1000, help='Rows classified per batch')
+
+    def handle(self, *args, **options):
+        recipients = OrgAlertRecipient.objects.all()
+        if options.get('org'):
+            recipients = recipients.filter(message__organization__slug=options['org'])
+        updated = compact_errors(recipients, chunk_size=options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(f'Compacted recipient errors: {updated} row(s) updated'))
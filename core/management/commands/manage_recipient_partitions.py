@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core.utils.partitions import TABLE, ensure_partitions, get_months_ahead, is_partitioned
+
+
+class Command(BaseCommand):
+    help = 'Create upcoming monthly OrgAlertRecipient partitions (Postgres only; old months are dropped by archive_delivery_history)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--ahead', type=int, help='Months ahead of the current one to create (default RECIPIENT_PARTITIONS_AHEAD)')
+
+    def handle(self, *args, **options):
+        if not is_partitioned():
+            self.stdout.write(f'{TABLE} is not partitioned on this database; nothing to do')
+            return
+
+        ahead = options.get('ahead')
+        if ahead is not None and ahead < 0:
+            raise CommandError('--ahead must not be negative')
+        created = ensure_partitions(get_months_ahead() if ahead is None else ahead)
+        for name in created:
+            self.stdout.write(f'Created {name}')
+
+        self.stdout.write(self.style.SUCCESS(f'Recipient partitions: {len(created)} created'))
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from core.utils.delivery_polling import poll_delivery_statuses
+
+
+class Command(BaseCommand):
+    help = 'Poll sender gateways for sent recipients whose delivery receipt never arrived'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=None, help='Status queries per sender (defaults to DELIVERY_STATUS_POLL_BATCH_SIZE)')
+        parser.add_argument('--budget', type=float, default=None,
+                            help='Seconds the run may spend querying gateways (defaults to DELIVERY_STATUS_POLL_BUDGET_SECONDS)')
+
+    def handle(self, *args, **options):
+        results = poll_delivery_statuses(limit=options.get('limit'), budget=options.get('budget'))
+        for sender, result in results.items():
+            self.stdout.write(
+                f"{sender}: {result['queried']} queried, {result['final']} final, {result['errors']} error(s)"
+            )
+        final = sum(result['final'] for result in results.values())
+        self.stdout.write(self.style.SUCCESS(f'Polled {len(results)} sender(s); {final} final status(es) applied'))
@@ -0,0 +1,50 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from core.models import ContactImportJob
+from core.utils.contact_import import get_budget, reclaim_stale_jobs, run_import_job
+
+
+class Command(BaseCommand):
+    help = 'Process queued contact import jobs (streamed decoding, batched inserts)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=5, help='Maximum import jobs to process this run')
+        parser.add_argument('--batch-size', type=int, default=None, help='Contacts inserted per batch (defaults to CONTACT_IMPORT_BATCH_SIZE)')
+        parser.add_argument('--budget', type=float, default=None, help='Seconds this run may spend importing; unfinished jobs resume next run (defaults to CONTACT_IMPORT_BUDGET_SECONDS)')
+
+    def handle(self, *args, **options):
+        limit = options.get('limit')
+        batch_size = options.get('batch_size')
+        budget = options.get('budget')
+        deadline = time.monotonic() + (get_budget() if budget is None else budget)
+
+        reclaimed = reclaim_stale_jobs()
+        if reclaimed:
+            self.stdout.write(f"Requeued {reclaimed} import job(s) whose worker stopped")
+
+        job_ids = list(
+            ContactImportJob.objects.filter(status='pending').order_by('created_at').values_list('id', flat=True)[:limit]
+        )
+        processed = 0
+        for job_id in job_ids:
+            if time.monotonic() >= deadline:
+                break
+            # Claim the job with a conditional update so concurrent workers never import it twice
+            claimed = ContactImportJob.objects.filter(id=job_id, status='pending').update(
+                status='running', updated_at=timezone.now()
+            )
+            if not claimed:
+                continue
+            job = ContactImportJob.objects.select_related('organization').get(id=job_id)
+            run_import_job(job, batch_size=batch_size, deadline=deadline)
+            processed += 1
+            state = 'paused, resumes next run' if job.status == 'pending' else job.status
+            self.stdout.write(
+                f"Import {job.id} ({job.organization.slug}): {state} - "
+                f"{job.rows_imported} imported, {job.rows_failed} rejected of {job.rows_processed} rows"
+            )
+
+        self.stdout.write(self.style.SUCCESS(f'Processed {processed} contact import job(s)'))
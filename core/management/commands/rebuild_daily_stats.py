@@ -0,0 +1,39 @@
+import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.models import Organization
+from core.utils.daily_stats import days_ago, rebuild_daily_stats
+
+
+class Command(BaseCommand):
+    help = 'Backfill or rebuild the OrgDailyStats rollup from OrgAlertRecipient rows'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--org', type=str, help='Optional org slug to rebuild only that organization')
+        parser.add_argument('--since', type=str, help='Only rebuild days on or after this date (YYYY-MM-DD)')
+        parser.add_argument('--days', type=int, help='Only rebuild the last N days (e.g. a nightly --days 3 repair)')
+
+    def handle(self, *args, **options):
+        since = None
+        if options.get('since'):
+            try:
+                since = datetime.date.fromisoformat(options['since'])
+            except ValueError:
+                raise CommandError('--since must be a date in YYYY-MM-DD format')
+        elif options.get('days'):
+            since = days_ago(options['days'] - 1)
+
+        organizations = Organization.objects.order_by('id')
+        if options.get('org'):
+            organizations = organizations.filter(slug=options['org'])
+
+        total_rows = 0
+        for organization in organizations.iterator():
+            # One transaction per organization keeps locks short on large tables
+            rows = rebuild_daily_stats(organization, since=since)
+            total_rows += rows
+            self.stdout.write(f"{organization.slug}: {rows} rollup row(s)")
+
+        scope = f" from {since}" if since else ''
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt daily stats{scope}: {total_rows} row(s)'))
@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+
+from core.models import ContactGroup, ContactSegment
+from core.utils.group_membership import reconcile_member_counts
+from core.utils.segments import refresh_estimated_count
+
+
+class Command(BaseCommand):
+    help = 'Repair denormalized group member counts and refresh segment size estimates'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--org', type=str, help='Optional org slug to limit the reconciliation')
+        parser.add_argument('--skip-segments', action='store_true', help='Only reconcile group member counts')
+
+    def handle(self, *args, **options):
+        org = options.get('org')
+        groups = ContactGroup.objects.all()
+        segments = ContactSegment.objects.select_related('organization')
+        if org:
+            groups = groups.filter(organization__slug=org)
+            segments = segments.filter(organization__slug=org)
+
+        fixed = reconcile_member_counts(groups)
+        for group_id in fixed:
+            self.stdout.write(f"Group {group_id}: member_count corrected")
+        self.stdout.write(self.style.SUCCESS(f'Reconciled member counts: {len(fixed)} group(s) corrected'))
+
+        if not options.get('skip_segments'):
+            refreshed = 0
+            for segment in segments.iterator():
+                refresh_estimated_count(segment, force=True)
+                refreshed += 1
+            self.stdout.write(self.style.SUCCESS(f'Refreshed estimates for {refreshed} segment(s)'))
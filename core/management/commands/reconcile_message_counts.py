@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from core.models import OrgMessage
+from core.utils.daily_stats import days_ago, reconcile_message_counts
+
+
+class Command(BaseCommand):
+    help = 'Repair the denormalized recipient counters on organization messages'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--org', type=str, help='Optional org slug to limit the reconciliation')
+        parser.add_argument('--days', type=int, help='Only check messages created in the last N days')
+
+    def handle(self, *args, **options):
+        messages = OrgMessage.objects.all()
+        if options.get('org'):
+            messages = messages.filter(organization__slug=options['org'])
+        if options.get('days'):
+            messages = messages.filter(created_at__date__gte=days_ago(options['days']))
+
+        fixed = reconcile_message_counts(messages)
+        for message_id in fixed:
+            self.stdout.write(f"Message {message_id}: counters corrected")
+        self.stdout.write(self.style.SUCCESS(f'Reconciled message counters: {len(fixed)} message(s) corrected'))
@@ -15,6 +15,7 @@ class Command(BaseCommand):
 
         from core.models import OrgAlertRecipient
         from core.hubtel_utils import send_sms
+        from core.utils.daily_stats import recipient_bucket, save_recipient
 
         qs = OrgAlertRecipient.objects.filter(status='failed').order_by('last_retry_at', 'id')
         if max_retries is not None:
@@ -25,6 +26,7 @@ class Command(BaseCommand):
         total = qs.count()
         processed = 0
         for ar in qs:
+            before = recipient_bucket(ar, ar.message)
             try:
                 msg = ar.message
                 contact = ar.contact
@@ -33,15 +35,15 @@ class Command(BaseCommand):
                 ar.status = 'sent'
                 ar.sent_at = timezone.now()
                 ar.provider_message_id = message_id
-                ar.error_message = ''
+                ar.set_error()
                 ar.retry_count = (ar.retry_count or 0) + 1
                 ar.last_retry_at = timezone.now()
-                ar.save()
+                save_recipient(ar, msg, before)
                 processed += 1
             except Exception as e:
                 ar.retry_count = (ar.retry_count or 0) + 1
                 ar.last_retry_at = timezone.now()
-                ar.error_message = str(e)
+                ar.set_error(str(e))
                 ar.save()
                 processed += 1
 
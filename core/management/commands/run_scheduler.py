@@ -1,9 +1,12 @@
 import time
 import signal
 import sys
+from datetime import timedelta
+from django.conf import settings
 from django.core.management.base import BaseCommand
 from django.core.management import call_command
 from django.utils import timezone
+from core import constants
 import os
 
 # Simple long-running scheduler that periodically runs the send-scheduled/ pending commands.
@@ -39,6 +42,9 @@ class Command(BaseCommand):
         signal.signal(signal.SIGINT, _signal_handler)
 
         self.stdout.write(self.style.SUCCESS(f'Starting scheduler loop (interval={interval}s, limit={limit}, dry_run={dry_run})'))
+        partitions_checked = None
+        statuses_polled = None
+        poll_every = timedelta(minutes=getattr(settings, 'DELIVERY_STATUS_POLL_EVERY_MINUTES', constants.DELIVERY_STATUS_POLL_EVERY_MINUTES))
 
         while RUNNING:
             now = timezone.now()
@@ -60,6 +66,28 @@ class Command(BaseCommand):
                 self.stdout.write(self.style.NOTICE(f'[{now}] Running send_scheduled_org_messages...'))
                 call_command('send_scheduled_org_messages')
 
+                # 4) import any contact uploads queued from the contacts page
+                #    (each run stops after CONTACT_IMPORT_BUDGET_SECONDS; big imports resume next run)
+                self.stdout.write(self.style.NOTICE(f'[{now}] Running process_contact_imports...'))
+                call_command('process_contact_imports')
+
+                # 5) apply delivery receipts the webhooks buffered since the last run
+                self.stdout.write(self.style.NOTICE(f'[{now}] Running apply_delivery_receipts...'))
+                call_command('apply_delivery_receipts')
+
+                # 6) every few minutes, poll gateways for receipts that never arrived
+                #    (each run stops after DELIVERY_STATUS_POLL_BUDGET_SECONDS)
+                if statuses_polled is None or now - statuses_polled >= poll_every:
+                    self.stdout.write(self.style.NOTICE(f'[{now}] Running poll_delivery_statuses...'))
+                    call_command('poll_delivery_statuses')
+                    statuses_polled = now
+
+                # 7) once a day, make sure next months' recipient partitions exist (no-op off Postgres)
+                if partitions_checked != now.date():
+                    self.stdout.write(self.style.NOTICE(f'[{now}] Running manage_recipient_partitions...'))
+                    call_command('manage_recipient_partitions')
+                    partitions_checked = now.date()
+
             except Exception as e:
                 self.stderr.write(f'Scheduler loop error: {e}')
 
@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core.models import Organization, School
+from core.utils.archive import number_history
+
+
+class Command(BaseCommand):
+    help = 'Show every message sent to a phone number by an organization or school, including archived rows'
+
+    def add_arguments(self, parser):
+        parser.add_argument('phone_number', type=str)
+        owner = parser.add_mutually_exclusive_group(required=True)
+        owner.add_argument('--org', type=str, help='Organization slug')
+        owner.add_argument('--school', type=int, help='School id')
+
+    def handle(self, *args, **options):
+        try:
+            if options.get('org'):
+                history = number_history(options['phone_number'], organization=Organization.objects.get(slug=options['org']))
+            else:
+                history = number_history(options['phone_number'], school=School.objects.get(pk=options['school']))
+        except (Organization.DoesNotExist, School.DoesNotExist):
+            raise CommandError('No such organization or school')
+
+        for record in history:
+            where = 'archive' if record['archived'] else 'live'
+            when = record.get('sent_at') or record.get('message_created_at')
+            detail = record.get('provider_status') or record.get('error_code') or record.get('error_message') or ''
+            self.stdout.write(
+                f"{when}  message {record['message_id']}  {record['status']:<8} {detail}  [{where}]"
+            )
+        self.stdout.write(self.style.SUCCESS(f"{len(history)} record(s) for {options['phone_number']}"))
@@ -4,6 +4,7 @@ from django.conf import settings
 import logging
 
 from core.models import OrgAlertRecipient
+from core.utils.daily_stats import recipient_bucket, save_recipient
 
 logger = logging.getLogger(__name__)
 
@@ -52,9 +53,10 @@ class Command(BaseCommand):
             # Skip if organization is not active (banned)
             if tenant and not tenant.is_active:
                 self.stdout.write(f"Skipping {phone}: organization '{tenant.name}' is banned")
+                before = recipient_bucket(ar, ar.message)
                 ar.status = 'failed'
-                ar.error_message = 'Organization is banned'
-                ar.save()
+                ar.set_error('Organization is banned', code='org_banned')
+                save_recipient(ar, ar.message, before)
                 continue
             # normalize message scheduled_time if naive and skip if not yet due
             try:
@@ -75,10 +77,11 @@ class Command(BaseCommand):
                 if dry_run:
                     self.stdout.write(f"[DRY] Would send to {phone}: {content[:60]}")
                     # mark as sent in dry-run for convenience
+                    before = recipient_bucket(ar, ar.message)
                     ar.provider_message_id = f"dryrun-{ar.id}"
                     ar.status = 'sent'
                     ar.sent_at = timezone.now()
-                    ar.save()
+                    save_recipient(ar, ar.message, before)
                     continue
 
                 # Use the new sender pool system
@@ -98,21 +101,23 @@ class Command(BaseCommand):
                         
                 except Exception as e:
                     logger.exception("Failed sending to %s: %s", phone, e)
+                    before = recipient_bucket(ar, ar.message)
                     # increment retry counter
                     ar.retry_count = (ar.retry_count or 0) + 1
                     ar.last_retry_at = timezone.now()
-                    ar.error_message = str(e)
+                    ar.set_error(str(e))
                     if ar.retry_count >= max_retries:
                         ar.status = 'failed'
                     else:
                         ar.status = 'pending'
-                    ar.save()
+                    save_recipient(ar, ar.message, before)
                     self.stdout.write(f"Failed {phone}: {e} (retry {ar.retry_count}/{max_retries})")
 
             except Exception as e:
                 logger.exception("Unexpected error processing recipient %s: %s", phone, e)
+                before = recipient_bucket(ar, ar.message)
                 # Mark as failed for unexpected errors
                 ar.status = 'failed'
-                ar.error_message = f"Unexpected error: {str(e)}"
-                ar.save()
+                ar.set_error(f"Unexpected error: {str(e)}", code='unexpected')
+                save_recipient(ar, ar.message, before)
                 self.stdout.write(f"Unexpected error for {phone}: {e}")
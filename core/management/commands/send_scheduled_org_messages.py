@@ -1,7 +1,13 @@
 from django.core.management.base import BaseCommand
+from django.db import transaction
 from django.utils import timezone
 from core.models import OrgMessage, OrgAlertRecipient
 from core.hubtel_utils import send_sms
+from core.utils import validate_sms_balance
+from core.utils.daily_stats import DailyStatsDelta, recipient_bucket, save_recipient
+from core.utils.segments import add_segment_recipients
+from core.utils.sender_utils import SUPPRESSED_ERROR
+from core.utils.suppression import get_suppressed_numbers
 from django.core.mail import send_mail
 from django.conf import settings
 from django.core.cache import cache
@@ -17,13 +23,17 @@ class Command(BaseCommand):
             # Skip if organization is not active (banned)
             if not message.organization.is_active:
                 self.stdout.write(f"Skipping message {message.id}: organization '{message.organization.name}' is banned")
-                # Mark all pending recipients as failed
-                for ar in message.recipients_status.filter(status='pending'):
-                    ar.status = 'failed'
-                    ar.error_message = 'Organization is banned'
-                    ar.save()
-                message.sent = True  # Mark as processed to avoid reprocessing
-                message.save()
+                # Mark all pending recipients as failed, counters in the same transaction
+                with transaction.atomic():
+                    stats = DailyStatsDelta()
+                    for ar in message.get_recipient_rows().filter(status='pending'):
+                        before = recipient_bucket(ar, message)
+                        ar.status = 'failed'
+                        ar.set_error('Organization is banned', code='org_banned')
+                        ar.save()
+                        stats.move(before, recipient_bucket(ar, message))
+                    stats.apply()
+                message.mark_as_sent()  # Mark as processed to avoid reprocessing
                 continue
             sched = message.scheduled_time
             try:
@@ -39,20 +49,51 @@ class Command(BaseCommand):
             if sched > now:
                 continue
 
-            recipients = message.recipients_status.all()
+            # Dynamic segments are resolved now, at send time, not when scheduled
+            segments = list(message.segments.all())
+            if segments:
+                added = add_segment_recipients(message, segments)
+                self.stdout.write(f"Message {message.id}: {added} recipient(s) added from {len(segments)} segment(s)")
+
+            # The audience is only known now, so the balance is checked now too
+            pending = message.get_recipient_rows().filter(status='pending')
+            is_valid, balance_error = validate_sms_balance(message.organization, pending.count(), settings)
+            if not is_valid:
+                self.stdout.write(f"Skipping message {message.id}: {balance_error}")
+                with transaction.atomic():
+                    stats = DailyStatsDelta()
+                    for ar in pending:
+                        before = recipient_bucket(ar, message)
+                        ar.status = 'failed'
+                        ar.set_error(balance_error, code='insufficient_credit')
+                        ar.save()
+                        stats.move(before, recipient_bucket(ar, message))
+                    stats.apply()
+                message.mark_as_sent()  # Mark as processed to avoid reprocessing
+                continue
+
+            recipients = message.get_recipient_rows()
+            suppressed = get_suppressed_numbers(message.organization_id)
             for ar in recipients:
                 if ar.status == 'pending':
+                    before = recipient_bucket(ar, message)
+                    if ar.contact.phone_number in suppressed:
+                        # Suppressed after the recipient row was created
+                        ar.status = 'failed'
+                        ar.set_error(SUPPRESSED_ERROR, code='suppressed')
+                        save_recipient(ar, message, before)
+                        continue
                     try:
                         send_sms(ar.contact.phone_number, message.content, message.organization)
                         ar.status = 'sent'
                         ar.sent_at = now
-                        ar.error_message = ''
+                        ar.set_error()
                     except Exception as e:
                         ar.status = 'failed'
-                        ar.error_message = str(e)
-                    ar.save()
-            message.sent = True
-            message.save()
+                        ar.set_error(str(e))
+                    # Saved and counted together, so a crash mid-message leaves nothing uncounted
+                    save_recipient(ar, message, before)
+            message.mark_as_sent()
             # Notify creator via email if available
             try:
                 creator = getattr(message, 'created_by', None)
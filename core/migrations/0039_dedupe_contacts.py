@@ -0,0 +1,104 @@
+import re
+
+from django.db import migrations
+
+NON_DIGITS = re.compile(r'[^0-9]')
+
+
+def normalize_phone_number(raw, default_country='+233'):
+    """Frozen copy of core.utils.normalize_phone_number as it was when this migration was written"""
+    if not raw:
+        return None
+    s = str(raw).strip()
+    plus = s.startswith('+')
+    digits = NON_DIGITS.sub('', s[1:] if plus else s)
+    if not digits:
+        return None
+    if plus:
+        return '+' + digits
+    if digits[0] == '0':
+        without0 = digits.lstrip('0')
+        return default_country + without0 if without0 else None
+    if 7 <= len(digits) <= 10:
+        return default_country + digits
+    if len(digits) > 10:
+        return '+' + digits
+    return None
+
+
+def _merge(apps, keep_id, dup_ids, placeholders):
+    """Move the duplicates' memberships and history onto ``keep_id``, then delete them"""
+    Contact = apps.get_model('core', 'Contact')
+    ContactGroup = apps.get_model('core', 'ContactGroup')
+    OrgAlertRecipient = apps.get_model('core', 'OrgAlertRecipient')
+    Membership = ContactGroup.contacts.through
+
+    # Merge group memberships onto the surviving contact
+    keep_groups = set(Membership.objects.filter(contact_id=keep_id).values_list('contactgroup_id', flat=True))
+    dup_groups = set(Membership.objects.filter(contact_id__in=dup_ids).values_list('contactgroup_id', flat=True))
+    Membership.objects.bulk_create(
+        [Membership(contactgroup_id=gid, contact_id=keep_id) for gid in dup_groups - keep_groups]
+    )
+
+    # Keep delivery history attached to the surviving contact
+    OrgAlertRecipient.objects.filter(contact_id__in=dup_ids).update(contact_id=keep_id)
+
+    # Prefer a real name over the phone-number placeholder used by imports
+    keeper = Contact.objects.get(id=keep_id)
+    if not keeper.name or keeper.name in placeholders:
+        better = (
+            Contact.objects.filter(id__in=dup_ids)
+            .exclude(name='')
+            .exclude(name__in=placeholders)
+            .order_by('-id')
+            .values_list('name', flat=True)
+            .first()
+        )
+        if better:
+            Contact.objects.filter(id=keep_id).update(name=better)
+
+    Membership.objects.filter(contact_id__in=dup_ids).delete()
+    Contact.objects.filter(id__in=dup_ids).delete()
+
+
+def dedupe_contacts(apps, schema_editor):
+    """Collapse contacts of an organization whose numbers normalize alike into the oldest row.
+
+    '0241234567', '+233 24 123 4567' and '233241234567' are one person, so
+    numbers are grouped by their normalized form, not their stored text.
+    Group memberships and message recipient history of the duplicates are
+    moved onto the surviving contact before the duplicates are deleted, and
+    every number that normalizes is stored normalized, so the unique
+    constraint added in the next migration can be created safely and later
+    (normalized) imports match the existing rows.
+    """
+    Contact = apps.get_model('core', 'Contact')
+
+    organization_ids = Contact.objects.order_by().values_list('organization_id', flat=True).distinct()
+    for organization_id in list(organization_ids):
+        by_number = {}
+        rows = Contact.objects.filter(organization_id=organization_id).order_by('id').values_list('id', 'phone_number')
+        for pk, phone_number in rows.iterator():
+            normalized = normalize_phone_number(phone_number)
+            by_number.setdefault(normalized or phone_number, []).append((pk, phone_number))
+
+        renamed = []
+        for number, contacts in by_number.items():
+            keep_id, keep_phone = contacts[0]
+            if len(contacts) > 1:
+                placeholders = {number} | {phone for _, phone in contacts}
+                _merge(apps, keep_id, [pk for pk, _ in contacts[1:]], placeholders)
+            if keep_phone != number:
+                renamed.append(Contact(id=keep_id, phone_number=number))
+        Contact.objects.bulk_update(renamed, ['phone_number'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0038_contactimportjob'),
+    ]
+
+    operations = [
+        migrations.RunPython(dedupe_contacts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.18 on 2026-10-19 16:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0039_dedupe_contacts'),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='contact',
+            constraint=models.UniqueConstraint(fields=('organization', 'phone_number'), name='unique_contact_phone_per_org'),
+        ),
+        migrations.RemoveIndex(
+            model_name='contact',
+            name='core_contac_organiz_b67585_idx',
+        ),
+        migrations.AddField(
+            model_name='contactimportjob',
+            name='rows_updated',
+            field=models.PositiveIntegerField(default=0, help_text='Imported rows that matched an existing contact'),
+        ),
+    ]
@@ -0,0 +1,96 @@
+# Generated by Django 5.2.18 on 2026-10-19 16:51
+
+import logging
+
+from django.db import DatabaseError, migrations, models, transaction
+
+logger = logging.getLogger(__name__)
+
+SQLITE_FTS_FORWARD = [
+    # External-content FTS5 table over core_contact; the trigram tokenizer makes
+    # MATCH behave like a case-insensitive substring search (sqlite >= 3.34)
+    """CREATE VIRTUAL TABLE core_contact_fts USING fts5(
+        name, phone_number, content='core_contact', content_rowid='id', tokenize='trigram'
+    )""",
+    """CREATE TRIGGER core_contact_fts_ai AFTER INSERT ON core_contact BEGIN
+        INSERT INTO core_contact_fts(rowid, name, phone_number) VALUES (new.id, new.name, new.phone_number);
+    END""",
+    """CREATE TRIGGER core_contact_fts_ad AFTER DELETE ON core_contact BEGIN
+        INSERT INTO core_contact_fts(core_contact_fts, rowid, name, phone_number)
+        VALUES ('delete', old.id, old.name, old.phone_number);
+    END""",
+    """CREATE TRIGGER core_contact_fts_au AFTER UPDATE OF name, phone_number ON core_contact BEGIN
+        INSERT INTO core_contact_fts(core_contact_fts, rowid, name, phone_number)
+        VALUES ('delete', old.id, old.name, old.phone_number);
+        INSERT INTO core_contact_fts(rowid, name, phone_number) VALUES (new.id, new.name, new.phone_number);
+    END""",
+    "INSERT INTO core_contact_fts(core_contact_fts) VALUES ('rebuild')",
+]
+
+SQLITE_FTS_REVERSE = [
+    'DROP TRIGGER IF EXISTS core_contact_fts_ai',
+    'DROP TRIGGER IF EXISTS core_contact_fts_ad',
+    'DROP TRIGGER IF EXISTS core_contact_fts_au',
+    'DROP TABLE IF EXISTS core_contact_fts',
+]
+
+POSTGRES_TRGM_FORWARD = [
+    'CREATE EXTENSION IF NOT EXISTS pg_trgm',
+    # Django's icontains compares UPPER(name), so index that expression
+    'CREATE INDEX IF NOT EXISTS core_contact_name_trgm ON core_contact USING gin (UPPER(name) gin_trgm_ops)',
+    'CREATE INDEX IF NOT EXISTS core_contact_phone_trgm ON core_contact USING gin (phone_number gin_trgm_ops)',
+]
+
+POSTGRES_TRGM_REVERSE = [
+    'DROP INDEX IF EXISTS core_contact_name_trgm',
+    'DROP INDEX IF EXISTS core_contact_phone_trgm',
+]
+
+
+def create_search_indexes(apps, schema_editor):
+    """Add the contact search index for the current database, if it supports one.
+
+    Search still works without it (as a scan), so a database that lacks FTS5
+    trigram support or does not allow pg_trgm only logs a warning.
+    """
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        statements = SQLITE_FTS_FORWARD
+    elif vendor == 'postgresql':
+        statements = POSTGRES_TRGM_FORWARD
+    else:
+        return
+    try:
+        with transaction.atomic(using=schema_editor.connection.alias):
+            with schema_editor.connection.cursor() as cursor:
+                for sql in statements:
+                    cursor.execute(sql)
+    except DatabaseError as e:
+        logger.warning('Skipping contact search index (%s); search will scan instead.', e)
+
+
+def drop_search_indexes(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    statements = {'sqlite': SQLITE_FTS_REVERSE, 'postgresql': POSTGRES_TRGM_REVERSE}.get(vendor, [])
+    with schema_editor.connection.cursor() as cursor:
+        for sql in statements:
+            cursor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0040_contact_unique_phone'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='contact',
+            name='core_contac_organiz_fb70f0_idx',
+        ),
+        migrations.AddIndex(
+            model_name='contact',
+            index=models.Index(fields=['organization', 'name', 'id'], name='core_contac_organiz_2f8360_idx'),
+        ),
+        migrations.RunPython(create_search_indexes, drop_search_indexes),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-19 16:56
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0041_contact_search_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='contactimportjob',
+            name='group',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='membership_imports', to='core.contactgroup'),
+        ),
+        migrations.AddField(
+            model_name='contactimportjob',
+            name='members_added',
+            field=models.PositiveIntegerField(default=0, help_text='Contacts newly added to the target group'),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.18 on 2026-10-19 16:58
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0042_contactimportjob_group'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ContactSegment',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100)),
+                ('rules', models.JSONField(default=list)),
+                ('match', models.CharField(choices=[('all', 'Match all rules'), ('any', 'Match any rule')], default='all', max_length=3)),
+                ('estimated_count', models.PositiveIntegerField(blank=True, null=True)),
+                ('count_refreshed_at', models.DateTimeField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('organization', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='segments', to='core.organization')),
+            ],
+            options={
+                'ordering': ['name'],
+            },
+        ),
+        migrations.AddField(
+            model_name='orgmessage',
+            name='segments',
+            field=models.ManyToManyField(blank=True, related_name='messages', to='core.contactsegment'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-19 18:02
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_member_counts(apps, schema_editor):
+    ContactGroup = apps.get_model('core', 'ContactGroup')
+    Membership = ContactGroup.contacts.through
+    counts = Membership.objects.filter(contactgroup=OuterRef('pk')).order_by().values('contactgroup').annotate(n=Count('*')).values('n')
+    ContactGroup.objects.update(member_count=Coalesce(Subquery(counts), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0043_contactsegment'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='contactgroup',
+            name='member_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_member_counts, migrations.RunPython.noop),
+    ]
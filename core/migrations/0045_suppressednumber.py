@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:04
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0044_contactgroup_member_count'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SuppressedNumber',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('phone_number', models.CharField(max_length=20)),
+                ('reason', models.CharField(choices=[('opt_out', 'Opted out'), ('invalid', 'Invalid / dead number'), ('complaint', 'Complaint'), ('manual', 'Added manually')], default='manual', max_length=20)),
+                ('note', models.CharField(blank=True, max_length=255)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL)),
+                ('organization', models.ForeignKey(blank=True, help_text='Leave empty to suppress the number for every organization', null=True, on_delete=django.db.models.deletion.CASCADE, related_name='suppressed_numbers', to='core.organization')),
+            ],
+            options={
+                'ordering': ['-created_at'],
+                'constraints': [models.UniqueConstraint(fields=('organization', 'phone_number'), name='uniq_org_suppressed_number'), models.UniqueConstraint(condition=models.Q(('organization__isnull', True)), fields=('phone_number',), name='uniq_global_suppressed_number')],
+            },
+        ),
+    ]
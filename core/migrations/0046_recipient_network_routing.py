@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:08
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0045_suppressednumber'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='orgalertrecipient',
+            name='network',
+            field=models.CharField(blank=True, default='', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='orgalertrecipient',
+            name='sender',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='core.sender'),
+        ),
+        migrations.AddField(
+            model_name='sender',
+            name='network_costs',
+            field=models.JSONField(blank=True, default=dict, help_text='Cost per SMS by destination network'),
+        ),
+    ]
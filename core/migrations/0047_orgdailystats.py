@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:13
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0046_recipient_network_routing'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OrgDailyStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('status', models.CharField(max_length=20)),
+                ('count', models.IntegerField(default=0)),
+                ('organization', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_stats', to='core.organization')),
+                ('sender', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='core.sender')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['organization', 'day'], name='core_orgdai_organiz_cc93da_idx'), models.Index(fields=['day', 'status'], name='core_orgdai_day_ed059a_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 5.2.18 on 2026-10-19 18:40
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_counters(apps, schema_editor):
+    OrgMessage = apps.get_model('core', 'OrgMessage')
+    OrgAlertRecipient = apps.get_model('core', 'OrgAlertRecipient')
+
+    def count(condition=Q()):
+        recipients = OrgAlertRecipient.objects.filter(condition, message=OuterRef('pk')).order_by().values('message')
+        return Coalesce(Subquery(recipients.annotate(n=Count('*')).values('n')), 0)
+
+    OrgMessage.objects.update(
+        total_count=count(),
+        sent_count=count(Q(status='sent')),
+        failed_count=count(Q(status='failed')),
+        pending_count=count(Q(status='pending')),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0047_orgdailystats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='orgmessage',
+            name='failed_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='orgmessage',
+            name='pending_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='orgmessage',
+            name='sent_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='orgmessage',
+            name='total_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 19:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0048_orgmessage_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='orgalertrecipient',
+            name='delivered_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
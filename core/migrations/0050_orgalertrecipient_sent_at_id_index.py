@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-19 19:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0049_orgalertrecipient_delivered_at'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='orgalertrecipient',
+            index=models.Index(fields=['sent_at', 'id'], name='core_orgale_sent_at_117f6f_idx'),
+        ),
+    ]
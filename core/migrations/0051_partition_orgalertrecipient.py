@@ -0,0 +1,152 @@
+# Generated by Django 5.2.18 on 2026-10-19 18:05
+
+import datetime
+import re
+
+import django.utils.timezone
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+TABLE = 'core_orgalertrecipient'
+LEGACY = 'core_orgalertrecipient_unpartitioned'
+MONTHS_AHEAD = 3
+
+
+def backfill_created_at(apps, schema_editor):
+    """Existing recipients were created with their message"""
+    OrgAlertRecipient = apps.get_model('core', 'OrgAlertRecipient')
+    OrgMessage = apps.get_model('core', 'OrgMessage')
+    OrgAlertRecipient.objects.update(
+        created_at=Subquery(OrgMessage.objects.filter(pk=OuterRef('message_id')).values('created_at')[:1])
+    )
+
+
+def _month_start(value):
+    return datetime.datetime(value.year, value.month, 1, tzinfo=datetime.timezone.utc)
+
+
+def _next_month(start):
+    return _month_start(start + datetime.timedelta(days=32))
+
+
+def _indexes_and_foreign_keys(cursor, table):
+    cursor.execute(
+        """SELECT pg_get_indexdef(ix.indexrelid) FROM pg_index ix
+        WHERE ix.indrelid = %s::regclass AND NOT ix.indisprimary""",
+        [table],
+    )
+    indexes = [row[0] for row in cursor.fetchall()]
+    cursor.execute(
+        "SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint WHERE conrelid = %s::regclass AND contype = 'f'",
+        [table],
+    )
+    return indexes, cursor.fetchall()
+
+
+def _recreate(cursor, quote, source, indexes, foreign_keys):
+    """Re-run ``source``'s index and FK definitions against TABLE (``source`` has been dropped)"""
+    pattern = re.compile(r' ON (ONLY )?(\S+\.)?"?%s"? ' % re.escape(source))
+    for definition in indexes:
+        cursor.execute(pattern.sub(f' ON {quote(TABLE)} ', definition, count=1))
+    for name, definition in foreign_keys:
+        cursor.execute(f'ALTER TABLE {quote(TABLE)} ADD CONSTRAINT {quote(name)} {definition}')
+
+
+def _keep_sequence(cursor, quote):
+    """Hand a serial (pre-identity) id sequence from LEGACY to TABLE so dropping LEGACY keeps it"""
+    cursor.execute("SELECT attidentity FROM pg_attribute WHERE attrelid = %s::regclass AND attname = 'id'", [LEGACY])
+    if cursor.fetchone()[0]:
+        return
+    cursor.execute("SELECT pg_get_serial_sequence(%s, 'id')", [LEGACY])
+    sequence = cursor.fetchone()[0]
+    if sequence:
+        cursor.execute(f'ALTER SEQUENCE {sequence} OWNED BY {quote(TABLE)}.id')
+
+
+def partition_table(apps, schema_editor):
+    """Rebuild core_orgalertrecipient as a table range-partitioned by month on created_at.
+
+    Every month from the oldest row to MONTHS_AHEAD months from now gets a
+    partition, plus a DEFAULT partition so an insert never fails if the
+    manage_recipient_partitions command has not run. The primary key becomes
+    (id, created_at) because Postgres requires the partition key in it; ids
+    stay unique through the identity sequence. Rows are copied in one
+    statement, so run this during a quiet period on a large table.
+    Other databases keep a single table.
+    """
+    connection = schema_editor.connection
+    if connection.vendor != 'postgresql':
+        return
+    quote = schema_editor.quote_name
+    with connection.cursor() as cursor:
+        # Flush deferred FK checks from the backfill before altering the table
+        cursor.execute('SET CONSTRAINTS ALL IMMEDIATE')
+        indexes, foreign_keys = _indexes_and_foreign_keys(cursor, TABLE)
+        cursor.execute(f'ALTER TABLE {quote(TABLE)} RENAME TO {quote(LEGACY)}')
+        cursor.execute(
+            f'CREATE TABLE {quote(TABLE)} (LIKE {quote(LEGACY)} INCLUDING DEFAULTS INCLUDING IDENTITY) '
+            'PARTITION BY RANGE (created_at)'
+        )
+        cursor.execute(f'SELECT MIN(created_at) FROM {quote(LEGACY)}')
+        oldest = cursor.fetchone()[0] or django.utils.timezone.now()
+        start = _month_start(oldest)
+        last = _month_start(django.utils.timezone.now())
+        for _ in range(MONTHS_AHEAD):
+            last = _next_month(last)
+        while start <= last:
+            end = _next_month(start)
+            cursor.execute(
+                f'CREATE TABLE {quote(TABLE + start.strftime("_p%Y_%m"))} PARTITION OF {quote(TABLE)} '
+                'FOR VALUES FROM (%s) TO (%s)',
+                [start, end],
+            )
+            start = end
+        cursor.execute(f'CREATE TABLE {quote(TABLE + "_default")} PARTITION OF {quote(TABLE)} DEFAULT')
+        _keep_sequence(cursor, quote)
+        cursor.execute(f'INSERT INTO {quote(TABLE)} SELECT * FROM {quote(LEGACY)}')
+        cursor.execute(f'DROP TABLE {quote(LEGACY)}')
+        cursor.execute(f'ALTER TABLE {quote(TABLE)} ADD PRIMARY KEY (id, created_at)')
+        _recreate(cursor, quote, LEGACY, indexes, foreign_keys)
+        cursor.execute(
+            f"SELECT setval(pg_get_serial_sequence(%s, 'id'), COALESCE(MAX(id), 1)) FROM {quote(TABLE)}",
+            [TABLE],
+        )
+
+
+def unpartition_table(apps, schema_editor):
+    """Copy the attached partitions back into a single table"""
+    connection = schema_editor.connection
+    if connection.vendor != 'postgresql':
+        return
+    quote = schema_editor.quote_name
+    with connection.cursor() as cursor:
+        indexes, foreign_keys = _indexes_and_foreign_keys(cursor, TABLE)
+        cursor.execute(f'ALTER TABLE {quote(TABLE)} RENAME TO {quote(LEGACY)}')
+        cursor.execute(f'CREATE TABLE {quote(TABLE)} (LIKE {quote(LEGACY)} INCLUDING DEFAULTS INCLUDING IDENTITY)')
+        _keep_sequence(cursor, quote)
+        cursor.execute(f'INSERT INTO {quote(TABLE)} SELECT * FROM {quote(LEGACY)}')
+        cursor.execute(f'DROP TABLE {quote(LEGACY)} CASCADE')
+        cursor.execute(f'ALTER TABLE {quote(TABLE)} ADD PRIMARY KEY (id)')
+        _recreate(cursor, quote, LEGACY, indexes, foreign_keys)
+        cursor.execute(
+            f"SELECT setval(pg_get_serial_sequence(%s, 'id'), COALESCE(MAX(id), 1)) FROM {quote(TABLE)}",
+            [TABLE],
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0050_orgalertrecipient_sent_at_id_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='orgalertrecipient',
+            name='created_at',
+            field=models.DateTimeField(auto_now_add=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.RunPython(backfill_created_at, migrations.RunPython.noop),
+        migrations.RunPython(partition_table, unpartition_table),
+    ]
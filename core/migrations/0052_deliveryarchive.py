@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-19 18:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0051_partition_orgalertrecipient'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DeliveryArchive',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('org_recipient', 'Organization recipients'), ('school_recipient', 'School recipients'), ('audit_log', 'Audit logs')], max_length=20)),
+                ('month', models.DateField(help_text='First day of the month the rows were created in (UTC)')),
+                ('path', models.CharField(max_length=255, unique=True)),
+                ('row_count', models.PositiveIntegerField(default=0)),
+                ('sent_count', models.PositiveIntegerField(default=0)),
+                ('failed_count', models.PositiveIntegerField(default=0)),
+                ('first_id', models.BigIntegerField()),
+                ('last_id', models.BigIntegerField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('organization', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='core.organization')),
+                ('school', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='core.school')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['kind', 'organization', 'month'], name='core_delive_kind_2b00a9_idx'), models.Index(fields=['kind', 'school', 'month'], name='core_delive_kind_4bd890_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 5.2.18 on 2026-10-19 19:20
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+# The codes in core.utils.delivery_errors.ERROR_CODES when this migration was written
+ERROR_CODES = [
+    ('suppressed', 'Number is on the suppression list'),
+    ('org_banned', 'Organization is banned'),
+    ('insufficient_credit', 'Insufficient credit or gateway balance'),
+    ('auth', 'Provider rejected the credentials'),
+    ('invalid_number', 'Invalid destination number'),
+    ('timeout', 'Timed out waiting for the provider'),
+    ('connection', 'Could not reach the provider'),
+    ('not_accepted', 'Provider did not accept the message'),
+    ('provider_failed', 'Provider reported the message undelivered'),
+    ('unexpected', 'Unexpected error while sending'),
+    ('other', 'Other error'),
+]
+
+
+def seed_error_codes(apps, schema_editor):
+    DeliveryError = apps.get_model('core', 'DeliveryError')
+    for code, description in ERROR_CODES:
+        DeliveryError.objects.get_or_create(code=code, defaults={'description': description})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0052_deliveryarchive'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DeliveryError',
+            fields=[
+                ('id', models.SmallAutoField(primary_key=True, serialize=False)),
+                ('code', models.SlugField(unique=True)),
+                ('description', models.CharField(max_length=255)),
+                ('example', models.TextField(blank=True, default='')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='orgalertrecipient',
+            name='error',
+            field=models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='core.deliveryerror'),
+        ),
+        migrations.RunPython(seed_error_codes, migrations.RunPython.noop),
+    ]
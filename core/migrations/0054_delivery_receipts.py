@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-19 19:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0053_delivery_error_catalogue'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DeliveryReceipt',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('provider', models.CharField(default='hubtel', max_length=20)),
+                ('provider_message_id', models.CharField(max_length=255)),
+                ('status', models.CharField(blank=True, default='', max_length=100)),
+                ('received_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='alertrecipient',
+            index=models.Index(fields=['provider_message_id'], name='core_alertr_provide_9ecd09_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='orgalertrecipient',
+            index=models.Index(fields=['provider_message_id'], name='core_orgale_provide_6435c7_idx'),
+        ),
+    ]
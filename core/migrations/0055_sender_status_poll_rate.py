@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 20:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0054_delivery_receipts'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='sender',
+            name='status_poll_rate',
+            field=models.PositiveSmallIntegerField(default=5, help_text="Delivery status queries per second this sender's gateway allows"),
+        ),
+    ]
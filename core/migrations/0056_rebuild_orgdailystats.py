@@ -0,0 +1,68 @@
+# Generated by Django 5.2.18 on 2026-10-19 20:20
+
+import datetime
+
+from django.db import migrations
+from django.db.models import Count, Max, Min, Sum
+from django.db.models.functions import Coalesce, TruncDate
+
+
+def rebuild_rollup(apps, schema_editor):
+    """Recount OrgDailyStats before 0057 makes each bucket unique.
+
+    Concurrent writers could create a bucket twice, after which every update
+    counted on both rows, so the stored counts cannot be trusted. Days that
+    still have their recipient rows are recounted from them (what the
+    rebuild_daily_stats command does). Months already archived have no rows to
+    count; their duplicate buckets are merged into one, keeping the total.
+    """
+    OrgDailyStats = apps.get_model('core', 'OrgDailyStats')
+    OrgAlertRecipient = apps.get_model('core', 'OrgAlertRecipient')
+    DeliveryArchive = apps.get_model('core', 'DeliveryArchive')
+
+    archived = DeliveryArchive.objects.filter(kind='org_recipient').aggregate(last=Max('month'))['last']
+    first_day = None
+    if archived:
+        first_day = (archived.replace(day=1) + datetime.timedelta(days=32)).replace(day=1)
+
+    recipients = OrgAlertRecipient.objects.annotate(day=TruncDate(Coalesce('sent_at', 'message__created_at')))
+    recount = OrgDailyStats.objects.all()
+    if first_day is not None:
+        recipients = recipients.filter(day__gte=first_day)
+        recount = recount.filter(day__gte=first_day)
+    rows = recipients.values('message__organization_id', 'day', 'status', 'sender_id').annotate(total=Count('id')).order_by()
+    recount.delete()
+    OrgDailyStats.objects.bulk_create(
+        (
+            OrgDailyStats(
+                organization_id=row['message__organization_id'], day=row['day'], status=row['status'],
+                sender_id=row['sender_id'], count=row['total'],
+            )
+            for row in rows
+        ),
+        batch_size=1000,
+    )
+
+    duplicates = (
+        OrgDailyStats.objects.values('organization_id', 'day', 'status', 'sender_id')
+        .annotate(rows=Count('id'), total=Sum('count'), keep=Min('id'))
+        .filter(rows__gt=1).order_by()
+    )
+    for bucket in duplicates:
+        same = OrgDailyStats.objects.filter(
+            organization_id=bucket['organization_id'], day=bucket['day'],
+            status=bucket['status'], sender_id=bucket['sender_id'],
+        )
+        same.exclude(id=bucket['keep']).delete()
+        same.update(count=bucket['total'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0055_sender_status_poll_rate'),
+    ]
+
+    operations = [
+        migrations.RunPython(rebuild_rollup, migrations.RunPython.noop),
+    ]
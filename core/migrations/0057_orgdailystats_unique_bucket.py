@@ -0,0 +1,21 @@
+# Generated by Django 5.2.18 on 2026-10-19 20:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0056_rebuild_orgdailystats'),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='orgdailystats',
+            constraint=models.UniqueConstraint(condition=models.Q(('sender__isnull', False)), fields=('organization', 'day', 'status', 'sender'), name='orgdailystats_unique_bucket'),
+        ),
+        migrations.AddConstraint(
+            model_name='orgdailystats',
+            constraint=models.UniqueConstraint(condition=models.Q(('sender__isnull', True)), fields=('organization', 'day', 'status'), name='orgdailystats_unique_bucket_no_sender'),
+        ),
+    ]
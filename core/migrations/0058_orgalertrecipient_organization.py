@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-19 20:30
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def backfill_organization(apps, schema_editor):
+    """Copy each recipient's organization from its message"""
+    OrgAlertRecipient = apps.get_model('core', 'OrgAlertRecipient')
+    OrgMessage = apps.get_model('core', 'OrgMessage')
+    OrgAlertRecipient.objects.filter(organization__isnull=True).update(
+        organization=Subquery(OrgMessage.objects.filter(pk=OuterRef('message_id')).values('organization_id')[:1])
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0057_orgdailystats_unique_bucket'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='orgalertrecipient',
+            name='organization',
+            field=models.ForeignKey(db_index=False, editable=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='core.organization'),
+        ),
+        migrations.RunPython(backfill_organization, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-19 20:35
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # Separate from 0058: Postgres will not alter a table with the backfill's
+    # deferred foreign key checks still pending in the same transaction
+
+    dependencies = [
+        ('core', '0058_orgalertrecipient_organization'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='orgalertrecipient',
+            name='organization',
+            field=models.ForeignKey(db_index=False, editable=False, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='core.organization'),
+        ),
+        migrations.AddIndex(
+            model_name='orgalertrecipient',
+            index=models.Index(fields=['organization', 'sent_at', 'id'], name='core_orgale_organiz_3d156e_idx'),
+        ),
+    ]
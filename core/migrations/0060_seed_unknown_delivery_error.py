@@ -0,0 +1,20 @@
+# Generated by Django 5.2.18 on 2026-10-19 20:40
+
+from django.db import migrations
+
+
+def seed_unknown(apps, schema_editor):
+    DeliveryError = apps.get_model('core', 'DeliveryError')
+    DeliveryError.objects.get_or_create(code='unknown', defaults={'description': 'Failed before error details were recorded'})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0059_orgalertrecipient_organization_required'),
+    ]
+
+    operations = [
+        # Recipients may point at the row by now (PROTECT), so it stays on reverse
+        migrations.RunPython(seed_unknown, migrations.RunPython.noop),
+    ]
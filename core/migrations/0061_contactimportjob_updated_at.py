@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 20:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0060_seed_unknown_delivery_error'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='contactimportjob',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
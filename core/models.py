@@ -17,6 +17,8 @@ class AlertRecipient(models.Model):
 		indexes = [
 			models.Index(fields=['status', 'sent_at']),
 			models.Index(fields=['message', 'status']),
+			# Delivery receipts are matched on the provider's id
+			models.Index(fields=['provider_message_id']),
 		]
 
 	def __str__(self):
@@ -133,6 +135,14 @@ class OrgMessage(models.Model):
 	sent = models.BooleanField(default=False)
 	created_at = models.DateTimeField(auto_now_add=True)
 	created_by = models.ForeignKey('User', on_delete=models.SET_NULL, null=True, blank=True)
+	# Dynamic audiences resolved when a scheduled message is dispatched
+	segments = models.ManyToManyField('ContactSegment', blank=True, related_name='messages')
+	# Recipient counts by status, moved with F() alongside every status change
+	# (see utils/daily_stats.py); reconcile_message_counts repairs drift
+	total_count = models.PositiveIntegerField(default=0)
+	sent_count = models.PositiveIntegerField(default=0)
+	failed_count = models.PositiveIntegerField(default=0)
+	pending_count = models.PositiveIntegerField(default=0)
 
 	class Meta:
 		indexes = [
@@ -143,19 +153,19 @@ class OrgMessage(models.Model):
 
 	def get_recipients_count(self):
 		"""Get total number of recipients for this message"""
-		return self.recipients_status.count()
+		return self.total_count
 
 	def get_sent_recipients_count(self):
 		"""Get number of successfully sent recipients"""
-		return self.recipients_status.filter(status='sent').count()
+		return self.sent_count
 
 	def get_failed_recipients_count(self):
 		"""Get number of failed recipients"""
-		return self.recipients_status.filter(status='failed').count()
+		return self.failed_count
 
 	def get_pending_recipients_count(self):
 		"""Get number of pending recipients"""
-		return self.recipients_status.filter(status='pending').count()
+		return self.pending_count
 
 	def get_delivery_rate(self):
 		"""Calculate delivery rate for this message"""
@@ -164,28 +174,15 @@ class OrgMessage(models.Model):
 		return (sent / total * 100) if total > 0 else 0
 
 	def get_average_send_time(self):
-		"""Calculate average time to send messages"""
-		sent_recipients = self.recipients_status.filter(status='sent', sent_at__isnull=False)
-		if not sent_recipients.exists():
-			return None
-		total_time = sum((recipient.sent_at - self.created_at).total_seconds() for recipient in sent_recipients)
-		return total_time / sent_recipients.count()
+		"""Average seconds from creation to sent, averaged in the database"""
+		from .utils.delivery_reports import message_report
+		avg = message_report(self).avg_send_time
+		return avg.total_seconds() if avg is not None else None
 
 	def get_provider_breakdown(self):
-		"""Get success rates by provider"""
-		total = self.get_recipients_count()
-		if total == 0:
-			return {'hubtel': 0, 'clicksend': 0, 'unknown': 0}
-		
-		hubtel_sent = self.recipients_status.filter(status='sent', provider_message_id__isnull=False).exclude(provider_message_id='').count()
-		clicksend_sent = self.recipients_status.filter(status='sent', provider_message_id__isnull=True).count()
-		unknown_sent = self.get_sent_recipients_count() - hubtel_sent - clicksend_sent
-		
-		return {
-			'hubtel': (hubtel_sent / total * 100) if total > 0 else 0,
-			'clicksend': (clicksend_sent / total * 100) if total > 0 else 0,
-			'unknown': (unknown_sent / total * 100) if total > 0 else 0
-		}
+		"""Get success rates by provider (one aggregate query)"""
+		from .utils.delivery_reports import message_report, provider_breakdown
+		return provider_breakdown(message_report(self))
 
 	def get_cost_breakdown(self):
 		"""Calculate total cost and cost per successful delivery"""
@@ -203,63 +200,73 @@ class OrgMessage(models.Model):
 		}
 
 	def get_time_based_stats(self):
-		"""Get statistics grouped by time periods"""
-		from django.db.models import Count
-		from django.utils import timezone
-		import datetime
-		
-		now = timezone.now()
-		recipients = self.recipients_status.filter(sent_at__isnull=False)
-		
-		# Last 24 hours
-		last_24h = now - datetime.timedelta(hours=24)
-		stats_24h = recipients.filter(sent_at__gte=last_24h).aggregate(
-			sent=Count('id', filter=models.Q(status='sent')),
-			failed=Count('id', filter=models.Q(status='failed'))
-		)
-		
-		# Last 7 days
-		last_7d = now - datetime.timedelta(days=7)
-		stats_7d = recipients.filter(sent_at__gte=last_7d).aggregate(
-			sent=Count('id', filter=models.Q(status='sent')),
-			failed=Count('id', filter=models.Q(status='failed'))
-		)
-		
-		return {
-			'last_24h': stats_24h,
-			'last_7d': stats_7d
-		}
+		"""Get statistics grouped by time periods (one aggregate query)"""
+		from .utils.delivery_reports import message_report, time_stats
+		return time_stats(message_report(self))
+
+	def get_latency_percentiles(self):
+		"""p50/p95/p99 seconds for submit-to-sent and sent-to-delivered"""
+		from .utils.delivery_reports import latency_percentiles
+		return latency_percentiles(self.get_recipient_rows())
 
 	def get_detailed_report(self):
-		"""Get comprehensive delivery report"""
-		return {
-			'total_recipients': self.get_recipients_count(),
-			'sent_count': self.get_sent_recipients_count(),
-			'failed_count': self.get_failed_recipients_count(),
-			'pending_count': self.get_pending_recipients_count(),
-			'delivery_rate': self.get_delivery_rate(),
-			'average_send_time': self.get_average_send_time(),
-			'provider_breakdown': self.get_provider_breakdown(),
-			'cost_breakdown': self.get_cost_breakdown(),
-			'time_stats': self.get_time_based_stats()
-		}
+		"""Get comprehensive delivery report: one aggregate for the figures, one for latency"""
+		from .utils.delivery_reports import build_report, message_report
+		report = build_report(message_report(self), self.organization.get_current_sms_rate())
+		report['latency'] = self.get_latency_percentiles()
+		return report
+
+	def get_recipient_rows(self):
+		"""This message's recipient rows, bounded below by the message's creation time.
+
+		Recipients are never created before their message, so the bound changes
+		nothing but lets Postgres skip the monthly partitions older than the message.
+		"""
+		return self.recipients_status.filter(created_at__gte=self.created_at)
 
 	def mark_as_sent(self):
 		"""Mark message as sent"""
 		self.sent = True
 		self.save(update_fields=['sent'])
 
-	def create_recipients(self, contacts):
-		"""Create OrgAlertRecipient instances for the given contacts"""
-		from .models import OrgAlertRecipient
-		recipients = []
-		for contact in contacts:
-			recipients.append(OrgAlertRecipient(
-				message=self,
-				contact=contact,
-				status='pending'
+	def create_recipients(self, contacts, batch_size=1000):
+		"""Create pending OrgAlertRecipient rows for the given contacts.
+
+		``contacts`` may be a Contact queryset, which is streamed as ids (skipping
+		contacts that are already recipients of this message) and inserted in
+		batches, or any iterable of Contact instances. Suppressed numbers are
+		dropped here, so they never get a recipient row. Returns the number created.
+		"""
+		from django.db.models import Exists, OuterRef, QuerySet
+		from .utils.networks import classify_network
+		from .utils.suppression import get_suppressed_numbers
+		suppressed = get_suppressed_numbers(self.organization_id)
+		if isinstance(contacts, QuerySet):
+			already = OrgAlertRecipient.objects.filter(message=self, contact=OuterRef('pk'))
+			rows = contacts.filter(~Exists(already)).order_by().values_list('id', 'phone_number').distinct().iterator(chunk_size=batch_size)
+		else:
+			rows = ((contact.id, contact.phone_number) for contact in contacts)
+		created = 0
+		batch = []
+		for contact_id, phone_number in rows:
+			if phone_number in suppressed:
+				continue
+			batch.append(OrgAlertRecipient(
+				message=self, organization_id=self.organization_id, contact_id=contact_id, status='pending',
+				network=classify_network(phone_number),
 			))
-		return OrgAlertRecipient.objects.bulk_create(recipients)
+			if len(batch) >= batch_size:
+				OrgAlertRecipient.objects.bulk_create(batch)
+				created += len(batch)
+				batch = []
+		if batch:
+			OrgAlertRecipient.objects.bulk_create(batch)
+			created += len(batch)
+		if created:
+			from django.utils import timezone
+			from .utils.daily_stats import apply_deltas
+			apply_deltas({(self.organization_id, timezone.localdate(self.created_at), 'pending', None, self.pk): created})
+		return created
 
 	def __str__(self):
 		return f"Message to {self.organization.name} at {self.scheduled_time}"
@@ -267,15 +274,31 @@ class OrgMessage(models.Model):
 
 class OrgAlertRecipient(models.Model):
 	message = models.ForeignKey('OrgMessage', on_delete=models.CASCADE, related_name='recipients_status')
+	# Copied from the message so an organization's logs are one index range
+	# (``organization, sent_at, id``) instead of a join through every message
+	organization = models.ForeignKey('Organization', on_delete=models.CASCADE, related_name='+', db_index=False, editable=False)
 	contact = models.ForeignKey('Contact', on_delete=models.CASCADE)
 	status = models.CharField(max_length=20, choices=[('pending', 'Pending'), ('sent', 'Sent'), ('failed', 'Failed')], default='pending')
 	sent_at = models.DateTimeField(blank=True, null=True)
+	# Partition key on Postgres (monthly range partitions, see utils/partitions.py);
+	# never earlier than the message's own created_at
+	created_at = models.DateTimeField(auto_now_add=True)
+	# When the provider reported the message delivered to the handset
+	delivered_at = models.DateTimeField(blank=True, null=True)
+	# Why the recipient failed, as a catalogue code (utils/delivery_errors.py). Not
+	# indexed: breakdowns are grouped within a message or organization's rows.
+	error = models.ForeignKey('DeliveryError', on_delete=models.PROTECT, null=True, blank=True, related_name='+', db_index=False)
+	# Raw error text, kept on a sample of rows only
 	error_message = models.TextField(blank=True, null=True)
 	# Provider tracking and retry metadata
 	provider_message_id = models.CharField(max_length=255, blank=True, null=True)
 	provider_status = models.CharField(max_length=100, blank=True, null=True)
 	retry_count = models.IntegerField(default=0)
 	last_retry_at = models.DateTimeField(blank=True, null=True)
+	# Destination carrier (core.utils.networks), classified when the row is created
+	network = models.CharField(max_length=20, blank=True, default='')
+	# Sender the message was routed through
+	sender = models.ForeignKey('Sender', on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
 	# Soft delete for org admin visibility
 	is_deleted = models.BooleanField(default=False)
 
@@ -288,8 +311,19 @@ class OrgAlertRecipient(models.Model):
 			models.Index(fields=['message', 'is_deleted']),
 			models.Index(fields=['contact', 'sent_at']),
 			models.Index(fields=['status', 'retry_count']),
+			# Keyset pages of the message logs, newest first: one organization's
+			# (org_message_logs) and all of them (audit_message_logs_view)
+			models.Index(fields=['organization', 'sent_at', 'id']),
+			models.Index(fields=['sent_at', 'id']),
+			# Delivery receipts are matched on the provider's id
+			models.Index(fields=['provider_message_id']),
 		]
 
+	def save(self, *args, **kwargs):
+		if self.organization_id is None and self.message_id is not None:
+			self.organization_id = self.message.organization_id
+		super().save(*args, **kwargs)
+
 	def mark_as_sent(self, provider_message_id=None):
 		"""Mark recipient as sent with optional provider tracking"""
 		from django.utils import timezone
@@ -303,12 +337,32 @@ class OrgAlertRecipient(models.Model):
 		"""Mark recipient as failed with error details"""
 		from django.utils import timezone
 		self.status = 'failed'
-		self.error_message = error_message or ''
+		self.set_error(error_message or '')
 		if provider_message_id:
 			self.provider_message_id = provider_message_id
 		self.retry_count += 1
 		self.last_retry_at = timezone.now()
-		self.save(update_fields=['status', 'error_message', 'provider_message_id', 'retry_count', 'last_retry_at'])
+		self.save(update_fields=['status', 'error', 'error_message', 'provider_message_id', 'retry_count', 'last_retry_at'])
+
+	def set_error(self, detail=None, code=None):
+		"""Record why this recipient failed: a catalogue code from ``code`` or ``detail``.
+
+		``set_error()`` with neither clears the error. Does not save.
+		"""
+		if detail is None and code is None:
+			self.error_id, self.error_message = None, None
+			return
+		from .utils.delivery_errors import error_fields
+		self.error_id, self.error_message = error_fields(detail, code, self.pk)
+
+	@property
+	def error_description(self):
+		"""Catalogue description of the error, with the raw text when this row kept it"""
+		if self.error_id is None:
+			return self.error_message or ''
+		from .utils.delivery_errors import describe
+		description = describe(self.error_id)
+		return f"{description} ({self.error_message})" if self.error_message else description
 
 	def can_retry(self, max_retries=3):
 		"""Check if this recipient can be retried"""
@@ -408,61 +462,36 @@ class Organization(models.Model):
 		return self.orgmessage_set.count()
 
 	def get_delivery_stats(self):
-		"""Get delivery statistics for the organization"""
-		from django.db.models import Count, Q
-		stats = OrgAlertRecipient.objects.filter(message__organization=self).aggregate(
-			total=Count('id'),
-			sent=Count('id', filter=Q(status='sent')),
-			failed=Count('id', filter=Q(status='failed')),
-			pending=Count('id', filter=Q(status='pending'))
-		)
-		total = stats['total']
-		sent = stats['sent']
+		"""Get delivery statistics for the organization (from the OrgDailyStats rollup)"""
+		from .utils.daily_stats import status_totals
+		stats = status_totals(self)
+		sent = stats.get('sent', 0)
+		total = sum(stats.values())
 		delivery_rate = (sent / total * 100) if total > 0 else 0
 
 		return {
 			'total_recipients': total,
 			'sent_recipients': sent,
-			'failed_recipients': stats['failed'],
-			'pending_recipients': stats['pending'],
+			'failed_recipients': stats.get('failed', 0),
+			'pending_recipients': stats.get('pending', 0),
 			'delivery_rate': delivery_rate
 		}
 
+	def _sent_in_last_days(self, days):
+		from .utils.daily_stats import days_ago, status_totals
+		return status_totals(self, since=days_ago(days - 1)).get('sent', 0)
+
 	def get_sms_stats_today(self):
 		"""Get SMS statistics for today"""
-		from django.utils import timezone
-		from django.db.models import Count
-		today = timezone.now().date()
-
-		return OrgAlertRecipient.objects.filter(
-			message__organization=self,
-			sent_at__date=today,
-			status='sent'
-		).count()
+		return self._sent_in_last_days(1)
 
 	def get_sms_stats_week(self):
 		"""Get SMS statistics for the past week"""
-		from django.utils import timezone
-		from django.db.models import Count
-		week_ago = timezone.now() - timezone.timedelta(days=7)
-
-		return OrgAlertRecipient.objects.filter(
-			message__organization=self,
-			sent_at__gte=week_ago,
-			status='sent'
-		).count()
+		return self._sent_in_last_days(7)
 
 	def get_sms_stats_month(self):
 		"""Get SMS statistics for the past month"""
-		from django.utils import timezone
-		from django.db.models import Count
-		month_ago = timezone.now() - timezone.timedelta(days=30)
-
-		return OrgAlertRecipient.objects.filter(
-			message__organization=self,
-			sent_at__gte=month_ago,
-			status='sent'
-		).count()
+		return self._sent_in_last_days(30)
 
 	def is_low_balance(self):
 		"""Check if organization has low balance (can't send 10 SMS)"""
@@ -495,8 +524,12 @@ class Contact(models.Model):
 	class Meta:
 		indexes = [
 			models.Index(fields=['organization', 'created_at']),
-			models.Index(fields=['organization', 'phone_number']),
-			models.Index(fields=['organization', 'name']),
+			# Keyset pagination seeks on (organization, name, id)
+			models.Index(fields=['organization', 'name', 'id']),
+		]
+		constraints = [
+			# One contact per number per organization (also serves (organization, phone_number) lookups)
+			models.UniqueConstraint(fields=['organization', 'phone_number'], name='unique_contact_phone_per_org'),
 		]
 
 	def clean(self):
@@ -509,50 +542,33 @@ class Contact(models.Model):
 		super().save(*args, **kwargs)
 
 	@classmethod
-	def bulk_create_from_csv(cls, csv_file, organization):
-		"""Bulk create contacts from CSV file"""
-		import csv, io
-		from .utils import normalize_phone_number
-
-		decoded = csv_file.read().decode('utf-8', errors='ignore')
-		reader = csv.DictReader(io.StringIO(decoded))
-
-		contacts_to_create = []
-		for row in reader:
-			phone = (row.get('phone') or row.get('phone_number') or '').strip()
-			name = (row.get('name') or row.get('contact_name') or '').strip()
-
-			if phone:
-				normalized_phone = normalize_phone_number(phone) or phone
-				if normalized_phone:
-					contacts_to_create.append(cls(
-						organization=organization,
-						name=name or normalized_phone,
-						phone_number=normalized_phone
-					))
-
-		return cls.objects.bulk_create(contacts_to_create, ignore_conflicts=True)
+	def bulk_create_from_csv(cls, csv_file, organization, batch_size=None):
+		"""Bulk create contacts from a binary CSV file.
+
+		The file is decoded incrementally and inserted in batches of
+		``CONTACT_IMPORT_BATCH_SIZE``; numbers that already exist have their name
+		updated instead of being duplicated. Returns the number of contacts imported.
+		Large uploads should go through ``ContactImportJob`` instead.
+		"""
+		from .utils.contact_import import ContactImporter, iter_csv_contacts
+
+		importer = ContactImporter(organization, batch_size=batch_size)
+		importer.run(iter_csv_contacts(csv_file))
+		return importer.rows_imported
 
 	@classmethod
-	def bulk_create_from_text(cls, text, organization):
-		"""Bulk create contacts from pasted text"""
-		import re
-		from .utils import normalize_phone_number
-
-		contacts_to_create = []
-		# Extract phone numbers from text
-		phones = re.findall(r'\+?\d{7,15}', text)
-
-		for phone in phones:
-			normalized_phone = normalize_phone_number(phone) or phone
-			if normalized_phone:
-				contacts_to_create.append(cls(
-					organization=organization,
-					name=normalized_phone,
-					phone_number=normalized_phone
-				))
-
-		return cls.objects.bulk_create(contacts_to_create, ignore_conflicts=True)
+	def bulk_create_from_text(cls, text, organization, batch_size=None):
+		"""Bulk create contacts from pasted text.
+
+		Numbers already in the organization's contact book are left untouched.
+		Returns the number of distinct numbers imported.
+		"""
+		from .utils.contact_import import PHONE_PATTERN, ContactImporter
+
+		# Extract phone numbers from text lazily, one match at a time
+		importer = ContactImporter(organization, batch_size=batch_size)
+		importer.run((None, '', m.group()) for m in PHONE_PATTERN.finditer(text))
+		return importer.rows_imported
 
 	def get_display_name(self):
 		"""Get display name for the contact"""
@@ -567,12 +583,143 @@ class ContactGroup(models.Model):
 	organization = models.ForeignKey(Organization, on_delete=models.CASCADE, related_name='groups')
 	name = models.CharField(max_length=100)
 	contacts = models.ManyToManyField(Contact, blank=True, related_name='groups')
+	# Maintained with the membership writes (see core.utils.group_membership)
+	member_count = models.PositiveIntegerField(default=0)
+	created_at = models.DateTimeField(auto_now_add=True)
+
+	def __str__(self):
+		return f"{self.name} ({self.organization.name})"
+
+
+class ContactSegment(models.Model):
+	"""A dynamic audience defined by rules instead of stored members.
+
+	``rules`` is a list of ``{"type", "value", "negate"}`` dicts (see
+	``core.utils.segments.RULE_TYPES``) combined with AND (``match='all'``) or
+	OR (``match='any'``). The audience is resolved with one SQL query when a
+	message is sent; ``estimated_count`` caches its last measured size.
+	"""
+	MATCH_CHOICES = [
+		('all', 'Match all rules'),
+		('any', 'Match any rule'),
+	]
+	organization = models.ForeignKey(Organization, on_delete=models.CASCADE, related_name='segments')
+	name = models.CharField(max_length=100)
+	rules = models.JSONField(default=list)
+	match = models.CharField(max_length=3, choices=MATCH_CHOICES, default='all')
+	estimated_count = models.PositiveIntegerField(null=True, blank=True)
+	count_refreshed_at = models.DateTimeField(null=True, blank=True)
 	created_at = models.DateTimeField(auto_now_add=True)
+	updated_at = models.DateTimeField(auto_now=True)
+
+	class Meta:
+		ordering = ['name']
+
+	def get_contacts(self):
+		"""Current audience as a lazy Contact queryset"""
+		from .utils.segments import segment_contacts
+		return segment_contacts(self)
+
+	def get_estimated_count(self, force=False):
+		"""Audience size, recounted at most every ``SEGMENT_COUNT_MAX_AGE`` seconds"""
+		from .utils.segments import refresh_estimated_count
+		return refresh_estimated_count(self, force=force)
 
 	def __str__(self):
 		return f"{self.name} ({self.organization.name})"
 
 
+class SuppressedNumber(models.Model):
+	"""A phone number that must never be messaged (opt-outs, dead numbers).
+
+	Rows without an organization apply platform-wide. Numbers are stored
+	normalized, exactly like ``Contact.phone_number``.
+	"""
+	REASON_CHOICES = [
+		('opt_out', 'Opted out'),
+		('invalid', 'Invalid / dead number'),
+		('complaint', 'Complaint'),
+		('manual', 'Added manually'),
+	]
+	organization = models.ForeignKey(Organization, on_delete=models.CASCADE, null=True, blank=True, related_name='suppressed_numbers', help_text='Leave empty to suppress the number for every organization')
+	phone_number = models.CharField(max_length=20)
+	reason = models.CharField(max_length=20, choices=REASON_CHOICES, default='manual')
+	note = models.CharField(max_length=255, blank=True)
+	created_by = models.ForeignKey('User', on_delete=models.SET_NULL, null=True, blank=True)
+	created_at = models.DateTimeField(auto_now_add=True)
+
+	class Meta:
+		ordering = ['-created_at']
+		constraints = [
+			models.UniqueConstraint(fields=['organization', 'phone_number'], name='uniq_org_suppressed_number'),
+			models.UniqueConstraint(fields=['phone_number'], condition=models.Q(organization__isnull=True), name='uniq_global_suppressed_number'),
+		]
+
+	def __str__(self):
+		scope = self.organization.name if self.organization_id else 'all organizations'
+		return f"{self.phone_number} suppressed for {scope}"
+
+
+class ContactImportJob(models.Model):
+	"""A contact upload queued for background import.
+
+	The uploaded file is kept on disk and processed in fixed-size batches by the
+	``process_contact_imports`` management command so large lists never have to
+	fit in memory or finish inside a web request.
+	"""
+	STATUS_CHOICES = [
+		('pending', 'Pending'),
+		('running', 'Running'),
+		('completed', 'Completed'),
+		('failed', 'Failed'),
+	]
+	organization = models.ForeignKey(Organization, on_delete=models.CASCADE, related_name='import_jobs')
+	created_by = models.ForeignKey('User', on_delete=models.SET_NULL, null=True, blank=True)
+	source_file = models.FileField(upload_to='contact_imports/')
+	original_filename = models.CharField(max_length=255, blank=True)
+	# When set, every imported contact is also added to this group
+	group = models.ForeignKey(ContactGroup, on_delete=models.CASCADE, null=True, blank=True, related_name='membership_imports')
+	status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+	# Progress tracking (updated after every batch)
+	total_bytes = models.PositiveBigIntegerField(default=0)
+	bytes_processed = models.PositiveBigIntegerField(default=0)
+	rows_processed = models.PositiveIntegerField(default=0)
+	rows_imported = models.PositiveIntegerField(default=0)
+	rows_updated = models.PositiveIntegerField(default=0, help_text="Imported rows that matched an existing contact")
+	rows_failed = models.PositiveIntegerField(default=0)
+	members_added = models.PositiveIntegerField(default=0, help_text="Contacts newly added to the target group")
+	# CSV of rejected rows (row number, name, phone, reason)
+	error_file = models.FileField(upload_to='contact_imports/errors/', blank=True, null=True)
+	error_message = models.TextField(blank=True, null=True)
+	created_at = models.DateTimeField(auto_now_add=True)
+	# Heartbeat: set by every progress save, so a 'running' job that stops
+	# changing has lost its worker and can be handed to another one
+	updated_at = models.DateTimeField(auto_now=True)
+	started_at = models.DateTimeField(blank=True, null=True)
+	finished_at = models.DateTimeField(blank=True, null=True)
+
+	class Meta:
+		ordering = ['-created_at']
+		indexes = [
+			models.Index(fields=['status', 'created_at']),
+			models.Index(fields=['organization', 'created_at']),
+		]
+
+	def is_finished(self):
+		return self.status in ('completed', 'failed')
+
+	def get_progress_percent(self):
+		"""Approximate progress based on how much of the file has been read"""
+		if self.status == 'completed':
+			return 100
+		if not self.total_bytes:
+			return 0
+		return min(99, int(self.bytes_processed / self.total_bytes * 100))
+
+	def __str__(self):
+		return f"Import {self.original_filename or self.id} ({self.organization.name}) - {self.status}"
+
+
 class StatsViewer(models.Model):
 	"""Optional mapping granting a user read-only 'stats' access to an Organization.
 
@@ -740,6 +887,12 @@ class Sender(models.Model):
 	# Gateway balance (managed by superadmin)
 	gateway_balance = models.DecimalField(max_digits=10, decimal_places=2, default=Decimal('0.00'), help_text="Balance with the SMS provider")
 
+	# Rate limit for delivery status polling (core.utils.delivery_polling)
+	status_poll_rate = models.PositiveSmallIntegerField(default=5, help_text="Delivery status queries per second this sender's gateway allows")
+
+	# Per-network price, e.g. {"mtn": "0.20"}; networks not listed cost DEFAULT_SMS_RATE
+	network_costs = models.JSONField(default=dict, blank=True, help_text="Cost per SMS by destination network")
+
 	# Usage tracking
 	total_sms_sent = models.PositiveIntegerField(default=0, help_text="Total SMS sent through this sender")
 	created_at = models.DateTimeField(auto_now_add=True)
@@ -752,16 +905,22 @@ class Sender(models.Model):
 			models.Index(fields=['sender_type']),
 		]
 
-	def can_send_sms(self, count=1):
-		"""Check if sender has sufficient gateway balance"""
-		# For now, assume 0.25 per SMS, but this could be configurable per sender
-		rate = Decimal('0.25')
-		return self.gateway_balance >= (rate * count)
-
-	def deduct_gateway_balance(self, count):
-		"""Deduct from gateway balance"""
-		rate = Decimal('0.25')
-		cost = rate * count
+	DEFAULT_SMS_RATE = Decimal('0.25')
+
+	def get_sms_cost(self, network=''):
+		"""Cost of one SMS to ``network`` through this sender"""
+		try:
+			return Decimal(str((self.network_costs or {})[network]))
+		except (KeyError, ArithmeticError, ValueError):
+			return self.DEFAULT_SMS_RATE
+
+	def can_send_sms(self, count=1, network='', committed=Decimal('0')):
+		"""Check if the gateway balance covers ``count`` SMS to ``network`` on top of ``committed``"""
+		return self.gateway_balance >= committed + self.get_sms_cost(network) * count
+
+	def deduct_gateway_balance(self, count, network=''):
+		"""Deduct ``count`` SMS to ``network`` from gateway balance"""
+		cost = self.get_sms_cost(network) * count
 		if self.gateway_balance >= cost:
 			self.gateway_balance -= cost
 			self.total_sms_sent += count
@@ -796,6 +955,72 @@ class SenderAssignment(models.Model):
 		return f"{self.sender.name} -> {self.organization.name}"
 
 
+class OrgDailyStats(models.Model):
+	"""Rollup of OrgAlertRecipient rows by organization, day, status and sender.
+
+	``count`` is how many recipients currently have ``status`` and fall on
+	``day`` (their ``sent_at`` date, or their message's creation date while
+	unsent). It is kept up to date incrementally (see core.utils.daily_stats)
+	and can be rebuilt with the ``rebuild_daily_stats`` command. Each bucket
+	is exactly one row, so the ``F()`` updates never count a change twice.
+	"""
+	organization = models.ForeignKey(Organization, on_delete=models.CASCADE, related_name='daily_stats')
+	day = models.DateField()
+	status = models.CharField(max_length=20)
+	sender = models.ForeignKey('Sender', on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+	count = models.IntegerField(default=0)
+
+	class Meta:
+		indexes = [
+			models.Index(fields=['organization', 'day']),
+			models.Index(fields=['day', 'status']),
+		]
+		constraints = [
+			# Recipients sent through the legacy path have no sender, and NULLs
+			# never collide in a unique index, so that bucket gets its own constraint
+			models.UniqueConstraint(
+				fields=['organization', 'day', 'status', 'sender'], condition=models.Q(sender__isnull=False),
+				name='orgdailystats_unique_bucket',
+			),
+			models.UniqueConstraint(
+				fields=['organization', 'day', 'status'], condition=models.Q(sender__isnull=True),
+				name='orgdailystats_unique_bucket_no_sender',
+			),
+		]
+
+	def __str__(self):
+		return f"{self.organization_id} {self.day} {self.status}: {self.count}"
+
+
+class DeliveryError(models.Model):
+	"""Catalogue of recipient failure reasons (see core.utils.delivery_errors)"""
+	id = models.SmallAutoField(primary_key=True)
+	code = models.SlugField(max_length=50, unique=True)
+	description = models.CharField(max_length=255)
+	# First raw error text recorded with this code
+	example = models.TextField(blank=True, default='')
+
+	def __str__(self):
+		return self.code
+
+
+class DeliveryReceipt(models.Model):
+	"""Provider delivery receipt waiting to be applied (see core.utils.receipts).
+
+	Webhooks only append rows here; ``apply_delivery_receipts`` applies them to
+	the recipients in batches and deletes them. Rows are read in id order, so
+	the table needs no other index.
+	"""
+	provider = models.CharField(max_length=20, default='hubtel')
+	provider_message_id = models.CharField(max_length=255)
+	# Raw status as reported by the provider
+	status = models.CharField(max_length=100, blank=True, default='')
+	received_at = models.DateTimeField(auto_now_add=True)
+
+	def __str__(self):
+		return f"{self.provider} {self.provider_message_id}: {self.status}"
+
+
 class AuditLog(models.Model):
 	"""Audit logs for sender management and SMS operations"""
 	ACTION_CHOICES = [
@@ -830,3 +1055,45 @@ class AuditLog(models.Model):
 
 	def __str__(self):
 		return f"{self.action} by {self.user} at {self.created_at}"
+
+
+class DeliveryArchive(models.Model):
+	"""One gzipped JSONL file of rows moved out of a hot table (see core.utils.archive).
+
+	Each file holds one organization's (or school's) rows from one month. The
+	counts recorded here stand in for the archived rows wherever totals are
+	read live (school dashboards, tenant stats); organization totals already
+	come from OrgDailyStats and the OrgMessage counters, which archiving
+	leaves alone.
+	"""
+	ORG_RECIPIENTS = 'org_recipient'
+	SCHOOL_RECIPIENTS = 'school_recipient'
+	AUDIT_LOGS = 'audit_log'
+	KIND_CHOICES = [
+		(ORG_RECIPIENTS, 'Organization recipients'),
+		(SCHOOL_RECIPIENTS, 'School recipients'),
+		(AUDIT_LOGS, 'Audit logs'),
+	]
+
+	kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+	organization = models.ForeignKey(Organization, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+	school = models.ForeignKey(School, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+	month = models.DateField(help_text="First day of the month the rows were created in (UTC)")
+	# Relative to DELIVERY_ARCHIVE_ROOT
+	path = models.CharField(max_length=255, unique=True)
+	row_count = models.PositiveIntegerField(default=0)
+	# Recipients with status sent/failed; for audit logs, sms_sent/sms_failed entries
+	sent_count = models.PositiveIntegerField(default=0)
+	failed_count = models.PositiveIntegerField(default=0)
+	first_id = models.BigIntegerField()
+	last_id = models.BigIntegerField()
+	created_at = models.DateTimeField(auto_now_add=True)
+
+	class Meta:
+		indexes = [
+			models.Index(fields=['kind', 'organization', 'month']),
+			models.Index(fields=['kind', 'school', 'month']),
+		]
+
+	def __str__(self):
+		return f"{self.kind} {self.month:%Y-%m}: {self.row_count} row(s)"
@@ -0,0 +1,93 @@
+"""
+Model signal handlers for the core app (connected in CoreConfig.ready).
+"""
+from django.db import transaction
+from django.db.models import QuerySet
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import Signal, receiver
+
+from .models import Contact, ContactGroup, OrgAlertRecipient, OrgMessage, OrgSMSTemplate, Organization, Sender, SuppressedNumber
+
+# Sent with ``organization_id`` whenever something the organization dashboard
+# shows has changed: recipient status moves (sends, retries, webhooks), contact
+# imports, and edits to contacts, templates and messages.
+organization_activity = Signal()
+
+
+@receiver(organization_activity)
+def invalidate_org_dashboard(sender, organization_id, **kwargs):
+	"""Make the organization's cached dashboard snapshot stale"""
+	from .utils.dashboard_metrics import bump_dashboard_version
+	transaction.on_commit(lambda: bump_dashboard_version(organization_id))
+
+
+# Contacts have no delete receivers so their cascades stay fast deletes;
+# core.utils.contact_deletion.delete_contacts does this work once per delete.
+@receiver(post_save, sender=Contact)
+@receiver(post_save, sender=OrgSMSTemplate)
+@receiver(post_delete, sender=OrgSMSTemplate)
+@receiver(post_save, sender=OrgMessage)
+@receiver(post_delete, sender=OrgMessage)
+def org_data_changed(sender, instance, **kwargs):
+	organization_activity.send(sender=sender, organization_id=instance.organization_id)
+
+
+@receiver(post_save, sender=Contact)
+def invalidate_contact_autocomplete(sender, instance, **kwargs):
+	"""Make cached autocomplete results for the contact's organization stale"""
+	from .utils.contact_search import bump_contacts_version
+	org_id = instance.organization_id
+	transaction.on_commit(lambda: bump_contacts_version(org_id))
+
+
+@receiver(pre_delete, sender=OrgMessage)
+def discount_message_recipients(sender, instance, origin=None, **kwargs):
+	"""Deleting a message cascades its recipient rows; take them out of the rollup.
+
+	Skipped when the whole organization is deleted: its rollup rows go with it.
+	"""
+	if isinstance(origin, Organization) or (isinstance(origin, QuerySet) and origin.model is Organization):
+		return
+	from .utils.daily_stats import discount_recipients
+	discount_recipients(OrgAlertRecipient.objects.filter(message=instance), message_counters=False)
+
+
+@receiver(pre_delete, sender=Sender)
+def release_sender_rollup(sender, instance, **kwargs):
+	"""The rollup's sender is SET_NULL; merge the sender's buckets first so none end up duplicated"""
+	from .utils.daily_stats import release_sender
+	release_sender(instance.pk)
+
+
+@receiver(post_save, sender=OrgAlertRecipient)
+def count_new_recipient(sender, instance, created, raw=False, **kwargs):
+	"""Count recipients created one at a time (``create_recipients`` counts its own batches)"""
+	if created and not raw:
+		from .utils.daily_stats import apply_deltas, recipient_bucket
+		apply_deltas({recipient_bucket(instance, instance.message): 1})
+
+
+@receiver(m2m_changed, sender=ContactGroup.contacts.through)
+def sync_group_member_counts(sender, instance, action, reverse, pk_set, **kwargs):
+	"""Recount groups changed through the related managers (admin, ``group.contacts.add``)"""
+	from .utils.group_membership import refresh_member_counts
+	if action == 'pre_clear' and reverse:
+		instance._cleared_group_ids = list(instance.groups.values_list('id', flat=True))
+		return
+	if action not in ('post_add', 'post_remove', 'post_clear'):
+		return
+	if reverse:
+		group_ids = pk_set if pk_set is not None else getattr(instance, '_cleared_group_ids', [])
+	else:
+		group_ids = [instance.pk]
+	if group_ids:
+		refresh_member_counts(ContactGroup.objects.filter(id__in=group_ids))
+
+
+@receiver(post_save, sender=SuppressedNumber)
+@receiver(post_delete, sender=SuppressedNumber)
+def invalidate_suppression_list(sender, instance, **kwargs):
+	"""Make every worker reload the suppression set the entry belongs to"""
+	from .utils.suppression import GLOBAL_SCOPE, bump_suppression_version
+	scope = instance.organization_id if instance.organization_id is not None else GLOBAL_SCOPE
+	transaction.on_commit(lambda: bump_suppression_version(scope))
@@ -0,0 +1,99 @@
+import datetime
+import io
+import os
+import shutil
+import tempfile
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from core.models import (
+	AlertRecipient, AuditLog, Contact, DeliveryArchive, Message, OrgAlertRecipient, OrgMessage, Organization, Parent, School,
+)
+from core.utils.archive import number_history
+from core.utils.daily_stats import reconcile_message_counts, status_totals
+from core.utils.dashboard_metrics import PlatformDashboardMetrics
+
+
+class DeliveryArchiveTests(TestCase):
+	def setUp(self):
+		cache.clear()
+		self.root = tempfile.mkdtemp()
+		self.addCleanup(shutil.rmtree, self.root)
+		settings_override = override_settings(DELIVERY_ARCHIVE_ROOT=self.root, DELIVERY_ARCHIVE_BATCH_SIZE=2)
+		settings_override.enable()
+		self.addCleanup(settings_override.disable)
+
+		self.long_ago = timezone.now() - datetime.timedelta(days=500)
+		self.org = Organization.objects.create(name='Archive Org', slug='archive-org')
+		self.contacts = [
+			Contact.objects.create(organization=self.org, name=f"A{i}", phone_number=f"+23324900100{i}")
+			for i in range(3)
+		]
+		self.old = self._org_message('old news', ['sent', 'failed', 'sent'], self.long_ago)
+		self.new = self._org_message('fresh', ['sent'], None)
+
+		self.school = School.objects.create(name='Archive School')
+		self.parent = Parent.objects.create(school=self.school, name='P', phone_number='+233249001100')
+		school_message = Message.objects.create(school=self.school, content='term dates', scheduled_time=self.long_ago)
+		Message.objects.filter(pk=school_message.pk).update(created_at=self.long_ago)
+		AlertRecipient.objects.create(message=school_message, parent=self.parent, status='sent', sent_at=self.long_ago)
+		audit = AuditLog.objects.create(organization=self.org, action='sms_sent', details={'to': '+233249001000'})
+		AuditLog.objects.filter(pk=audit.pk).update(created_at=self.long_ago)
+
+	def _org_message(self, content, statuses, created_at):
+		message = OrgMessage.objects.create(organization=self.org, content=content, scheduled_time=timezone.now())
+		message.create_recipients(self.contacts[:len(statuses)])
+		for contact, status in zip(self.contacts, statuses):
+			message.recipients_status.filter(contact=contact).update(status=status, sent_at=created_at or timezone.now())
+		if created_at:
+			OrgMessage.objects.filter(pk=message.pk).update(created_at=created_at)
+			message.recipients_status.update(created_at=created_at)
+		reconcile_message_counts(OrgMessage.objects.filter(pk=message.pk))
+		message.refresh_from_db()
+		return message
+
+	def _archive(self):
+		out = io.StringIO()
+		call_command('archive_delivery_history', '--months', '12', stdout=out)
+		return out.getvalue()
+
+	def test_moves_old_rows_to_files_and_keeps_the_totals(self):
+		totals = status_totals(self.org)
+		output = self._archive()
+		self.assertIn('Archived 5 row(s)', output)
+
+		self.assertFalse(OrgAlertRecipient.objects.filter(message=self.old).exists())
+		self.assertEqual(OrgAlertRecipient.objects.filter(message=self.new).count(), 1)
+		self.assertFalse(AlertRecipient.objects.exists())
+		self.assertFalse(AuditLog.objects.exists())
+
+		org_files = DeliveryArchive.objects.filter(kind=DeliveryArchive.ORG_RECIPIENTS, organization=self.org)
+		self.assertEqual([(a.row_count, a.sent_count, a.failed_count) for a in org_files.order_by('first_id')], [(2, 1, 1), (1, 1, 0)])
+		for archive in DeliveryArchive.objects.all():
+			self.assertTrue(os.path.exists(os.path.join(self.root, archive.path)))
+
+		# Counters and rollups still describe the archived rows, and repairs leave them be
+		self.assertEqual(reconcile_message_counts(), [])
+		self.old.refresh_from_db()
+		self.assertEqual((self.old.total_count, self.old.sent_count, self.old.failed_count), (3, 2, 1))
+		self.assertEqual(status_totals(self.org), totals)
+		schools = PlatformDashboardMetrics().calculate_tenant_stats()['school_stats']
+		self.assertEqual((schools[0]['total_recipients'], schools[0]['sent_recipients']), (1, 1))
+
+		self.assertIn('Archived 0 row(s)', self._archive())
+
+	def test_number_history_reads_live_and_archived_rows(self):
+		self._archive()
+		history = number_history('0249001000', organization=self.org)
+		self.assertEqual([(r['message'], r['status'], r['archived']) for r in history], [
+			('fresh', 'sent', False),
+			('old news', 'sent', True),
+		])
+		out = io.StringIO()
+		call_command('search_delivery_archive', '+233249001100', '--school', str(self.school.pk), stdout=out)
+		self.assertIn('sent', out.getvalue())
+		self.assertIn('[archive]', out.getvalue())
+		self.assertIn('1 record(s)', out.getvalue())
@@ -0,0 +1,51 @@
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import TransactionTestCase
+from django.utils import timezone
+
+BEFORE = [('core', '0038_contactimportjob')]
+AFTER = [('core', '0039_dedupe_contacts')]
+
+
+class DedupeContactsMigrationTests(TransactionTestCase):
+	def _migrate(self, targets):
+		executor = MigrationExecutor(connection)
+		executor.loader.build_graph()
+		executor.migrate(targets)
+		return executor.loader.project_state(targets).apps
+
+	def tearDown(self):
+		self._migrate(MigrationExecutor(connection).loader.graph.leaf_nodes())
+
+	def test_numbers_that_normalize_alike_are_merged(self):
+		apps = self._migrate(BEFORE)
+		Organization = apps.get_model('core', 'Organization')
+		Contact = apps.get_model('core', 'Contact')
+		ContactGroup = apps.get_model('core', 'ContactGroup')
+		OrgMessage = apps.get_model('core', 'OrgMessage')
+		OrgAlertRecipient = apps.get_model('core', 'OrgAlertRecipient')
+		org = Organization.objects.create(name='Dedupe Org', slug='dedupe-org')
+		other_org = Organization.objects.create(name='Other Org', slug='other-dedupe-org')
+		oldest = Contact.objects.create(organization=org, name='0241234567', phone_number='0241234567')
+		named = Contact.objects.create(organization=org, name='Ama', phone_number='+233 24 123 4567')
+		kofi = Contact.objects.create(organization=org, name='Kofi', phone_number='0201111111')
+		junk = Contact.objects.create(organization=org, name='Junk', phone_number='n/a')
+		elsewhere = Contact.objects.create(organization=other_org, name='Yaw', phone_number='+233241234567')
+		group = ContactGroup.objects.create(organization=org, name='Parents')
+		group.contacts.add(named)
+		message = OrgMessage.objects.create(organization=org, content='hi', scheduled_time=timezone.now())
+		OrgAlertRecipient.objects.create(message=message, contact=named, status='sent')
+
+		apps = self._migrate(AFTER)
+		Contact = apps.get_model('core', 'Contact')
+		ContactGroup = apps.get_model('core', 'ContactGroup')
+		OrgAlertRecipient = apps.get_model('core', 'OrgAlertRecipient')
+		# The oldest row survives with the real name; numbers that normalize are stored normalized
+		self.assertEqual(
+			list(Contact.objects.filter(organization__slug='dedupe-org').order_by('id').values_list('id', 'name', 'phone_number')),
+			[(oldest.id, 'Ama', '+233241234567'), (kofi.id, 'Kofi', '+233201111111'), (junk.id, 'Junk', 'n/a')],
+		)
+		# Memberships and history follow the surviving contact; other organizations are untouched
+		self.assertEqual(list(ContactGroup.objects.get().contacts.values_list('id', flat=True)), [oldest.id])
+		self.assertEqual(list(OrgAlertRecipient.objects.values_list('contact_id', flat=True)), [oldest.id])
+		self.assertTrue(Contact.objects.filter(id=elsewhere.id, phone_number='+233241234567').exists())
@@ -0,0 +1,163 @@
+import datetime
+import io
+import shutil
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from core.models import Contact, ContactImportJob, Organization
+from core.utils.contact_import import iter_text_contacts, iter_xlsx_contacts, run_import_job
+
+
+class ContactImportJobTests(TestCase):
+	def setUp(self):
+		self.media_root = tempfile.mkdtemp()
+		self.override = override_settings(MEDIA_ROOT=self.media_root)
+		self.override.enable()
+		self.org = Organization.objects.create(name='Import Org', slug='import-org')
+		User = get_user_model()
+		self.admin = User.objects.create_user(username='importer', password='pw12345!')
+		self.admin.role = User.ORG_ADMIN
+		self.admin.organization = self.org
+		self.admin.save()
+
+	def tearDown(self):
+		self.override.disable()
+		shutil.rmtree(self.media_root, ignore_errors=True)
+
+	def _csv(self, body, name='contacts.csv'):
+		return SimpleUploadedFile(name, body.encode('utf-8'), content_type='text/csv')
+
+	def test_upload_queues_job_and_command_imports_in_batches(self):
+		body = "\ufeffName,Phone\n" + "".join(f"Person {i},0550{i:06d}\n" for i in range(25)) + "Bad,abc\nNo Phone,\n"
+		self.client.force_login(self.admin, backend='django.contrib.auth.backends.ModelBackend')
+		resp = self.client.post(
+			reverse('org_upload_contacts', kwargs={'org_slug': self.org.slug}),
+			{'action': 'upload_file', 'contacts_file': self._csv(body)},
+		)
+		self.assertEqual(resp.status_code, 200)
+		job = ContactImportJob.objects.get(organization=self.org)
+		self.assertEqual(job.status, 'pending')
+		self.assertEqual(Contact.objects.filter(organization=self.org).count(), 0)
+
+		call_command('process_contact_imports', batch_size=10, stdout=io.StringIO())
+
+		job.refresh_from_db()
+		self.assertEqual(job.status, 'completed')
+		self.assertEqual(job.rows_processed, 27)
+		self.assertEqual(job.rows_imported, 25)
+		self.assertEqual(job.rows_failed, 2)
+		self.assertEqual(job.get_progress_percent(), 100)
+		self.assertTrue(Contact.objects.filter(organization=self.org, phone_number='+233550000003', name='Person 3').exists())
+
+		with job.error_file.open('r') as fh:
+			lines = fh.read().splitlines()
+		self.assertEqual(lines[0], 'row,name,phone,error')
+		self.assertEqual(len(lines), 3)
+
+		status = self.client.get(reverse('org_contact_import_status', kwargs={'org_slug': self.org.slug, 'job_id': job.id})).json()
+		self.assertEqual(status['status'], 'completed')
+		self.assertTrue(status['has_error_file'])
+
+	def test_job_pauses_at_its_budget_and_resumes(self):
+		body = "name,phone\n" + "".join(f"Person {i},0550{i:06d}\n" for i in range(25)) + "Bad,abc\n"
+		job = ContactImportJob.objects.create(organization=self.org, source_file=self._csv(body), original_filename='contacts.csv')
+		now = [0.0]
+
+		def clock():
+			now[0] += 1.0
+			return now[0]
+
+		# Runs out of time after the first batch of ten rows
+		run_import_job(job, batch_size=10, deadline=1.0, clock=clock)
+		job.refresh_from_db()
+		self.assertEqual((job.status, job.rows_processed, job.finished_at), ('pending', 10, None))
+		self.assertEqual(Contact.objects.filter(organization=self.org).count(), 10)
+
+		call_command('process_contact_imports', batch_size=10, stdout=io.StringIO())
+		job.refresh_from_db()
+		self.assertEqual((job.status, job.rows_processed, job.rows_imported, job.rows_failed), ('completed', 26, 25, 1))
+		self.assertEqual(Contact.objects.filter(organization=self.org).count(), 25)
+		with job.error_file.open('r') as fh:
+			self.assertEqual(fh.read().splitlines(), ['row,name,phone,error', '27,Bad,abc,Invalid phone number'])
+
+	def test_jobs_abandoned_by_a_worker_are_picked_up_again(self):
+		body = "name,phone\nAma,0201234567\n"
+		stale = ContactImportJob.objects.create(organization=self.org, source_file=self._csv(body), status='running')
+		alive = ContactImportJob.objects.create(organization=self.org, source_file=self._csv(body), status='running')
+		ContactImportJob.objects.filter(pk=stale.pk).update(updated_at=timezone.now() - datetime.timedelta(hours=1))
+		out = io.StringIO()
+		call_command('process_contact_imports', stdout=out)
+		self.assertIn('Requeued 1 import job(s)', out.getvalue())
+		stale.refresh_from_db()
+		alive.refresh_from_db()
+		self.assertEqual((stale.status, alive.status), ('completed', 'running'))
+
+	def test_bulk_create_from_csv_returns_imported_count(self):
+		imported = Contact.bulk_create_from_csv(self._csv("phone_number,contact_name\n+233201234567,Ama\n"), self.org)
+		self.assertEqual(imported, 1)
+		self.assertEqual(Contact.objects.get(organization=self.org).name, 'Ama')
+
+	def test_reimport_upserts_names_without_duplicating(self):
+		Contact.bulk_create_from_csv(self._csv("name,phone\nAma,0201234567\nKojo,0241234567\n"), self.org)
+		imported = Contact.bulk_create_from_csv(self._csv("name,phone\nAma Mensah,+233201234567\n,0241234567\nAma M.,0201234567\n"), self.org)
+		self.assertEqual(imported, 2)
+		contacts = dict(Contact.objects.filter(organization=self.org).values_list('phone_number', 'name'))
+		# Named rows update the existing contact (last row wins); unnamed rows never clobber names
+		self.assertEqual(contacts, {'+233201234567': 'Ama M.', '+233241234567': 'Kojo'})
+
+		Contact.bulk_create_from_text("call 0201234567 or +233551112222", self.org)
+		self.assertEqual(Contact.objects.filter(organization=self.org).count(), 3)
+		self.assertEqual(Contact.objects.get(phone_number='+233201234567').name, 'Ama M.')
+
+	def _xlsx(self, rows):
+		from openpyxl import Workbook
+		wb = Workbook()
+		for row in rows:
+			wb.active.append(row)
+		buf = io.BytesIO()
+		wb.save(buf)
+		buf.seek(0)
+		return buf
+
+	def test_xlsx_reader_streams_rows(self):
+		try:
+			import openpyxl  # noqa: F401
+		except ImportError:
+			self.skipTest('openpyxl not installed')
+		# Header row in any case; Excel turns unformatted numbers into floats
+		rows = list(iter_xlsx_contacts(self._xlsx([['Name', 'Phone'], ['Ama', 241234567.0], [None, None], ['Kojo', '+233 20 123 4567']])))
+		self.assertEqual(rows, [(2, 'Ama', '241234567'), (4, 'Kojo', '+233 20 123 4567')])
+		# Without headers the phone-looking cell is picked out of each row
+		rows = list(iter_xlsx_contacts(self._xlsx([['0241234567', 'Ama'], ['Kojo', 'n/a', '0201234567']])))
+		self.assertEqual(rows, [(1, 'Ama', '0241234567'), (2, 'Kojo', '0201234567')])
+
+	def test_xlsx_and_text_uploads_import_through_job(self):
+		try:
+			import openpyxl  # noqa: F401
+		except ImportError:
+			self.skipTest('openpyxl not installed')
+		self.client.force_login(self.admin, backend='django.contrib.auth.backends.ModelBackend')
+		url = reverse('org_upload_contacts', kwargs={'org_slug': self.org.slug})
+		xlsx = SimpleUploadedFile('list.xlsx', self._xlsx([['phone', 'name']] + [[f"0550{i:06d}", f"P{i}"] for i in range(12)]).read())
+		self.client.post(url, {'action': 'upload_file', 'contacts_file': xlsx})
+		self.client.post(url, {'action': 'upload_file', 'contacts_file': self._csv("call 0201234567, 0550000001 or +233551112222", name='notes.txt')})
+		resp = self.client.post(url, {'action': 'upload_file', 'contacts_file': self._csv("x", name='old.xls')})
+		self.assertContains(resp, 'Legacy .xls files are not supported')
+		self.assertEqual(ContactImportJob.objects.filter(organization=self.org).count(), 2)
+
+		call_command('process_contact_imports', batch_size=5, stdout=io.StringIO())
+
+		self.assertFalse(ContactImportJob.objects.exclude(status='completed').exists())
+		self.assertEqual(Contact.objects.filter(organization=self.org).count(), 14)
+		self.assertEqual(Contact.objects.get(organization=self.org, phone_number='+233550000001').name, 'P1')
+
+	def test_text_scanner_finds_numbers_across_chunk_boundaries(self):
+		text = "call 0241234567 then +233201234567; junk 12345\n" * 50
+		found = [phone for _, _, phone in iter_text_contacts(io.BytesIO(text.encode()), chunk_size=7)]
+		self.assertEqual(found, ['0241234567', '+233201234567'] * 50)
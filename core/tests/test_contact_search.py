@@ -0,0 +1,133 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from core.models import Contact, ContactGroup, Organization
+from core.utils.contact_search import contact_count, keyset_page, search_contacts
+
+
+class ContactSearchTests(TestCase):
+	def setUp(self):
+		self.org = Organization.objects.create(name='Search Org', slug='search-org')
+		User = get_user_model()
+		self.admin = User.objects.create_user(username='searcher', password='pw12345!')
+		self.admin.role = User.ORG_ADMIN
+		self.admin.organization = self.org
+		self.admin.save()
+		self.client.force_login(self.admin, backend='django.contrib.auth.backends.ModelBackend')
+		# Duplicate names make the id tie-breaker matter
+		names = ['Ama Mensah', 'Kojo Annan', 'Ama Mensah', 'Yaw Boateng', 'Akosua Owusu', 'Kwame Asante', 'Esi Amoah']
+		for i, name in enumerate(names):
+			Contact.objects.create(organization=self.org, name=name, phone_number=f"+23324100{i:04d}")
+		other = Organization.objects.create(name='Other', slug='other')
+		Contact.objects.create(organization=other, name='Ama Other', phone_number='+233241000001')
+
+	def test_keyset_pages_walk_forward_and_back(self):
+		contacts = Contact.objects.filter(organization=self.org)
+		expected = list(contacts.order_by('name', 'id'))
+		seen, page = [], keyset_page(contacts, page_size=3)
+		pages = [page]
+		while True:
+			seen.extend(page.items)
+			if not page.has_next:
+				break
+			page = keyset_page(contacts, after=page.next_cursor, page_size=3)
+			pages.append(page)
+		self.assertEqual(seen, expected)
+		self.assertEqual([len(p.items) for p in pages], [3, 3, 1])
+		self.assertFalse(pages[0].has_previous)
+
+		back = keyset_page(contacts, before=pages[2].prev_cursor, page_size=3)
+		self.assertEqual(back.items, pages[1].items)
+		self.assertEqual(keyset_page(contacts, after='not-a-cursor', page_size=3).items, pages[0].items)
+
+	def test_search_by_name_and_phone(self):
+		def names(q):
+			return sorted(search_contacts(self.org, q).values_list('name', flat=True))
+		self.assertEqual(names('mensah'), ['Ama Mensah', 'Ama Mensah'])
+		self.assertEqual(names('Ak'), ['Akosua Owusu'])
+		self.assertEqual(names('asa'), ['Kwame Asante'])
+		self.assertEqual(names('024 100 0003'), ['Yaw Boateng'])
+		self.assertEqual(names('+233241000006'), ['Esi Amoah'])
+		self.assertEqual(names('"quoted'), [])
+
+	def test_search_api_pages_and_flags_group_members(self):
+		group = ContactGroup.objects.create(organization=self.org, name='Staff')
+		kojo = Contact.objects.get(name='Kojo Annan')
+		group.contacts.add(kojo)
+		url = reverse('org_contact_search', kwargs={'org_slug': self.org.slug})
+
+		data = self.client.get(url, {'q': 'a', 'limit': 2, 'group': group.id}).json()
+		self.assertEqual([r['name'] for r in data['results']], ['Akosua Owusu', 'Ama Mensah'])
+		self.assertIsNotNone(data['next'])
+		data = self.client.get(url, {'q': 'a', 'limit': 2, 'group': group.id, 'after': data['next']}).json()
+		self.assertEqual([r['name'] for r in data['results']], ['Ama Mensah'])
+
+		data = self.client.get(url, {'q': 'kojo', 'group': group.id}).json()
+		self.assertEqual(data['results'], [{'id': kojo.id, 'name': 'Kojo Annan', 'phone': kojo.phone_number, 'member': True}])
+
+	def test_group_edit_applies_picker_changes_only(self):
+		group = ContactGroup.objects.create(organization=self.org, name='Staff')
+		ama, kojo, yaw = (Contact.objects.filter(organization=self.org, name=n).first() for n in ('Ama Mensah', 'Kojo Annan', 'Yaw Boateng'))
+		group.contacts.add(ama, kojo)
+		self.client.post(reverse('org_groups', kwargs={'org_slug': self.org.slug}), {
+			'action': 'edit', 'group_id': group.id, 'name': 'Staff', 'add_contacts': [yaw.id], 'remove_contacts': [kojo.id],
+		})
+		self.assertEqual(set(group.contacts.all()), {ama, yaw})
+
+	def test_contacts_page_is_paginated(self):
+		with self.settings(CONTACTS_PAGE_SIZE=4):
+			resp = self.client.get(reverse('org_upload_contacts', kwargs={'org_slug': self.org.slug}))
+		self.assertEqual(len(resp.context['contacts']), 4)
+		self.assertEqual(resp.context['contact_count'], 7)
+		self.assertTrue(resp.context['page'].has_next)
+
+	def test_contact_count_is_cached_until_the_book_changes(self):
+		cache.clear()
+		self.assertEqual(contact_count(self.org.id), 7)
+		with CaptureQueriesContext(connection) as queries:
+			self.assertEqual(contact_count(self.org.id), 7)
+		self.assertFalse([q for q in queries if '"core_contact"' in q['sql']])
+		with self.captureOnCommitCallbacks(execute=True):
+			Contact.objects.create(organization=self.org, name='New', phone_number='+233241009999')
+		self.assertEqual(contact_count(self.org.id), 8)
+
+
+class ContactAutocompleteTests(TestCase):
+	def setUp(self):
+		from django.core.cache import cache
+		cache.clear()
+		self.org = Organization.objects.create(name='Picker Org', slug='picker-org')
+		User = get_user_model()
+		self.admin = User.objects.create_user(username='picker', password='pw12345!')
+		self.admin.role = User.ORG_ADMIN
+		self.admin.organization = self.org
+		self.admin.save()
+		self.client.force_login(self.admin, backend='django.contrib.auth.backends.ModelBackend')
+		self.ama = Contact.objects.create(organization=self.org, name='Ama Mensah', phone_number='+233201234567')
+		self.url = reverse('org_contact_autocomplete', kwargs={'org_slug': self.org.slug})
+
+	def test_returns_compact_tuples_with_etag(self):
+		resp = self.client.get(self.url, {'q': 'ama'})
+		self.assertEqual(resp.json(), {'results': [[self.ama.id, 'Ama Mensah', '+233201234567']]})
+		etag = resp['ETag']
+		self.assertIn('private', resp['Cache-Control'])
+
+		resp = self.client.get(self.url, {'q': 'ama'}, HTTP_IF_NONE_MATCH=etag)
+		self.assertEqual(resp.status_code, 304)
+
+	def test_contact_changes_invalidate_cached_results(self):
+		with self.captureOnCommitCallbacks(execute=True):
+			etag = self.client.get(self.url, {'q': 'ama'})['ETag']
+			Contact.objects.create(organization=self.org, name='Ama Owusu', phone_number='+233241234567')
+		resp = self.client.get(self.url, {'q': 'ama'}, HTTP_IF_NONE_MATCH=etag)
+		self.assertEqual(resp.status_code, 200)
+		self.assertEqual([r[1] for r in resp.json()['results']], ['Ama Mensah', 'Ama Owusu'])
+
+		# Bulk imports don't send signals but still invalidate
+		from django.core.files.uploadedfile import SimpleUploadedFile
+		Contact.bulk_create_from_csv(SimpleUploadedFile('c.csv', b"name,phone\nAma Boateng,0551112222\n"), self.org)
+		self.assertEqual(len(self.client.get(self.url, {'q': 'ama'}).json()['results']), 3)
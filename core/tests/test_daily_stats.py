@@ -0,0 +1,262 @@
+import io
+import json
+from decimal import Decimal
+from unittest import mock
+
+from django.core.cache import cache
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import IntegrityError, connection, transaction
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from core.models import Contact, OrgAlertRecipient, OrgDailyStats, OrgMessage, Organization, Sender, SenderAssignment
+from core.utils.dashboard_metrics import OrganizationDashboardMetrics
+from core.utils.contact_deletion import delete_contacts
+from core.utils.daily_stats import rebuild_daily_stats, reconcile_message_counts, status_totals
+from core.utils.receipts import apply_receipts
+from core.utils.sender_utils import send_sms_through_sender_pool
+
+
+@override_settings(HUBTEL_WEBHOOK_SECRET=None)
+class DailyStatsTests(TestCase):
+	def setUp(self):
+		cache.clear()
+		self.org = Organization.objects.create(name='Stats Org', slug='stats-org', sms_credit_balance=Decimal('100.00'))
+		self.sender = Sender.objects.create(
+			name='Main', sender_id='MAIN', sender_type='alphanumeric', provider='hubtel', gateway_balance=Decimal('50.00'),
+		)
+		SenderAssignment.objects.create(sender=self.sender, organization=self.org)
+		self.contacts = [
+			Contact.objects.create(organization=self.org, name=f"S{i}", phone_number=f"+23324600000{i}")
+			for i in range(3)
+		]
+
+	def _rollup(self):
+		return sorted(
+			(row.day, row.status, row.sender_id, row.count)
+			for row in OrgDailyStats.objects.filter(organization=self.org) if row.count
+		)
+
+	def test_writers_keep_rollup_equal_to_rebuild(self):
+		message = OrgMessage.objects.create(organization=self.org, content='hi', scheduled_time=timezone.now())
+		message.create_recipients(self.contacts)
+		self.assertEqual(status_totals(self.org), {'pending': 3})
+
+		ids = iter(['m1', None, 'm3'])
+		with mock.patch('core.hubtel_utils.send_sms_with_credentials', side_effect=lambda **kw: next(ids)):
+			send_sms_through_sender_pool(self.org, message, 'hi', None)
+		self.assertEqual(status_totals(self.org), {'pending': 0, 'sent': 2, 'failed': 1})
+
+		resp = self.client.post(reverse('hubtel_webhook'), json.dumps({'messageId': 'm3', 'status': 'Failed'}), content_type='application/json')
+		apply_receipts()
+		self.assertEqual(resp.status_code, 200)
+		self.assertEqual(status_totals(self.org), {'pending': 0, 'sent': 1, 'failed': 2})
+
+		maintained = self._rollup()
+		rebuild_daily_stats(self.org)
+		self.assertEqual(self._rollup(), maintained)
+
+	def test_dashboard_reads_the_rollup(self):
+		today = timezone.localdate()
+		OrgDailyStats.objects.create(organization=self.org, day=today, status='sent', count=5)
+		OrgDailyStats.objects.create(organization=self.org, day=today, status='failed', count=5)
+		OrgDailyStats.objects.create(organization=self.org, day=today - timezone.timedelta(days=10), status='sent', count=7)
+		metrics = OrganizationDashboardMetrics(self.org)
+		with self.assertNumQueries(1):
+			stats = metrics.calculate_sms_stats()
+		self.assertEqual(stats, {'msgs_sent_today': 5, 'msgs_sent_week': 5, 'msgs_sent_month': 12})
+		self.assertEqual(metrics.calculate_trends()['delivery_trend'][-1], 50)
+		self.assertEqual(self.org.get_delivery_stats()['total_recipients'], 17)
+
+	def test_one_row_per_bucket(self):
+		today = timezone.localdate()
+		for sender in (self.sender, None):
+			OrgDailyStats.objects.create(organization=self.org, day=today, status='sent', sender=sender, count=1)
+			with self.assertRaises(IntegrityError), transaction.atomic():
+				OrgDailyStats.objects.create(organization=self.org, day=today, status='sent', sender=sender, count=1)
+
+	def test_deleting_messages_and_senders_keeps_the_rollup(self):
+		ids = iter(['d1', None, 'd3'])
+		messages = []
+		for _ in range(2):
+			message = OrgMessage.objects.create(organization=self.org, content='hi', scheduled_time=timezone.now())
+			message.create_recipients(self.contacts)
+			messages.append(message)
+		with mock.patch('core.hubtel_utils.send_sms_with_credentials', side_effect=lambda **kw: next(ids)):
+			send_sms_through_sender_pool(self.org, messages[0], 'hi', None)
+		# A legacy (no sender) bucket for the same day the sender's rows fold into
+		OrgAlertRecipient.objects.filter(message=messages[1], contact=self.contacts[0]).update(status='sent', sent_at=timezone.now())
+		rebuild_daily_stats(self.org)
+		reconcile_message_counts()
+
+		messages[1].delete()
+		self.assertEqual(status_totals(self.org), {'pending': 0, 'sent': 2, 'failed': 1})
+		SenderAssignment.objects.all().delete()
+		self.sender.delete()
+		maintained = self._rollup()
+		rebuild_daily_stats(self.org)
+		self.assertEqual(self._rollup(), maintained)
+		self.assertFalse(OrgDailyStats.objects.filter(sender__isnull=False).exists())
+
+	def test_rebuild_command(self):
+		message = OrgMessage.objects.create(organization=self.org, content='hi', scheduled_time=timezone.now())
+		message.create_recipients(self.contacts)
+		OrgDailyStats.objects.all().delete()
+		out = io.StringIO()
+		call_command('rebuild_daily_stats', '--org', self.org.slug, stdout=out)
+		self.assertIn('stats-org: 1 rollup row(s)', out.getvalue())
+		self.assertEqual(status_totals(self.org), {'pending': 3})
+
+
+@override_settings(HUBTEL_WEBHOOK_SECRET=None)
+class MessageCounterTests(TestCase):
+	def setUp(self):
+		cache.clear()
+		self.org = Organization.objects.create(name='Counter Org', slug='counter-org', sms_credit_balance=Decimal('100.00'))
+		sender = Sender.objects.create(
+			name='Main', sender_id='MAIN', sender_type='alphanumeric', provider='hubtel', gateway_balance=Decimal('50.00'),
+		)
+		SenderAssignment.objects.create(sender=sender, organization=self.org)
+		self.contacts = [
+			Contact.objects.create(organization=self.org, name=f"C{i}", phone_number=f"+23324700000{i}")
+			for i in range(4)
+		]
+
+	def _counters(self, message):
+		message.refresh_from_db()
+		return (message.total_count, message.sent_count, message.failed_count, message.pending_count)
+
+	def test_counters_follow_status_changes(self):
+		message = OrgMessage.objects.create(organization=self.org, content='hi', scheduled_time=timezone.now())
+		message.create_recipients(self.contacts[:3])
+		self.assertEqual(self._counters(message), (3, 0, 0, 3))
+
+		ids = iter(['c1', 'c2', None])
+		with mock.patch('core.hubtel_utils.send_sms_with_credentials', side_effect=lambda **kw: next(ids)):
+			send_sms_through_sender_pool(self.org, message, 'hi', None)
+		self.assertEqual(self._counters(message), (3, 2, 1, 0))
+
+		self.client.post(reverse('hubtel_webhook'), json.dumps({'messageId': 'c2', 'status': 'Failed'}), content_type='application/json')
+		apply_receipts()
+		self.assertEqual(self._counters(message), (3, 1, 2, 0))
+
+		# Rows created one at a time and rows removed with their contact are counted too
+		OrgAlertRecipient.objects.create(message=message, contact=self.contacts[3], status='pending')
+		self.assertEqual(self._counters(message), (4, 1, 2, 1))
+		delete_contacts(Contact.objects.filter(pk=self.contacts[0].pk))
+		self.assertEqual(self._counters(message), (3, 0, 2, 1))
+		self.assertEqual(reconcile_message_counts(), [])
+		self.assertEqual(status_totals(self.org), {'pending': 1, 'sent': 0, 'failed': 2})
+
+	def test_retry_through_the_view_moves_the_counters(self):
+		User = get_user_model()
+		admin = User.objects.create_user(username='retry-admin', password='pw12345!')
+		admin.role = User.ORG_ADMIN
+		admin.organization = self.org
+		admin.save()
+		self.client.force_login(admin, backend='django.contrib.auth.backends.ModelBackend')
+		message = OrgMessage.objects.create(organization=self.org, content='hi', scheduled_time=timezone.now())
+		message.create_recipients(self.contacts[:3])
+		ids = iter(['t1', None, None])
+		with mock.patch('core.hubtel_utils.send_sms_with_credentials', side_effect=lambda **kw: next(ids)):
+			send_sms_through_sender_pool(self.org, message, 'hi', None)
+		self.assertEqual(self._counters(message), (3, 1, 2, 0))
+
+		url = reverse('org_retry_failed', kwargs={'org_slug': self.org.slug})
+		with mock.patch('core.hubtel_utils.send_sms', side_effect=['t2', Exception('gateway down')]):
+			resp = self.client.post(url)
+		self.assertEqual(resp.context['retried'], 1)
+		self.assertEqual(self._counters(message), (3, 2, 1, 0))
+		self.assertEqual(status_totals(self.org), {'pending': 0, 'sent': 2, 'failed': 1})
+		self.assertEqual(reconcile_message_counts(), [])
+		maintained = sorted(OrgDailyStats.objects.filter(organization=self.org, count__gt=0).values_list('day', 'status', 'sender_id', 'count'))
+		rebuild_daily_stats(self.org)
+		self.assertEqual(sorted(OrgDailyStats.objects.filter(organization=self.org).values_list('day', 'status', 'sender_id', 'count')), maintained)
+
+	def test_a_run_that_dies_half_way_leaves_saved_statuses_counted(self):
+		message = OrgMessage.objects.create(organization=self.org, content='hi', scheduled_time=timezone.now())
+		message.create_recipients(self.contacts[:3])
+		with mock.patch('core.management.commands.send_scheduled_org_messages.send_sms', side_effect=['k1', KeyboardInterrupt]):
+			with self.assertRaises(KeyboardInterrupt):
+				call_command('send_scheduled_org_messages', stdout=io.StringIO())
+		self.assertEqual(self._counters(message), (3, 1, 0, 2))
+		self.assertEqual(reconcile_message_counts(), [])
+
+		# The sender pool commits each network's group with its counters
+		other = Contact.objects.create(organization=self.org, name='Other network', phone_number='+233201234567')
+		message = OrgMessage.objects.create(organization=self.org, content='hi', scheduled_time=timezone.now())
+		message.create_recipients(self.contacts + [other])
+		ids = iter(['g1', 'g2', 'g3', 'g4'])
+
+		def send(**kwargs):
+			if kwargs['to_number'] == other.phone_number:
+				raise KeyboardInterrupt
+			return next(ids)
+
+		with mock.patch('core.hubtel_utils.send_sms_with_credentials', side_effect=send), self.assertRaises(KeyboardInterrupt):
+			send_sms_through_sender_pool(self.org, message, 'hi', None)
+		self.assertEqual(self._counters(message), (5, 4, 0, 1))
+		self.assertEqual(reconcile_message_counts(), [])
+		self.assertEqual(status_totals(self.org), {'pending': 3, 'sent': 5})
+
+	def test_bulk_contact_delete_query_count_is_flat(self):
+		User = get_user_model()
+		admin = User.objects.create_user(username='delete-admin', password='pw12345!')
+		admin.role = User.ORG_ADMIN
+		admin.organization = self.org
+		admin.save()
+		self.client.force_login(admin, backend='django.contrib.auth.backends.ModelBackend')
+		url = reverse('org_upload_contacts', kwargs={'org_slug': self.org.slug})
+		extra = [
+			Contact.objects.create(organization=self.org, name=f"D{i}", phone_number=f"+23324710000{i}")
+			for i in range(6)
+		]
+		message = OrgMessage.objects.create(organization=self.org, content='hi', scheduled_time=timezone.now())
+		message.create_recipients(self.contacts + extra)
+
+		def bulk_delete(contacts):
+			with CaptureQueriesContext(connection) as queries:
+				self.client.post(url, {'action': 'bulk_delete_contacts', 'selected_contacts': [c.id for c in contacts]})
+			return len(queries)
+
+		self.client.get(url)
+		few = bulk_delete(self.contacts[:1])
+		self.assertEqual(bulk_delete(extra), few)
+		self.assertEqual(self._counters(message), (3, 0, 0, 3))
+		self.assertEqual(status_totals(self.org), {'pending': 3})
+		self.assertEqual(reconcile_message_counts(), [])
+
+	def test_reconcile_command_repairs_drift(self):
+		message = OrgMessage.objects.create(organization=self.org, content='hi', scheduled_time=timezone.now())
+		message.create_recipients(self.contacts)
+		OrgMessage.objects.filter(pk=message.pk).update(total_count=0, pending_count=9)
+		out = io.StringIO()
+		call_command('reconcile_message_counts', '--org', self.org.slug, stdout=out)
+		self.assertIn(f"Message {message.pk}: counters corrected", out.getvalue())
+		self.assertEqual(self._counters(message), (4, 0, 0, 4))
+
+	def test_sent_list_query_count_does_not_grow_with_messages(self):
+		User = get_user_model()
+		admin = User.objects.create_user(username='counter-admin', password='pw12345!')
+		admin.role = User.ORG_ADMIN
+		admin.organization = self.org
+		admin.save()
+		self.client.force_login(admin, backend='django.contrib.auth.backends.ModelBackend')
+		url = reverse('org_sent_messages', kwargs={'org_slug': self.org.slug})
+
+		def sent_message():
+			message = OrgMessage.objects.create(organization=self.org, content='done', scheduled_time=timezone.now(), sent=True)
+			message.create_recipients(self.contacts)
+
+		sent_message()
+		with CaptureQueriesContext(connection) as few:
+			self.client.get(url)
+		for _ in range(5):
+			sent_message()
+		with CaptureQueriesContext(connection) as many:
+			resp = self.client.get(url)
+		self.assertContains(resp, '4 recipients', count=6)
+		self.assertEqual(len(many), len(few))
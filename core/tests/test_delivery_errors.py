@@ -0,0 +1,98 @@
+import io
+import json
+from decimal import Decimal
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from core.models import Contact, DeliveryError, OrgAlertRecipient, OrgMessage, Organization, Sender, SenderAssignment
+from core.utils import delivery_errors
+from core.utils.delivery_errors import classify_error, failure_breakdown
+from core.utils.receipts import apply_receipts
+from core.utils.sender_utils import send_sms_through_sender_pool
+
+POOL_TIMEOUT = "Hubtel send error: HTTPSConnectionPool(host='smsc.hubtel.com', port=443): Read timed out. (read timeout=10)"
+POOL_DOWN = "Hubtel send error: HTTPSConnectionPool(host='smsc.hubtel.com', port=443): Max retries exceeded with url: /v1/messages/send (Caused by NewConnectionError)"
+
+
+@override_settings(HUBTEL_WEBHOOK_SECRET=None)
+class DeliveryErrorTests(TestCase):
+	def setUp(self):
+		cache.clear()
+		delivery_errors._catalogue.clear()
+		delivery_errors._examples_kept.clear()
+		self.org = Organization.objects.create(name='Error Org', slug='error-org', sms_credit_balance=Decimal('100.00'))
+		sender = Sender.objects.create(
+			name='Main', sender_id='MAIN', sender_type='alphanumeric', provider='hubtel', gateway_balance=Decimal('50.00'),
+		)
+		SenderAssignment.objects.create(sender=sender, organization=self.org)
+		self.contacts = [
+			Contact.objects.create(organization=self.org, name=f"E{i}", phone_number=f"+23324910000{i}")
+			for i in range(4)
+		]
+		self.message = OrgMessage.objects.create(organization=self.org, content='hi', scheduled_time=timezone.now())
+		self.message.create_recipients(self.contacts)
+
+	def test_classify_error(self):
+		self.assertEqual(classify_error(POOL_TIMEOUT), 'timeout')
+		self.assertEqual(classify_error(POOL_DOWN), 'connection')
+		self.assertEqual(classify_error('401 Client Error: Unauthorized for url'), 'auth')
+		self.assertEqual(classify_error('Insufficient SMS credits. Please top up your balance.'), 'insufficient_credit')
+		self.assertEqual(classify_error(''), 'not_accepted')
+		self.assertEqual(classify_error('something new'), 'other')
+
+	def test_failures_store_a_code_and_sample_the_raw_text(self):
+		rows = list(OrgAlertRecipient.objects.filter(message=self.message).order_by('id'))
+		with override_settings(ERROR_DETAIL_SAMPLE_EVERY=2):
+			for recipient in rows:
+				recipient.mark_as_failed(POOL_TIMEOUT)
+		for recipient in OrgAlertRecipient.objects.filter(message=self.message):
+			self.assertEqual(recipient.error.code, 'timeout')
+			self.assertEqual(recipient.error_message, POOL_TIMEOUT if recipient.pk % 2 == 0 else None)
+		self.assertEqual(DeliveryError.objects.get(code='timeout').example, POOL_TIMEOUT)
+		self.assertEqual(rows[0].error_description.split(' (')[0], 'Timed out waiting for the provider')
+
+	def test_send_and_receipt_failures_group_by_code(self):
+		ids = iter(['e1', 'e2', None, None])
+		with mock.patch('core.hubtel_utils.send_sms_with_credentials', side_effect=lambda **kw: next(ids)):
+			send_sms_through_sender_pool(self.org, self.message, 'hi', None)
+		self.client.post(reverse('hubtel_webhook'), json.dumps({'messageId': 'e1', 'status': 'Failed'}), content_type='application/json')
+		apply_receipts()
+
+		recipients = OrgAlertRecipient.objects.filter(message=self.message)
+		delivery_errors.catalogue()
+		with self.assertNumQueries(1):
+			breakdown = failure_breakdown(recipients)
+		self.assertEqual([(row['code'], row['count']) for row in breakdown], [('not_accepted', 2), ('provider_failed', 1)])
+
+		self.client.post(reverse('hubtel_webhook'), json.dumps({'messageId': 'e1', 'status': 'Delivered'}), content_type='application/json')
+		apply_receipts()
+		self.assertIsNone(recipients.get(provider_message_id='e1').error_id)
+
+	def test_delivery_report_lists_failure_reasons(self):
+		OrgAlertRecipient.objects.filter(message=self.message).update(status='failed', error=delivery_errors.error_for('auth'))
+		User = get_user_model()
+		admin = User.objects.create_user(username='error-admin', password='pw12345!')
+		admin.role = User.ORG_ADMIN
+		admin.organization = self.org
+		admin.save()
+		self.client.force_login(admin, backend='django.contrib.auth.backends.ModelBackend')
+		resp = self.client.get(reverse('org_delivery_reports', kwargs={'org_slug': self.org.slug}))
+		self.assertContains(resp, 'Provider rejected the credentials')
+		self.assertEqual(resp.context['failure_breakdown'], [{'code': 'auth', 'description': 'Provider rejected the credentials', 'count': 4}])
+
+	@override_settings(ERROR_DETAIL_SAMPLE_EVERY=1000000)
+	def test_compact_command_backfills_old_rows(self):
+		OrgAlertRecipient.objects.filter(message=self.message).update(status='failed', error_message=POOL_DOWN)
+		OrgAlertRecipient.objects.filter(contact=self.contacts[0]).update(error_message='')
+		out = io.StringIO()
+		call_command('compact_recipient_errors', '--org', self.org.slug, '--chunk-size', '3', stdout=out)
+		self.assertIn('4 row(s) updated', out.getvalue())
+		breakdown = failure_breakdown(OrgAlertRecipient.objects.filter(message=self.message))
+		self.assertEqual([(row['code'], row['count']) for row in breakdown], [('connection', 3), ('unknown', 1)])
+		self.assertFalse(OrgAlertRecipient.objects.filter(error_message__isnull=False).exists())
@@ -0,0 +1,125 @@
+import datetime
+import io
+from decimal import Decimal
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+
+from core.models import Contact, DeliveryReceipt, OrgAlertRecipient, OrgMessage, Organization, Sender, SenderAssignment
+from core.utils import delivery_errors
+from core.utils.delivery_polling import poll_delivery_statuses, poll_sender
+from core.utils.sender_utils import send_sms_through_sender_pool
+
+STATUS_API = 'core.hubtel_utils.get_sms_delivery_status_with_credentials'
+
+
+class DeliveryPollingTests(TestCase):
+	def setUp(self):
+		cache.clear()
+		delivery_errors._catalogue.clear()
+		self.org = Organization.objects.create(name='Poll Org', slug='poll-org', sms_credit_balance=Decimal('100.00'))
+		self.sender = Sender.objects.create(
+			name='Main', sender_id='MAIN', sender_type='alphanumeric', provider='hubtel',
+			gateway_balance=Decimal('50.00'), hubtel_api_url='https://sms.example/send', status_poll_rate=2,
+		)
+		SenderAssignment.objects.create(sender=self.sender, organization=self.org)
+		contacts = [
+			Contact.objects.create(organization=self.org, name=f"P{i}", phone_number=f"+23324930000{i}")
+			for i in range(4)
+		]
+		self.message = OrgMessage.objects.create(organization=self.org, content='hi', scheduled_time=timezone.now())
+		self.message.create_recipients(contacts)
+		ids = iter(['p1', 'p2', 'p3', 'p4'])
+		with mock.patch('core.hubtel_utils.send_sms_with_credentials', side_effect=lambda **kw: next(ids)):
+			send_sms_through_sender_pool(self.org, self.message, 'hi', None)
+		# p4's receipt arrived, so it is never polled
+		OrgAlertRecipient.objects.filter(provider_message_id='p4').update(provider_status='Delivered')
+		self.sent_at = OrgAlertRecipient.objects.get(provider_message_id='p1').sent_at
+
+	def _at(self, minutes):
+		return self.sent_at + datetime.timedelta(minutes=minutes)
+
+	def _poll(self, now, statuses, **kwargs):
+		sleep = mock.Mock()
+		with mock.patch(STATUS_API, side_effect=lambda message_id, **kw: statuses[message_id]) as api:
+			results = poll_delivery_statuses(now=now, sleep=sleep, clock=lambda: 0.0, **kwargs)
+		return results, api, sleep
+
+	def test_final_statuses_are_applied_under_the_rate_limit(self):
+		results, api, _ = self._poll(self._at(10), {})
+		self.assertEqual((results, api.call_count), ({}, 0))
+
+		statuses = {'p1': {'status': 'Delivered'}, 'p2': {'data': {'status': 'Undelivered'}}, 'p3': {'status': 'Sent'}}
+		results, api, sleep = self._poll(self._at(45), statuses)
+		self.assertEqual(results, {self.sender: {'queried': 3, 'final': 2, 'errors': 0}})
+		self.assertEqual([c.args[0] for c in api.call_args_list], ['p1', 'p2', 'p3'])
+		# Two queries per second: a half-second wait before every query after the first
+		self.assertEqual([c.args[0] for c in sleep.call_args_list], [0.5, 0.5])
+
+		self.assertIsNotNone(OrgAlertRecipient.objects.get(provider_message_id='p1').delivered_at)
+		self.assertEqual(OrgAlertRecipient.objects.get(provider_message_id='p2').status, 'failed')
+		# An intermediate answer is not recorded, so the recipient stays due for another check
+		self.assertIsNone(OrgAlertRecipient.objects.get(provider_message_id='p3').provider_status)
+		self.assertFalse(DeliveryReceipt.objects.exists())
+		self.message.refresh_from_db()
+		self.assertEqual((self.message.sent_count, self.message.failed_count), (3, 1))
+
+	def test_each_message_backs_off_until_the_horizon(self):
+		statuses = {'p1': {'status': 'Sent'}, 'p2': {'status': 'Sent'}, 'p3': {'status': 'Sent'}}
+		self.assertEqual(self._poll(self._at(45), statuses)[1].call_count, 3)
+		# Asked once: next check is 60 minutes after sending
+		self.assertEqual(self._poll(self._at(50), statuses)[1].call_count, 0)
+		self.assertEqual(self._poll(self._at(61), statuses)[1].call_count, 3)
+		# Asked twice: next check is 120 minutes after sending
+		self.assertEqual(self._poll(self._at(100), statuses)[1].call_count, 0)
+		self.assertEqual(self._poll(self._at(121), statuses)[1].call_count, 3)
+		self.assertEqual(self._poll(self._at(49 * 60), statuses)[1].call_count, 0)
+
+	def test_limit_and_gateway_errors(self):
+		self.assertEqual(self._poll(self._at(45), {'p1': {'status': 'Sent'}}, limit=1)[1].call_count, 1)
+
+		failing = mock.patch(STATUS_API, side_effect=Exception('Hubtel status error: 429 Too Many Requests'))
+		with failing as api, mock.patch('core.utils.delivery_polling.MAX_SENDER_ERRORS', 1), self.assertLogs('core.utils.delivery_polling', 'WARNING'):
+			result = poll_sender(self.sender, now=self._at(45), sleep=mock.Mock(), clock=lambda: 0.0)
+		# The sender is left alone after the error; the failed query still counts as a check
+		self.assertEqual(result, {'queried': 1, 'final': 0, 'errors': 1})
+		self.assertEqual([c.args[0] for c in api.call_args_list], ['p2'])
+		self.assertEqual([c.args[0] for c in self._poll(self._at(50), {'p3': {'status': 'Sent'}})[1].call_args_list], ['p3'])
+
+	def test_a_run_stops_at_its_budget_and_the_next_resumes(self):
+		second = Sender.objects.create(
+			name='Second', sender_id='SECOND', sender_type='alphanumeric', provider='hubtel',
+			gateway_balance=Decimal('50.00'), hubtel_api_url='https://sms.example/send', status_poll_rate=2,
+		)
+		OrgAlertRecipient.objects.filter(provider_message_id='p3').update(sender=second)
+		now = [0.0]
+
+		def slow_gateway(message_id, **kwargs):
+			now[0] += 5.0
+			return {'status': 'Sent'}
+
+		def sleep(seconds):
+			now[0] += seconds
+
+		with mock.patch(STATUS_API, side_effect=slow_gateway) as api:
+			results = poll_delivery_statuses(now=self._at(45), sleep=sleep, clock=lambda: now[0], budget=8)
+		# Two five-second queries use up the budget; the second sender is not reached
+		self.assertEqual([c.args[0] for c in api.call_args_list], ['p1', 'p2'])
+		self.assertEqual(list(results), [self.sender])
+
+		now[0] = 0.0
+		with mock.patch(STATUS_API, side_effect=slow_gateway) as api:
+			poll_delivery_statuses(now=self._at(45), sleep=sleep, clock=lambda: now[0], budget=8)
+		self.assertEqual([c.args[0] for c in api.call_args_list][0], 'p3')
+
+	def test_command(self):
+		out = io.StringIO()
+		with mock.patch(STATUS_API, return_value={'status': 'Delivered'}), \
+				mock.patch('core.utils.delivery_polling.timezone.now', return_value=self._at(45)), \
+				mock.patch('core.utils.delivery_polling.time.sleep'):
+			call_command('poll_delivery_statuses', stdout=out)
+		self.assertIn('3 final status(es) applied', out.getvalue())
+		self.assertEqual(OrgAlertRecipient.objects.filter(message=self.message, delivered_at__isnull=False).count(), 3)
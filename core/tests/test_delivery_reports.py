@@ -0,0 +1,98 @@
+import datetime
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from core.models import Contact, OrgAlertRecipient, OrgMessage, Organization
+from core.utils import delivery_errors
+from core.utils.delivery_reports import annotate_report, build_report, latency_percentiles, organization_delivery_totals
+
+
+class DeliveryReportTests(TestCase):
+	def setUp(self):
+		self.org = Organization.objects.create(name='Report Org', slug='report-org')
+		User = get_user_model()
+		self.admin = User.objects.create_user(username='reporter', password='pw12345!')
+		self.admin.role = User.ORG_ADMIN
+		self.admin.organization = self.org
+		self.admin.save()
+		self.client.force_login(self.admin, backend='django.contrib.auth.backends.ModelBackend')
+		self.contacts = [
+			Contact.objects.create(organization=self.org, name=f"R{i}", phone_number=f"+23324500000{i}")
+			for i in range(4)
+		]
+
+	def _message(self, statuses, days_ago=0):
+		message = OrgMessage.objects.create(organization=self.org, content='report', scheduled_time=timezone.now())
+		OrgMessage.objects.filter(pk=message.pk).update(created_at=timezone.now() - datetime.timedelta(days=days_ago))
+		message.refresh_from_db()
+		for contact, status in zip(self.contacts, statuses):
+			OrgAlertRecipient.objects.create(
+				message=message, contact=contact, status=status,
+				sent_at=message.created_at + datetime.timedelta(seconds=30) if status != 'pending' else None,
+				provider_message_id='p1' if status == 'sent' and contact.name == 'R0' else None,
+			)
+		return message
+
+	def test_annotated_report_matches_per_message_helpers(self):
+		messages = [self._message(['sent', 'sent', 'failed', 'pending']), self._message(['failed'], days_ago=40), self._message([])]
+		rate = self.org.get_current_sms_rate()
+		for message in annotate_report(OrgMessage.objects.filter(organization=self.org)):
+			expected = OrgMessage.objects.get(pk=message.pk).get_detailed_report()
+			expected.pop('latency')
+			self.assertEqual(build_report(message, rate), expected)
+		self.assertEqual(len(messages), 3)
+
+	def test_single_message_helpers_are_one_query_each(self):
+		message = self._message(['sent', 'sent', 'failed', 'pending'])
+		message.refresh_from_db()
+		with self.assertNumQueries(1):
+			self.assertEqual(message.get_average_send_time(), 30.0)
+		with self.assertNumQueries(1):
+			self.assertEqual(message.get_provider_breakdown(), {'hubtel': 25.0, 'clicksend': 25.0, 'unknown': 0})
+		with self.assertNumQueries(1):
+			self.assertEqual(message.get_time_based_stats()['last_24h'], {'sent': 2, 'failed': 1})
+
+	def test_latency_percentiles(self):
+		message = OrgMessage.objects.create(organization=self.org, content='latency', scheduled_time=timezone.now())
+		message.refresh_from_db()
+		for i, contact in enumerate(self.contacts):
+			sent_at = message.created_at + datetime.timedelta(seconds=10 * (i + 1))
+			OrgAlertRecipient.objects.create(
+				message=message, contact=contact, status='sent', sent_at=sent_at,
+				delivered_at=sent_at + datetime.timedelta(seconds=2) if i < 2 else None,
+			)
+		latency = latency_percentiles(message.recipients_status.all())
+		self.assertEqual(latency['submit_to_sent'], {'p50': 20.0, 'p95': 40.0, 'p99': 40.0})
+		self.assertEqual(latency['sent_to_delivered'], {'p50': 2.0, 'p95': 2.0, 'p99': 2.0})
+		empty = OrgMessage.objects.create(organization=self.org, content='none', scheduled_time=timezone.now())
+		self.assertEqual(empty.get_detailed_report()['latency']['submit_to_sent'], {'p50': None, 'p95': None, 'p99': None})
+
+	def test_totals_in_one_query(self):
+		self._message(['sent', 'sent', 'failed'])
+		self._message(['sent', 'failed'], days_ago=40)
+		with self.assertNumQueries(1):
+			totals = organization_delivery_totals(self.org)
+		self.assertEqual(
+			{k: totals[k] for k in ('total_messages', 'total_recipients', 'total_sent', 'total_failed', 'recent_sent', 'recent_failed')},
+			{'total_messages': 2, 'total_recipients': 5, 'total_sent': 3, 'total_failed': 2, 'recent_sent': 2, 'recent_failed': 1},
+		)
+		self.assertEqual(totals['overall_delivery_rate'], 60)
+
+	def test_page_query_count_does_not_grow_with_messages(self):
+		url = reverse('org_delivery_reports', kwargs={'org_slug': self.org.slug})
+		self._message(['sent', 'failed'])
+		# The error catalogue is loaded once per process, not per page
+		delivery_errors.catalogue()
+		with CaptureQueriesContext(connection) as few:
+			self.client.get(url)
+		for _ in range(6):
+			self._message(['sent', 'sent', 'pending'])
+		with CaptureQueriesContext(connection) as many:
+			resp = self.client.get(url)
+		self.assertEqual(resp.status_code, 200)
+		self.assertEqual(len(many), len(few))
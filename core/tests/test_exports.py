@@ -0,0 +1,67 @@
+import csv
+import gzip
+import io
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from core.models import Contact, ContactGroup, OrgAlertRecipient, OrgMessage, Organization
+
+
+class OrgExportTests(TestCase):
+	def setUp(self):
+		self.org = Organization.objects.create(name='Export Org', slug='export-org')
+		User = get_user_model()
+		self.admin = User.objects.create_user(username='exporter', password='pw12345!')
+		self.admin.role = User.ORG_ADMIN
+		self.admin.organization = self.org
+		self.admin.save()
+		self.client.force_login(self.admin, backend='django.contrib.auth.backends.ModelBackend')
+
+		self.ama = Contact.objects.create(organization=self.org, name='Ama', phone_number='+233201234567')
+		self.kojo = Contact.objects.create(organization=self.org, name='Kojo, Jr.', phone_number='+233241234567')
+		group = ContactGroup.objects.create(organization=self.org, name='Parents')
+		group.contacts.add(self.ama, self.kojo)
+		msg = OrgMessage.objects.create(organization=self.org, content='School closes early', scheduled_time=timezone.now())
+		OrgAlertRecipient.objects.create(message=msg, contact=self.ama, status='sent', sent_at=timezone.now())
+		OrgAlertRecipient.objects.create(message=msg, contact=self.kojo, status='failed', error_message='Invalid number')
+
+		other = Organization.objects.create(name='Other Org', slug='other-org')
+		Contact.objects.create(organization=other, name='Stranger', phone_number='+233551112222')
+
+	def _rows(self, response):
+		body = b''.join(response.streaming_content)
+		if response['Content-Type'] == 'application/gzip':
+			body = gzip.decompress(body)
+		return list(csv.reader(io.StringIO(body.decode('utf-8-sig'))))
+
+	def _get(self, kind, **params):
+		return self.client.get(reverse('org_export', kwargs={'org_slug': self.org.slug, 'kind': kind}), params)
+
+	def test_contacts_export_streams_only_own_contacts(self):
+		resp = self._get('contacts')
+		self.assertTrue(resp.streaming)
+		self.assertIn('attachment; filename="export-org-contacts-', resp['Content-Disposition'])
+		rows = self._rows(resp)
+		self.assertEqual(rows[0], ['name', 'phone', 'created_at'])
+		self.assertEqual([r[:2] for r in rows[1:]], [['Ama', '+233201234567'], ['Kojo, Jr.', '+233241234567']])
+
+	def test_groups_and_gzip_export(self):
+		resp = self._get('groups', gzip='1')
+		self.assertTrue(resp['Content-Disposition'].endswith('.csv.gz"'))
+		rows = self._rows(resp)
+		self.assertEqual(rows[1:], [['Parents', 'Ama', '+233201234567'], ['Parents', 'Kojo, Jr.', '+233241234567']])
+
+	def test_message_log_filters_and_delivery_report_counts(self):
+		rows = self._rows(self._get('message-logs', status='failed'))
+		self.assertEqual(len(rows), 2)
+		self.assertEqual(rows[1][1:5], ['Kojo, Jr.', '+233241234567', 'failed', ''])
+
+		rows = self._rows(self._get('delivery-reports'))
+		report = dict(zip(rows[0], rows[1]))
+		self.assertEqual((report['recipients'], report['sent'], report['failed'], report['delivery_rate']), ('2', '1', '1', '50.0'))
+
+	def test_unknown_export_is_404(self):
+		self.assertEqual(self._get('payments').status_code, 404)
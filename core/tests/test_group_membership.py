@@ -0,0 +1,119 @@
+import io
+import shutil
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from core.models import Contact, ContactGroup, ContactImportJob, Organization
+from core.utils.contact_deletion import delete_contacts
+from core.utils.group_membership import add_members, remove_members
+
+
+class GroupMembershipTests(TestCase):
+	def setUp(self):
+		self.org = Organization.objects.create(name='Group Org', slug='group-org')
+		User = get_user_model()
+		self.admin = User.objects.create_user(username='grouper', password='pw12345!')
+		self.admin.role = User.ORG_ADMIN
+		self.admin.organization = self.org
+		self.admin.save()
+		self.client.force_login(self.admin, backend='django.contrib.auth.backends.ModelBackend')
+		self.contacts = [
+			Contact.objects.create(organization=self.org, name=f"C{i}", phone_number=f"+23320100{i:04d}")
+			for i in range(10)
+		]
+		self.group = ContactGroup.objects.create(organization=self.org, name='Parents')
+		other = Organization.objects.create(name='Other', slug='other-group-org')
+		self.stranger = Contact.objects.create(organization=other, name='Stranger', phone_number='+233201009999')
+
+	def _url(self, op):
+		return reverse('org_group_members', kwargs={'org_slug': self.org.slug, 'group_id': self.group.id, 'op': op})
+
+	def test_add_and_remove_in_chunks(self):
+		ids = [c.id for c in self.contacts[:7]] + [self.stranger.id, 'junk']
+		self.assertEqual(add_members(self.group, ids, chunk_size=3), 7)
+		# Re-adding is a no-op
+		self.assertEqual(add_members(self.group, ids, chunk_size=3), 0)
+		self.assertEqual(remove_members(self.group, [c.id for c in self.contacts[:4]], chunk_size=3), 4)
+		self.assertEqual(set(self.group.contacts.all()), set(self.contacts[4:7]))
+
+	def test_delta_endpoints_accept_ids_and_phones(self):
+		resp = self.client.post(self._url('add'), {'contact_ids': f"{self.contacts[0].id},{self.contacts[1].id}", 'phones': '0201000002, +233201009999'})
+		self.assertEqual(resp.json(), {'group': self.group.id, 'added': 3})
+		resp = self.client.post(self._url('remove'), {'phones': '0201000001'})
+		self.assertEqual(resp.json()['removed'], 1)
+		self.assertEqual(set(self.group.contacts.all()), {self.contacts[0], self.contacts[2]})
+		self.assertEqual(self.client.get(self._url('add')).status_code, 405)
+
+	def test_import_pasted_list_creates_missing_contacts(self):
+		resp = self.client.post(self._url('import'), {'phones': '0201000003\n0559998888\n12345'})
+		self.assertEqual(resp.json()['added'], 2)
+		self.assertTrue(self.group.contacts.filter(phone_number='+233559998888').exists())
+		self.assertEqual(Contact.objects.filter(organization=self.org).count(), 11)
+
+	def test_import_file_is_queued_into_group(self):
+		media_root = tempfile.mkdtemp()
+		try:
+			with override_settings(MEDIA_ROOT=media_root):
+				upload = SimpleUploadedFile('members.csv', b"name,phone\nNew Parent,0557770000\nC5,0201000005\n", content_type='text/csv')
+				job_id = self.client.post(self._url('import'), {'members_file': upload}).json()['job']
+				call_command('process_contact_imports', stdout=io.StringIO())
+		finally:
+			shutil.rmtree(media_root, ignore_errors=True)
+		job = ContactImportJob.objects.get(id=job_id)
+		self.assertEqual((job.status, job.members_added), ('completed', 2))
+		self.assertEqual(set(self.group.contacts.values_list('name', flat=True)), {'New Parent', 'C5'})
+		self.group.refresh_from_db()
+		self.assertEqual(self.group.member_count, 2)
+
+	def test_member_count_follows_every_write_path(self):
+		add_members(self.group, [c.id for c in self.contacts[:5]], chunk_size=2)
+		remove_members(self.group, [self.contacts[0].id])
+		self.group.contacts.add(self.contacts[8])
+		self.contacts[9].groups.add(self.group)
+		delete_contacts(Contact.objects.filter(pk=self.contacts[1].pk))
+		self.group.refresh_from_db()
+		self.assertEqual(self.group.member_count, 5)
+		self.contacts[9].groups.clear()
+		self.group.refresh_from_db()
+		self.assertEqual(self.group.member_count, 4)
+
+	def test_reconcile_command_repairs_drift(self):
+		add_members(self.group, [c.id for c in self.contacts[:3]])
+		ContactGroup.objects.filter(pk=self.group.pk).update(member_count=42)
+		out = io.StringIO()
+		call_command('reconcile_member_counts', stdout=out)
+		self.group.refresh_from_db()
+		self.assertEqual(self.group.member_count, 3)
+		self.assertIn('1 group(s) corrected', out.getvalue())
+
+	def test_group_list_query_count_is_flat(self):
+		url = reverse('org_groups', kwargs={'org_slug': self.org.slug})
+		add_members(self.group, [c.id for c in self.contacts])
+		with CaptureQueriesContext(connection) as one_group:
+			self.client.get(url)
+		for i in range(5):
+			extra = ContactGroup.objects.create(organization=self.org, name=f'Extra {i}')
+			add_members(extra, [self.contacts[i].id])
+		with CaptureQueriesContext(connection) as six_groups:
+			resp = self.client.get(url)
+		self.assertContains(resp, '10 contacts')
+		self.assertEqual(len(six_groups), len(one_group))
+
+	def test_editing_a_group_keeps_member_count(self):
+		add_members(self.group, [c.id for c in self.contacts[:2]])
+		url = reverse('org_groups', kwargs={'org_slug': self.org.slug})
+		self.client.post(url, {
+			'action': 'edit', 'group_id': self.group.id, 'name': 'Guardians',
+			'add_contacts': [c.id for c in self.contacts[2:5]], 'remove_contacts': [self.contacts[0].id],
+		})
+		self.group.refresh_from_db()
+		self.assertEqual(self.group.name, 'Guardians')
+		self.assertEqual(self.group.member_count, self.group.contacts.count())
+		self.assertEqual(self.group.member_count, 4)
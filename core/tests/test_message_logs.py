@@ -0,0 +1,101 @@
+import datetime
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.db.models import F
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from core.models import Contact, OrgAlertRecipient, OrgMessage, Organization
+from core.utils.message_logs import log_page
+
+
+class MessageLogPaginationTests(TestCase):
+	def setUp(self):
+		self.org = Organization.objects.create(name='Log Org', slug='log-org')
+		User = get_user_model()
+		self.admin = User.objects.create_user(username='logger', password='pw12345!')
+		self.admin.role = User.ORG_ADMIN
+		self.admin.organization = self.org
+		self.admin.save()
+		self.client.force_login(self.admin, backend='django.contrib.auth.backends.ModelBackend')
+		self.message = OrgMessage.objects.create(organization=self.org, content='log me', scheduled_time=timezone.now())
+		self.now = timezone.now().replace(microsecond=0)
+
+	def _log(self, name, sent_at, status='sent'):
+		contact = Contact.objects.create(organization=self.org, name=name, phone_number=f"+23324900{Contact.objects.count():04d}")
+		return OrgAlertRecipient.objects.create(message=self.message, contact=contact, status=status, sent_at=sent_at)
+
+	def test_walks_every_row_once_in_both_directions(self):
+		same = self.now - datetime.timedelta(hours=1)
+		for i in range(3):
+			self._log(f"P{i}", None, status='pending')
+		for i in range(4):
+			self._log(f"T{i}", same)
+		for i in range(3):
+			self._log(f"D{i}", self.now - datetime.timedelta(days=i + 2))
+		logs = OrgAlertRecipient.objects.filter(message__organization=self.org)
+		expected = list(logs.order_by(F('sent_at').desc(nulls_first=True), '-id').values_list('id', flat=True))
+
+		seen, pages, cursor = [], [], None
+		while True:
+			page = log_page(logs, after=cursor, page_size=3)
+			pages.append(page)
+			seen.extend(row.id for row in page.items)
+			if not page.has_next:
+				break
+			cursor = page.next_cursor
+		self.assertEqual(seen, expected)
+
+		back = log_page(logs, before=pages[-1].prev_cursor, page_size=3)
+		self.assertEqual([row.id for row in back.items], [row.id for row in pages[-2].items])
+
+	def test_date_filter_applies_without_a_status(self):
+		self._log('Old', self.now - datetime.timedelta(days=10))
+		self._log('New', self.now)
+		today = timezone.localdate(self.now).isoformat()
+		resp = self.client.get(reverse('org_message_logs', kwargs={'org_slug': self.org.slug}), {'from': today, 'to': today})
+		self.assertEqual([log.contact.name for log in resp.context['logs']], ['New'])
+		self.assertEqual(resp.context['filter_query'], f"from={today}&to={today}")
+
+	@override_settings(MESSAGE_LOGS_PAGE_SIZE=5)
+	def test_page_query_count_does_not_grow_with_history(self):
+		url = reverse('org_message_logs', kwargs={'org_slug': self.org.slug})
+		self._log('First', self.now)
+		with CaptureQueriesContext(connection) as few:
+			self.client.get(url)
+		for i in range(12):
+			self._log(f"L{i}", self.now - datetime.timedelta(minutes=i))
+		with CaptureQueriesContext(connection) as many:
+			resp = self.client.get(url)
+		self.assertEqual(len(resp.context['logs']), 5)
+		self.assertTrue(resp.context['page'].has_next)
+		self.assertEqual(len(many), len(few))
+
+	def test_org_logs_seek_on_the_recipient_organization(self):
+		contact = Contact.objects.create(organization=self.org, name='Bulk', phone_number='+233249009999')
+		other = OrgMessage.objects.create(organization=self.org, content='bulk', scheduled_time=timezone.now())
+		other.create_recipients([contact])
+		self.assertEqual(OrgAlertRecipient.objects.get(contact=contact).organization_id, self.org.id)
+		self.assertEqual(self._log('Single', self.now).organization_id, self.org.id)
+
+		with CaptureQueriesContext(connection) as queries:
+			self.client.get(reverse('org_message_logs', kwargs={'org_slug': self.org.slug}))
+		page_sql = next(q['sql'] for q in queries if q['sql'].startswith('SELECT') and 'FROM "core_orgalertrecipient"' in q['sql'])
+		where = page_sql.split(' WHERE ', 1)[1]
+		self.assertIn('"core_orgalertrecipient"."organization_id" =', where)
+		self.assertNotIn('"core_orgmessage"."organization_id"', where)
+
+	def test_audit_view_pages_across_organizations(self):
+		self._log('Audit', self.now)
+		User = get_user_model()
+		auditor = User.objects.create_user(username='auditor', password='pw12345!')
+		auditor.role = User.SUPER_ADMIN
+		auditor.save()
+		self.client.force_login(auditor, backend='django.contrib.auth.backends.ModelBackend')
+		resp = self.client.get(reverse('audit_message_logs'), {'org': self.org.slug, 'show_deleted': 'true'})
+		self.assertEqual(resp.status_code, 200)
+		self.assertEqual([log.contact.name for log in resp.context['logs']], ['Audit'])
+		self.assertEqual(resp.context['filter_query'], 'org=log-org&show_deleted=true')
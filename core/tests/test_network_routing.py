@@ -0,0 +1,82 @@
+from decimal import Decimal
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from core.models import Contact, OrgAlertRecipient, OrgMessage, Organization, Sender, SenderAssignment
+from core.utils.networks import AIRTELTIGO, MTN, TELECEL, UNKNOWN, classify_network, classify_networks
+from core.utils.sender_utils import choose_sender, send_sms_through_sender_pool
+
+
+class NetworkClassificationTests(TestCase):
+	def test_known_prefixes(self):
+		self.assertEqual(
+			classify_networks(['+233244123456', '+233201234567', '+233271234567', '+233551234567', '+447700900123', '']),
+			[MTN, TELECEL, AIRTELTIGO, MTN, UNKNOWN, UNKNOWN],
+		)
+
+	@override_settings(NETWORK_PREFIXES={'23324': MTN, '233249': TELECEL})
+	def test_longest_prefix_wins(self):
+		self.assertEqual(classify_network('+233249000000'), TELECEL)
+		self.assertEqual(classify_network('+233241000000'), MTN)
+
+
+class SenderRoutingTests(TestCase):
+	def setUp(self):
+		cache.clear()
+		self.org = Organization.objects.create(name='Route Org', slug='route-org', sms_credit_balance=Decimal('100.00'))
+		self.cheap_mtn = self._sender('Cheap MTN', {'mtn': '0.10'})
+		self.cheap_telecel = self._sender('Cheap Telecel', {'telecel': '0.12'})
+		self.contacts = [
+			Contact.objects.create(organization=self.org, name='M1', phone_number='+233241000001'),
+			Contact.objects.create(organization=self.org, name='M2', phone_number='+233551000002'),
+			Contact.objects.create(organization=self.org, name='T1', phone_number='+233201000003'),
+		]
+
+	def _sender(self, name, costs, balance='50.00'):
+		sender = Sender.objects.create(
+			name=name, sender_id=name.replace(' ', ''), sender_type='alphanumeric', provider='hubtel',
+			gateway_balance=Decimal(balance), network_costs=costs,
+		)
+		SenderAssignment.objects.create(sender=sender, organization=self.org)
+		return sender
+
+	def test_recipients_are_classified_at_insert(self):
+		message = OrgMessage.objects.create(organization=self.org, content='hi', scheduled_time=timezone.now())
+		message.create_recipients(Contact.objects.filter(organization=self.org))
+		self.assertEqual(
+			dict(message.recipients_status.values_list('contact__name', 'network')),
+			{'M1': MTN, 'M2': MTN, 'T1': TELECEL},
+		)
+
+	def test_choose_sender_by_cost_or_health(self):
+		senders = [self.cheap_telecel, self.cheap_mtn]
+		self.assertEqual(choose_sender(senders, MTN, 1), self.cheap_mtn)
+		health = {(self.cheap_mtn.id, MTN): 0.5}
+		self.assertEqual(choose_sender(senders, MTN, 1, health=health, policy='health'), self.cheap_telecel)
+		# A sender that cannot cover the batch at its own cost for the network is skipped
+		self.cheap_mtn.gateway_balance = Decimal('1.00')
+		self.assertEqual(choose_sender(senders, MTN, 10), self.cheap_mtn)
+		self.assertEqual(choose_sender(senders, MTN, 11), self.cheap_telecel)
+		self.assertEqual(choose_sender(senders, MTN, 4, planned={self.cheap_mtn.id: Decimal('0.70')}), self.cheap_telecel)
+		self.assertEqual(choose_sender(senders, MTN, 1000), None)
+
+	def test_dispatch_routes_each_network_to_its_cheapest_sender(self):
+		message = OrgMessage.objects.create(organization=self.org, content='hi', scheduled_time=timezone.now())
+		message.create_recipients(self.contacts)
+		with mock.patch('core.hubtel_utils.send_sms_with_credentials', side_effect=lambda **kw: f"id-{kw['to_number']}") as send:
+			processed, _, sender_used = send_sms_through_sender_pool(self.org, message, 'hi', None)
+		self.assertEqual((processed, sender_used), (3, self.cheap_mtn))
+		used = {call.kwargs['to_number']: call.kwargs['sender_id'] for call in send.call_args_list}
+		self.assertEqual(used, {'+233241000001': 'CheapMTN', '+233551000002': 'CheapMTN', '+233201000003': 'CheapTelecel'})
+		self.assertEqual(
+			dict(OrgAlertRecipient.objects.filter(message=message).values_list('contact__name', 'sender__name')),
+			{'M1': 'Cheap MTN', 'M2': 'Cheap MTN', 'T1': 'Cheap Telecel'},
+		)
+		self.cheap_mtn.refresh_from_db()
+		self.cheap_telecel.refresh_from_db()
+		self.assertEqual(self.cheap_mtn.total_sms_sent, 2)
+		# Each gateway is charged its own per-network cost
+		self.assertEqual((self.cheap_mtn.gateway_balance, self.cheap_telecel.gateway_balance), (Decimal('49.80'), Decimal('49.88')))
@@ -0,0 +1,107 @@
+import datetime
+import io
+import shutil
+import tempfile
+from unittest import mock, skipUnless
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from core.models import Contact, OrgAlertRecipient, OrgMessage, Organization
+from core.utils.archive import archive_before
+from core.utils.contact_deletion import delete_contacts
+from core.utils.daily_stats import reconcile_message_counts
+from core.utils.delivery_reports import message_report
+from core.utils.message_logs import filter_logs
+from core.utils.partitions import (
+	add_months, create_partition, ensure_partitions, is_partitioned, month_partitions, month_start, partition_name,
+)
+
+UTC = datetime.timezone.utc
+
+
+class RecipientPartitionTests(TestCase):
+	def setUp(self):
+		self.org = Organization.objects.create(name='Part Org', slug='part-org')
+		self.contacts = [
+			Contact.objects.create(organization=self.org, name=f"P{i}", phone_number=f"+23324800000{i}")
+			for i in range(2)
+		]
+
+	def test_month_helpers(self):
+		start = month_start(datetime.datetime(2026, 12, 31, 23, 30, tzinfo=datetime.timezone(datetime.timedelta(hours=-2))))
+		self.assertEqual(start, datetime.datetime(2027, 1, 1, tzinfo=UTC))
+		self.assertEqual(add_months(start, -1), datetime.datetime(2026, 12, 1, tzinfo=UTC))
+		self.assertEqual(add_months(start, 14), datetime.datetime(2028, 3, 1, tzinfo=UTC))
+		self.assertEqual(partition_name(start), 'core_orgalertrecipient_p2027_01')
+
+	def test_single_table_databases_are_left_alone(self):
+		self.assertEqual(ensure_partitions(), [])
+		out = io.StringIO()
+		call_command('manage_recipient_partitions', stdout=out)
+		self.assertIn('not partitioned', out.getvalue())
+
+	def test_recipient_queries_carry_a_created_at_bound(self):
+		message = OrgMessage.objects.create(organization=self.org, content='bounded', scheduled_time=timezone.now())
+		message.create_recipients(self.contacts)
+		recipient = OrgAlertRecipient.objects.get(contact=self.contacts[0])
+		self.assertGreaterEqual(recipient.created_at, message.created_at)
+		self.assertEqual(message.get_recipient_rows().count(), 2)
+
+		with CaptureQueriesContext(connection) as queries:
+			report = message_report(message)
+		self.assertEqual(report.sent_without_provider_id, 0)
+		self.assertIn('"created_at" >=', queries[0]['sql'].split(' WHERE ')[0])
+
+		logs = filter_logs(OrgAlertRecipient.objects.all(), date_to=timezone.localdate())
+		self.assertIn('"core_orgalertrecipient"."created_at" <', str(logs.query))
+
+	def test_repairs_skip_archived_months(self):
+		old = OrgMessage.objects.create(organization=self.org, content='old', scheduled_time=timezone.now())
+		new = OrgMessage.objects.create(organization=self.org, content='new', scheduled_time=timezone.now())
+		OrgMessage.objects.filter(pk=old.pk).update(created_at=timezone.now() - datetime.timedelta(days=400), total_count=7)
+		OrgMessage.objects.filter(pk=new.pk).update(total_count=7)
+		with mock.patch('core.utils.daily_stats.recipient_history_start', return_value=month_start(timezone.now())):
+			self.assertEqual(reconcile_message_counts(), [new.pk])
+		old.refresh_from_db()
+		self.assertEqual(old.total_count, 7)
+
+
+@skipUnless(connection.vendor == 'postgresql', 'recipient partitions only exist on Postgres')
+class PostgresRecipientPartitionTests(TestCase):
+	def setUp(self):
+		if not is_partitioned():
+			self.skipTest('core_orgalertrecipient is not partitioned')
+		root = tempfile.mkdtemp()
+		self.addCleanup(shutil.rmtree, root)
+		settings_override = override_settings(DELIVERY_ARCHIVE_ROOT=root)
+		settings_override.enable()
+		self.addCleanup(settings_override.disable)
+		self.org = Organization.objects.create(name='PG Part Org', slug='pg-part-org')
+		self.contact = Contact.objects.create(organization=self.org, name='Old', phone_number='+233248100000')
+
+	def test_archiving_drops_the_month_and_deletes_still_cascade(self):
+		this_month = month_start(timezone.now())
+		old_month = add_months(this_month, -14)
+		if old_month not in month_partitions():
+			create_partition(old_month)
+		old = OrgMessage.objects.create(organization=self.org, content='old', scheduled_time=timezone.now())
+		old.create_recipients([self.contact])
+		OrgMessage.objects.filter(pk=old.pk).update(created_at=old_month + datetime.timedelta(days=1))
+		# Moves the row into the old month's partition
+		old.recipients_status.update(created_at=old_month + datetime.timedelta(days=1))
+		new = OrgMessage.objects.create(organization=self.org, content='new', scheduled_time=timezone.now())
+		new.create_recipients([self.contact])
+
+		archive_before(add_months(this_month, -12))
+		self.assertNotIn(old_month, month_partitions())
+		self.assertEqual(list(OrgAlertRecipient.objects.values_list('message_id', flat=True)), [new.pk])
+
+		# No partition outlives the archive with foreign keys to these rows
+		delete_contacts(Contact.objects.filter(pk=self.contact.pk))
+		old.delete()
+		self.org.delete()
+		self.assertFalse(OrgAlertRecipient.objects.exists())
@@ -0,0 +1,30 @@
+from django.test import SimpleTestCase
+
+from core.utils import normalize_phone_number, normalize_phone_numbers
+
+SAMPLES = [
+	'0241234567', '+233 24 123 4567', '(024) 123-4567', '233241234567', '241234567',
+	'+1 (555) 010-9999', '', None, 'n/a', '12345', '+', '000', '0', 241234567,
+]
+
+
+class NormalizePhoneNumbersTests(SimpleTestCase):
+	def test_rules(self):
+		expected = [
+			'+233241234567', '+233241234567', '+233241234567', '+233241234567', '+233241234567',
+			'+15550109999', None, None, None, None, None, None, None, '+233241234567',
+		]
+		self.assertEqual([normalize_phone_number(v) for v in SAMPLES], expected)
+		self.assertEqual(normalize_phone_number('0241234567', default_country='+44'), '+44241234567')
+
+	def test_wrapper_matches_scalar(self):
+		normalized, valid = normalize_phone_numbers(SAMPLES)
+		self.assertEqual(normalized, [normalize_phone_number(v) for v in SAMPLES])
+		self.assertEqual(valid, [n is not None for n in normalized])
+
+	def test_rejects_numbers_without_digits(self):
+		# '+' and all-zero inputs used to normalize to '+' and '+233'
+		for raw in ('+', '+ -', '000', '0'):
+			self.assertIsNone(normalize_phone_number(raw))
+		self.assertEqual(normalize_phone_number('0241234567'), '+233241234567')
+		self.assertEqual(normalize_phone_number('+233 24 123 4567'), '+233241234567')
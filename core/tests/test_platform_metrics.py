@@ -0,0 +1,138 @@
+import time
+from decimal import Decimal
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from core.models import Contact, OrgMessage, Organization, Payment, Sender, SenderAssignment
+from core.utils.contact_import import ContactImporter
+from core.utils.dashboard_metrics import (
+	OrganizationDashboardMetrics, PlatformDashboardMetrics, cached_with_refresh, get_dashboard_version,
+)
+from core.utils.sender_utils import send_sms_through_sender_pool
+
+
+class PlatformMetricsTests(TestCase):
+	def setUp(self):
+		cache.clear()
+
+	def _org(self, n, sent=2, failed=1, paid=None):
+		org = Organization.objects.create(name=f"Org {n}", slug=f"org-{n}", sms_credit_balance=Decimal('10.00'), is_premium=n % 2 == 0)
+		message = OrgMessage.objects.create(organization=org, content='hi', scheduled_time=timezone.now(), sent=True)
+		contacts = [Contact.objects.create(organization=org, name=f"C{i}", phone_number=f"+2332480{n:02d}{i:03d}") for i in range(sent + failed)]
+		message.create_recipients(contacts)
+		message.recipients_status.filter(contact__in=contacts[:sent]).update(status='sent', sent_at=timezone.now())
+		message.recipients_status.filter(contact__in=contacts[sent:]).update(status='failed')
+		OrgMessage.objects.filter(pk=message.pk).update(sent_count=sent, failed_count=failed, pending_count=0)
+		if paid:
+			Payment.objects.create(organization=org, amount=Decimal(paid), paystack_reference=f"ref-{n}", status='success')
+		return org
+
+	def test_figures(self):
+		first = self._org(1, paid='50.00')
+		self._org(2, sent=1, failed=0, paid='20.00')
+		metrics = PlatformDashboardMetrics().calculate_all()
+		stats = {row['organization'].slug: row for row in metrics['org_stats']}
+		self.assertEqual(
+			(stats['org-1']['total_recipients'], stats['org-1']['sent_recipients'], stats['org-1']['failed_recipients']),
+			(3, 2, 1),
+		)
+		self.assertEqual((metrics['total_messages'], metrics['total_sent']), (2, 2))
+		self.assertEqual((metrics['total_orgs'], metrics['premium_orgs'], metrics['total_payments']), (2, 1, 2))
+		self.assertEqual(metrics['total_revenue'], Decimal('70.00'))
+		self.assertEqual(metrics['payments_trend'][-1], 2)
+		payers = {row['organization'].pk: row['total_paid'] for row in metrics['top_payers']}
+		self.assertEqual(payers[first.pk], Decimal('50.00'))
+
+	def test_query_count_does_not_grow_with_tenants(self):
+		self._org(1, paid='5.00')
+		with CaptureQueriesContext(connection) as few:
+			PlatformDashboardMetrics().calculate_all()
+		for n in range(2, 8):
+			self._org(n, paid='5.00')
+		with CaptureQueriesContext(connection) as many:
+			PlatformDashboardMetrics().calculate_all()
+		self.assertEqual(len(many), len(few))
+
+	def test_stale_value_is_served_while_one_caller_refreshes(self):
+		compute = mock.Mock(side_effect=[1, 2, 3])
+		self.assertEqual(cached_with_refresh('swr-test', compute, 60, 600), 1)
+		self.assertEqual(cached_with_refresh('swr-test', compute, 60, 600), 1)
+		later = mock.patch('core.utils.dashboard_metrics.time.time', return_value=timezone.now().timestamp() + 120)
+		with later:
+			# Another process holds the refresh lock: the stale value is served
+			cache.add('swr-test:refreshing', 1, 60)
+			self.assertEqual(cached_with_refresh('swr-test', compute, 60, 600), 1)
+			cache.delete('swr-test:refreshing')
+			self.assertEqual(cached_with_refresh('swr-test', compute, 60, 600), 2)
+		self.assertEqual(compute.call_count, 2)
+
+	def test_super_admin_dashboard_renders_from_snapshot(self):
+		self._org(1, paid='5.00')
+		User = get_user_model()
+		admin = User.objects.create_user(username='platform', password='pw12345!')
+		admin.role = User.SUPER_ADMIN
+		admin.save()
+		self.client.force_login(admin, backend='django.contrib.auth.backends.ModelBackend')
+		resp = self.client.get(reverse('dashboard'))
+		self.assertEqual(resp.status_code, 200)
+		self.assertEqual(resp.context['total_orgs'], 1)
+		with mock.patch.object(PlatformDashboardMetrics, 'calculate_all') as calculate:
+			self.assertEqual(self.client.get(reverse('dashboard')).status_code, 200)
+		calculate.assert_not_called()
+
+
+class OrgDashboardCacheTests(TestCase):
+	def setUp(self):
+		cache.clear()
+		self.org = Organization.objects.create(name='Dash Org', slug='dash-org', sms_credit_balance=Decimal('100.00'))
+		sender = Sender.objects.create(
+			name='Main', sender_id='MAIN', sender_type='alphanumeric', provider='hubtel', gateway_balance=Decimal('50.00'),
+		)
+		SenderAssignment.objects.create(sender=sender, organization=self.org)
+		self.contact = Contact.objects.create(organization=self.org, name='D1', phone_number='+233249000001')
+
+	def test_send_makes_the_snapshot_stale_at_once(self):
+		metrics = OrganizationDashboardMetrics(self.org)
+		self.assertEqual(metrics.get_all_metrics()['msgs_sent_today'], 0)
+		version = get_dashboard_version(self.org.id)
+		with self.captureOnCommitCallbacks(execute=True):
+			message = OrgMessage.objects.create(organization=self.org, content='hi', scheduled_time=timezone.now())
+			message.create_recipients([self.contact])
+			with mock.patch('core.hubtel_utils.send_sms_with_credentials', return_value='d1'):
+				send_sms_through_sender_pool(self.org, message, 'hi', None)
+		self.assertNotEqual(get_dashboard_version(self.org.id), version)
+		self.assertEqual(metrics.get_all_metrics()['msgs_sent_today'], 1)
+		# Unchanged data: served from the snapshot
+		with mock.patch.object(OrganizationDashboardMetrics, 'calculate_metrics') as calculate:
+			metrics.get_all_metrics()
+		calculate.assert_not_called()
+
+	def test_import_bumps_the_version(self):
+		version = get_dashboard_version(self.org.id)
+		with self.captureOnCommitCallbacks(execute=True):
+			ContactImporter(self.org).run([(2, 'New', '0241234567')])
+		self.assertNotEqual(get_dashboard_version(self.org.id), version)
+
+	def test_single_flight(self):
+		compute = mock.Mock(side_effect=['old', 'new'])
+		self.assertEqual(cached_with_refresh('flight', compute, 300, 600, version=1), 'old')
+		cache.add('flight:refreshing', 1, 60)
+		# A newer version is being computed elsewhere: keep serving the previous snapshot
+		self.assertEqual(cached_with_refresh('flight', compute, 300, 600, version=2), 'old')
+		self.assertEqual(compute.call_count, 1)
+		# Nothing cached: wait for the lock holder's result instead of computing it again
+		cache.add('cold:refreshing', 1, 60)
+		finish_elsewhere = lambda seconds: cache.set('cold', (time.time(), 1, 'theirs'), 600)
+		with mock.patch('core.utils.dashboard_metrics.time.sleep', side_effect=finish_elsewhere):
+			self.assertEqual(cached_with_refresh('cold', compute, 300, 600, version=1, wait_seconds=5), 'theirs')
+		self.assertEqual(compute.call_count, 1)
+		# ...and compute it anyway if it never arrives
+		cache.add('colder:refreshing', 1, 60)
+		self.assertEqual(cached_with_refresh('colder', compute, 300, 600, version=1, wait_seconds=0), 'new')
@@ -0,0 +1,177 @@
+import datetime
+import io
+import json
+from decimal import Decimal
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from core.models import (
+	AlertRecipient, Contact, DeliveryReceipt, Message, OrgAlertRecipient, OrgMessage, Organization, Parent, School, Sender,
+	SenderAssignment,
+)
+from core.utils import delivery_errors
+from core.utils.daily_stats import status_totals
+from core.utils.receipts import apply_receipts, receipt_outcome, record_receipt
+from core.utils.sender_utils import send_sms_through_sender_pool
+
+
+@override_settings(HUBTEL_WEBHOOK_SECRET=None)
+class DeliveryReceiptTests(TestCase):
+	def setUp(self):
+		cache.clear()
+		delivery_errors._catalogue.clear()
+		delivery_errors._examples_kept.clear()
+		self.org = Organization.objects.create(name='Receipt Org', slug='receipt-org', sms_credit_balance=Decimal('100.00'))
+		sender = Sender.objects.create(
+			name='Main', sender_id='MAIN', sender_type='alphanumeric', provider='hubtel', gateway_balance=Decimal('50.00'),
+		)
+		SenderAssignment.objects.create(sender=sender, organization=self.org)
+		contacts = [
+			Contact.objects.create(organization=self.org, name=f"R{i}", phone_number=f"+23324920000{i}")
+			for i in range(4)
+		]
+		self.message = OrgMessage.objects.create(organization=self.org, content='hi', scheduled_time=timezone.now())
+		self.message.create_recipients(contacts)
+		ids = iter(['r1', 'r2', 'r3', 'r4'])
+		with mock.patch('core.hubtel_utils.send_sms_with_credentials', side_effect=lambda **kw: next(ids)):
+			send_sms_through_sender_pool(self.org, self.message, 'hi', None)
+
+	def _post(self, message_id, status):
+		return self.client.post(
+			reverse('hubtel_webhook'), json.dumps({'messageId': message_id, 'status': status}), content_type='application/json',
+		)
+
+	def _recipient(self, message_id):
+		return OrgAlertRecipient.objects.get(provider_message_id=message_id)
+
+	def test_status_mapping(self):
+		self.assertEqual(receipt_outcome('Undelivered'), ('failed', False))
+		self.assertEqual(receipt_outcome('UNDELIV'), ('failed', False))
+		self.assertEqual(receipt_outcome('Delivered'), ('sent', True))
+		self.assertEqual(receipt_outcome('DELIVRD'), ('sent', True))
+		self.assertEqual(receipt_outcome('DeliveredToNetwork'), ('sent', False))
+		self.assertEqual(receipt_outcome('Accepted'), (None, False))
+		self.assertEqual(receipt_outcome(''), (None, False))
+
+	def test_webhook_only_buffers_the_receipt(self):
+		with self.assertNumQueries(1):
+			resp = self._post('r1', 'Undelivered')
+		self.assertEqual(resp.status_code, 200)
+		self.assertEqual(self._recipient('r1').status, 'sent')
+		self.assertEqual(DeliveryReceipt.objects.count(), 1)
+		self.assertEqual(self._post('', 'Delivered').status_code, 400)
+
+		apply_receipts()
+		recipient = self._recipient('r1')
+		self.assertEqual((recipient.status, recipient.provider_status), ('failed', 'Undelivered'))
+		self.assertEqual(recipient.error.code, 'provider_failed')
+		self.assertFalse(DeliveryReceipt.objects.exists())
+
+	def test_batch_dedups_and_repeats_are_idempotent(self):
+		for message_id, status in [
+			('r1', 'Delivered'), ('r1', 'Delivered'), ('r1', 'Accepted'),
+			('r2', 'Failed'), ('r2', 'Failed'),
+			('r3', 'Undelivered'), ('r3', 'Delivered'),
+		]:
+			self._post(message_id, status)
+		delivery_errors.catalogue()
+		# Claim, one indexed lookup, one bulk_update per changed-field set, the
+		# counters and rollup, the buffer delete (and the catalogue example, once)
+		with self.assertNumQueries(16):
+			totals = apply_receipts()
+		self.assertEqual(totals, {'received': 7, 'duplicates': 4, 'updated': 3, 'unchanged': 0, 'waiting': 0, 'dropped': 0})
+		self.assertEqual(self._recipient('r1').provider_status, 'Delivered')
+		self.assertIsNotNone(self._recipient('r1').delivered_at)
+		self.assertEqual(self._recipient('r2').status, 'failed')
+		self.assertEqual(self._recipient('r3').provider_status, 'Delivered')
+		self.assertEqual(status_totals(self.org), {'pending': 0, 'sent': 3, 'failed': 1})
+
+		# A provider retrying the same receipts changes nothing, and a late
+		# intermediate status does not override a delivery report
+		self._post('r1', 'Delivered')
+		self._post('r2', 'Failed')
+		self._post('r3', 'Sent')
+		totals = apply_receipts()
+		self.assertEqual((totals['updated'], totals['unchanged']), (0, 3))
+		self.assertEqual(self._recipient('r3').provider_status, 'Delivered')
+		self.assertEqual(status_totals(self.org), {'pending': 0, 'sent': 3, 'failed': 1})
+		self.message.refresh_from_db()
+		self.assertEqual((self.message.sent_count, self.message.failed_count), (3, 1))
+
+	def test_unmatched_receipts_wait_then_drop(self):
+		record_receipt('hubtel', 'late', 'Delivered')
+		self.assertEqual(apply_receipts()['waiting'], 1)
+		self.assertEqual(DeliveryReceipt.objects.count(), 1)
+
+		later = timezone.now() + datetime.timedelta(hours=1)
+		self.assertEqual(apply_receipts(now=later)['dropped'], 1)
+		self.assertFalse(DeliveryReceipt.objects.exists())
+
+	def test_command_applies_in_batches(self):
+		for message_id in ['r1', 'r2', 'r3', 'r4']:
+			self._post(message_id, 'Delivered')
+		out = io.StringIO()
+		call_command('apply_delivery_receipts', '--batch-size=3', stdout=out)
+		self.assertIn('4 recipient(s) updated', out.getvalue())
+		self.assertEqual(OrgAlertRecipient.objects.filter(message=self.message, delivered_at__isnull=False).count(), 4)
+
+	@override_settings(CLICKSEND_WEBHOOK_TOKEN='s3cret')
+	def test_clicksend_receipts_feed_the_same_buffer(self):
+		clicksend = Sender.objects.create(
+			name='Fallback', sender_id='FALLBACK', sender_type='alphanumeric', provider='clicksend', gateway_balance=Decimal('50.00'),
+		)
+		OrgAlertRecipient.objects.filter(provider_message_id__in=['r1', 'r2']).update(sender=clicksend)
+		url = reverse('clicksend_webhook') + '?token=s3cret'
+		resp = self.client.post(url, {'message_id': 'r1', 'status': 'Undelivered', 'status_text': 'Failed: handset unreachable'})
+		self.assertEqual(resp.status_code, 200)
+		self.client.post(url, json.dumps({'message_id': 'r2', 'status': 'Delivered'}), content_type='application/json')
+		# r3 went out through Hubtel: a ClickSend receipt with the same id is not its receipt
+		self.client.post(url, {'message_id': 'r3', 'status': 'Undelivered'})
+		self.assertEqual(self.client.post(url, {'status': 'Delivered'}).status_code, 400)
+		self.assertEqual(list(DeliveryReceipt.objects.values_list('provider', flat=True)), ['clicksend'] * 3)
+
+		self.assertEqual(apply_receipts()['waiting'], 1)
+		self.assertEqual(self._recipient('r1').status, 'failed')
+		self.assertIsNotNone(self._recipient('r2').delivered_at)
+		self.assertEqual((self._recipient('r3').status, self._recipient('r3').provider_status), ('sent', None))
+
+	def test_receipts_only_match_their_provider(self):
+		school = School.objects.create(name='Receipt School')
+		parent = Parent.objects.create(school=school, name='P', phone_number='+233249200100')
+		school_message = Message.objects.create(school=school, content='term dates', scheduled_time=timezone.now())
+		AlertRecipient.objects.create(message=school_message, parent=parent, status='sent', provider_message_id='s1')
+		# A legacy organization recipient has no sender, so either gateway may have sent it
+		OrgAlertRecipient.objects.filter(provider_message_id='r4').update(sender=None)
+		record_receipt('clicksend', 's1', 'Delivered')
+		record_receipt('clicksend', 'r4', 'Delivered')
+		record_receipt('hubtel', 'r1', 'Delivered')
+
+		self.assertEqual(apply_receipts()['waiting'], 1)
+		self.assertIsNone(AlertRecipient.objects.get(provider_message_id='s1').provider_status)
+		self.assertIsNotNone(self._recipient('r4').delivered_at)
+		self.assertIsNotNone(self._recipient('r1').delivered_at)
+
+		record_receipt('hubtel', 's1', 'Delivered')
+		apply_receipts()
+		self.assertEqual(AlertRecipient.objects.get(provider_message_id='s1').provider_status, 'Delivered')
+
+	@override_settings(CLICKSEND_WEBHOOK_TOKEN='s3cret')
+	def test_clicksend_token(self):
+		url = reverse('clicksend_webhook')
+		self.assertEqual(self.client.post(url, {'message_id': 'r1', 'status': 'Delivered'}).status_code, 403)
+		self.assertEqual(self.client.post(url + '?token=wrong', {'message_id': 'r1', 'status': 'Delivered'}).status_code, 403)
+		self.assertEqual(self.client.post(url + '?token=s3cret', {'message_id': 'r1', 'status': 'Delivered'}).status_code, 200)
+		self.assertEqual(DeliveryReceipt.objects.count(), 1)
+
+	@override_settings(CLICKSEND_WEBHOOK_TOKEN=None)
+	def test_clicksend_without_a_token_only_in_debug(self):
+		url = reverse('clicksend_webhook')
+		self.assertEqual(self.client.post(url, {'message_id': 'r1', 'status': 'Delivered'}).status_code, 403)
+		with self.settings(DEBUG=True):
+			self.assertEqual(self.client.post(url, {'message_id': 'r1', 'status': 'Delivered'}).status_code, 200)
+		self.assertEqual(DeliveryReceipt.objects.count(), 1)
@@ -0,0 +1,116 @@
+import datetime
+import io
+from decimal import Decimal
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from core.models import Contact, ContactGroup, ContactSegment, OrgAlertRecipient, OrgMessage, Organization
+from core.utils.segments import SegmentRuleError, add_segment_recipients, compile_rules, segment_contacts
+
+
+class SegmentTests(TestCase):
+	def setUp(self):
+		self.org = Organization.objects.create(name='Segment Org', slug='segment-org')
+		User = get_user_model()
+		self.admin = User.objects.create_user(username='segmenter', password='pw12345!')
+		self.admin.role = User.ORG_ADMIN
+		self.admin.organization = self.org
+		self.admin.save()
+		self.client.force_login(self.admin, backend='django.contrib.auth.backends.ModelBackend')
+		self.ama = Contact.objects.create(organization=self.org, name='Ama', phone_number='+233241000001')
+		self.kofi = Contact.objects.create(organization=self.org, name='Kofi', phone_number='+233201000002')
+		self.old = Contact.objects.create(organization=self.org, name='Old Parent', phone_number='+233241000003')
+		Contact.objects.filter(pk=self.old.pk).update(created_at=timezone.now() - datetime.timedelta(days=90))
+		other = Organization.objects.create(name='Other', slug='other-segment-org')
+		Contact.objects.create(organization=other, name='Ama Elsewhere', phone_number='+233241000009')
+
+	def _contacts(self, rules, match='all'):
+		segment = ContactSegment(organization=self.org, name='s', rules=rules, match=match)
+		return set(segment_contacts(segment))
+
+	def test_field_and_date_rules(self):
+		self.assertEqual(self._contacts([{'type': 'created_within_days', 'value': 30}]), {self.ama, self.kofi})
+		self.assertEqual(self._contacts([{'type': 'phone_startswith', 'value': '024'}]), {self.ama, self.old})
+		self.assertEqual(
+			self._contacts([{'type': 'name_startswith', 'value': 'k'}, {'type': 'name_contains', 'value': 'parent'}], match='any'),
+			{self.kofi, self.old},
+		)
+
+	def test_group_rule_can_be_negated(self):
+		group = ContactGroup.objects.create(organization=self.org, name='Staff')
+		group.contacts.add(self.ama)
+		self.assertEqual(self._contacts([{'type': 'in_group', 'value': group.id}]), {self.ama})
+		self.assertEqual(self._contacts([{'type': 'in_group', 'value': group.id, 'negate': True}]), {self.kofi, self.old})
+
+	def test_last_broadcast_status_uses_latest_sent_message(self):
+		first = OrgMessage.objects.create(organization=self.org, content='a', scheduled_time=timezone.now(), sent=True)
+		OrgAlertRecipient.objects.create(message=first, contact=self.ama, status='failed')
+		latest = OrgMessage.objects.create(organization=self.org, content='b', scheduled_time=timezone.now(), sent=True)
+		OrgAlertRecipient.objects.create(message=latest, contact=self.kofi, status='failed')
+		OrgAlertRecipient.objects.create(message=latest, contact=self.ama, status='sent')
+		self.assertEqual(self._contacts([{'type': 'last_broadcast_status', 'value': 'failed'}]), {self.kofi})
+
+	def test_invalid_rules_raise(self):
+		for rules in ([], [{'type': 'nope'}], [{'type': 'created_within_days', 'value': 'x'}], [{'type': 'created_before', 'value': '2024-13-01'}]):
+			with self.assertRaises(SegmentRuleError):
+				compile_rules(rules, self.org)
+
+	def test_estimated_count_is_cached_until_stale(self):
+		segment = ContactSegment.objects.create(organization=self.org, name='All 024', rules=[{'type': 'phone_startswith', 'value': '024'}])
+		self.assertEqual(segment.get_estimated_count(), 2)
+		Contact.objects.create(organization=self.org, name='New', phone_number='+233241000004')
+		segment.refresh_from_db()
+		self.assertEqual(segment.get_estimated_count(), 2)
+		self.assertEqual(segment.get_estimated_count(force=True), 3)
+
+	def test_segment_recipients_are_deduplicated(self):
+		message = OrgMessage.objects.create(organization=self.org, content='hi', scheduled_time=timezone.now())
+		message.create_recipients([self.ama])
+		segments = [
+			ContactSegment.objects.create(organization=self.org, name='024', rules=[{'type': 'phone_startswith', 'value': '024'}]),
+			ContactSegment.objects.create(organization=self.org, name='New', rules=[{'type': 'created_within_days', 'value': 30}]),
+		]
+		self.assertEqual(add_segment_recipients(message, segments, batch_size=1), 2)
+		self.assertEqual(add_segment_recipients(message, segments), 0)
+		self.assertEqual(set(message.recipients_status.values_list('contact_id', flat=True)), {self.ama.id, self.kofi.id, self.old.id})
+
+	def test_scheduled_segment_audience_is_checked_against_the_balance(self):
+		segment = ContactSegment.objects.create(organization=self.org, name='024', rules=[{'type': 'phone_startswith', 'value': '024'}])
+		message = OrgMessage.objects.create(organization=self.org, content='hi', scheduled_time=timezone.now())
+		message.segments.set([segment])
+		with mock.patch('core.management.commands.send_scheduled_org_messages.send_sms') as send:
+			call_command('send_scheduled_org_messages', stdout=io.StringIO())
+		self.assertEqual(send.call_count, 0)
+		self.assertEqual(
+			list(message.recipients_status.values_list('status', 'error__code').distinct()), [('failed', 'insufficient_credit')],
+		)
+
+		Organization.objects.filter(pk=self.org.pk).update(sms_credit_balance=Decimal('10.00'))
+		message = OrgMessage.objects.create(organization=self.org, content='hi again', scheduled_time=timezone.now())
+		message.segments.set([segment])
+		with mock.patch('core.management.commands.send_scheduled_org_messages.send_sms') as send:
+			call_command('send_scheduled_org_messages', stdout=io.StringIO())
+		self.assertEqual(send.call_count, 2)
+
+	def test_balance_error_keeps_the_segment_picker(self):
+		ContactSegment.objects.create(organization=self.org, name='024', rules=[{'type': 'phone_startswith', 'value': '024'}])
+		resp = self.client.post(reverse('org_send_sms', kwargs={'org_slug': self.org.slug}), {'sms_body': 'hi', 'action': 'send_now'})
+		self.assertIn('Insufficient balance', resp.context['error'])
+		self.assertEqual([segment.name for segment in resp.context['segments']], ['024'])
+
+	def test_create_segment_from_groups_page(self):
+		url = reverse('org_groups', kwargs={'org_slug': self.org.slug})
+		resp = self.client.post(url, {
+			'action': 'create_segment', 'name': 'Recent', 'match': 'all',
+			'rule_type': ['created_within_days', 'name_contains'], 'rule_value': ['30', 'ama'], 'rule_negate': ['', 'not'],
+		})
+		self.assertEqual(resp.status_code, 200)
+		segment = ContactSegment.objects.get(organization=self.org, name='Recent')
+		self.assertEqual(set(segment.get_contacts()), {self.kofi})
+		resp = self.client.post(url, {'action': 'create_segment', 'name': 'Bad', 'rule_type': ['created_before'], 'rule_value': ['soon'], 'rule_negate': ['']})
+		self.assertFalse(ContactSegment.objects.filter(name='Bad').exists())
@@ -0,0 +1,120 @@
+import io
+from decimal import Decimal
+from types import SimpleNamespace
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from core.models import Contact, OrgMessage, Organization, SuppressedNumber
+from core.utils import suppression
+from core.utils.sender_utils import send_via_hubtel
+from core.utils.suppression import get_suppressed_numbers, is_suppressed, suppress_numbers, unsuppress_numbers
+
+
+class SuppressionTests(TestCase):
+	def setUp(self):
+		self.org = Organization.objects.create(name='Quiet Org', slug='quiet-org')
+		self.other = Organization.objects.create(name='Loud Org', slug='loud-org')
+		self.contacts = [
+			Contact.objects.create(organization=self.org, name=f"P{i}", phone_number=f"+23324400000{i}")
+			for i in range(4)
+		]
+		# Sets held in process memory outlive each test's rolled-back rows
+		suppression._local_sets.clear()
+		self.addCleanup(suppression._local_sets.clear)
+
+	def _message(self):
+		return OrgMessage.objects.create(organization=self.org, content='hello', scheduled_time=timezone.now())
+
+	def test_suppressed_numbers_get_no_recipient_rows(self):
+		with self.captureOnCommitCallbacks(execute=True):
+			suppress_numbers(self.org, ['0244000000'], reason='opt_out')
+			suppress_numbers(None, ['+233244000001'], reason='invalid')
+		message = self._message()
+		self.assertEqual(message.create_recipients(Contact.objects.filter(organization=self.org)), 2)
+		self.assertEqual(
+			set(message.recipients_status.values_list('contact__phone_number', flat=True)),
+			{'+233244000002', '+233244000003'},
+		)
+		# Instances are filtered too
+		self.assertEqual(self._message().create_recipients(self.contacts), 2)
+
+	def test_scopes_and_invalidation(self):
+		self.assertFalse(is_suppressed(self.org.id, '+233244000002'))
+		with self.captureOnCommitCallbacks(execute=True):
+			suppress_numbers(self.org, ['0244000002'])
+		self.assertTrue(is_suppressed(self.org.id, '+233244000002'))
+		self.assertFalse(is_suppressed(self.other.id, '+233244000002'))
+		with self.captureOnCommitCallbacks(execute=True):
+			SuppressedNumber.objects.create(phone_number='+233244000003')
+		self.assertIn('+233244000003', get_suppressed_numbers(self.other.id))
+		with self.captureOnCommitCallbacks(execute=True):
+			self.assertEqual(unsuppress_numbers(self.org, ['+233244000002']), 1)
+		self.assertFalse(is_suppressed(self.org.id, '+233244000002'))
+
+	def test_lookups_are_served_from_memory(self):
+		with self.captureOnCommitCallbacks(execute=True):
+			suppress_numbers(self.org, ['0244000000'])
+		get_suppressed_numbers(self.org.id)
+		with self.assertNumQueries(0):
+			for contact in self.contacts:
+				is_suppressed(self.org.id, contact.phone_number)
+
+	def test_dispatcher_skips_numbers_suppressed_after_scheduling(self):
+		message = self._message()
+		message.create_recipients(self.contacts[:2])
+		with self.captureOnCommitCallbacks(execute=True):
+			suppress_numbers(self.org, ['0244000001'])
+		sender = SimpleNamespace(hubtel_api_url='', hubtel_client_id='', hubtel_client_secret='', hubtel_api_key='', sender_id='S')
+		with mock.patch('core.hubtel_utils.send_sms_with_credentials', return_value='abc') as send:
+			sent_ids = send_via_hubtel(sender, message, 'hello')
+		self.assertEqual(sent_ids, ['abc', None])
+		self.assertEqual(send.call_count, 1)
+
+	def test_scheduled_dispatch_skips_numbers_suppressed_after_scheduling(self):
+		Organization.objects.filter(pk=self.org.pk).update(sms_credit_balance=Decimal('10.00'))
+		message = self._message()
+		message.create_recipients(self.contacts[:2])
+		with self.captureOnCommitCallbacks(execute=True):
+			suppress_numbers(self.org, ['0244000001'])
+		with mock.patch('core.management.commands.send_scheduled_org_messages.send_sms', return_value='abc') as send:
+			call_command('send_scheduled_org_messages', stdout=io.StringIO())
+		self.assertEqual([c.args[0] for c in send.call_args_list], ['+233244000000'])
+		recipient = message.recipients_status.get(contact=self.contacts[1])
+		self.assertEqual((recipient.status, recipient.error.code), ('failed', 'suppressed'))
+
+	def test_send_balance_check_leaves_out_suppressed_numbers(self):
+		User = get_user_model()
+		admin = User.objects.create_user(username='quiet-sender', password='pw12345!')
+		admin.role = User.ORG_ADMIN
+		admin.organization = self.org
+		admin.save()
+		self.client.force_login(admin, backend='django.contrib.auth.backends.ModelBackend')
+		# Enough credit for the two numbers that are still reachable, not for all four
+		Organization.objects.filter(pk=self.org.pk).update(sms_credit_balance=Decimal('0.50'), sms_rate=Decimal('0.25'))
+		with self.captureOnCommitCallbacks(execute=True):
+			suppress_numbers(self.org, ['0244000000'], reason='opt_out')
+			suppress_numbers(None, ['+233244000001'], reason='invalid')
+		url = reverse('org_send_sms', kwargs={'org_slug': self.org.slug})
+		resp = self.client.post(url, {'sms_body': 'hello', 'action': 'send_now'})
+		self.assertNotContains(resp, 'Insufficient balance')
+		message = OrgMessage.objects.get(organization=self.org)
+		self.assertEqual(message.recipients_status.count(), 2)
+
+	def test_contacts_page_manages_the_list(self):
+		User = get_user_model()
+		admin = User.objects.create_user(username='quiet', password='pw12345!')
+		admin.role = User.ORG_ADMIN
+		admin.organization = self.org
+		admin.save()
+		self.client.force_login(admin, backend='django.contrib.auth.backends.ModelBackend')
+		url = reverse('org_upload_contacts', kwargs={'org_slug': self.org.slug})
+		resp = self.client.post(url, {'action': 'suppress_numbers', 'numbers': '0244000000, 0244000001', 'reason': 'opt_out'})
+		self.assertContains(resp, '2 number(s) will no longer receive messages.')
+		self.assertEqual(SuppressedNumber.objects.filter(organization=self.org, reason='opt_out').count(), 2)
+		self.client.post(url, {'action': 'unsuppress_number', 'numbers': '+233244000000'})
+		self.assertEqual(list(SuppressedNumber.objects.values_list('phone_number', flat=True)), ['+233244000001'])
@@ -21,12 +21,18 @@ urlpatterns = [
     # Organization tenant routes
     path('<slug:org_slug>/org/dashboard/', views.org_dashboard, name='org_dashboard'),
     path('<slug:org_slug>/org/upload-contacts/', views.org_upload_contacts, name='org_upload_contacts'),
+    path('<slug:org_slug>/org/contacts/imports/<int:job_id>/', views.org_contact_import_status, name='org_contact_import_status'),
+    path('<slug:org_slug>/org/contacts/imports/<int:job_id>/errors/', views.org_contact_import_errors, name='org_contact_import_errors'),
+    path('<slug:org_slug>/org/contacts/search/', views.org_contact_search, name='org_contact_search'),
+    path('<slug:org_slug>/org/contacts/autocomplete/', views.org_contact_autocomplete, name='org_contact_autocomplete'),
+    path('<slug:org_slug>/org/export/<slug:kind>/', views.org_export, name='org_export'),
     path('<slug:org_slug>/org/templates/', views.org_templates, name='org_templates'),
     path('<slug:org_slug>/org/templates/<int:template_id>/edit/', views.org_template_edit, name='org_template_edit'),
     path('<slug:org_slug>/org/templates/<int:template_id>/delete/', views.org_template_delete, name='org_template_delete'),
     path('<slug:org_slug>/org/retry-failed/', views.org_retry_failed, name='org_retry_failed'),
     path('<slug:org_slug>/org/send/', views.org_send_sms, name='org_send_sms'),
     path('<slug:org_slug>/org/groups/', views.org_groups_view, name='org_groups'),
+    path('<slug:org_slug>/org/groups/<int:group_id>/members/<slug:op>/', views.org_group_members, name='org_group_members'),
     path('<slug:org_slug>/org/messages/scheduled/', views.org_scheduled_messages, name='org_scheduled_messages'),
     path('<slug:org_slug>/org/messages/sent/', views.org_sent_messages, name='org_sent_messages'),
     path('<slug:org_slug>/org/message-logs/', views.org_message_logs, name='org_message_logs'),
@@ -38,6 +44,8 @@ urlpatterns = [
     path('<slug:org_slug>/org/billing/callback/', views.org_billing_callback, name='org_billing_callback'),
     # Hubtel delivery receipt webhook
     path('webhooks/hubtel/', views.hubtel_webhook, name='hubtel_webhook'),
+    # ClickSend delivery receipt (DLR push) webhook
+    path('webhooks/clicksend/', views.clicksend_webhook, name='clicksend_webhook'),
     path('health/', views.health, name='health'),
     # Alias for legacy test/name expectations
     path('super/', views.dashboard, name='super_admin'),
@@ -2,6 +2,9 @@ import re
 from decimal import Decimal
 
 
+_NON_DIGITS = re.compile(r'[^0-9]')
+
+
 def normalize_phone_number(raw: str, default_country='+233') -> str | None:
 	"""Normalize phone numbers into E.164-like format for this project.
 
@@ -18,35 +21,31 @@ def normalize_phone_number(raw: str, default_country='+233') -> str | None:
 	if not raw:
 		return None
 	s = str(raw).strip()
-	# Remove common separators and letters
-	# Keep leading + if present, else only digits
-	if s.startswith('+'):
-		cleaned = '+' + re.sub(r'[^0-9]', '', s[1:])
-	else:
-		cleaned = re.sub(r'[^0-9]', '', s)
-
-	if not cleaned:
+	plus = s.startswith('+')
+	digits = _NON_DIGITS.sub('', s[1:] if plus else s)
+	if not digits:
 		return None
+	if plus:
+		return '+' + digits
+	if digits[0] == '0':
+		without0 = digits.lstrip('0')
+		return default_country + without0 if without0 else None
+	if 7 <= len(digits) <= 10:
+		return default_country + digits
+	if len(digits) > 10:
+		return '+' + digits
+	return None
 
-	# If starts with + and has digits, return
-	if cleaned.startswith('+'):
-		return cleaned
-
-	# If starts with 0, replace leading 0 with country code without plus
-	if cleaned.startswith('0'):
-		# remove leading 0s
-		without0 = cleaned.lstrip('0')
-		return default_country + without0
-
-	# If digits length looks like local national (7-10 digits), prepend default
-	if 7 <= len(cleaned) <= 10:
-		return default_country + cleaned
 
-	# Otherwise, if it's longer (international without +), try prefixing +
-	if len(cleaned) > 10:
-		return '+' + cleaned
+def normalize_phone_numbers(values, default_country='+233'):
+	"""Convenience wrapper: ``normalize_phone_number`` applied to every value.
 
-	return None
+	Returns ``(normalized, valid)`` lists: the normalized number (or ``None``)
+	for every input and the matching boolean mask (invert it for the invalid
+	rows). It is a plain loop, no faster than calling the scalar function.
+	"""
+	normalized = [normalize_phone_number(raw, default_country) for raw in values]
+	return normalized, [n is not None for n in normalized]
 
 
 def validate_sms_balance(organization, num_messages, settings):
@@ -105,4 +104,4 @@ def deduct_sms_balance(organization, num_messages, settings):
 
 from . import crypto_utils
 
-__all__ = ["normalize_phone_number"]
+__all__ = ["normalize_phone_number", "normalize_phone_numbers"]
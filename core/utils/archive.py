@@ -0,0 +1,287 @@
+"""
+Cold archival of old delivery and audit rows.
+
+``archive_before(cutoff)`` moves ``OrgAlertRecipient``, ``AlertRecipient`` and
+``AuditLog`` rows created before ``cutoff`` out of the database into gzipped
+JSON Lines files under ``DELIVERY_ARCHIVE_ROOT``, one set of files per
+organization (or school) and month::
+
+    org_recipient/org-12/2025-03.000001201-000004800.jsonl.gz
+
+Each file is written under a temporary name, fsynced and renamed into place
+before anything is deleted; the ``DeliveryArchive`` row describing it is saved
+in the same transaction as the delete. File names come from the first and
+last row id, so a run that dies half way rewrites the same files next time.
+On a partitioned Postgres table (see utils/partitions.py) a month whose rows
+are all archived has its partition dropped instead of deleted row by row.
+
+Archiving leaves ``OrgDailyStats`` and the ``OrgMessage`` counters alone, and
+the repairs that recount recipients stop at the archived months. School
+totals, which have no rollup, add the counts kept on ``DeliveryArchive``.
+
+``number_history`` answers "what happened to this number" from the live rows
+and the archive together.
+"""
+import datetime
+import gzip
+import json
+import os
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection, transaction
+from django.db.models import Q, Sum
+from django.db.models.functions import TruncMonth
+
+from .. import constants
+from ..models import AlertRecipient, AuditLog, DeliveryArchive, OrgAlertRecipient
+from . import normalize_phone_number
+from .partitions import add_months, is_partitioned, month_partitions, month_start
+
+UTC = datetime.timezone.utc
+
+
+def get_archive_root():
+	return str(getattr(settings, 'DELIVERY_ARCHIVE_ROOT', os.path.join(settings.BASE_DIR, 'archive')))
+
+
+def get_retention_months():
+	return getattr(settings, 'DELIVERY_ARCHIVE_RETENTION_MONTHS', constants.DELIVERY_ARCHIVE_RETENTION_MONTHS)
+
+
+def get_batch_size():
+	return getattr(settings, 'DELIVERY_ARCHIVE_BATCH_SIZE', constants.DELIVERY_ARCHIVE_BATCH_SIZE)
+
+
+def retention_cutoff(months=None, now=None):
+	"""Start of the oldest month kept in the database"""
+	months = get_retention_months() if months is None else months
+	return add_months(month_start(now or datetime.datetime.now(UTC)), -months)
+
+
+class ArchiveSpec:
+	"""How one table is archived: its owner column, month column and the fields kept per row"""
+
+	def __init__(self, kind, model, owner, created, fields, sent, failed, owner_label):
+		self.kind = kind
+		self.model = model
+		self.owner = owner
+		self.created = created
+		# (record key, ORM lookup) pairs
+		self.fields = fields
+		self.sent = sent
+		self.failed = failed
+		self.owner_label = owner_label
+
+	def owner_filter(self, owner_id):
+		if owner_id is None:
+			return Q(**{self.owner + '__isnull': True})
+		return Q(**{self.owner: owner_id})
+
+	def owner_kwargs(self, owner_id):
+		return {'school_id' if self.kind == DeliveryArchive.SCHOOL_RECIPIENTS else 'organization_id': owner_id}
+
+
+SPECS = {
+	DeliveryArchive.ORG_RECIPIENTS: ArchiveSpec(
+		DeliveryArchive.ORG_RECIPIENTS, OrgAlertRecipient, 'message__organization', 'created_at',
+		[
+			('id', 'id'), ('message_id', 'message_id'), ('message', 'message__content'),
+			('message_created_at', 'message__created_at'), ('contact_id', 'contact_id'),
+			('name', 'contact__name'), ('phone_number', 'contact__phone_number'), ('status', 'status'),
+			('created_at', 'created_at'), ('sent_at', 'sent_at'), ('delivered_at', 'delivered_at'),
+			('error_code', 'error__code'), ('error_message', 'error_message'), ('provider_message_id', 'provider_message_id'),
+			('provider_status', 'provider_status'), ('retry_count', 'retry_count'), ('network', 'network'),
+			('sender_id', 'sender_id'), ('is_deleted', 'is_deleted'),
+		],
+		Q(status='sent'), Q(status='failed'), lambda owner_id: f"org-{owner_id}",
+	),
+	DeliveryArchive.SCHOOL_RECIPIENTS: ArchiveSpec(
+		DeliveryArchive.SCHOOL_RECIPIENTS, AlertRecipient, 'message__school', 'message__created_at',
+		[
+			('id', 'id'), ('message_id', 'message_id'), ('message', 'message__content'),
+			('message_created_at', 'message__created_at'), ('parent_id', 'parent_id'),
+			('name', 'parent__name'), ('phone_number', 'parent__phone_number'), ('status', 'status'),
+			('sent_at', 'sent_at'), ('error_message', 'error_message'),
+			('provider_message_id', 'provider_message_id'), ('provider_status', 'provider_status'),
+		],
+		Q(status='sent'), Q(status='failed'), lambda owner_id: f"school-{owner_id}",
+	),
+	DeliveryArchive.AUDIT_LOGS: ArchiveSpec(
+		DeliveryArchive.AUDIT_LOGS, AuditLog, 'organization', 'created_at',
+		[
+			('id', 'id'), ('action', 'action'), ('user_id', 'user_id'), ('username', 'user__username'),
+			('organization_id', 'organization_id'), ('sender_id', 'sender_id'), ('details', 'details'),
+			('ip_address', 'ip_address'), ('user_agent', 'user_agent'), ('created_at', 'created_at'),
+		],
+		Q(action='sms_sent'), Q(action='sms_failed'),
+		lambda owner_id: 'platform' if owner_id is None else f"org-{owner_id}",
+	),
+}
+
+
+def _month_groups(spec, cutoff):
+	"""``(owner id, month start)`` pairs that have rows created before ``cutoff``"""
+	rows = (
+		spec.model.objects.filter(**{spec.created + '__lt': cutoff})
+		.annotate(month=TruncMonth(spec.created, tzinfo=UTC))
+		.values_list(spec.owner, 'month').distinct().order_by()
+	)
+	return sorted(
+		((owner_id, month_start(month)) for owner_id, month in rows),
+		key=lambda group: (group[1], group[0] is not None, group[0] or 0),
+	)
+
+
+def _write(path, records):
+	"""Write ``records`` as gzipped JSON Lines to ``path`` (under the archive root), atomically"""
+	full_path = os.path.join(get_archive_root(), path)
+	os.makedirs(os.path.dirname(full_path), exist_ok=True)
+	tmp_path = full_path + '.tmp'
+	with open(tmp_path, 'wb') as raw:
+		with gzip.GzipFile(fileobj=raw, mode='wb') as out:
+			for record in records:
+				out.write((json.dumps(record, cls=DjangoJSONEncoder, separators=(',', ':')) + '\n').encode('utf-8'))
+		raw.flush()
+		os.fsync(raw.fileno())
+	os.replace(tmp_path, full_path)
+
+
+def _drop_partition(start):
+	"""Drop the recipient partition for ``start``'s month; True if there was one"""
+	name = month_partitions().get(start)
+	if name is None:
+		return False
+	quote = connection.ops.quote_name
+	with transaction.atomic(), connection.cursor() as cursor:
+		cursor.execute(f'ALTER TABLE {quote(OrgAlertRecipient._meta.db_table)} DETACH PARTITION {quote(name)}')
+		cursor.execute(f'DROP TABLE {quote(name)}')
+	return True
+
+
+def archive_month(spec, owner_id, start, cutoff, delete=True, batch_size=None):
+	"""Archive one owner's rows from the month starting at ``start`` (and before ``cutoff``).
+
+	Returns the ``DeliveryArchive`` rows written. With ``delete=False`` the rows
+	are written but left in place (the caller drops the whole partition).
+	"""
+	batch_size = batch_size or get_batch_size()
+	end = min(add_months(start, 1), cutoff)
+	rows = spec.model.objects.filter(
+		spec.owner_filter(owner_id),
+		**{spec.created + '__gte': start, spec.created + '__lt': end},
+	)
+	lookups = [lookup for _, lookup in spec.fields]
+	archives = []
+	last_id = 0
+	while True:
+		batch = list(rows.filter(id__gt=last_id).order_by('id').values(*lookups)[:batch_size])
+		if not batch:
+			break
+		records = [{key: row[lookup] for key, lookup in spec.fields} for row in batch]
+		first_id, last_id = batch[0]['id'], batch[-1]['id']
+		path = f"{spec.kind}/{spec.owner_label(owner_id)}/{start:%Y-%m}.{first_id:09d}-{last_id:09d}.jsonl.gz"
+		_write(path, records)
+		ids = [row['id'] for row in batch]
+		chunk = spec.model.objects.filter(id__in=ids)
+		with transaction.atomic():
+			archive, _ = DeliveryArchive.objects.update_or_create(path=path, defaults={
+				'kind': spec.kind,
+				'month': start.date(),
+				'row_count': len(batch),
+				'sent_count': chunk.filter(spec.sent).count(),
+				'failed_count': chunk.filter(spec.failed).count(),
+				'first_id': first_id,
+				'last_id': last_id,
+				**spec.owner_kwargs(owner_id),
+			})
+			if delete:
+				chunk.delete()
+		archives.append(archive)
+	return archives
+
+
+def archive_before(cutoff, kinds=None, batch_size=None):
+	"""Archive every row of ``kinds`` (default: all) created before ``cutoff``.
+
+	Returns ``{kind: [DeliveryArchive, ...]}``.
+	"""
+	written = {}
+	partitioned = is_partitioned()
+	for kind in kinds or SPECS:
+		spec = SPECS[kind]
+		drop_partitions = partitioned and kind == DeliveryArchive.ORG_RECIPIENTS
+		written[kind] = []
+		groups = _month_groups(spec, cutoff)
+		for index, (owner_id, start) in enumerate(groups):
+			whole_month = add_months(start, 1) <= cutoff
+			written[kind] += archive_month(
+				spec, owner_id, start, cutoff, delete=not (drop_partitions and whole_month), batch_size=batch_size,
+			)
+			last_of_month = index + 1 == len(groups) or groups[index + 1][1] != start
+			if drop_partitions and whole_month and last_of_month and not _drop_partition(start):
+				# Rows of a month without its own partition sit in the DEFAULT partition
+				spec.model.objects.filter(created_at__gte=start, created_at__lt=add_months(start, 1)).delete()
+	return written
+
+
+def read_archive(archive):
+	"""Yield the records stored in one ``DeliveryArchive`` file"""
+	with gzip.open(os.path.join(get_archive_root(), archive.path), 'rt', encoding='utf-8') as lines:
+		for line in lines:
+			yield json.loads(line)
+
+
+def archived_records(kind, organization=None, school=None, since=None, until=None):
+	"""Yield archived records of ``kind`` for one owner, oldest month first"""
+	archives = DeliveryArchive.objects.filter(kind=kind)
+	if organization is not None:
+		archives = archives.filter(organization=organization)
+	if school is not None:
+		archives = archives.filter(school=school)
+	if since is not None:
+		archives = archives.filter(month__gte=since.replace(day=1))
+	if until is not None:
+		archives = archives.filter(month__lte=until)
+	for archive in archives.order_by('month', 'first_id'):
+		yield from read_archive(archive)
+
+
+def number_history(phone_number, organization=None, school=None):
+	"""Every recipient row for ``phone_number`` of one organization or school, live and archived.
+
+	Returns record dicts (the archive's fields plus ``archived``), newest first.
+	"""
+	if (organization is None) == (school is None):
+		raise ValueError('Pass exactly one of organization or school')
+	phone_number = normalize_phone_number(phone_number) or phone_number
+	if organization is not None:
+		spec, live, owner = SPECS[DeliveryArchive.ORG_RECIPIENTS], OrgAlertRecipient.objects.filter(message__organization=organization), {'organization': organization}
+	else:
+		spec, live, owner = SPECS[DeliveryArchive.SCHOOL_RECIPIENTS], AlertRecipient.objects.filter(message__school=school), {'school': school}
+	lookups = [lookup for _, lookup in spec.fields]
+	live = live.filter(**{dict(spec.fields)['phone_number']: phone_number}).values(*lookups)
+	# Round-tripped through JSON so live and archived records look the same
+	history = [
+		json.loads(json.dumps({**{key: row[lookup] for key, lookup in spec.fields}, 'archived': False}, cls=DjangoJSONEncoder))
+		for row in live
+	]
+	for record in archived_records(spec.kind, **owner):
+		if record['phone_number'] == phone_number:
+			record['archived'] = True
+			history.append(record)
+
+	def newest_first(record):
+		when = record.get('sent_at') or record.get('message_created_at')
+		return (datetime.datetime.fromisoformat(when) if when else datetime.datetime.min.replace(tzinfo=UTC), record['id'])
+	return sorted(history, key=newest_first, reverse=True)
+
+
+def archived_recipient_totals(kind, owner_ids=None):
+	"""``{owner id: {'total', 'sent', 'failed'}}`` summed over the archived files of ``kind``"""
+	owner = 'school' if kind == DeliveryArchive.SCHOOL_RECIPIENTS else 'organization'
+	archives = DeliveryArchive.objects.filter(kind=kind)
+	if owner_ids is not None:
+		archives = archives.filter(**{owner + '__in': owner_ids})
+	rows = archives.values(owner).annotate(total=Sum('row_count'), sent=Sum('sent_count'), failed=Sum('failed_count')).order_by()
+	return {row[owner]: {'total': row['total'], 'sent': row['sent'], 'failed': row['failed']} for row in rows}
@@ -0,0 +1,45 @@
+"""
+Deleting contacts in bulk.
+
+A contact's delete cascades its recipient rows, which are counted in the
+daily rollup and the per-message counters, and its group memberships,
+counted in ``ContactGroup.member_count``. ``delete_contacts`` takes them out
+of both with one grouped query each before a single queryset delete, then
+invalidates the dashboard and autocomplete caches once per organization.
+There are deliberately no delete signals on ``Contact``: any receiver would
+stop Django from fast-deleting the cascades and cost queries per contact.
+"""
+from django.db import transaction
+from django.db.models import Count, F
+
+from ..models import Contact, ContactGroup, OrgAlertRecipient
+from ..signals import organization_activity
+from .contact_search import bump_contacts_version
+from .daily_stats import discount_recipients
+
+Membership = ContactGroup.contacts.through
+
+
+def _discount_memberships(contacts):
+	"""Lower ``member_count`` of every group the contacts belong to, one F() update per group"""
+	removed = (
+		Membership.objects.filter(contact__in=contacts)
+		.values('contactgroup_id').annotate(n=Count('*')).order_by()
+	)
+	for row in removed:
+		ContactGroup.objects.filter(pk=row['contactgroup_id']).update(member_count=F('member_count') - row['n'])
+
+
+def delete_contacts(contacts):
+	"""Delete a Contact queryset and keep the counters in step; returns how many contacts went"""
+	with transaction.atomic():
+		organization_ids = list(contacts.order_by().values_list('organization_id', flat=True).distinct())
+		if not organization_ids:
+			return 0
+		discount_recipients(OrgAlertRecipient.objects.filter(contact__in=contacts))
+		_discount_memberships(contacts)
+		deleted = contacts.delete()[1].get(Contact._meta.label, 0)
+		for organization_id in organization_ids:
+			organization_activity.send(sender=Contact, organization_id=organization_id)
+			transaction.on_commit(lambda organization_id=organization_id: bump_contacts_version(organization_id))
+	return deleted
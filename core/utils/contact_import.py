@@ -0,0 +1,380 @@
+"""
+Streaming contact import pipeline.
+
+Uploads are decoded incrementally and written to the database in fixed-size
+batches, so memory use stays bounded no matter how large the contact list is.
+
+A job runs for at most ``CONTACT_IMPORT_BUDGET_SECONDS`` per call, so a huge
+list cannot hold up the rest of the scheduler loop: at the first batch
+boundary past the budget its progress is saved, it goes back to ``pending``
+and the next run skips the rows it already read. A ``running`` job whose
+heartbeat (``updated_at``, touched by every progress save) is older than
+``CONTACT_IMPORT_STALE_MINUTES`` lost its worker and is queued again the same
+way; rows it rejected since it last paused are missing from its error file.
+"""
+import csv
+import datetime
+import io
+import itertools
+import logging
+import os
+import re
+import shutil
+import tempfile
+import time
+
+from django.conf import settings
+from django.core.files import File
+from django.db import transaction
+from django.utils import timezone
+
+from .. import constants
+from . import normalize_phone_numbers
+from .contact_search import bump_contacts_version
+from ..models import Contact, ContactImportJob
+from ..signals import organization_activity
+
+logger = logging.getLogger(__name__)
+
+ERROR_FILE_HEADER = ['row', 'name', 'phone', 'error']
+
+PHONE_HEADERS = ('phone', 'phone_number', 'phone number', 'mobile', 'msisdn', 'number')
+NAME_HEADERS = ('name', 'contact_name', 'contact name', 'full name')
+
+# Same pattern Contact.bulk_create_from_text has always used
+PHONE_PATTERN = re.compile(r'\+?\d{7,15}')
+# A number that may continue into the next chunk
+_TRAILING_NUMBER = re.compile(r'\+?\d*$')
+TEXT_CHUNK_SIZE = 64 * 1024
+
+
+def get_batch_size():
+	return getattr(settings, 'CONTACT_IMPORT_BATCH_SIZE', constants.CONTACT_IMPORT_BATCH_SIZE)
+
+
+def get_budget():
+	return getattr(settings, 'CONTACT_IMPORT_BUDGET_SECONDS', constants.CONTACT_IMPORT_BUDGET_SECONDS)
+
+
+def get_stale_after():
+	return datetime.timedelta(minutes=getattr(settings, 'CONTACT_IMPORT_STALE_MINUTES', constants.CONTACT_IMPORT_STALE_MINUTES))
+
+
+def iter_csv_contacts(fileobj, encoding='utf-8-sig'):
+	"""Yield ``(row_number, name, phone)`` tuples from a binary CSV file.
+
+	The file is decoded through ``io.TextIOWrapper`` a buffer at a time rather
+	than reading the whole upload into memory. Header names are matched
+	case-insensitively (``phone``/``phone_number`` and ``name``/``contact_name``).
+	"""
+	text = io.TextIOWrapper(fileobj, encoding=encoding, errors='ignore', newline='')
+	try:
+		reader = csv.DictReader(text)
+		if reader.fieldnames:
+			reader.fieldnames = [(f or '').strip().lower() for f in reader.fieldnames]
+		for row_number, row in enumerate(reader, start=2):
+			phone = (row.get('phone') or row.get('phone_number') or '').strip()
+			name = (row.get('name') or row.get('contact_name') or '').strip()
+			yield row_number, name, phone
+	finally:
+		# Hand the underlying file back to the caller instead of closing it
+		text.detach()
+
+
+def _cell_text(value):
+	"""Render a spreadsheet cell as text; Excel stores numbers as floats"""
+	if value is None:
+		return ''
+	if isinstance(value, float) and value.is_integer():
+		value = int(value)
+	return str(value).strip()
+
+
+def iter_xlsx_contacts(fileobj):
+	"""Yield ``(row_number, name, phone)`` tuples from the first sheet of an .xlsx file.
+
+	The workbook is opened in openpyxl's ``read_only`` mode, which streams rows
+	from the sheet XML instead of building the whole workbook in memory. When the
+	first row has recognisable headers they pick the name and phone columns;
+	otherwise the first cell that looks like a phone number is used as the phone
+	and the first other non-empty cell as the name.
+	"""
+	try:
+		from openpyxl import load_workbook
+	except ImportError:
+		raise RuntimeError('Excel import requires the openpyxl package')
+
+	workbook = load_workbook(fileobj, read_only=True, data_only=True)
+	try:
+		rows = workbook.worksheets[0].iter_rows(values_only=True) if workbook.worksheets else iter(())
+		first = next(rows, None)
+		if first is None:
+			return
+		headers = [_cell_text(v).lower() for v in first]
+		phone_col = next((headers.index(h) for h in PHONE_HEADERS if h in headers), None)
+		name_col = next((headers.index(h) for h in NAME_HEADERS if h in headers), None)
+		if phone_col is None:
+			# No header row: the first row is data
+			rows = _chain_first(first, rows)
+			start = 1
+		else:
+			start = 2
+
+		for row_number, row in enumerate(rows, start=start):
+			cells = [_cell_text(v) for v in row]
+			if not any(cells):
+				continue
+			if phone_col is not None:
+				phone = cells[phone_col] if phone_col < len(cells) else ''
+				name = cells[name_col] if name_col is not None and name_col < len(cells) else ''
+			else:
+				phone = next((c for c in cells if PHONE_PATTERN.search(c)), '')
+				name = next((c for c in cells if c and c != phone), '')
+			yield row_number, name, phone
+	finally:
+		workbook.close()
+
+
+def _chain_first(first, rows):
+	yield first
+	yield from rows
+
+
+def iter_text_contacts(fileobj, encoding='utf-8', chunk_size=None):
+	"""Yield ``(n, '', phone)`` for every phone number found in a binary text file.
+
+	The file is scanned a chunk at a time; digits at the end of a chunk are
+	carried over so numbers split across a chunk boundary are still found.
+	``n`` is the position of the number in the file (1-based).
+	"""
+	chunk_size = chunk_size or TEXT_CHUNK_SIZE
+	text = io.TextIOWrapper(fileobj, encoding=encoding, errors='ignore')
+	found = 0
+	carry = ''
+	try:
+		while True:
+			chunk = text.read(chunk_size)
+			buffer = carry + chunk
+			if chunk:
+				tail = _TRAILING_NUMBER.search(buffer).start()
+				buffer, carry = buffer[:tail], buffer[tail:]
+			for match in PHONE_PATTERN.finditer(buffer):
+				found += 1
+				yield found, '', match.group()
+			if not chunk:
+				break
+	finally:
+		text.detach()
+
+
+def iter_upload_contacts(fileobj, filename):
+	"""Pick the streaming reader for an uploaded file based on its extension"""
+	ext = os.path.splitext(filename or '')[1].lower()
+	if ext == '.csv':
+		return iter_csv_contacts(fileobj)
+	if ext in ('.xlsx', '.xlsm'):
+		return iter_xlsx_contacts(fileobj)
+	if ext == '.xls':
+		raise ValueError('Legacy .xls files are not supported; save the sheet as .xlsx or CSV')
+	return iter_text_contacts(fileobj)
+
+
+class ContactImporter:
+	"""Normalize and upsert contacts for one organization in fixed-size batches.
+
+	Contacts are keyed on ``(organization, phone_number)``: rows for numbers that
+	already exist update the stored name (when the row carries one) instead of
+	creating a duplicate. Rejected rows are written to ``error_writer`` (a
+	``csv.writer``) when given, and ``on_batch`` is called with the importer after
+	every flushed batch so callers can persist progress.
+	"""
+
+	def __init__(self, organization, batch_size=None, error_writer=None, on_batch=None):
+		self.organization = organization
+		self.batch_size = batch_size or get_batch_size()
+		self.error_writer = error_writer
+		self.on_batch = on_batch
+		self.rows_processed = 0
+		self.rows_imported = 0
+		self.rows_updated = 0
+		self.rows_failed = 0
+		# Raw (row_number, name, phone) rows waiting to be written as one batch
+		self._pending = []
+
+	def reject(self, row_number, name, phone, reason):
+		self.rows_failed += 1
+		if self.error_writer is not None:
+			self.error_writer.writerow([row_number, name, phone, reason])
+
+	def add(self, row_number, name, phone):
+		self.rows_processed += 1
+		if not phone:
+			self.reject(row_number, name, phone, 'Missing phone number')
+			return
+		self._pending.append((row_number, name, phone))
+		if len(self._pending) >= self.batch_size:
+			self.flush()
+
+	def flush(self):
+		if self._pending:
+			batch = self._normalize_batch(self._pending)
+			self._pending = []
+			if batch:
+				self._write_batch(batch)
+		if self.on_batch:
+			self.on_batch(self)
+
+	def _normalize_batch(self, rows):
+		"""Normalize and validate a batch of rows; returns ``{phone_number: name}``"""
+		max_length = Contact._meta.get_field('phone_number').max_length
+		normalized, valid = normalize_phone_numbers([phone for _, _, phone in rows])
+		# phone_number -> name ('' when the row had no name); later rows win
+		batch = {}
+		for (row_number, name, phone), number, ok in zip(rows, normalized, valid):
+			if not ok:
+				self.reject(row_number, name, phone, 'Invalid phone number')
+			elif len(number) > max_length:
+				self.reject(row_number, name, phone, 'Phone number too long')
+			elif name or number not in batch:
+				batch[number] = (name or '')[:255]
+		return batch
+
+	def _write_batch(self, batch):
+		existing = set(Contact.objects.filter(
+			organization=self.organization, phone_number__in=list(batch)
+		).values_list('phone_number', flat=True))
+
+		named = [
+			Contact(organization=self.organization, name=name, phone_number=phone)
+			for phone, name in batch.items() if name
+		]
+		unnamed = [
+			Contact(organization=self.organization, name=phone, phone_number=phone)
+			for phone, name in batch.items() if not name and phone not in existing
+		]
+		with transaction.atomic():
+			if named:
+				# Upsert: new numbers are inserted, known numbers get the new name
+				Contact.objects.bulk_create(
+					named,
+					update_conflicts=True,
+					unique_fields=['organization', 'phone_number'],
+					update_fields=['name'],
+				)
+			if unnamed:
+				# Rows without a name never overwrite an existing contact's name
+				Contact.objects.bulk_create(unnamed, ignore_conflicts=True)
+
+		# bulk_create sends no post_save signals, so invalidate cached lookups here
+		bump_contacts_version(self.organization.id)
+		organization_activity.send(sender=Contact, organization_id=self.organization.id)
+		self.rows_imported += len(batch)
+		self.rows_updated += len(existing)
+
+	def run(self, rows, deadline=None, clock=time.monotonic):
+		"""Consume an iterable of ``(row_number, name, phone)`` tuples.
+
+		With a ``deadline`` (a ``clock()`` value) it stops at the first batch
+		boundary past it. Returns whether every row was read.
+		"""
+		for row_number, name, phone in rows:
+			self.add(row_number, name, phone)
+			if deadline is not None and not self._pending and clock() >= deadline:
+				self.flush()
+				return False
+		self.flush()
+		return True
+
+
+def reclaim_stale_jobs(now=None):
+	"""Queue ``running`` jobs whose worker stopped saving progress again; returns how many"""
+	now = now or timezone.now()
+	return ContactImportJob.objects.filter(status='running', updated_at__lt=now - get_stale_after()).update(
+		status='pending', updated_at=now,
+	)
+
+
+def _save_error_file(job, error_tmp):
+	"""Attach the rejected rows collected so far to the job, replacing an earlier partial file"""
+	if job.error_file:
+		job.error_file.delete(save=False)
+	error_tmp.seek(0)
+	job.error_file.save(f"import_{job.id}_errors.csv", File(error_tmp), save=False)
+
+
+def run_import_job(job, batch_size=None, deadline=None, clock=time.monotonic):
+	"""Import a claimed ``ContactImportJob`` and record progress on it.
+
+	Progress counters are saved after every batch; rejected rows are collected
+	in a temporary file on disk and attached to the job as ``error_file``. Jobs
+	with a ``group`` also add every imported contact to that group. A job that
+	reaches ``deadline`` is saved back as ``pending`` and a later call carries
+	on after the rows it already read.
+	"""
+	if not job.started_at:
+		job.started_at = timezone.now()
+	job.status = 'running'
+	job.save(update_fields=['status', 'started_at', 'updated_at'])
+
+	error_tmp = tempfile.TemporaryFile(mode='w+', newline='', encoding='utf-8')
+	if job.error_file:
+		# Rows rejected before the job last paused
+		with job.error_file.open('r') as previous:
+			shutil.copyfileobj(previous, error_tmp)
+	else:
+		csv.writer(error_tmp).writerow(ERROR_FILE_HEADER)
+	writer = csv.writer(error_tmp)
+	try:
+		with job.source_file.open('rb') as fh:
+			job.total_bytes = job.source_file.size
+
+			def _save_progress(importer):
+				job.rows_processed = importer.rows_processed
+				job.rows_imported = importer.rows_imported
+				job.rows_updated = importer.rows_updated
+				job.rows_failed = importer.rows_failed
+				try:
+					# Spreadsheet reads seek around inside the zip; never move backwards
+					job.bytes_processed = max(job.bytes_processed, min(fh.tell(), job.total_bytes))
+				except Exception:
+					pass
+				job.members_added = getattr(importer, 'members_added', 0)
+				job.save(update_fields=['total_bytes', 'bytes_processed', 'rows_processed', 'rows_imported', 'rows_updated', 'rows_failed', 'members_added', 'updated_at'])
+
+			if job.group_id:
+				from .group_membership import GroupMembershipImporter
+				importer = GroupMembershipImporter(job.group, batch_size=batch_size, error_writer=writer, on_batch=_save_progress)
+			else:
+				importer = ContactImporter(job.organization, batch_size=batch_size, error_writer=writer, on_batch=_save_progress)
+			# Carry on from where an earlier run of this job stopped
+			importer.rows_processed = job.rows_processed
+			importer.rows_imported = job.rows_imported
+			importer.rows_updated = job.rows_updated
+			importer.rows_failed = job.rows_failed
+			if job.group_id:
+				importer.members_added = job.members_added
+			rows = iter_upload_contacts(fh, job.original_filename or job.source_file.name)
+			try:
+				finished = importer.run(itertools.islice(rows, job.rows_processed, None), deadline, clock)
+			finally:
+				# A paused reader must let go of the file before it is closed
+				rows.close()
+
+		if importer.rows_failed:
+			_save_error_file(job, error_tmp)
+		if finished:
+			job.bytes_processed = job.total_bytes
+			job.status = 'completed'
+		else:
+			job.status = 'pending'
+	except Exception as e:
+		logger.exception("Contact import job %s failed", job.id)
+		job.status = 'failed'
+		job.error_message = str(e)
+	finally:
+		error_tmp.close()
+
+	if job.is_finished():
+		job.finished_at = timezone.now()
+	job.save()
+	return job
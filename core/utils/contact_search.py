@@ -0,0 +1,234 @@
+"""
+Keyset pagination and search over an organization's contact book.
+
+Pages are addressed by an opaque cursor holding the ``(name, id)`` of the
+last (or first) row shown, so fetching page 1 or page 400 is the same
+index seek on ``(organization, name, id)`` rather than an ever-growing OFFSET.
+
+Search uses the trigram indexes on Postgres (``pg_trgm``) and the
+``core_contact_fts`` FTS5 table on sqlite, both created in migration 0041.
+"""
+import base64
+import hashlib
+import json
+import re
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DatabaseError, connection
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+from .. import constants
+from ..models import Contact
+
+# Trigram indexes (and the FTS5 trigram tokenizer) need at least 3 characters
+MIN_TRIGRAM_LENGTH = 3
+_PHONE_QUERY = re.compile(r'^\+?[\d\s\-()]+$')
+
+
+def get_page_size():
+	return getattr(settings, 'CONTACTS_PAGE_SIZE', constants.CONTACTS_PAGE_SIZE)
+
+
+def encode_cursor(name, pk):
+	raw = json.dumps([name, pk], separators=(',', ':')).encode('utf-8')
+	return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(token):
+	"""Return ``(name, id)`` from a cursor, or None if it is missing or malformed"""
+	if not token:
+		return None
+	try:
+		name, pk = json.loads(base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)))
+		return str(name), int(pk)
+	except (ValueError, TypeError):
+		return None
+
+
+class ContactPage:
+	"""One page of contacts plus the cursors for its neighbours (None at either end)"""
+
+	def __init__(self, items, next_cursor=None, prev_cursor=None):
+		self.items = items
+		self.next_cursor = next_cursor
+		self.prev_cursor = prev_cursor
+
+	@property
+	def has_next(self):
+		return self.next_cursor is not None
+
+	@property
+	def has_previous(self):
+		return self.prev_cursor is not None
+
+
+def keyset_page(queryset, after=None, before=None, page_size=None):
+	"""Fetch one page of ``queryset`` ordered by ``(name, id)``.
+
+	``after``/``before`` are cursors from a previous page's ``next_cursor`` /
+	``prev_cursor``. One extra row is fetched to know whether another page exists.
+	"""
+	page_size = page_size or get_page_size()
+	after, before = decode_cursor(after), decode_cursor(before)
+	if before and not after:
+		name, pk = before
+		rows = list(
+			queryset.filter(Q(name__lt=name) | Q(name=name, id__lt=pk))
+			.order_by('-name', '-id')[:page_size + 1]
+		)
+		has_more = len(rows) > page_size
+		rows = rows[:page_size][::-1]
+		page = ContactPage(items=rows)
+		if rows:
+			page.next_cursor = encode_cursor(rows[-1].name, rows[-1].id)
+			if has_more:
+				page.prev_cursor = encode_cursor(rows[0].name, rows[0].id)
+		return page
+
+	if after:
+		name, pk = after
+		queryset = queryset.filter(Q(name__gt=name) | Q(name=name, id__gt=pk))
+	rows = list(queryset.order_by('name', 'id')[:page_size + 1])
+	has_more = len(rows) > page_size
+	rows = rows[:page_size]
+	page = ContactPage(items=rows)
+	if rows:
+		if has_more:
+			page.next_cursor = encode_cursor(rows[-1].name, rows[-1].id)
+		if after:
+			page.prev_cursor = encode_cursor(rows[0].name, rows[0].id)
+	return page
+
+
+def _contacts_version_key(organization_id):
+	return f"contacts_version_{organization_id}"
+
+
+def get_contacts_version(organization_id):
+	"""Counter bumped whenever the organization's contacts change.
+
+	It is part of every autocomplete cache key and ETag, so bumping it makes
+	all cached results for the organization stale at once.
+	"""
+	try:
+		version = cache.get(_contacts_version_key(organization_id))
+		if version is None:
+			version = 1
+			cache.add(_contacts_version_key(organization_id), version, None)
+		return version
+	except Exception:
+		return 0
+
+
+def bump_contacts_version(organization_id):
+	try:
+		cache.incr(_contacts_version_key(organization_id))
+	except ValueError:
+		# Not set yet (or evicted): any fresh value invalidates old keys
+		cache.set(_contacts_version_key(organization_id), 2, None)
+	except Exception:
+		pass
+
+
+def autocomplete_cache_key(organization_id, query, limit):
+	digest = hashlib.md5(f"{query.strip().lower()}|{limit}".encode('utf-8')).hexdigest()
+	return f"contact_autocomplete_{organization_id}_{get_contacts_version(organization_id)}_{digest}"
+
+
+def autocomplete_contacts(organization, query, limit=20):
+	"""Best ``limit`` matches for ``query`` as compact ``[id, name, phone]`` lists.
+
+	Results are cached per organization (``CACHE_TIMEOUT_CONTACTS``) under a
+	versioned key, so edits to the contact book show up immediately.
+	"""
+	key = autocomplete_cache_key(organization.id, query or '', limit)
+	try:
+		results = cache.get(key)
+	except Exception:
+		results = None
+	if results is None:
+		contacts = search_contacts(organization, query).order_by('name', 'id')
+		results = [list(row) for row in contacts.values_list('id', 'name', 'phone_number')[:limit]]
+		try:
+			cache.set(key, results, getattr(settings, 'CACHE_TIMEOUT_CONTACTS', constants.CACHE_TIMEOUT_CONTACTS))
+		except Exception:
+			pass
+	return key, results
+
+
+def contact_count(organization_id):
+	"""Number of contacts in the organization's book, cached under the contacts version.
+
+	Every contact write bumps the version, so the count is recomputed once
+	after a change instead of on every contacts page load.
+	"""
+	key = f"contact_count_{organization_id}_{get_contacts_version(organization_id)}"
+	try:
+		count = cache.get(key)
+	except Exception:
+		count = None
+	if count is None:
+		count = Contact.objects.filter(organization_id=organization_id).count()
+		try:
+			cache.set(key, count, getattr(settings, 'CACHE_TIMEOUT_CONTACTS', constants.CACHE_TIMEOUT_CONTACTS))
+		except Exception:
+			pass
+	return count
+
+
+def _fts_query(term):
+	# Quote as a single FTS5 string so user input can't use query syntax
+	return '"' + term.replace('"', '""') + '"'
+
+
+def search_contacts(organization, query):
+	"""Contacts of ``organization`` whose name or phone matches ``query``.
+
+	Phone-looking queries are reduced to their digits and matched as a
+	substring of the stored number; anything else matches names (prefix for
+	short queries, substring otherwise). The result is an unordered queryset,
+	so it can be passed to ``keyset_page``.
+	"""
+	contacts = Contact.objects.filter(organization=organization)
+	query = (query or '').strip()
+	if not query:
+		return contacts
+
+	if _PHONE_QUERY.match(query):
+		term = re.sub(r'\D', '', query)
+		if term.startswith('0'):
+			# Local format: stored numbers carry the country code instead of the 0
+			term = term.lstrip('0')
+		if not term:
+			return contacts
+		field_name = 'phone_number'
+	else:
+		term = query
+		field_name = 'name'
+
+	if len(term) < MIN_TRIGRAM_LENGTH:
+		if field_name == 'name':
+			return contacts.filter(name__istartswith=term)
+		return contacts.filter(phone_number__contains=term)
+
+	if connection.vendor == 'sqlite' and _sqlite_fts_available():
+		match = f'{field_name} : {_fts_query(term)}'
+		return contacts.filter(id__in=RawSQL(
+			'SELECT rowid FROM core_contact_fts WHERE core_contact_fts MATCH %s', [match]
+		))
+	# Postgres: served by the gin_trgm_ops indexes on phone_number and UPPER(name)
+	if field_name == 'name':
+		return contacts.filter(name__icontains=term)
+	return contacts.filter(phone_number__contains=term)
+
+
+def _sqlite_fts_available():
+	"""True when migration 0041 could create the FTS5 table (needs FTS5 + trigram)"""
+	try:
+		with connection.cursor() as cursor:
+			cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'core_contact_fts'")
+			return cursor.fetchone() is not None
+	except DatabaseError:
+		return False
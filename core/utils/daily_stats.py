@@ -0,0 +1,235 @@
+"""
+Incrementally maintained delivery counts: the daily rollup (``OrgDailyStats``)
+and the per-message counters on ``OrgMessage``.
+
+Writers describe what happened to recipients as bucket moves: a recipient
+that goes from pending to sent leaves its ``(org, day, 'pending', None, message)``
+bucket and joins ``(org, sent day, 'sent', sender, message)``. Moves are
+collected in a ``DailyStatsDelta`` and applied as an ``F()`` update per
+touched rollup bucket and per touched message, inside the same transaction
+as the recipient writes they describe (``save_recipient`` for writers that
+save one recipient at a time), so a run that dies half way leaves no saved
+status uncounted. Dashboards and message lists then read stored numbers
+instead of counting the raw recipient table.
+"""
+import datetime
+from collections import Counter
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, OuterRef, Q, Subquery, Sum
+from django.db.models.functions import Coalesce, TruncDate
+from django.utils import timezone
+
+from ..models import OrgAlertRecipient, OrgDailyStats, OrgMessage
+from ..signals import organization_activity
+from .partitions import recipient_history_start
+
+# OrgMessage counter field for each recipient status
+STATUS_COUNTERS = {
+	'pending': 'pending_count',
+	'sent': 'sent_count',
+	'failed': 'failed_count',
+}
+COUNTER_FIELDS = ['total_count'] + list(STATUS_COUNTERS.values())
+
+
+def recipient_bucket(recipient, message):
+	"""The ``(organization id, day, status, sender id, message id)`` bucket a recipient counts in"""
+	when = recipient.sent_at or message.created_at
+	return (message.organization_id, timezone.localdate(when), recipient.status, recipient.sender_id, message.pk)
+
+
+class DailyStatsDelta:
+	"""Bucket count changes collected while recipients are updated"""
+
+	def __init__(self):
+		self.counts = Counter()
+
+	def add(self, bucket, count=1):
+		self.counts[bucket] += count
+
+	def move(self, before, after):
+		if before != after:
+			self.counts[before] -= 1
+			self.counts[after] += 1
+
+	def apply(self, message_counters=True):
+		apply_deltas(self.counts, message_counters)
+		self.counts = Counter()
+
+
+def apply_deltas(deltas, message_counters=True):
+	"""Add ``{bucket: delta}`` to the rollup and (unless ``message_counters`` is false) the message counters.
+
+	One update per rollup bucket and one per message, in a single transaction.
+	"""
+	rollup = Counter()
+	counters = {}
+	for (organization_id, day, status, sender_id, message_id), delta in deltas.items():
+		rollup[(organization_id, day, status, sender_id)] += delta
+		per_message = counters.setdefault(message_id, Counter())
+		per_message['total_count'] += delta
+		if status in STATUS_COUNTERS:
+			per_message[STATUS_COUNTERS[status]] += delta
+	changes = [(bucket, delta) for bucket, delta in rollup.items() if delta]
+	message_changes = []
+	for message_id, fields in (counters.items() if message_counters else ()):
+		updates = {field: F(field) + delta for field, delta in fields.items() if delta}
+		if updates:
+			message_changes.append((message_id, updates))
+	if not changes and not message_changes:
+		return
+	with transaction.atomic():
+		for message_id, updates in message_changes:
+			OrgMessage.objects.filter(pk=message_id).update(**updates)
+		for bucket, delta in changes:
+			_add_to_bucket(*bucket, delta)
+		for organization_id in {bucket[0] for bucket, _ in changes}:
+			organization_activity.send(sender=OrgDailyStats, organization_id=organization_id)
+
+
+def save_recipient(recipient, message, before):
+	"""Save ``recipient`` and move it from the ``before`` bucket to its current one in one transaction"""
+	with transaction.atomic():
+		recipient.save()
+		after = recipient_bucket(recipient, message)
+		if after != before:
+			apply_deltas({before: -1, after: 1})
+
+
+def _add_to_bucket(organization_id, day, status, sender_id, delta):
+	"""``count += delta`` on one rollup row, creating the row for a new bucket.
+
+	Two writers creating the same bucket at once both find nothing to update;
+	the unique constraints on ``OrgDailyStats`` fail the second insert, which
+	then adds to the first writer's row.
+	"""
+	bucket = OrgDailyStats.objects.filter(organization_id=organization_id, day=day, status=status, sender_id=sender_id)
+	if bucket.update(count=F('count') + delta):
+		return
+	try:
+		with transaction.atomic():
+			OrgDailyStats.objects.create(
+				organization_id=organization_id, day=day, status=status, sender_id=sender_id, count=delta,
+			)
+	except IntegrityError:
+		bucket.update(count=F('count') + delta)
+
+
+def discount_recipients(recipients, message_counters=True):
+	"""Take ``recipients`` out of the rollup and message counters before they are deleted.
+
+	One grouped query, then one update per touched bucket and message. Pass
+	``message_counters=False`` when the messages are being deleted too.
+	"""
+	rows = (
+		recipients.annotate(day=TruncDate(Coalesce('sent_at', 'message__created_at')))
+		.values('message__organization_id', 'day', 'status', 'sender_id', 'message_id')
+		.annotate(total=Count('id')).order_by()
+	)
+	stats = DailyStatsDelta()
+	for row in rows:
+		bucket = (row['message__organization_id'], row['day'], row['status'], row['sender_id'], row['message_id'])
+		stats.add(bucket, -row['total'])
+	stats.apply(message_counters)
+
+
+def release_sender(sender_id):
+	"""Fold a sender's rollup rows into the no-sender buckets before the sender is deleted.
+
+	The rollup's sender foreign key is SET_NULL, which would otherwise turn
+	them into duplicates of existing no-sender buckets.
+	"""
+	with transaction.atomic():
+		rows = list(OrgDailyStats.objects.filter(sender_id=sender_id))
+		OrgDailyStats.objects.filter(sender_id=sender_id).delete()
+		for row in rows:
+			_add_to_bucket(row.organization_id, row.day, row.status, None, row.count)
+
+
+def _stats(organization=None, since=None):
+	stats = OrgDailyStats.objects.all()
+	if organization is not None:
+		stats = stats.filter(organization=organization)
+	if since is not None:
+		stats = stats.filter(day__gte=since)
+	return stats
+
+
+def status_totals(organization=None, since=None):
+	"""``{status: count}`` summed over every day (from ``since``) for one or all organizations"""
+	rows = _stats(organization, since).values('status').annotate(total=Sum('count')).order_by()
+	return {row['status']: row['total'] or 0 for row in rows}
+
+
+def daily_status_counts(organization=None, since=None):
+	"""``{day: {status: count}}`` for one or all organizations"""
+	rows = _stats(organization, since).values('day', 'status').annotate(total=Sum('count')).order_by()
+	by_day = {}
+	for row in rows:
+		by_day.setdefault(row['day'], {})[row['status']] = row['total'] or 0
+	return by_day
+
+
+def rebuild_daily_stats(organization, since=None):
+	"""Recompute one organization's rollup from ``OrgAlertRecipient``.
+
+	With ``since`` only buckets from that day on are replaced; days whose
+	recipient rows have been archived are never replaced. Returns the
+	number of rollup rows written.
+	"""
+	history_start = recipient_history_start()
+	if history_start is not None:
+		first_day = timezone.localdate(history_start)
+		since = max(since, first_day) if since else first_day
+	recipients = OrgAlertRecipient.objects.filter(message__organization=organization).annotate(
+		day=TruncDate(Coalesce('sent_at', 'message__created_at')),
+	)
+	if since is not None:
+		recipients = recipients.filter(day__gte=since)
+	rows = recipients.values('day', 'status', 'sender_id').annotate(total=Count('id')).order_by()
+	with transaction.atomic():
+		_stats(organization, since).delete()
+		created = OrgDailyStats.objects.bulk_create([
+			OrgDailyStats(organization=organization, day=row['day'], status=row['status'], sender_id=row['sender_id'], count=row['total'])
+			for row in rows
+		])
+	return len(created)
+
+
+def _actual_counts():
+	"""Subqueries counting each message's recipients, keyed by counter field"""
+	def count(condition=Q()):
+		recipients = OrgAlertRecipient.objects.filter(condition, message=OuterRef('pk')).order_by().values('message')
+		return Coalesce(Subquery(recipients.annotate(n=Count('*')).values('n')), 0)
+	actual = {'total_count': count()}
+	for status, field in STATUS_COUNTERS.items():
+		actual[field] = count(Q(status=status))
+	return actual
+
+
+def reconcile_message_counts(messages=None, chunk_size=500):
+	"""Fix messages whose counters disagree with their recipient rows.
+
+	Messages older than the attached recipient partitions are skipped. Returns
+	the ids of the messages that had drifted.
+	"""
+	messages = OrgMessage.objects.all() if messages is None else messages
+	history_start = recipient_history_start()
+	if history_start is not None:
+		messages = messages.filter(created_at__gte=history_start)
+	actual = _actual_counts()
+	drifted = Q()
+	for field in COUNTER_FIELDS:
+		drifted |= ~Q(**{field: F('actual_' + field)})
+	stale_ids = list(
+		messages.annotate(**{'actual_' + field: expr for field, expr in actual.items()})
+		.filter(drifted).values_list('id', flat=True)
+	)
+	for start in range(0, len(stale_ids), chunk_size):
+		OrgMessage.objects.filter(id__in=stale_ids[start:start + chunk_size]).update(**actual)
+	return stale_ids
+
+
+def days_ago(days):
+	return timezone.localdate() - datetime.timedelta(days=days)
@@ -1,11 +1,131 @@
 """
 Dashboard utilities for calculating metrics and trends.
 """
+import time
+from decimal import Decimal
+
+from django.conf import settings
 from django.core.cache import cache
 from django.utils import timezone
-from django.db.models import Count, Q
-from django.db.models.functions import TruncDate
-from ..models import Organization, Contact, OrgSMSTemplate, OrgAlertRecipient, OrgMessage
+from django.db.models import Avg, Count, Q, Sum
+from django.db.models.functions import Coalesce, TruncDate
+from .. import constants
+from ..models import (
+	AlertRecipient, Contact, DeliveryArchive, EnrollmentRequest, Message, Organization, OrgMessage, OrgSMSTemplate,
+	Payment, School,
+)
+from .archive import archived_recipient_totals
+from .daily_stats import daily_status_counts, days_ago
+
+
+def get_platform_fresh_seconds():
+	return getattr(settings, 'PLATFORM_METRICS_FRESH_SECONDS', constants.PLATFORM_METRICS_FRESH_SECONDS)
+
+
+def get_platform_stale_seconds():
+	return getattr(settings, 'PLATFORM_METRICS_STALE_SECONDS', constants.PLATFORM_METRICS_STALE_SECONDS)
+
+
+def get_dashboard_fresh_seconds():
+	return getattr(settings, 'CACHE_TIMEOUT_DASHBOARD', constants.CACHE_TIMEOUT_DASHBOARD)
+
+
+def get_dashboard_stale_seconds():
+	return getattr(settings, 'DASHBOARD_STALE_SECONDS', constants.DASHBOARD_STALE_SECONDS)
+
+
+def get_refresh_wait_seconds():
+	return getattr(settings, 'DASHBOARD_REFRESH_WAIT_SECONDS', constants.DASHBOARD_REFRESH_WAIT_SECONDS)
+
+
+def _dashboard_version_key(organization_id):
+	return f"org_dashboard_version_{organization_id}"
+
+
+def get_dashboard_version(organization_id):
+	"""Version of the organization's dashboard data; None if the cache is down.
+
+	Bumped (``bump_dashboard_version``) by the ``organization_activity``
+	signal whenever sends, webhooks, imports or edits change what the
+	dashboard shows.
+	"""
+	key = _dashboard_version_key(organization_id)
+	try:
+		version = cache.get(key)
+		if version is None:
+			# Time-based start value, so an evicted counter never repeats an old version
+			cache.add(key, int(time.time() * 1000), None)
+			version = cache.get(key)
+		return version
+	except Exception:
+		return None
+
+
+def bump_dashboard_version(organization_id):
+	key = _dashboard_version_key(organization_id)
+	try:
+		cache.incr(key)
+	except ValueError:
+		cache.set(key, int(time.time() * 1000), None)
+	except Exception:
+		pass
+
+
+def _cache_get(key):
+	try:
+		return cache.get(key)
+	except Exception:
+		return None
+
+
+def _wait_for_entry(key, seconds):
+	deadline = time.monotonic() + seconds
+	while time.monotonic() < deadline:
+		time.sleep(0.05)
+		entry = _cache_get(key)
+		if entry is not None:
+			return entry
+	return None
+
+
+def cached_with_refresh(key, compute, fresh_seconds, stale_seconds, version=None, wait_seconds=None):
+	"""Stale-while-revalidate, single-flight read of ``compute()`` cached under ``key``.
+
+	Entries are stored as ``(computed_at, version, value)`` for ``stale_seconds``.
+	An entry computed for the current ``version`` within ``fresh_seconds`` is
+	returned as is. Otherwise the first caller to take the refresh lock
+	recomputes, and everyone else keeps getting the stale value meanwhile.
+	With nothing cached, callers that miss the lock wait up to
+	``wait_seconds`` for the winner's result before computing it themselves.
+	"""
+	entry = _cache_get(key)
+	if entry is not None:
+		computed_at, entry_version, value = entry
+		if entry_version == version and time.time() - computed_at < fresh_seconds:
+			return value
+	lock_key = f"{key}:refreshing"
+	try:
+		locked = cache.add(lock_key, 1, max(fresh_seconds, 30))
+	except Exception:
+		locked = True  # No cache to coordinate through
+	if not locked:
+		if entry is None:
+			entry = _wait_for_entry(key, get_refresh_wait_seconds() if wait_seconds is None else wait_seconds)
+		if entry is not None:
+			return entry[2]
+	try:
+		value = compute()
+		try:
+			cache.set(key, (time.time(), version, value), stale_seconds)
+		except Exception:
+			pass  # Silently fail if caching is unavailable
+	finally:
+		if locked:
+			try:
+				cache.delete(lock_key)
+			except Exception:
+				pass
+	return value
 
 
 class OrganizationDashboardMetrics:
@@ -13,25 +133,11 @@ class OrganizationDashboardMetrics:
 
 	def __init__(self, organization):
 		self.organization = organization
-		self.cache_timeout = 300  # 5 minutes
+		self.cache_timeout = get_dashboard_fresh_seconds()
 
 	def get_cache_key(self):
 		return f"org_dashboard_metrics_{self.organization.id}"
 
-	def get_cached_metrics(self):
-		"""Try to get cached metrics"""
-		try:
-			return cache.get(self.get_cache_key())
-		except Exception:
-			return None
-
-	def cache_metrics(self, metrics):
-		"""Cache metrics if caching is available"""
-		try:
-			cache.set(self.get_cache_key(), metrics, self.cache_timeout)
-		except Exception:
-			pass  # Silently fail if caching is unavailable
-
 	def calculate_basic_metrics(self):
 		"""Calculate basic organization metrics"""
 		return {
@@ -41,25 +147,19 @@ class OrganizationDashboardMetrics:
 		}
 
 	def calculate_sms_stats(self):
-		"""Calculate SMS sending statistics"""
-		now = timezone.now()
-		start_today = now.replace(hour=0, minute=0, second=0, microsecond=0)
-		start_week = now - timezone.timedelta(days=7)
-		start_month = now - timezone.timedelta(days=30)
-
-		# Use efficient aggregation queries
-		stats = OrgAlertRecipient.objects.filter(
-			message__organization=self.organization
-		).aggregate(
-			sent_today=Count('id', filter=Q(status='sent', sent_at__gte=start_today)),
-			sent_week=Count('id', filter=Q(status='sent', sent_at__gte=start_week)),
-			sent_month=Count('id', filter=Q(status='sent', sent_at__gte=start_month)),
-		)
+		"""Calculate SMS sending statistics (today, last 7 and last 30 days)"""
+		# Served from the OrgDailyStats rollup: at most a few rows per day
+		by_day = daily_status_counts(self.organization, since=days_ago(29))
+		today = days_ago(0)
+		start_week = days_ago(6)
+
+		def sent_since(start):
+			return sum(counts.get('sent', 0) for day, counts in by_day.items() if day >= start)
 
 		return {
-			'msgs_sent_today': stats['sent_today'],
-			'msgs_sent_week': stats['sent_week'],
-			'msgs_sent_month': stats['sent_month'],
+			'msgs_sent_today': by_day.get(today, {}).get('sent', 0),
+			'msgs_sent_week': sent_since(start_week),
+			'msgs_sent_month': sent_since(days_ago(29)),
 		}
 
 	def calculate_delivery_stats(self):
@@ -71,12 +171,8 @@ class OrganizationDashboardMetrics:
 		now = timezone.now()
 		start_date = (now - timezone.timedelta(days=days - 1)).date()
 
-		# Aggregate data by date for trends
-		msgs_qs = OrgAlertRecipient.objects.filter(
-			message__organization=self.organization,
-			status='sent',
-			sent_at__date__gte=start_date
-		).annotate(day=TruncDate('sent_at')).values('day').annotate(count=Count('id'))
+		# Recipient counts by day come from the OrgDailyStats rollup
+		by_day = daily_status_counts(self.organization, since=start_date)
 
 		contacts_qs = Contact.objects.filter(
 			organization=self.organization,
@@ -88,16 +184,11 @@ class OrganizationDashboardMetrics:
 			created_at__date__gte=start_date
 		).annotate(day=TruncDate('created_at')).values('day').annotate(count=Count('id'))
 
-		total_qs = OrgAlertRecipient.objects.filter(
-			message__organization=self.organization,
-			message__created_at__date__gte=start_date
-		).annotate(day=TruncDate('message__created_at')).values('day').annotate(total=Count('id'))
-
 		# Build lookup dictionaries
-		msgs_by_date = {r['day']: r['count'] for r in msgs_qs}
+		msgs_by_date = {day: counts.get('sent', 0) for day, counts in by_day.items()}
 		contacts_by_date = {r['day']: r['count'] for r in contacts_qs}
 		templates_by_date = {r['day']: r['count'] for r in templates_qs}
-		total_by_date = {r['day']: r['total'] for r in total_qs}
+		total_by_date = {day: sum(counts.values()) for day, counts in by_day.items()}
 
 		# Build trend arrays (oldest to newest)
 		msgs_sent_trend = []
@@ -128,23 +219,220 @@ class OrganizationDashboardMetrics:
 			organization=self.organization
 		).select_related('created_by').order_by('-scheduled_time')[:limit]
 
-	def get_all_metrics(self):
-		"""Get all dashboard metrics, using cache when possible"""
-		cached = self.get_cached_metrics()
-		if cached:
-			# Still need to get fresh messages as they change frequently
-			cached['messages'] = self.get_recent_messages()
-			return cached
-
-		# Calculate fresh metrics
+	def calculate_metrics(self):
+		"""Calculate every cached figure"""
 		metrics = {}
 		metrics.update(self.calculate_basic_metrics())
 		metrics.update(self.calculate_sms_stats())
 		metrics.update(self.calculate_delivery_stats())
 		metrics.update(self.calculate_trends())
+		return metrics
+
+	def get_all_metrics(self):
+		"""Get all dashboard metrics.
+
+		The figures are cached for the organization's current dashboard
+		version, so a send, webhook or import makes them stale at once; one
+		request then recomputes while the others are served the previous
+		snapshot.
+		"""
+		metrics = dict(cached_with_refresh(
+			self.get_cache_key(), self.calculate_metrics, self.cache_timeout, get_dashboard_stale_seconds(),
+			version=get_dashboard_version(self.organization.id),
+		))
+		# Still need to get fresh messages as they change frequently
 		metrics['messages'] = self.get_recent_messages()
+		return metrics
+
+
+def _percent(part, total):
+	return (part / total * 100) if total else 0
+
+
+class PlatformDashboardMetrics:
+	"""Service class for the super admin dashboard's platform-wide metrics.
+
+	Every figure comes from a few grouped queries rather than per-tenant
+	ones. The snapshot is cached with ``cached_with_refresh``, so most page
+	loads cost a single cache read.
+	"""
+	cache_key = 'platform_dashboard_metrics'
+
+	def __init__(self, trend_days=30):
+		self.trend_days = trend_days
+
+	def calculate_tenant_stats(self):
+		"""Per-school and per-organization message and delivery figures"""
+		school_messages = {
+			row['school']: row for row in Message.objects.values('school').annotate(
+				total=Count('id'), sent=Count('id', filter=Q(sent=True)),
+			).order_by()
+		}
+		# Archived recipient rows are counted from their DeliveryArchive totals
+		school_recipients = archived_recipient_totals(DeliveryArchive.SCHOOL_RECIPIENTS)
+		for row in AlertRecipient.objects.values('message__school').annotate(
+			total=Count('id'), sent=Count('id', filter=Q(status='sent')), failed=Count('id', filter=Q(status='failed')),
+		).order_by():
+			archived = school_recipients.get(row['message__school'], {'total': 0, 'sent': 0, 'failed': 0})
+			school_recipients[row['message__school']] = {key: row[key] + archived[key] for key in ('total', 'sent', 'failed')}
+		empty_messages = {'total': 0, 'sent': 0}
+		empty_recipients = {'total': 0, 'sent': 0, 'failed': 0}
+		school_stats = []
+		for school in School.objects.all():
+			messages = school_messages.get(school.id, empty_messages)
+			recipients = school_recipients.get(school.id, empty_recipients)
+			school_stats.append({
+				'school': school,
+				'total_messages': messages['total'],
+				'sent_messages': messages['sent'],
+				'total_recipients': recipients['total'],
+				'sent_recipients': recipients['sent'],
+				'failed_recipients': recipients['failed'],
+				'delivery_rate': _percent(recipients['sent'], recipients['total']),
+			})
+
+		# Recipient figures come from the counters stored on OrgMessage
+		org_messages = {
+			row['organization']: row for row in OrgMessage.objects.values('organization').annotate(
+				total=Count('id'), sent=Count('id', filter=Q(sent=True)),
+				recipients=Sum('total_count'), sent_recipients=Sum('sent_count'), failed_recipients=Sum('failed_count'),
+			).order_by()
+		}
+		from .crypto_utils import decrypt_value
+		org_stats = []
+		for org in Organization.objects.all():
+			row = org_messages.get(org.id, {})
+			sender_id = getattr(org, 'sender_id', None)
+			total_recipients = row.get('recipients') or 0
+			sent_recipients = row.get('sent_recipients') or 0
+			org_stats.append({
+				'organization': org,
+				'total_messages': row.get('total', 0),
+				'sent_messages': row.get('sent', 0),
+				'total_recipients': total_recipients,
+				'sent_recipients': sent_recipients,
+				'failed_recipients': row.get('failed_recipients') or 0,
+				'delivery_rate': _percent(sent_recipients, total_recipients),
+				# decrypt sender id for display (secrets are stored encrypted)
+				'sender_id_display': decrypt_value(sender_id) if sender_id else None,
+			})
+
+		return {
+			'school_stats': school_stats,
+			'org_stats': org_stats,
+			'total_messages': sum(row['total'] for row in school_messages.values()) + sum(row['total'] for row in org_messages.values()),
+			'total_sent': sum(row['sent'] for row in school_messages.values()) + sum(row['sent'] for row in org_messages.values()),
+		}
+
+	def calculate_trends(self):
+		"""Daily sent messages, delivery rate, new organizations and payments (oldest to newest)"""
+		days = [days_ago(i) for i in range(self.trend_days - 1, -1, -1)]
+		start_date = days[0]
+
+		# School recipients: sent by sent_at date, totals by message creation date
+		sent_by_date = {}
+		total_by_date = {}
+		school_sent = AlertRecipient.objects.filter(status='sent', sent_at__date__gte=start_date).annotate(
+			day=TruncDate('sent_at')).values('day').annotate(count=Count('id')).order_by()
+		for row in school_sent:
+			sent_by_date[row['day']] = sent_by_date.get(row['day'], 0) + row['count']
+		school_total = AlertRecipient.objects.filter(message__created_at__date__gte=start_date).annotate(
+			day=TruncDate('message__created_at')).values('day').annotate(count=Count('id')).order_by()
+		for row in school_total:
+			total_by_date[row['day']] = total_by_date.get(row['day'], 0) + row['count']
+		# Organization recipients come from the OrgDailyStats rollup (all orgs, by day)
+		for day, counts in daily_status_counts(since=start_date).items():
+			sent_by_date[day] = sent_by_date.get(day, 0) + counts.get('sent', 0)
+			total_by_date[day] = total_by_date.get(day, 0) + sum(counts.values())
+
+		def by_day(queryset):
+			rows = queryset.filter(created_at__date__gte=start_date).annotate(day=TruncDate('created_at')).values('day').annotate(count=Count('id')).order_by()
+			return {row['day']: row['count'] for row in rows}
 
-		# Cache the expensive calculations
-		self.cache_metrics(metrics)
+		orgs_by_date = by_day(Organization.objects.all())
+		payments_by_date = by_day(Payment.objects.filter(status='success'))
 
-		return metrics
\ No newline at end of file
+		delivery_trend = [
+			int(sent_by_date.get(d, 0) / total_by_date[d] * 100) if total_by_date.get(d) else 0
+			for d in days
+		]
+		valid_rates = [rate for rate in delivery_trend if rate > 0]
+		orgs_trend = [orgs_by_date.get(d, 0) for d in days]
+		payments_trend = [payments_by_date.get(d, 0) for d in days]
+		return {
+			'messages_trend': [sent_by_date.get(d, 0) for d in days],
+			'orgs_trend': orgs_trend,
+			'delivery_trend': delivery_trend,
+			'avg_delivery_rate': sum(valid_rates) / len(valid_rates) if valid_rates else 0,
+			'payments_trend': payments_trend,
+			'total_orgs_this_week': sum(orgs_trend),
+			'total_payments_this_week': sum(payments_trend),
+		}
+
+	def calculate_billing_stats(self):
+		"""Payment, balance, premium and enrollment figures: one aggregate per table"""
+		start_date = days_ago(self.trend_days - 1)
+		success = Q(status='success')
+		payments = Payment.objects.aggregate(
+			total_payments=Count('id', filter=success),
+			total_revenue=Sum('amount', filter=success),
+			recent_payments=Count('id', filter=success & Q(created_at__date__gte=start_date)),
+		)
+		orgs = Organization.objects.aggregate(
+			total_orgs=Count('id'),
+			orgs_with_balance=Count('id', filter=Q(sms_credit_balance__gt=Decimal('0'))),
+			total_org_balance=Sum('sms_credit_balance'),
+			premium_orgs=Count('id', filter=Q(is_premium=True)),
+			banned_orgs=Count('id', filter=Q(banned=True)),
+			total_sms_sent_all=Sum('total_sms_sent'),
+			avg_sms_rate=Avg('sms_rate'),
+		)
+		thirty_days_ago = timezone.now() - timezone.timedelta(days=30)
+		enrollments = EnrollmentRequest.objects.aggregate(
+			total_enrollment_requests=Count('id', filter=Q(created_at__gte=thirty_days_ago)),
+			rejected_enrollment_requests=Count('id', filter=Q(status='rejected', reviewed_at__gte=thirty_days_ago)),
+		)
+		top_orgs = Organization.objects.filter(sms_credit_balance__gt=Decimal('0')).annotate(
+			total_paid=Coalesce(Sum('payments__amount', filter=Q(payments__status='success')), Decimal('0')),
+		).order_by('-sms_credit_balance')[:5]
+
+		total_balance = orgs['total_org_balance'] or Decimal('0')
+		return {
+			'total_payments': payments['total_payments'],
+			'total_revenue': payments['total_revenue'] or Decimal('0'),
+			'recent_payments': payments['recent_payments'],
+			'orgs_with_balance': orgs['orgs_with_balance'],
+			'total_org_balance': total_balance,
+			'avg_org_balance': total_balance / orgs['orgs_with_balance'] if orgs['orgs_with_balance'] > 0 else Decimal('0'),
+			'premium_orgs': orgs['premium_orgs'],
+			'total_orgs': orgs['total_orgs'],
+			'premium_percentage': _percent(orgs['premium_orgs'], orgs['total_orgs']),
+			'banned_orgs': orgs['banned_orgs'],
+			'total_sms_sent_all': orgs['total_sms_sent_all'] or 0,
+			'total_balance_all': total_balance,
+			'avg_sms_rate': orgs['avg_sms_rate'] or Decimal('0.25'),
+			'top_payers': [
+				{'organization': org, 'balance': org.sms_credit_balance, 'total_paid': org.total_paid}
+				for org in top_orgs
+			],
+			**enrollments,
+		}
+
+	def calculate_all(self):
+		metrics = {}
+		metrics.update(self.calculate_tenant_stats())
+		metrics.update(self.calculate_trends())
+		metrics.update(self.calculate_billing_stats())
+		return metrics
+
+	def get_all_metrics(self):
+		"""Platform metrics, served stale-while-revalidate from the cache"""
+		return cached_with_refresh(
+			self.cache_key, self.calculate_all, get_platform_fresh_seconds(), get_platform_stale_seconds(),
+		)
+
+	def invalidate(self):
+		try:
+			cache.delete(self.cache_key)
+		except Exception:
+			pass
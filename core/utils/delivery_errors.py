@@ -0,0 +1,138 @@
+"""
+Catalogue of recipient failure reasons.
+
+A failed ``OrgAlertRecipient`` points at a ``DeliveryError`` row (a smallint
+foreign key) instead of carrying the provider's exception text, which for
+most failures is the same few hundred bytes repeated on thousands of rows.
+The raw text is only kept on one row in ``ERROR_DETAIL_SAMPLE_EVERY`` (by id),
+and the first text seen for each code is kept on the catalogue row. Failure
+breakdowns are a ``GROUP BY error_id`` mapped through the catalogue, which is
+small and cached per process.
+"""
+from django.conf import settings
+from django.db.models import Count
+
+from .. import constants
+from ..models import DeliveryError, OrgAlertRecipient
+
+# (code, description, lower-case fragments of the error text that select it).
+# First match wins, so e.g. timeouts are recognised before the connection
+# errors whose text they share.
+ERROR_CODES = [
+	('suppressed', 'Number is on the suppression list', ['suppression list']),
+	('org_banned', 'Organization is banned', ['organization is banned']),
+	('insufficient_credit', 'Insufficient credit or gateway balance', ['insufficient']),
+	('auth', 'Provider rejected the credentials', ['401', '403', 'unauthorized', 'forbidden', 'credential', 'authenticat']),
+	('invalid_number', 'Invalid destination number', ['invalid number', 'invalid phone', 'invalid destination', 'invalid msisdn', 'invalid recipient']),
+	('timeout', 'Timed out waiting for the provider', ['timed out', 'timeout']),
+	('connection', 'Could not reach the provider', ['connectionpool', 'connectionerror', 'connection refused', 'connection reset', 'connection aborted', 'max retries exceeded', 'name resolution']),
+	('not_accepted', 'Provider did not accept the message', ['not sent successfully']),
+	('provider_failed', 'Provider reported the message undelivered', []),
+	('unexpected', 'Unexpected error while sending', ['unexpected error']),
+	('unknown', 'Failed before error details were recorded', []),
+	('other', 'Other error', []),
+]
+UNCLASSIFIED = {'code': 'unclassified', 'description': 'No error recorded'}
+
+_catalogue = {}
+_examples_kept = set()
+
+
+def get_sample_every():
+	return getattr(settings, 'ERROR_DETAIL_SAMPLE_EVERY', constants.ERROR_DETAIL_SAMPLE_EVERY)
+
+
+def classify_error(detail):
+	"""The catalogue code for an error text (``not_accepted`` when there is none)"""
+	text = (detail or '').lower()
+	if not text:
+		return 'not_accepted'
+	for code, _, fragments in ERROR_CODES:
+		if any(fragment in text for fragment in fragments):
+			return code
+	return 'other'
+
+
+def catalogue():
+	"""``{code: DeliveryError}``, loaded once per process (migration 0053 seeds every code)"""
+	if not _catalogue:
+		_catalogue.update({error.code: error for error in DeliveryError.objects.all()})
+	return _catalogue
+
+
+def error_for(code):
+	error = catalogue().get(code)
+	if error is None:
+		descriptions = {entry[0]: entry[1] for entry in ERROR_CODES}
+		error, _ = DeliveryError.objects.get_or_create(code=code, defaults={'description': descriptions.get(code, code)})
+		_catalogue[code] = error
+	return error
+
+
+def describe(error_id):
+	"""Description of a catalogue id, without a query once the catalogue is loaded"""
+	for error in catalogue().values():
+		if error.pk == error_id:
+			return error.description
+	error = DeliveryError.objects.filter(pk=error_id).first()
+	return error.description if error else UNCLASSIFIED['description']
+
+
+def error_fields(detail=None, code=None, pk=None):
+	"""``(error_id, error_message)`` to store for a failure.
+
+	``code`` defaults to ``classify_error(detail)``. The raw ``detail`` is
+	returned only for sampled rows (``pk`` a multiple of ``ERROR_DETAIL_SAMPLE_EVERY``);
+	the first detail seen per code is also saved on the catalogue row.
+	"""
+	error = error_for(code or classify_error(detail))
+	if detail and error.pk not in _examples_kept:
+		if not error.example:
+			DeliveryError.objects.filter(pk=error.pk, example='').update(example=detail)
+			error.example = detail
+		_examples_kept.add(error.pk)
+	sampled = bool(detail) and pk is not None and pk % get_sample_every() == 0
+	return error.pk, (detail if sampled else None)
+
+
+def failure_breakdown(recipients):
+	"""Failed recipients of a queryset by reason, most common first.
+
+	Returns ``[{'code', 'description', 'count'}, ...]`` from one ``GROUP BY``.
+	"""
+	rows = recipients.filter(status='failed').values('error_id').annotate(count=Count('id')).order_by()
+	by_id = {error.pk: error for error in catalogue().values()}
+	breakdown = []
+	for row in rows:
+		error = by_id.get(row['error_id'])
+		label = {'code': error.code, 'description': error.description} if error else UNCLASSIFIED
+		breakdown.append({**label, 'count': row['count']})
+	return sorted(breakdown, key=lambda entry: (-entry['count'], entry['code']))
+
+
+def compact_errors(recipients=None, chunk_size=1000):
+	"""Give rows written before the catalogue an error code and drop unsampled raw text.
+
+	Old rows with no error text are coded ``unknown``: nothing says why they
+	failed, so they are not counted as provider rejections. Returns the number
+	of rows updated.
+	"""
+	recipients = OrgAlertRecipient.objects.all() if recipients is None else recipients
+	recipients = recipients.filter(error__isnull=True, status='failed')
+	updated = 0
+	last_id = 0
+	while True:
+		rows = list(recipients.filter(id__gt=last_id).order_by('id').values_list('id', 'error_message')[:chunk_size])
+		if not rows:
+			break
+		last_id = rows[-1][0]
+		groups = {}
+		for pk, detail in rows:
+			error_id, kept = error_fields(detail, code=None if detail else 'unknown', pk=pk)
+			groups.setdefault((error_id, kept is not None), []).append(pk)
+		for (error_id, keep_detail), ids in groups.items():
+			changes = {'error_id': error_id}
+			if not keep_detail:
+				changes['error_message'] = None
+			updated += OrgAlertRecipient.objects.filter(id__in=ids).update(**changes)
+	return updated
@@ -0,0 +1,200 @@
+"""
+Poll providers for delivery receipts that never arrived.
+
+Receipts get lost (webhook downtime, a wrong callback URL), leaving
+recipients ``sent`` with no ``provider_status``. ``poll_delivery_statuses``
+asks each sender's gateway about those recipients once they are
+``DELIVERY_STATUS_POLL_AFTER_MINUTES`` old, at no more than the sender's
+``status_poll_rate`` queries per second and ``DELIVERY_STATUS_POLL_BATCH_SIZE``
+queries per run. A recipient is asked again after twice as long each time
+(30 minutes, 1 hour, 2 hours, ... after sending by default) and never once
+it is older than ``DELIVERY_STATUS_POLL_HORIZON_HOURS``. Only final answers
+(delivered or failed) are kept; they go through the same receipt buffer as
+the webhooks (core.utils.receipts).
+
+A run stops after ``DELIVERY_STATUS_POLL_BUDGET_SECONDS`` of wall-clock time
+so it cannot hold up the scheduler loop; the next run starts with the sender
+it did not reach. Recipients sent through the legacy path (no ``sender``) are
+not polled: that path falls back from Hubtel to ClickSend, so which gateway
+holds the message is not recorded.
+"""
+import datetime
+import logging
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Q
+from django.utils import timezone
+
+from .. import constants
+from ..models import DeliveryReceipt, OrgAlertRecipient, Sender
+from .receipts import apply_receipts, is_final
+
+logger = logging.getLogger(__name__)
+
+# Consecutive gateway errors after which a sender is left alone until the next run
+MAX_SENDER_ERRORS = 3
+
+
+def get_poll_after():
+	return datetime.timedelta(minutes=getattr(settings, 'DELIVERY_STATUS_POLL_AFTER_MINUTES', constants.DELIVERY_STATUS_POLL_AFTER_MINUTES))
+
+
+def get_poll_horizon():
+	return datetime.timedelta(hours=getattr(settings, 'DELIVERY_STATUS_POLL_HORIZON_HOURS', constants.DELIVERY_STATUS_POLL_HORIZON_HOURS))
+
+
+def get_poll_batch_size():
+	return getattr(settings, 'DELIVERY_STATUS_POLL_BATCH_SIZE', constants.DELIVERY_STATUS_POLL_BATCH_SIZE)
+
+
+def get_poll_budget():
+	return getattr(settings, 'DELIVERY_STATUS_POLL_BUDGET_SECONDS', constants.DELIVERY_STATUS_POLL_BUDGET_SECONDS)
+
+
+def _status_from(data):
+	if not isinstance(data, dict):
+		return None
+	nested = data.get('data')
+	if isinstance(nested, dict):
+		data = nested
+	return data.get('status') or data.get('statusDescription') or data.get('deliveryStatus') or data.get('status_text')
+
+
+def query_hubtel_status(sender, message_id):
+	from .. import hubtel_utils
+	return _status_from(hubtel_utils.get_sms_delivery_status_with_credentials(
+		message_id, api_url=sender.hubtel_api_url, api_key=sender.hubtel_api_key,
+	))
+
+
+def query_clicksend_status(sender, message_id):
+	from .. import clicksend_utils
+	return _status_from(clicksend_utils.get_delivery_receipt_with_credentials(
+		message_id, username=sender.clicksend_username, api_key=sender.clicksend_api_key,
+	))
+
+
+# provider -> function(sender, provider message id) returning the raw status (or None)
+STATUS_FUNCTIONS = {
+	'hubtel': query_hubtel_status,
+	'clicksend': query_clicksend_status,
+}
+
+
+# Id of the first sender the next run should poll (the one the last run's budget did not reach)
+RESUME_KEY = 'delivery-status-poll:resume-sender'
+
+
+def _checks_key(recipient_id):
+	return f"delivery-status-checks:{recipient_id}"
+
+
+def is_due(sent_at, checks, now):
+	"""Whether a recipient already asked about ``checks`` times should be asked again"""
+	return sent_at + get_poll_after() * (2 ** checks) <= now
+
+
+def unresolved_recipients(sender, now):
+	"""``sent`` recipients routed through ``sender`` with no receipt, inside the polling window"""
+	return OrgAlertRecipient.objects.filter(
+		Q(provider_status__isnull=True) | Q(provider_status=''),
+		sender=sender,
+		status='sent',
+		provider_message_id__isnull=False,
+		sent_at__gte=now - get_poll_horizon(),
+		sent_at__lte=now - get_poll_after(),
+	)
+
+
+def due_recipients(sender, now, limit, chunk_size=500):
+	"""Up to ``limit`` unresolved recipients whose next check is due, oldest first, with their check counts"""
+	rows = unresolved_recipients(sender, now).order_by('sent_at', 'id').only('id', 'provider_message_id', 'sent_at')
+	due = []
+	last = None
+	while len(due) < limit:
+		page = rows if last is None else rows.filter(Q(sent_at__gt=last.sent_at) | Q(sent_at=last.sent_at, id__gt=last.id))
+		page = list(page[:chunk_size])
+		if not page:
+			break
+		checks = cache.get_many([_checks_key(recipient.id) for recipient in page])
+		for recipient in page:
+			count = checks.get(_checks_key(recipient.id), 0)
+			if is_due(recipient.sent_at, count, now):
+				due.append((recipient, count))
+				if len(due) == limit:
+					break
+		last = page[-1]
+	return due
+
+
+def poll_sender(sender, now=None, limit=None, sleep=time.sleep, clock=time.monotonic, deadline=None):
+	"""Ask ``sender``'s gateway about its due recipients and buffer the final answers.
+
+	Stops early once ``clock()`` reaches ``deadline``. Returns ``{'queried', 'final', 'errors'}``.
+	"""
+	result = {'queried': 0, 'final': 0, 'errors': 0}
+	query = STATUS_FUNCTIONS.get(sender.provider)
+	if query is None:
+		return result
+	now = now or timezone.now()
+	interval = 1.0 / max(sender.status_poll_rate, 1)
+	receipts = []
+	checks = {}
+	errors_in_a_row = 0
+	last_call = None
+	for recipient, count in due_recipients(sender, now, limit or get_poll_batch_size()):
+		wait = 0 if last_call is None else interval - (clock() - last_call)
+		if deadline is not None and clock() + max(wait, 0) >= deadline:
+			break
+		if wait > 0:
+			sleep(wait)
+		last_call = clock()
+		result['queried'] += 1
+		checks[_checks_key(recipient.id)] = count + 1
+		try:
+			status = query(sender, recipient.provider_message_id)
+		except Exception as e:
+			logger.warning(f"Delivery status query failed for {recipient.provider_message_id} via {sender}: {e}")
+			result['errors'] += 1
+			errors_in_a_row += 1
+			if errors_in_a_row >= MAX_SENDER_ERRORS:
+				break
+			continue
+		errors_in_a_row = 0
+		if status and is_final(status):
+			receipts.append(DeliveryReceipt(
+				provider=sender.provider, provider_message_id=recipient.provider_message_id, status=str(status)[:100],
+			))
+	# Check counts only matter inside the polling window
+	cache.set_many(checks, timeout=int(get_poll_horizon().total_seconds()))
+	DeliveryReceipt.objects.bulk_create(receipts)
+	result['final'] = len(receipts)
+	return result
+
+
+def poll_delivery_statuses(now=None, limit=None, sleep=time.sleep, clock=time.monotonic, budget=None):
+	"""Poll every sender with a status API for up to ``budget`` seconds, then apply what was found.
+
+	Returns ``{sender: poll_sender result}`` for the senders that had recipients to ask about.
+	"""
+	now = now or timezone.now()
+	deadline = clock() + (get_poll_budget() if budget is None else budget)
+	senders = list(Sender.objects.filter(provider__in=list(STATUS_FUNCTIONS)).order_by('id'))
+	resume = cache.get(RESUME_KEY)
+	if resume is not None:
+		senders = [s for s in senders if s.id >= resume] + [s for s in senders if s.id < resume]
+	results = {}
+	for sender in senders:
+		if clock() >= deadline:
+			cache.set(RESUME_KEY, sender.id, None)
+			break
+		result = poll_sender(sender, now, limit, sleep, clock, deadline)
+		if result['queried']:
+			results[sender] = result
+	else:
+		cache.delete(RESUME_KEY)
+	if any(result['final'] for result in results.values()):
+		apply_receipts(now=now)
+	return results
@@ -0,0 +1,203 @@
+"""
+Delivery report figures computed in SQL.
+
+The report page used to call the per-message ``OrgMessage.get_*`` helpers
+for every message, several queries each. Here the organization totals are
+one aggregate and each page of messages is one annotated query, so the page
+costs the same number of queries however many messages an org has sent.
+Status counts come from the counters stored on ``OrgMessage``.
+
+Given ``since`` (no recipient of the messages was created before it), the
+recipient join carries a literal ``created_at`` bound so Postgres only scans
+the monthly recipient partitions from then on.
+
+Latency percentiles use ``PERCENTILE_DISC`` on Postgres (one aggregate for
+every percentile); other databases read the nearest-rank rows with ordered
+``LIMIT 1 OFFSET k`` queries.
+"""
+import datetime
+import math
+
+from django.db import connection
+from django.db.models import Aggregate, Avg, Count, DurationField, ExpressionWrapper, F, FilteredRelation, Q, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from ..models import OrgAlertRecipient, OrgMessage
+from .delivery_errors import failure_breakdown
+
+RECENT_DAYS = 30
+LATENCY_PERCENTILES = (50, 95, 99)
+
+
+def _status(status, prefix='recipients_status__'):
+	return Q(**{prefix + 'status': status})
+
+
+def annotate_report(messages, now=None, since=None):
+	"""Annotate an OrgMessage queryset with the report figures not kept as counters"""
+	now = now or timezone.now()
+	relation = 'recipients_status'
+	if since is not None:
+		relation = 'report_rows'
+		messages = messages.annotate(report_rows=FilteredRelation(
+			'recipients_status', condition=Q(recipients_status__created_at__gte=since),
+		))
+	prefix = relation + '__'
+
+	def rows(**lookups):
+		return Q(**{prefix + lookup: value for lookup, value in lookups.items()})
+
+	sent = _status('sent', prefix)
+	sent_with_id = sent & rows(provider_message_id__isnull=False) & ~rows(provider_message_id='')
+	finished = rows(sent_at__isnull=False)
+	since_24h = finished & rows(sent_at__gte=now - datetime.timedelta(hours=24))
+	since_7d = finished & rows(sent_at__gte=now - datetime.timedelta(days=7))
+	return messages.annotate(
+		avg_send_time=Avg(
+			ExpressionWrapper(F(prefix + 'sent_at') - F('created_at'), output_field=DurationField()),
+			filter=sent & finished,
+		),
+		sent_with_provider_id=Count(relation, filter=sent_with_id),
+		sent_without_provider_id=Count(relation, filter=sent & rows(provider_message_id__isnull=True)),
+		sent_24h=Count(relation, filter=since_24h & sent),
+		failed_24h=Count(relation, filter=since_24h & _status('failed', prefix)),
+		sent_7d=Count(relation, filter=since_7d & sent),
+		failed_7d=Count(relation, filter=since_7d & _status('failed', prefix)),
+	)
+
+
+def message_report(message, now=None):
+	"""One message with its ``annotate_report`` figures, in a single query"""
+	return annotate_report(OrgMessage.objects.filter(pk=message.pk), now, since=message.created_at).get()
+
+
+def _percent(part, total):
+	return (part / total * 100) if total > 0 else 0
+
+
+def _seconds(duration):
+	return duration.total_seconds() if duration is not None else None
+
+
+def provider_breakdown(message):
+	"""Share of recipients sent through each provider, from ``annotate_report`` values"""
+	total = message.total_count
+	unknown = message.sent_count - message.sent_with_provider_id - message.sent_without_provider_id
+	return {
+		'hubtel': _percent(message.sent_with_provider_id, total),
+		'clicksend': _percent(message.sent_without_provider_id, total),
+		'unknown': _percent(unknown, total),
+	}
+
+
+def time_stats(message):
+	"""Sent/failed counts for the last 24 hours and 7 days, from ``annotate_report`` values"""
+	return {
+		'last_24h': {'sent': message.sent_24h, 'failed': message.failed_24h},
+		'last_7d': {'sent': message.sent_7d, 'failed': message.failed_7d},
+	}
+
+
+def build_report(message, rate):
+	"""The ``OrgMessage.get_detailed_report`` dict (without latency), from ``annotate_report`` values"""
+	total, sent = message.total_count, message.sent_count
+	return {
+		'total_recipients': total,
+		'sent_count': sent,
+		'failed_count': message.failed_count,
+		'pending_count': message.pending_count,
+		'delivery_rate': _percent(sent, total),
+		'average_send_time': _seconds(message.avg_send_time),
+		'provider_breakdown': provider_breakdown(message),
+		'cost_breakdown': {
+			'total_cost': sent * rate if sent else 0,
+			'cost_per_delivery': rate if sent else 0,
+		},
+		'time_stats': time_stats(message),
+	}
+
+
+class PercentileDisc(Aggregate):
+	"""Postgres ``PERCENTILE_DISC(fraction) WITHIN GROUP (ORDER BY expression)``"""
+	function = 'PERCENTILE_DISC'
+	template = '%(function)s(%(fraction)s) WITHIN GROUP (ORDER BY %(expressions)s)'
+
+	def __init__(self, expression, fraction, **extra):
+		super().__init__(expression, fraction=float(fraction), **extra)
+
+
+def _latencies():
+	"""Latency expressions on OrgAlertRecipient rows, with the rows each applies to"""
+	return {
+		'submit_to_sent': (
+			ExpressionWrapper(F('sent_at') - F('message__created_at'), output_field=DurationField()),
+			Q(status='sent', sent_at__isnull=False),
+		),
+		'sent_to_delivered': (
+			ExpressionWrapper(F('delivered_at') - F('sent_at'), output_field=DurationField()),
+			Q(sent_at__isnull=False, delivered_at__isnull=False),
+		),
+	}
+
+
+def _nearest_rank(recipients, expression, condition, percentiles):
+	values = recipients.filter(condition).annotate(latency=expression)
+	count = values.count()
+	ordered = values.order_by('latency').values_list('latency', flat=True)
+	return {
+		p: ordered[max(math.ceil(p / 100 * count) - 1, 0)] if count else None
+		for p in percentiles
+	}
+
+
+def latency_percentiles(recipients, percentiles=LATENCY_PERCENTILES):
+	"""Submit-to-sent and sent-to-delivered percentiles (seconds) over an OrgAlertRecipient queryset.
+
+	Returns ``{'submit_to_sent': {'p50': ..., ...}, 'sent_to_delivered': {...}}``
+	with ``None`` where there are no samples.
+	"""
+	latencies = _latencies()
+	if connection.vendor == 'postgresql':
+		row = recipients.aggregate(**{
+			f"{name}_{p}": PercentileDisc(expression, p / 100, filter=condition, output_field=DurationField())
+			for name, (expression, condition) in latencies.items()
+			for p in percentiles
+		})
+		values = {name: {p: row[f"{name}_{p}"] for p in percentiles} for name in latencies}
+	else:
+		values = {
+			name: _nearest_rank(recipients, expression, condition, percentiles)
+			for name, (expression, condition) in latencies.items()
+		}
+	return {
+		name: {f"p{p}": _seconds(duration) for p, duration in by_percentile.items()}
+		for name, by_percentile in values.items()
+	}
+
+
+def organization_failure_breakdown(organization, now=None):
+	"""Failed recipients of the last RECENT_DAYS by error code (one GROUP BY over recent partitions)"""
+	now = now or timezone.now()
+	return failure_breakdown(OrgAlertRecipient.objects.filter(
+		message__organization=organization, created_at__gte=now - datetime.timedelta(days=RECENT_DAYS),
+	))
+
+
+def organization_delivery_totals(organization, now=None):
+	"""All-time and last-30-day totals for the organization in one aggregate over the message counters"""
+	now = now or timezone.now()
+	recent = Q(created_at__gte=now - datetime.timedelta(days=RECENT_DAYS))
+	totals = OrgMessage.objects.filter(organization=organization).aggregate(
+		total_messages=Count('id'),
+		total_recipients=Coalesce(Sum('total_count'), 0),
+		total_sent=Coalesce(Sum('sent_count'), 0),
+		total_failed=Coalesce(Sum('failed_count'), 0),
+		recent_sent=Coalesce(Sum('sent_count', filter=recent), 0),
+		recent_failed=Coalesce(Sum('failed_count', filter=recent), 0),
+	)
+	rate = organization.get_current_sms_rate()
+	totals['overall_delivery_rate'] = _percent(totals['total_sent'], totals['total_recipients'])
+	totals['total_cost'] = totals['total_sent'] * rate
+	totals['avg_cost_per_message'] = totals['total_cost'] / totals['total_messages'] if totals['total_messages'] > 0 else 0
+	return totals
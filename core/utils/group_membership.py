@@ -0,0 +1,128 @@
+"""
+Incremental contact-group membership changes.
+
+Members are added and removed by writing the ``ContactGroup.contacts``
+through table directly in fixed-size chunks, so the cost of an edit depends
+on how many members change, not on how big the group already is.
+
+``ContactGroup.member_count`` is adjusted in the same transaction as each
+chunk; ``reconcile_member_counts`` repairs any drift from writes made
+elsewhere (e.g. raw SQL or a crashed worker).
+"""
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from .. import constants
+from . import normalize_phone_numbers
+from .contact_import import ContactImporter
+from ..models import Contact, ContactGroup
+
+Membership = ContactGroup.contacts.through
+
+
+def get_chunk_size():
+	return getattr(settings, 'GROUP_MEMBERSHIP_CHUNK_SIZE', constants.GROUP_MEMBERSHIP_CHUNK_SIZE)
+
+
+def _chunks(values, size):
+	values = list(values)
+	for start in range(0, len(values), size):
+		yield values[start:start + size]
+
+
+def _clean_ids(contact_ids):
+	ids = set()
+	for value in contact_ids:
+		try:
+			ids.add(int(value))
+		except (TypeError, ValueError):
+			continue
+	return sorted(ids)
+
+
+def add_members(group, contact_ids, chunk_size=None):
+	"""Add contacts (ids) to ``group``; returns how many were not already members.
+
+	Ids that belong to another organization or are already members are skipped.
+	"""
+	added = 0
+	for chunk in _chunks(_clean_ids(contact_ids), chunk_size or get_chunk_size()):
+		with transaction.atomic():
+			valid = set(Contact.objects.filter(organization_id=group.organization_id, id__in=chunk).values_list('id', flat=True))
+			existing = set(Membership.objects.filter(contactgroup=group, contact_id__in=valid).values_list('contact_id', flat=True))
+			new_ids = valid - existing
+			Membership.objects.bulk_create(
+				[Membership(contactgroup_id=group.id, contact_id=cid) for cid in new_ids],
+				ignore_conflicts=True,
+			)
+			if new_ids:
+				ContactGroup.objects.filter(pk=group.pk).update(member_count=F('member_count') + len(new_ids))
+		added += len(new_ids)
+	return added
+
+
+def remove_members(group, contact_ids, chunk_size=None):
+	"""Remove contacts (ids) from ``group``; returns how many memberships were deleted"""
+	removed = 0
+	for chunk in _chunks(_clean_ids(contact_ids), chunk_size or get_chunk_size()):
+		with transaction.atomic():
+			deleted = Membership.objects.filter(contactgroup=group, contact_id__in=chunk).delete()[0]
+			if deleted:
+				ContactGroup.objects.filter(pk=group.pk).update(member_count=F('member_count') - deleted)
+		removed += deleted
+	return removed
+
+
+def _actual_member_count():
+	return Coalesce(Subquery(
+		Membership.objects.filter(contactgroup=OuterRef('pk')).order_by().values('contactgroup').annotate(n=Count('*')).values('n')
+	), 0)
+
+
+def refresh_member_counts(groups):
+	"""Recount ``member_count`` for a ContactGroup queryset with one UPDATE"""
+	return groups.update(member_count=_actual_member_count())
+
+
+def reconcile_member_counts(groups=None):
+	"""Fix groups whose ``member_count`` disagrees with the through table.
+
+	Returns the ids of the groups that had drifted.
+	"""
+	groups = ContactGroup.objects.all() if groups is None else groups
+	stale_ids = list(
+		groups.annotate(actual=_actual_member_count()).exclude(member_count=F('actual')).values_list('id', flat=True)
+	)
+	for chunk in _chunks(stale_ids, get_chunk_size()):
+		refresh_member_counts(ContactGroup.objects.filter(id__in=chunk))
+	return stale_ids
+
+
+def contact_ids_for_phones(organization, phones, chunk_size=None):
+	"""Ids of the organization's contacts matching ``phones`` (any input format)"""
+	normalized, valid = normalize_phone_numbers(phones)
+	numbers = sorted({n for n, ok in zip(normalized, valid) if ok})
+	ids = []
+	for chunk in _chunks(numbers, chunk_size or get_chunk_size()):
+		ids.extend(Contact.objects.filter(organization=organization, phone_number__in=chunk).values_list('id', flat=True))
+	return ids
+
+
+class GroupMembershipImporter(ContactImporter):
+	"""``ContactImporter`` that also adds every imported contact to ``group``.
+
+	Unknown numbers become new contacts (exactly as in a contact import) and
+	each batch's contacts are then added to the group in the same pass.
+	"""
+
+	def __init__(self, group, **kwargs):
+		super().__init__(group.organization, **kwargs)
+		self.group = group
+		self.members_added = 0
+
+	def _write_batch(self, batch):
+		super()._write_batch(batch)
+		ids = Contact.objects.filter(organization=self.organization, phone_number__in=list(batch)).values_list('id', flat=True)
+		self.members_added += add_members(self.group, ids)
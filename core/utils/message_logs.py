@@ -0,0 +1,128 @@
+"""
+Keyset-paginated message log pages (``OrgAlertRecipient`` history).
+
+Logs are listed newest first by ``(sent_at, id)``, with rows that have not
+been sent yet (``sent_at`` NULL) ahead of everything else, which is how a
+descending index scan returns them on Postgres. A page is addressed by an
+opaque cursor holding the ``(sent_at, id)`` of its last (or first) row, so
+page 1 and page 4,000 are the same index seek instead of an ever-growing
+OFFSET. An organization's logs filter on the recipient's own ``organization``
+column, so the seek runs on the ``(organization, sent_at, id)`` index rather
+than joining every message; the audit view across all organizations uses
+``(sent_at, id)``. Date filters are half-open ``sent_at`` ranges, which those
+indexes can answer directly (``sent_at__date`` wraps the column in a function
+and cannot use it). A row is always created before it
+is sent, so the upper bound also applies to ``created_at``, which lets
+Postgres skip the recipient partitions of later months.
+"""
+import base64
+import datetime
+import json
+
+from django.conf import settings
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .. import constants
+from .contact_search import ContactPage
+
+# Columns a log row renders; everything else stays in the database
+LOG_ONLY = [
+	'id', 'status', 'sent_at', 'is_deleted', 'message', 'contact',
+	'message__content', 'contact__name', 'contact__phone_number',
+]
+AUDIT_LOG_ONLY = LOG_ONLY + ['message__organization', 'message__organization__name', 'message__organization__slug']
+
+
+def get_page_size():
+	return getattr(settings, 'MESSAGE_LOGS_PAGE_SIZE', constants.MESSAGE_LOGS_PAGE_SIZE)
+
+
+def _day_start(day):
+	return timezone.make_aware(datetime.datetime.combine(day, datetime.time.min))
+
+
+def sent_at_range(date_from=None, date_to=None):
+	"""``Q`` for rows sent on ``date_from``..``date_to`` (inclusive local days)"""
+	condition = Q()
+	if date_from:
+		condition &= Q(sent_at__gte=_day_start(date_from))
+	if date_to:
+		end = _day_start(date_to + datetime.timedelta(days=1))
+		condition &= Q(sent_at__lt=end, created_at__lt=end)
+	return condition
+
+
+def filter_logs(logs, status=None, date_from=None, date_to=None):
+	"""Apply the message log filters; each one applies on its own"""
+	if status:
+		logs = logs.filter(status=status)
+	return logs.filter(sent_at_range(date_from, date_to))
+
+
+def encode_cursor(sent_at, pk):
+	raw = json.dumps([sent_at.isoformat() if sent_at else None, pk], separators=(',', ':')).encode('utf-8')
+	return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(token):
+	"""Return ``(sent_at or None, id)`` from a cursor, or None if it is missing or malformed"""
+	if not token:
+		return None
+	try:
+		sent_at, pk = json.loads(base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)))
+		return (datetime.datetime.fromisoformat(sent_at) if sent_at else None), int(pk)
+	except (ValueError, TypeError):
+		return None
+
+
+class MessageLogPage(ContactPage):
+	"""One page of message log rows plus the cursors for its neighbours"""
+
+
+def _older_than(sent_at, pk):
+	if sent_at is None:
+		return Q(sent_at__isnull=True, id__lt=pk) | Q(sent_at__isnull=False)
+	return Q(sent_at__lt=sent_at) | Q(sent_at=sent_at, id__lt=pk)
+
+
+def _newer_than(sent_at, pk):
+	if sent_at is None:
+		return Q(sent_at__isnull=True, id__gt=pk)
+	return Q(sent_at__gt=sent_at) | Q(sent_at=sent_at, id__gt=pk) | Q(sent_at__isnull=True)
+
+
+def log_page(queryset, after=None, before=None, page_size=None):
+	"""Fetch one page of ``queryset`` newest first by ``(sent_at, id)``.
+
+	``after``/``before`` are cursors from a previous page's ``next_cursor`` /
+	``prev_cursor``. One extra row is fetched to know whether another page exists.
+	"""
+	page_size = page_size or get_page_size()
+	after, before = decode_cursor(after), decode_cursor(before)
+	if before and not after:
+		rows = list(
+			queryset.filter(_newer_than(*before))
+			.order_by(F('sent_at').asc(nulls_last=True), 'id')[:page_size + 1]
+		)
+		has_more = len(rows) > page_size
+		rows = rows[:page_size][::-1]
+		page = MessageLogPage(items=rows)
+		if rows:
+			page.next_cursor = encode_cursor(rows[-1].sent_at, rows[-1].id)
+			if has_more:
+				page.prev_cursor = encode_cursor(rows[0].sent_at, rows[0].id)
+		return page
+
+	if after:
+		queryset = queryset.filter(_older_than(*after))
+	rows = list(queryset.order_by(F('sent_at').desc(nulls_first=True), '-id')[:page_size + 1])
+	has_more = len(rows) > page_size
+	rows = rows[:page_size]
+	page = MessageLogPage(items=rows)
+	if rows:
+		if has_more:
+			page.next_cursor = encode_cursor(rows[-1].sent_at, rows[-1].id)
+		if after:
+			page.prev_cursor = encode_cursor(rows[0].sent_at, rows[0].id)
+	return page
@@ -0,0 +1,104 @@
+"""
+Mobile network (carrier) lookup for normalized phone numbers.
+
+Ghanaian numbers are assigned to carriers by the two digits after the
+country code. The prefixes are compiled once into a digit trie, so
+classifying a number is a walk of at most a few dictionary lookups and
+needs no regex or database access. Recipients are classified when their
+rows are created, and the dispatcher routes each network's recipients to
+the best assigned sender (see ``core.utils.sender_utils``).
+"""
+from decimal import Decimal, InvalidOperation
+
+from django.conf import settings
+
+MTN = 'mtn'
+TELECEL = 'telecel'
+AIRTELTIGO = 'airteltigo'
+UNKNOWN = ''
+
+NETWORK_CHOICES = [
+	(MTN, 'MTN'),
+	(TELECEL, 'Telecel (Vodafone)'),
+	(AIRTELTIGO, 'AirtelTigo'),
+	(UNKNOWN, 'Unknown'),
+]
+
+# Prefixes of the E.164 digits (no "+"); longest match wins
+DEFAULT_NETWORK_PREFIXES = {
+	'23324': MTN, '23325': MTN, '23353': MTN, '23354': MTN, '23355': MTN, '23359': MTN,
+	'23320': TELECEL, '23350': TELECEL,
+	'23326': AIRTELTIGO, '23327': AIRTELTIGO, '23356': AIRTELTIGO, '23357': AIRTELTIGO,
+}
+
+# Key under which a trie node stores the network of the prefix ending there
+_NETWORK = None
+
+_trie = None
+_trie_source = None
+
+
+def get_network_prefixes():
+	return getattr(settings, 'NETWORK_PREFIXES', DEFAULT_NETWORK_PREFIXES)
+
+
+def build_prefix_trie(prefixes):
+	"""Compile ``{prefix: network}`` into nested dicts keyed by digit"""
+	root = {}
+	for prefix, network in prefixes.items():
+		node = root
+		for digit in prefix.lstrip('+'):
+			node = node.setdefault(digit, {})
+		node[_NETWORK] = network
+	return root
+
+
+def _get_trie():
+	global _trie, _trie_source
+	prefixes = get_network_prefixes()
+	if _trie is None or _trie_source is not prefixes:
+		_trie, _trie_source = build_prefix_trie(prefixes), prefixes
+	return _trie
+
+
+def classify_network(phone_number, trie=None):
+	"""Network of a normalized number (``+233...``), or ``UNKNOWN``"""
+	if not phone_number:
+		return UNKNOWN
+	node = trie if trie is not None else _get_trie()
+	network = UNKNOWN
+	for char in phone_number:
+		if char == '+':
+			continue
+		node = node.get(char)
+		if node is None:
+			break
+		network = node.get(_NETWORK, network)
+	return network
+
+
+def classify_networks(phone_numbers):
+	"""``classify_network`` over many numbers, resolving the trie once"""
+	trie = _get_trie()
+	return [classify_network(number, trie) for number in phone_numbers]
+
+
+def parse_network_costs(data, prefix='cost_'):
+	"""Read per-network SMS costs (e.g. ``cost_mtn``) from a form into a dict of strings.
+
+	Blank or invalid values are left out, so those networks use the default rate.
+	"""
+	costs = {}
+	for network, _ in NETWORK_CHOICES:
+		if not network:
+			continue
+		raw = (data.get(prefix + network) or '').strip()
+		if not raw:
+			continue
+		try:
+			value = Decimal(raw)
+		except InvalidOperation:
+			continue
+		if value >= 0:
+			costs[network] = str(value)
+	return costs
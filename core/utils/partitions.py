@@ -0,0 +1,137 @@
+"""
+Monthly partitions of ``OrgAlertRecipient`` on Postgres.
+
+Migration 0051 turns ``core_orgalertrecipient`` into a table range-partitioned
+on ``created_at``: one partition per calendar month (UTC) named
+``core_orgalertrecipient_pYYYY_MM``, plus a DEFAULT partition that catches
+rows no month partition covers. ``manage_recipient_partitions`` keeps months
+ahead created. Old months leave only through the archive (core.utils.archive),
+which drops a month's partition once its rows are written out; a detached
+partition would keep its foreign keys to contacts and messages while its rows
+dropped out of sight of the archive. On other databases the table stays a
+single table and everything here is a no-op.
+
+Queries only skip partitions when they carry a literal ``created_at`` bound,
+which is why per-message reads go through ``OrgMessage.get_recipient_rows``
+and the message log date filters bound ``created_at`` as well as ``sent_at``.
+"""
+import datetime
+import re
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Max
+
+from .. import constants
+from ..models import DeliveryArchive, OrgAlertRecipient
+
+TABLE = OrgAlertRecipient._meta.db_table
+DEFAULT_PARTITION = TABLE + '_default'
+MONTH_PARTITION_RE = re.compile(r'^%s_p(\d{4})_(\d{2})$' % re.escape(TABLE))
+
+
+def get_months_ahead():
+	return getattr(settings, 'RECIPIENT_PARTITIONS_AHEAD', constants.RECIPIENT_PARTITIONS_AHEAD)
+
+
+def month_start(value):
+	"""The first instant (UTC) of the month ``value`` falls in"""
+	if isinstance(value, datetime.datetime):
+		value = value.astimezone(datetime.timezone.utc)
+	return datetime.datetime(value.year, value.month, 1, tzinfo=datetime.timezone.utc)
+
+
+def add_months(start, months):
+	month = start.month - 1 + months
+	return start.replace(year=start.year + month // 12, month=month % 12 + 1)
+
+
+def partition_name(start):
+	return f"{TABLE}_p{start:%Y_%m}"
+
+
+def is_partitioned():
+	if connection.vendor != 'postgresql':
+		return False
+	with connection.cursor() as cursor:
+		cursor.execute('SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(%s)', [TABLE])
+		return cursor.fetchone() is not None
+
+
+def month_partitions():
+	"""``{month start: partition name}`` of the attached month partitions, oldest first"""
+	with connection.cursor() as cursor:
+		cursor.execute(
+			'SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid '
+			'WHERE i.inhparent = to_regclass(%s)',
+			[TABLE],
+		)
+		names = [row[0] for row in cursor.fetchall()]
+	months = {}
+	for name in names:
+		match = MONTH_PARTITION_RE.match(name)
+		if match:
+			start = datetime.datetime(int(match.group(1)), int(match.group(2)), 1, tzinfo=datetime.timezone.utc)
+			months[start] = name
+	return dict(sorted(months.items()))
+
+
+def create_partition(start):
+	"""Create the partition for the month starting at ``start``.
+
+	Postgres refuses to add a partition while the DEFAULT partition holds rows
+	in its range, so any such rows are moved into the new partition in the
+	same transaction.
+	"""
+	end = add_months(start, 1)
+	quote = connection.ops.quote_name
+	name = partition_name(start)
+	with transaction.atomic(), connection.cursor() as cursor:
+		cursor.execute(
+			f'SELECT EXISTS (SELECT 1 FROM {quote(DEFAULT_PARTITION)} WHERE created_at >= %s AND created_at < %s)',
+			[start, end],
+		)
+		stray = cursor.fetchone()[0]
+		if stray:
+			cursor.execute(f'ALTER TABLE {quote(TABLE)} DETACH PARTITION {quote(DEFAULT_PARTITION)}')
+		cursor.execute(
+			f'CREATE TABLE {quote(name)} PARTITION OF {quote(TABLE)} FOR VALUES FROM (%s) TO (%s)',
+			[start, end],
+		)
+		if stray:
+			cursor.execute(
+				f'WITH moved AS (DELETE FROM {quote(DEFAULT_PARTITION)} WHERE created_at >= %s AND created_at < %s RETURNING *) '
+				f'INSERT INTO {quote(TABLE)} SELECT * FROM moved',
+				[start, end],
+			)
+			cursor.execute(f'ALTER TABLE {quote(TABLE)} ATTACH PARTITION {quote(DEFAULT_PARTITION)} DEFAULT')
+	return name
+
+
+def ensure_partitions(months_ahead=None, now=None):
+	"""Create any missing partitions from this month to ``months_ahead`` months out.
+
+	Returns the names created.
+	"""
+	if not is_partitioned():
+		return []
+	months_ahead = get_months_ahead() if months_ahead is None else months_ahead
+	current = month_start(now or datetime.datetime.now(datetime.timezone.utc))
+	existing = month_partitions()
+	created = []
+	for offset in range(months_ahead + 1):
+		start = add_months(current, offset)
+		if start not in existing:
+			created.append(create_partition(start))
+	return created
+
+
+def recipient_history_start():
+	"""Earliest ``created_at`` whose recipient rows are all still in the table, or None.
+
+	Months before it were archived (core.utils.archive). Repairs that recount
+	recipient rows (``reconcile_message_counts``, ``rebuild_daily_stats``) stay
+	after it so they do not zero those months' counts.
+	"""
+	archived = DeliveryArchive.objects.filter(kind=DeliveryArchive.ORG_RECIPIENTS).aggregate(last=Max('month'))['last']
+	return add_months(month_start(archived), 1) if archived else None
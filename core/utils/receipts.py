@@ -0,0 +1,227 @@
+"""
+Buffered provider delivery receipts.
+
+Webhooks (``hubtel_webhook``, ``clicksend_webhook``) verify the request and
+append a ``DeliveryReceipt`` row, which is all a provider has to wait for.
+``apply_receipts`` then works through the buffer in id order: each batch is
+reduced to one receipt per provider and message id, the recipients are fetched
+with one indexed ``provider_message_id IN (...)`` query per model and provider,
+and the changed rows are written with one ``bulk_update`` per set of changed
+fields. A receipt only matches recipients sent through its own provider: an
+organization recipient's ``sender.provider`` (or any provider for legacy rows
+with no sender, whose gateway was not recorded), and ``hubtel`` for school
+recipients, which are only ever sent through Hubtel.
+A receipt that changes nothing (a provider retrying, or the same status twice)
+is dropped without a write, so applying a receipt twice is harmless.
+
+Receipts whose message id matches no recipient yet (the receipt beat the send
+path's commit) stay in the buffer for ``DELIVERY_RECEIPT_RETRY_SECONDS``.
+"""
+import datetime
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .. import constants
+from ..models import AlertRecipient, DeliveryReceipt, OrgAlertRecipient
+from .daily_stats import DailyStatsDelta, recipient_bucket
+
+DELIVERED_STATUSES = {'delivered', 'delivered_to_terminal', 'delivrd', '2'}
+FAILED_STATUSES = {'failed', 'undelivered', 'undeliv', 'rejected', 'rejectd', 'expired', '3'}
+
+ORG_ONLY = [
+	'id', 'status', 'provider_message_id', 'provider_status', 'sent_at', 'delivered_at',
+	'error', 'error_message', 'sender', 'message', 'message__organization', 'message__created_at',
+]
+SCHOOL_ONLY = ['id', 'status', 'provider_message_id', 'provider_status', 'sent_at']
+# School messages only go out through Hubtel (hubtel_utils.send_sms)
+SCHOOL_PROVIDER = 'hubtel'
+
+
+def get_batch_size():
+	return getattr(settings, 'DELIVERY_RECEIPT_BATCH_SIZE', constants.DELIVERY_RECEIPT_BATCH_SIZE)
+
+
+def get_retry_seconds():
+	return getattr(settings, 'DELIVERY_RECEIPT_RETRY_SECONDS', constants.DELIVERY_RECEIPT_RETRY_SECONDS)
+
+
+def receipt_outcome(provider_status):
+	"""``(status, delivered)`` for a raw provider status.
+
+	``status`` is ``'sent'``, ``'failed'`` or None when the status says nothing
+	about the outcome (accepted, queued, ...). Failures are matched first
+	because ``undelivered`` contains ``deliv``.
+	"""
+	ps = str(provider_status or '').strip().lower()
+	if not ps:
+		return None, False
+	if ps in FAILED_STATUSES or 'fail' in ps or 'undeliv' in ps or 'reject' in ps:
+		return 'failed', False
+	if ps in DELIVERED_STATUSES or 'deliv' in ps:
+		return 'sent', ps in DELIVERED_STATUSES
+	return None, False
+
+
+def is_final(provider_status):
+	"""Whether a provider status is the message's last word (delivered or failed)"""
+	status, delivered = receipt_outcome(provider_status)
+	return status == 'failed' or delivered
+
+
+def record_receipt(provider, provider_message_id, provider_status):
+	"""Append one receipt to the buffer (the only write a webhook request makes)"""
+	return DeliveryReceipt.objects.create(
+		provider=provider,
+		provider_message_id=str(provider_message_id)[:255],
+		status=str(provider_status or '')[:100],
+	)
+
+
+def _winners(receipts):
+	"""One receipt per ``(provider, message id)``: a final status beats an intermediate one, then the latest wins"""
+	latest = {}
+	for receipt in receipts:
+		key = (receipt.provider, receipt.provider_message_id)
+		current = latest.get(key)
+		if current is None or (is_final(receipt.status), receipt.id) >= (is_final(current.status), current.id):
+			latest[key] = receipt
+	return latest
+
+
+def _update(recipient, receipt, org):
+	"""Apply ``receipt`` to ``recipient`` in memory and return the names of the fields it changed"""
+	status, delivered = receipt_outcome(receipt.status)
+	if is_final(recipient.provider_status) and not is_final(receipt.status):
+		# A late "accepted"/"sent" never overrides a delivery or failure report
+		return ()
+	changed = []
+	if recipient.provider_status != receipt.status:
+		recipient.provider_status = receipt.status
+		changed.append('provider_status')
+	if status and recipient.status != status:
+		recipient.status = status
+		changed.append('status')
+	if recipient.status == 'sent' and not recipient.sent_at:
+		recipient.sent_at = receipt.received_at
+		changed.append('sent_at')
+	if org:
+		# Delivery time feeds the sent-to-delivered latency percentiles
+		if delivered and not recipient.delivered_at:
+			recipient.delivered_at = receipt.received_at
+			changed.append('delivered_at')
+		if status == 'failed' and 'status' in changed:
+			recipient.set_error(receipt.status, code='provider_failed')
+			changed += ['error', 'error_message']
+		elif status == 'sent' and recipient.error_id:
+			recipient.set_error()
+			changed += ['error', 'error_message']
+	return tuple(changed)
+
+
+def _matching_rows(model, provider, message_ids, org):
+	"""``model``'s rows with one of ``message_ids`` that were sent through ``provider``"""
+	rows = model.objects.filter(provider_message_id__in=message_ids)
+	if org:
+		return rows.filter(Q(sender__provider=provider) | Q(sender__isnull=True)).select_related('message').only(*ORG_ONLY)
+	return rows.only(*SCHOOL_ONLY) if provider == SCHOOL_PROVIDER else model.objects.none()
+
+
+def _apply(model, receipts, org, stats):
+	"""Apply ``{(provider, provider_message_id): receipt}`` to ``model``'s rows.
+
+	Returns ``(matched keys, rows updated, rows already up to date)``.
+	"""
+	by_provider = {}
+	for provider, message_id in receipts:
+		by_provider.setdefault(provider, []).append(message_id)
+	matched = set()
+	groups = {}
+	unchanged = 0
+	for provider, message_ids in by_provider.items():
+		for recipient in _matching_rows(model, provider, message_ids, org):
+			key = (provider, recipient.provider_message_id)
+			matched.add(key)
+			before = recipient_bucket(recipient, recipient.message) if org else None
+			changed = _update(recipient, receipts[key], org)
+			if not changed:
+				unchanged += 1
+				continue
+			groups.setdefault(changed, []).append(recipient)
+			if org:
+				stats.move(before, recipient_bucket(recipient, recipient.message))
+	updated = 0
+	for fields, recipients in groups.items():
+		model.objects.bulk_update(recipients, fields, batch_size=500)
+		updated += len(recipients)
+	return matched, updated, unchanged
+
+
+def apply_receipt_batch(after_id=0, limit=None, now=None):
+	"""Apply the next ``limit`` buffered receipts with an id above ``after_id``.
+
+	Returns a dict with ``last_id`` (None when the buffer had nothing left),
+	``received``, ``duplicates``, ``updated``, ``unchanged``, ``waiting`` and
+	``dropped`` counts. Recipients, the daily rollup and the buffer change in
+	one transaction.
+	"""
+	limit = limit or get_batch_size()
+	now = now or timezone.now()
+	result = {'last_id': None, 'received': 0, 'duplicates': 0, 'updated': 0, 'unchanged': 0, 'waiting': 0, 'dropped': 0}
+	with transaction.atomic():
+		claimed = DeliveryReceipt.objects.filter(id__gt=after_id).order_by('id')
+		if connection.features.has_select_for_update_skip_locked:
+			# Concurrent appliers take different receipts instead of waiting
+			claimed = claimed.select_for_update(skip_locked=True)
+		receipts = list(claimed[:limit])
+		if not receipts:
+			return result
+		latest = _winners(receipts)
+		stats = DailyStatsDelta()
+		matched, updated, unchanged = _apply(OrgAlertRecipient, latest, True, stats)
+		rest = {key: receipt for key, receipt in latest.items() if key not in matched}
+		if rest:
+			school_matched, school_updated, school_unchanged = _apply(AlertRecipient, rest, False, stats)
+			matched |= school_matched
+			updated += school_updated
+			unchanged += school_unchanged
+		stats.apply()
+
+		retry_after = now - datetime.timedelta(seconds=get_retry_seconds())
+		waiting = {
+			receipt.id for key, receipt in latest.items()
+			if key not in matched and receipt.received_at >= retry_after
+		}
+		done = [receipt.id for receipt in receipts if receipt.id not in waiting]
+		for start in range(0, len(done), 500):
+			DeliveryReceipt.objects.filter(id__in=done[start:start + 500]).delete()
+
+	result.update(
+		last_id=receipts[-1].id,
+		received=len(receipts),
+		duplicates=len(receipts) - len(latest),
+		updated=updated,
+		unchanged=unchanged,
+		waiting=len(waiting),
+		dropped=len(latest) - len(matched) - len(waiting),
+	)
+	return result
+
+
+def apply_receipts(limit=None, now=None):
+	"""Apply everything in the buffer, batch by batch; returns the summed counts.
+
+	Receipts left waiting for their recipient are passed over until the next run.
+	"""
+	limit = limit or get_batch_size()
+	totals = {'received': 0, 'duplicates': 0, 'updated': 0, 'unchanged': 0, 'waiting': 0, 'dropped': 0}
+	after_id = 0
+	while True:
+		batch = apply_receipt_batch(after_id, limit, now)
+		for key in totals:
+			totals[key] += batch[key]
+		if batch['received'] < limit:
+			return totals
+		after_id = batch['last_id']
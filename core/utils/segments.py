@@ -0,0 +1,182 @@
+"""
+Rule-based dynamic contact segments.
+
+A segment is a list of rules over contact fields, ``created_at`` and message
+history, e.g.::
+
+	[{"type": "created_within_days", "value": 30},
+	 {"type": "last_broadcast_status", "value": "failed"}]
+
+``compile_rules`` turns them into a single ``Q`` (history rules become
+``EXISTS`` subqueries) so a segment's audience is one SQL query evaluated at
+send time; membership is never materialized.
+"""
+import datetime
+
+from django.conf import settings
+from django.db.models import Exists, OuterRef, Q, Subquery
+from django.utils import timezone
+
+from .. import constants
+from . import normalize_phone_number
+from ..models import Contact, ContactGroup, OrgAlertRecipient, OrgMessage
+
+
+class SegmentRuleError(ValueError):
+	"""Raised for a rule that is unknown or has an unusable value"""
+
+
+def _int_value(rule, minimum=0):
+	try:
+		value = int(rule.get('value'))
+	except (TypeError, ValueError):
+		raise SegmentRuleError(f"'{rule.get('type')}' needs a whole number")
+	if value < minimum:
+		raise SegmentRuleError(f"'{rule.get('type')}' must be at least {minimum}")
+	return value
+
+
+def _date_value(rule):
+	try:
+		return datetime.date.fromisoformat(str(rule.get('value')))
+	except ValueError:
+		raise SegmentRuleError(f"'{rule.get('type')}' needs a date (YYYY-MM-DD)")
+
+
+def _text_value(rule):
+	value = str(rule.get('value') or '').strip()
+	if not value:
+		raise SegmentRuleError(f"'{rule.get('type')}' needs a value")
+	return value
+
+
+def _days_ago(days):
+	return timezone.now() - datetime.timedelta(days=days)
+
+
+def _recipients(organization):
+	return OrgAlertRecipient.objects.filter(contact=OuterRef('pk'), message__organization=organization)
+
+
+def _name_contains(rule, organization):
+	return Q(name__icontains=_text_value(rule))
+
+
+def _name_startswith(rule, organization):
+	return Q(name__istartswith=_text_value(rule))
+
+
+def _phone_startswith(rule, organization):
+	value = _text_value(rule)
+	if not value.startswith('+'):
+		# Local prefixes such as "024" are stored with the country code
+		value = normalize_phone_number(value) or value
+	return Q(phone_number__startswith=value)
+
+
+def _created_within_days(rule, organization):
+	return Q(created_at__gte=_days_ago(_int_value(rule, minimum=1)))
+
+
+def _created_before(rule, organization):
+	return Q(created_at__date__lt=_date_value(rule))
+
+
+def _created_after(rule, organization):
+	return Q(created_at__date__gt=_date_value(rule))
+
+
+def _in_group(rule, organization):
+	group_id = _int_value(rule, minimum=1)
+	return Q(Exists(ContactGroup.contacts.through.objects.filter(
+		contact_id=OuterRef('pk'), contactgroup_id=group_id, contactgroup__organization=organization,
+	)))
+
+
+def _last_broadcast_status(rule, organization):
+	status = _text_value(rule)
+	if status not in ('pending', 'sent', 'failed'):
+		raise SegmentRuleError("'last_broadcast_status' must be pending, sent or failed")
+	latest = OrgMessage.objects.filter(organization=organization, sent=True).order_by('-created_at', '-id').values('id')[:1]
+	return Q(Exists(_recipients(organization).filter(message_id=Subquery(latest), status=status)))
+
+
+def _messaged_within_days(rule, organization):
+	cutoff = _days_ago(_int_value(rule, minimum=1))
+	return Q(Exists(_recipients(organization).filter(status='sent', sent_at__gte=cutoff)))
+
+
+def _failed_within_days(rule, organization):
+	cutoff = _days_ago(_int_value(rule, minimum=1))
+	return Q(Exists(_recipients(organization).filter(status='failed', message__created_at__gte=cutoff)))
+
+
+# type -> (label, compiler); labels are shown in the segment builder
+RULE_TYPES = {
+	'name_contains': ('Name contains', _name_contains),
+	'name_startswith': ('Name starts with', _name_startswith),
+	'phone_startswith': ('Phone starts with', _phone_startswith),
+	'created_within_days': ('Added in the last N days', _created_within_days),
+	'created_before': ('Added before date', _created_before),
+	'created_after': ('Added after date', _created_after),
+	'in_group': ('Member of group', _in_group),
+	'last_broadcast_status': ('Status in last broadcast', _last_broadcast_status),
+	'messaged_within_days': ('Sent a message in the last N days', _messaged_within_days),
+	'failed_within_days': ('Had a failed message in the last N days', _failed_within_days),
+}
+
+
+def compile_rules(rules, organization, match='all'):
+	"""Compile segment rules into one ``Q`` over ``Contact``.
+
+	Each rule is ``{"type": ..., "value": ..., "negate": bool}``; ``match`` is
+	``'all'`` (AND) or ``'any'`` (OR). Raises ``SegmentRuleError`` for bad rules.
+	"""
+	if not isinstance(rules, list) or not rules:
+		raise SegmentRuleError('A segment needs at least one rule')
+	combined = None
+	for rule in rules:
+		if not isinstance(rule, dict) or rule.get('type') not in RULE_TYPES:
+			raise SegmentRuleError(f"Unknown rule: {rule!r}")
+		q = RULE_TYPES[rule['type']][1](rule, organization)
+		if rule.get('negate'):
+			q = ~q
+		if combined is None:
+			combined = q
+		elif match == 'any':
+			combined |= q
+		else:
+			combined &= q
+	return combined
+
+
+def segment_contacts(segment):
+	"""The segment's current audience as a single (lazy) ``Contact`` queryset"""
+	condition = compile_rules(segment.rules, segment.organization, segment.match)
+	return Contact.objects.filter(organization=segment.organization).filter(condition)
+
+
+def get_count_max_age():
+	return getattr(settings, 'SEGMENT_COUNT_MAX_AGE', constants.SEGMENT_COUNT_MAX_AGE)
+
+
+def refresh_estimated_count(segment, force=False):
+	"""Return the segment's audience size, recounting only when the cached value is stale"""
+	fresh_after = timezone.now() - datetime.timedelta(seconds=get_count_max_age())
+	if not force and segment.estimated_count is not None and segment.count_refreshed_at and segment.count_refreshed_at >= fresh_after:
+		return segment.estimated_count
+	segment.estimated_count = segment_contacts(segment).count()
+	segment.count_refreshed_at = timezone.now()
+	type(segment).objects.filter(pk=segment.pk).update(
+		estimated_count=segment.estimated_count, count_refreshed_at=segment.count_refreshed_at,
+	)
+	return segment.estimated_count
+
+
+def add_segment_recipients(message, segments, batch_size=1000):
+	"""Create pending recipient rows for every segment contact not already on ``message``.
+
+	Each segment's audience is streamed from one query and inserted in batches.
+	Returns the number of recipient rows created.
+	"""
+	return sum(message.create_recipients(segment_contacts(segment), batch_size=batch_size) for segment in segments)
@@ -1,10 +1,21 @@
 import logging
+from datetime import timedelta
 from decimal import Decimal
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Q
 from django.utils import timezone
-from ..models import Sender, SenderAssignment, AuditLog
+from .. import constants
+from ..models import Sender, SenderAssignment, AuditLog, OrgAlertRecipient
+from .daily_stats import DailyStatsDelta, recipient_bucket, save_recipient
+from .networks import classify_network
+from .suppression import get_suppressed_numbers
 
 logger = logging.getLogger(__name__)
 
+SUPPRESSED_ERROR = 'Number is on the suppression list'
+
 
 def get_sender_for_organization(organization):
     """
@@ -26,9 +37,131 @@ def get_sender_for_organization(organization):
     return None
 
 
+def get_senders_for_organization(organization):
+    """
+    All usable senders assigned to the organization, oldest assignment first.
+    Returns an empty list if there are none.
+    """
+    try:
+        assignments = SenderAssignment.objects.filter(
+            organization=organization,
+            is_active=True,
+            sender__status__in=['available', 'assigned']
+        ).select_related('sender').order_by('assigned_at', 'id')
+        return [assignment.sender for assignment in assignments]
+    except Exception as e:
+        logger.error(f"Error getting senders for organization {organization.slug}: {str(e)}")
+    return []
+
+
+def get_sender_health(sender_ids):
+    """
+    Recent delivery success rate per (sender id, network), e.g. {(3, 'mtn'): 0.97}.
+
+    Built from one grouped query over the last SENDER_HEALTH_WINDOW_HOURS and
+    cached for SENDER_HEALTH_CACHE_SECONDS. Pairs with fewer than
+    SENDER_HEALTH_MIN_SAMPLE finished messages are left out (treated as healthy).
+    """
+    if not sender_ids:
+        return {}
+    key = 'sender_health_' + '_'.join(str(i) for i in sorted(sender_ids))
+    try:
+        health = cache.get(key)
+    except Exception:
+        health = None
+    if health is not None:
+        return health
+
+    since = timezone.now() - timedelta(hours=getattr(settings, 'SENDER_HEALTH_WINDOW_HOURS', constants.SENDER_HEALTH_WINDOW_HOURS))
+    min_sample = getattr(settings, 'SENDER_HEALTH_MIN_SAMPLE', constants.SENDER_HEALTH_MIN_SAMPLE)
+    rows = OrgAlertRecipient.objects.filter(
+        sender_id__in=sender_ids,
+        status__in=['sent', 'failed'],
+        message__created_at__gte=since,
+    ).values('sender_id', 'network').annotate(
+        total=Count('id'),
+        failed=Count('id', filter=Q(status='failed')),
+    ).order_by()
+    health = {}
+    for row in rows:
+        if row['total'] >= min_sample:
+            health[(row['sender_id'], row['network'])] = 1 - row['failed'] / row['total']
+    try:
+        cache.set(key, health, getattr(settings, 'SENDER_HEALTH_CACHE_SECONDS', constants.SENDER_HEALTH_CACHE_SECONDS))
+    except Exception:
+        pass
+    return health
+
+
+def choose_sender(senders, network, count, health=None, policy=None, planned=None):
+    """
+    Pick the sender for ``count`` messages to ``network``.
+
+    With the 'cost' policy (default) the cheapest sender for the network wins
+    and health breaks ties; with 'health' it is the other way round. Senders
+    without gateway balance for their share at their cost for the network (on
+    top of the cost ``planned`` has already given them) are skipped. Remaining
+    ties keep assignment order.
+    """
+    health = health or {}
+    planned = planned or {}
+    policy = policy or getattr(settings, 'SENDER_ROUTING_POLICY', constants.SENDER_ROUTING_POLICY)
+    candidates = [
+        sender for sender in senders
+        if sender.provider in SEND_FUNCTIONS and sender.can_send_sms(count, network, planned.get(sender.id, 0))
+    ]
+    if not candidates:
+        return None
+
+    def rank(sender):
+        cost = sender.get_sms_cost(network)
+        success = health.get((sender.id, network), 1.0)
+        return (-success, cost) if policy == 'health' else (cost, -success)
+
+    return min(candidates, key=rank)
+
+
+def plan_routes(organization, senders, recipients, user=None):
+    """
+    Group recipients by destination network and pick a sender for each group.
+
+    Returns a list of (sender, network, recipients). Raises before anything is
+    sent if some network's recipients cannot be routed.
+    """
+    groups = {}
+    for ar in recipients:
+        network = ar.network or classify_network(ar.contact.phone_number)
+        groups.setdefault(network, []).append(ar)
+
+    health = get_sender_health([sender.id for sender in senders])
+    planned = {}
+    routes = []
+    # Largest groups first, so they get first pick of sender balance
+    for network, group in sorted(groups.items(), key=lambda item: -len(item[1])):
+        sender = choose_sender(senders, network, len(group), health=health, planned=planned)
+        if sender is None:
+            unsupported = [s.provider for s in senders if s.provider not in SEND_FUNCTIONS]
+            if unsupported and len(unsupported) == len(senders):
+                raise Exception(f"Unsupported provider: {unsupported[0]}")
+            # Log low balance
+            AuditLog.objects.create(
+                user=user,  # Can be None for background commands
+                organization=organization,
+                sender=senders[0],
+                action='gateway_balance_low',
+                details={'required': len(group), 'network': network, 'available': str(senders[0].gateway_balance)},
+            )
+            raise Exception("Sender gateway balance is insufficient. Please contact support.")
+        planned[sender.id] = planned.get(sender.id, 0) + sender.get_sms_cost(network) * len(group)
+        routes.append((sender, network, group))
+    return routes
+
+
 def send_sms_through_sender_pool(organization, message, sms_body, user):
     """
-    Send SMS through the assigned sender in the sender pool.
+    Send SMS through the senders assigned to the organization.
+    Recipients are grouped by destination network and each group goes through
+    the cheapest (or healthiest, see SENDER_ROUTING_POLICY) assigned sender.
     Requires sender assignment - no fallback to legacy system.
 
     Args:
@@ -38,17 +171,18 @@ def send_sms_through_sender_pool(organization, message, sms_body, user):
         user: User who initiated the send
 
     Returns:
-        tuple: (processed_count, total_cost, sender_used)
+        tuple: (processed_count, total_cost, sender_used) where sender_used is
+        the sender that carried the most recipients
 
     Raises:
         Exception: If no sender is assigned to the organization
     """
-    # Get assigned sender
-    sender = get_sender_for_organization(organization)
+    # Get assigned senders
+    senders = get_senders_for_organization(organization)
 
-    if sender:
+    if senders:
         # Use sender pool system
-        return _send_via_sender_pool(organization, message, sms_body, user, sender)
+        return _send_via_sender_pool(organization, message, sms_body, user, senders)
     else:
         # No fallback - sender pool is required
         raise Exception(
@@ -57,58 +191,62 @@ def send_sms_through_sender_pool(organization, message, sms_body, user):
         )
 
 
-def _send_via_sender_pool(organization, message, sms_body, user, sender):
-    """Send SMS using the assigned sender from the pool."""
-    # Check sender gateway balance
-    if not sender.can_send_sms(message.recipients_status.count()):
-        # Log low balance
-        AuditLog.objects.create(
-            user=user,  # Can be None for background commands
-            organization=organization,
-            sender=sender,
-            action='gateway_balance_low',
-            details={'required': message.recipients_status.count(), 'available': str(sender.gateway_balance)},
-        )
-        raise Exception("Sender gateway balance is insufficient. Please contact support.")
+def _send_via_sender_pool(organization, message, sms_body, user, senders):
+    """Send SMS using the assigned senders from the pool, routed per network."""
+    recipients = list(message.get_recipient_rows().select_related('contact').order_by('id'))
+    routes = plan_routes(organization, senders, recipients, user=user)
 
     # Check organization credit balance
-    recipient_count = message.recipients_status.count()
+    recipient_count = len(recipients)
     required_credits = organization.get_current_sms_rate() * recipient_count
     if organization.sms_credit_balance < required_credits:
         raise Exception("Insufficient SMS credits. Please top up your balance.")
 
     processed = 0
-    total_cost = Decimal('0')
-
-    # Send through the appropriate provider
-    if sender.provider == 'hubtel':
-        sent_ids = send_via_hubtel(sender, message, sms_body)
-    elif sender.provider == 'clicksend':
-        sent_ids = send_via_clicksend(sender, message, sms_body)
-    else:
-        raise Exception(f"Unsupported provider: {sender.provider}")
-
-    # Update recipients and deduct balances
-    for ar, sent_id in zip(message.recipients_status.all(), sent_ids):
-        if sent_id:
-            ar.provider_message_id = str(sent_id)
-            ar.status = 'sent'
-            ar.sent_at = timezone.now()
-            processed += 1
-        else:
-            ar.status = 'failed'
-        ar.save()
-
-    # Deduct balances
+    carried = {}
+    suppressed = get_suppressed_numbers(organization.id)
+
+    for sender, network, group in routes:
+        # Send through the appropriate provider
+        sent_ids = SEND_FUNCTIONS[sender.provider](sender, message, sms_body, recipients=group)
+
+        # Update recipients, their counters and the sender's balance in one
+        # transaction per group, so a failure in a later group leaves these counted
+        sent_here = 0
+        with transaction.atomic():
+            stats = DailyStatsDelta()
+            for ar, sent_id in zip(group, sent_ids):
+                before = recipient_bucket(ar, message)
+                ar.sender = sender
+                ar.network = network
+                if sent_id:
+                    ar.provider_message_id = str(sent_id)
+                    ar.status = 'sent'
+                    ar.sent_at = timezone.now()
+                    sent_here += 1
+                else:
+                    ar.status = 'failed'
+                    if ar.contact.phone_number in suppressed:
+                        ar.set_error(SUPPRESSED_ERROR, code='suppressed')
+                    else:
+                        ar.set_error(code='not_accepted')
+                ar.save()
+                stats.move(before, recipient_bucket(ar, message))
+            stats.apply()
+            if sent_here > 0:
+                sender.deduct_gateway_balance(sent_here, network)
+        processed += sent_here
+        carried[sender] = carried.get(sender, 0) + len(group)
+
+    # Deduct organization balance
     if processed > 0:
-        sender.deduct_gateway_balance(processed)
         organization.deduct_sms_cost(processed)
 
-    # Update message status
-    message.sent = True
-    message.save()
+    # Update message status (only the flag, so the recipient counters are not overwritten)
+    message.mark_as_sent()
 
-    return processed, organization.get_current_sms_rate() * processed, sender
+    sender_used = max(carried, key=carried.get) if carried else senders[0]
+    return processed, organization.get_current_sms_rate() * processed, sender_used
 
 
 def _send_via_legacy_system(organization, message, sms_body, user):
@@ -116,7 +254,7 @@ def _send_via_legacy_system(organization, message, sms_body, user):
     logger.warning(f"Using legacy SMS sending for organization {organization.slug} - sender pool not configured")
     
     # Check organization credit balance
-    recipient_count = message.recipients_status.count()
+    recipient_count = message.get_recipient_rows().count()
     required_credits = organization.get_current_sms_rate() * recipient_count
     if organization.sms_credit_balance < required_credits:
         raise Exception("Insufficient SMS credits. Please top up your balance.")
@@ -126,10 +264,20 @@ def _send_via_legacy_system(organization, message, sms_body, user):
 
     # Try Hubtel first (primary), then ClickSend (fallback)
     sent_ids = []
-    for ar in message.recipients_status.all():
+    suppressed = get_suppressed_numbers(organization.id)
+    for ar in message.get_recipient_rows():
         sent_id = None
+        before = recipient_bucket(ar, message)
+        if ar.contact.phone_number in suppressed:
+            # Suppressed after the recipient row was created
+            sent_ids.append(None)
+            ar.status = 'failed'
+            ar.set_error(SUPPRESSED_ERROR, code='suppressed')
+            save_recipient(ar, message, before)
+            continue
         
         # Try Hubtel
+        error = None
         try:
             from .. import hubtel_utils
             # Use organization as tenant for settings-based credentials
@@ -143,6 +291,7 @@ def _send_via_legacy_system(organization, message, sms_body, user):
             except Exception as e2:
                 logger.error(f"ClickSend also failed for {ar.contact.phone_number}: {str(e2)}")
                 sent_id = None
+                error = str(e2)
         
         sent_ids.append(sent_id)
         if sent_id:
@@ -152,26 +301,30 @@ def _send_via_legacy_system(organization, message, sms_body, user):
             processed += 1
         else:
             ar.status = 'failed'
-        ar.save()
+            ar.set_error(error, code=None if error else 'not_accepted')
+        save_recipient(ar, message, before)
 
     # Deduct balance if any messages were sent
     if processed > 0:
         organization.deduct_sms_cost(processed)
         total_cost = organization.get_current_sms_rate() * processed
 
-    # Update message status
-    message.sent = True
-    message.save()
+    # Update message status (only the flag, so the recipient counters are not overwritten)
+    message.mark_as_sent()
 
     return processed, total_cost, None  # No sender for legacy system
 
 
-def send_via_hubtel(sender, message, sms_body):
-    """Send SMS via Hubtel using sender credentials"""
+def send_via_hubtel(sender, message, sms_body, recipients=None):
+    """Send SMS via Hubtel using sender credentials (to ``recipients``, default all)"""
     from .. import hubtel_utils
 
     sent_ids = []
-    for ar in message.recipients_status.all():
+    suppressed = get_suppressed_numbers(message.organization_id)
+    for ar in (message.get_recipient_rows() if recipients is None else recipients):
+        if ar.contact.phone_number in suppressed:
+            sent_ids.append(None)
+            continue
         try:
             # Use sender's credentials instead of organization's
             sent_id = hubtel_utils.send_sms_with_credentials(
@@ -190,15 +343,19 @@ def send_via_hubtel(sender, message, sms_body):
     return sent_ids
 
 
-def send_via_clicksend(sender, message, sms_body):
-    """Send SMS via ClickSend using sender credentials"""
+def send_via_clicksend(sender, message, sms_body, recipients=None):
+    """Send SMS via ClickSend using sender credentials (to ``recipients``, default all)"""
     try:
         from .. import clicksend_utils
     except ImportError:
         raise Exception("ClickSend integration not available")
 
     sent_ids = []
-    for ar in message.recipients_status.all():
+    suppressed = get_suppressed_numbers(message.organization_id)
+    for ar in (message.get_recipient_rows() if recipients is None else recipients):
+        if ar.contact.phone_number in suppressed:
+            sent_ids.append(None)
+            continue
         try:
             sent_id = clicksend_utils.send_sms_with_credentials(
                 to_number=ar.contact.phone_number,
@@ -212,3 +369,10 @@ def send_via_clicksend(sender, message, sms_body):
             logger.error(f"ClickSend send failed for {ar.contact.phone_number}: {str(e)}")
             sent_ids.append(None)
     return sent_ids
+
+
+# provider -> function(sender, message, sms_body, recipients) returning one id (or None) per recipient
+SEND_FUNCTIONS = {
+    'hubtel': send_via_hubtel,
+    'clicksend': send_via_clicksend,
+}
@@ -0,0 +1,136 @@
+"""
+Suppression list lookups used before recipients are created and sent.
+
+Each organization's suppressed numbers (and the platform-wide ones) are held
+as a ``frozenset`` in process memory, so checking a number is a hash lookup
+rather than a query per recipient. The sets are keyed by a version counter in
+the shared cache; ``bump_suppression_version`` (called on every change) makes
+every worker reload, after at most ``SUPPRESSION_RECHECK_SECONDS``.
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Q
+
+from .. import constants
+from . import normalize_phone_numbers
+from ..models import SuppressedNumber
+
+GLOBAL_SCOPE = 'global'
+
+# scope -> (version, frozenset of numbers, monotonic time the version was checked);
+# scope is an organization id or GLOBAL_SCOPE
+_local_sets = {}
+
+
+def get_recheck_seconds():
+	return getattr(settings, 'SUPPRESSION_RECHECK_SECONDS', constants.SUPPRESSION_RECHECK_SECONDS)
+
+
+def _version_key(scope):
+	return f"suppression_version_{scope}"
+
+
+def _fresh_version():
+	# Time-based start values: a counter that was evicted never restarts at a
+	# number some worker still holds a set for
+	return int(time.time() * 1000)
+
+
+def get_suppression_version(scope):
+	"""Current version for ``scope``; 0 (never cached locally) if the cache is down"""
+	try:
+		version = cache.get(_version_key(scope))
+		if version is None:
+			cache.add(_version_key(scope), _fresh_version(), None)
+			version = cache.get(_version_key(scope))
+		return version or 0
+	except Exception:
+		return 0
+
+
+def bump_suppression_version(scope):
+	try:
+		cache.incr(_version_key(scope))
+	except ValueError:
+		cache.set(_version_key(scope), _fresh_version(), None)
+	except Exception:
+		pass
+	_local_sets.pop(scope, None)
+
+
+def _load_numbers(scope):
+	numbers = SuppressedNumber.objects.order_by()
+	if scope == GLOBAL_SCOPE:
+		numbers = numbers.filter(organization__isnull=True)
+	else:
+		numbers = numbers.filter(organization_id=scope)
+	return frozenset(numbers.values_list('phone_number', flat=True))
+
+
+def _scope_numbers(scope):
+	now = time.monotonic()
+	held = _local_sets.get(scope)
+	if held is not None and held[0] and now - held[2] < get_recheck_seconds():
+		return held[1]
+	version = get_suppression_version(scope)
+	if version and held is not None and held[0] == version:
+		_local_sets[scope] = (version, held[1], now)
+		return held[1]
+	numbers = _load_numbers(scope)
+	_local_sets[scope] = (version, numbers, now)
+	return numbers
+
+
+def get_suppressed_numbers(organization_id):
+	"""Numbers that must not be messaged for this organization (its own plus global)"""
+	global_numbers = _scope_numbers(GLOBAL_SCOPE)
+	if organization_id is None:
+		return global_numbers
+	return global_numbers | _scope_numbers(organization_id)
+
+
+def exclude_suppressed(contacts, organization_id):
+	"""``contacts`` without the numbers ``get_suppressed_numbers`` drops, as a subquery on the same rows"""
+	numbers = SuppressedNumber.objects.filter(Q(organization__isnull=True) | Q(organization_id=organization_id))
+	return contacts.exclude(phone_number__in=numbers.values('phone_number'))
+
+
+def is_suppressed(organization_id, phone_number):
+	return phone_number in _scope_numbers(GLOBAL_SCOPE) or (
+		organization_id is not None and phone_number in _scope_numbers(organization_id)
+	)
+
+
+def _scope_for(organization):
+	return GLOBAL_SCOPE if organization is None else organization.id
+
+
+def suppress_numbers(organization, phones, reason='manual', note='', created_by=None):
+	"""Add numbers (any input format) to the organization's list, or the global
+	list when ``organization`` is None. Returns how many valid numbers were given.
+	"""
+	normalized, valid = normalize_phone_numbers(phones)
+	numbers = sorted({n for n, ok in zip(normalized, valid) if ok})
+	SuppressedNumber.objects.bulk_create(
+		[SuppressedNumber(organization=organization, phone_number=n, reason=reason, note=note, created_by=created_by) for n in numbers],
+		ignore_conflicts=True,
+	)
+	scope = _scope_for(organization)
+	transaction.on_commit(lambda: bump_suppression_version(scope))
+	return len(numbers)
+
+
+def unsuppress_numbers(organization, phones):
+	"""Remove numbers from the organization's (or the global) list; returns rows deleted"""
+	normalized, valid = normalize_phone_numbers(phones)
+	numbers = [n for n, ok in zip(normalized, valid) if ok]
+	entries = SuppressedNumber.objects.filter(phone_number__in=numbers)
+	if organization is None:
+		entries = entries.filter(organization__isnull=True)
+	else:
+		entries = entries.filter(organization=organization)
+	# Queryset delete sends post_delete per row, which bumps the version
+	return entries.delete()[0]
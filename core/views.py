@@ -455,206 +455,31 @@ def dashboard(request, school_slug=None):
 				if logo_file and logo_path:
 					school.logo.name = logo_path
 					school.save()
-		from .models import Message, AlertRecipient, Organization, OrgMessage, OrgAlertRecipient
-		schools = School.objects.all()
-		school_stats = []
-		for school in schools:
-			messages = Message.objects.filter(school=school)
-			total_messages = messages.count()
-			sent_messages = messages.filter(sent=True).count()
-			recipients = AlertRecipient.objects.filter(message__school=school)
-			total_recipients = recipients.count()
-			sent_recipients = recipients.filter(status='sent').count()
-			failed_recipients = recipients.filter(status='failed').count()
-			delivery_rate = (sent_recipients / total_recipients * 100) if total_recipients else 0
-			school_stats.append({
-				'school': school,
-				'total_messages': total_messages,
-				'sent_messages': sent_messages,
-				'total_recipients': total_recipients,
-				'sent_recipients': sent_recipients,
-				'failed_recipients': failed_recipients,
-				'delivery_rate': delivery_rate,
-			})
-		orgs = Organization.objects.all()
-		org_stats = []
-		for org in orgs:
-			messages = OrgMessage.objects.filter(organization=org)
-			total_messages = messages.count()
-			sent_messages = messages.filter(sent=True).count()
-			recipients = OrgAlertRecipient.objects.filter(message__organization=org)
-			total_recipients = recipients.count()
-			sent_recipients = recipients.filter(status='sent').count()
-			failed_recipients = recipients.filter(status='failed').count()
-			delivery_rate = (sent_recipients / total_recipients * 100) if total_recipients else 0
-			# decrypt sender id for display (secrets are stored encrypted)
-			from .utils.crypto_utils import decrypt_value
-			sender_id = getattr(org, 'sender_id', None)
-			sender_display = decrypt_value(sender_id) if sender_id else None
-			org_stats.append({
-				'organization': org,
-				'total_messages': total_messages,
-				'sent_messages': sent_messages,
-				'total_recipients': total_recipients,
-				'sent_recipients': sent_recipients,
-				'failed_recipients': failed_recipients,
-				'delivery_rate': delivery_rate,
-				'sender_id_display': sender_display,
-			})
-		# Overall message totals for the chart
-		from .models import Message as SchoolMessage, OrgMessage as OrganizationMessage
-		total_msgs = SchoolMessage.objects.count() + OrganizationMessage.objects.count()
-		total_sent = SchoolMessage.objects.filter(sent=True).count() + OrganizationMessage.objects.filter(sent=True).count()
-		# Build 7-day trends (oldest -> newest)
-		from django.utils import timezone
-		import datetime
-		from django.db.models.functions import TruncDate
-		from django.db.models import Count
-		trend_days = 30  # Show 30 days of trends instead of 7
-		now = timezone.now()
-		start_date = (now - datetime.timedelta(days=trend_days - 1)).date()
-		# Aggregate sent counts by sent_at date for school and org recipients
-		from .models import AlertRecipient as SchoolAlertRecipient, OrgAlertRecipient as OrganizationAlertRecipient
-		sent_school_qs = SchoolAlertRecipient.objects.filter(status='sent', sent_at__date__gte=start_date).annotate(day=TruncDate('sent_at')).values('day').annotate(count=Count('id'))
-		sent_org_qs = OrganizationAlertRecipient.objects.filter(status='sent', sent_at__date__gte=start_date).annotate(day=TruncDate('sent_at')).values('day').annotate(count=Count('id'))
-		# Aggregate totals by message created date (for delivery denominator)
-		total_school_qs = SchoolAlertRecipient.objects.filter(message__created_at__date__gte=start_date).annotate(day=TruncDate('message__created_at')).values('day').annotate(total=Count('id'))
-		total_org_qs = OrganizationAlertRecipient.objects.filter(message__created_at__date__gte=start_date).annotate(day=TruncDate('message__created_at')).values('day').annotate(total=Count('id'))
-		# Aggregate org creations
-		orgs_qs = Organization.objects.filter(created_at__date__gte=start_date).annotate(day=TruncDate('created_at')).values('day').annotate(count=Count('id'))
-		# build dicts keyed by date for quick lookup
-		sent_by_date = {}
-		for r in sent_school_qs:
-			sent_by_date[r['day']] = sent_by_date.get(r['day'], 0) + r['count']
-		for r in sent_org_qs:
-			sent_by_date[r['day']] = sent_by_date.get(r['day'], 0) + r['count']
-		total_by_date = {}
-		for r in total_school_qs:
-			total_by_date[r['day']] = total_by_date.get(r['day'], 0) + r['total']
-		for r in total_org_qs:
-			total_by_date[r['day']] = total_by_date.get(r['day'], 0) + r['total']
-		orgs_by_date = { r['day']: r['count'] for r in orgs_qs }
-		# Build arrays oldest->newest
-		messages_trend = []
-		orgs_trend = []
-		delivery_trend = []
-		for i in range(trend_days - 1, -1, -1):
-			d = (now - datetime.timedelta(days=i)).date()
-			messages_trend.append(sent_by_date.get(d, 0))
-			orgs_trend.append(orgs_by_date.get(d, 0))
-			total = total_by_date.get(d, 0)
-			sent = sent_by_date.get(d, 0)
-			delivery_trend.append(int((sent / total * 100)) if total else 0)
-
-		# Calculate average delivery rate
-		avg_delivery_rate = 0
-		if delivery_trend:
-			valid_rates = [rate for rate in delivery_trend if rate > 0]
-			if valid_rates:
-				avg_delivery_rate = sum(valid_rates) / len(valid_rates)
-
-		# Billing analytics
+		# Platform KPIs: a few grouped queries, cached stale-while-revalidate
+		from .utils.dashboard_metrics import PlatformDashboardMetrics
+		platform_metrics = PlatformDashboardMetrics()
+		if request.method == "POST":
+			platform_metrics.invalidate()
+		metrics = platform_metrics.get_all_metrics()
+
+		# Work queues are read live; each is a single bounded query
 		from .models import Payment
-		from django.db.models import Sum, Count, Avg
-		from decimal import Decimal
-
-		# Payment statistics
-		total_payments = Payment.objects.filter(status='success').count()
-		total_revenue = Payment.objects.filter(status='success').aggregate(total=Sum('amount'))['total'] or Decimal('0')
-		recent_payments = Payment.objects.filter(status='success', created_at__date__gte=start_date).count()
-
-		# Organization balance statistics
-		orgs_with_balance = Organization.objects.filter(sms_credit_balance__gt=Decimal('0')).count()
-		total_org_balance = Organization.objects.aggregate(total=Sum('sms_credit_balance'))['total'] or Decimal('0')
-		avg_org_balance = total_org_balance / orgs_with_balance if orgs_with_balance > 0 else Decimal('0')
-		premium_orgs = Organization.objects.filter(is_premium=True).count()
-		total_orgs = Organization.objects.count()
-		premium_percentage = (premium_orgs / total_orgs * 100) if total_orgs > 0 else 0
-
-		# SMS usage statistics for pay-as-you-go
-		total_sms_sent_all = Organization.objects.aggregate(total=Sum('total_sms_sent'))['total'] or 0
-		total_balance_all = Organization.objects.aggregate(total=Sum('sms_credit_balance'))['total'] or Decimal('0.00')
-		avg_sms_rate = Organization.objects.aggregate(avg=Avg('sms_rate'))['avg'] or Decimal('0.25')
-
-		# Recent payments trend (7 days)
-		payments_trend = []
-		for i in range(trend_days - 1, -1, -1):
-			d = (now - datetime.timedelta(days=i)).date()
-			day_payments = Payment.objects.filter(status='success', created_at__date=d).count()
-			payments_trend.append(day_payments)
-
-		# Calculate trend totals for template display
-		total_orgs_this_week = sum(orgs_trend)
-		total_payments_this_week = sum(payments_trend)
-
-		# Recent payment transactions (last 10 successful payments)
 		recent_payment_transactions = Payment.objects.filter(status='success').select_related('organization').order_by('-created_at')[:10]
-
-		# Top paying organizations
-		top_orgs = Organization.objects.filter(sms_credit_balance__gt=Decimal('0')).order_by('-sms_credit_balance')[:5]
-		top_payers = []
-		for org in top_orgs:
-			total_paid = Payment.objects.filter(organization=org, status='success').aggregate(total=Sum('amount'))['total'] or Decimal('0')
-			top_payers.append({
-				'organization': org,
-				'balance': org.sms_credit_balance,
-				'total_paid': total_paid,
-			})
-
-		# Pending organization approvals
 		pending_approvals = Organization.objects.filter(approval_status='pending').order_by('-created_at')
-
-		# Approved enrollment requests that need manual account creation
 		approved_enrollment_requests = EnrollmentRequest.objects.filter(status='approved').order_by('-reviewed_at')[:10]  # Show latest 10
-
-		# Pending enrollment requests that need review
 		pending_enrollment_requests = EnrollmentRequest.objects.filter(status='pending').order_by('-created_at')[:10]  # Show latest 10
 
-		# Additional enrollment request statistics
-		from django.utils import timezone
-		from datetime import timedelta
-		thirty_days_ago = timezone.now() - timedelta(days=30)
-		total_enrollment_requests = EnrollmentRequest.objects.filter(created_at__gte=thirty_days_ago).count()
-		rejected_enrollment_requests = EnrollmentRequest.objects.filter(status='rejected', reviewed_at__gte=thirty_days_ago).count()
-
-		# Banned organizations count
-		banned_orgs = Organization.objects.filter(banned=True).count()
-
-		context = {"schools": schools, "school_stats": school_stats, "org_stats": org_stats, "notice": notice,
-			"total_messages": total_msgs, "total_sent": total_sent,
-			"messages_trend": messages_trend, "orgs_trend": orgs_trend, "delivery_trend": delivery_trend, "avg_delivery_rate": avg_delivery_rate,
+		context = {"schools": School.objects.all(), "notice": notice,
 			"hubtel_dry_run": getattr(settings, 'HUBTEL_DRY_RUN', False),
 			"clicksend_dry_run": getattr(settings, 'CLICKSEND_DRY_RUN', False),
-			# Billing analytics
-			"total_payments": total_payments,
-			"total_revenue": total_revenue,
-			"recent_payments": recent_payments,
-			"orgs_with_balance": orgs_with_balance,
-			"total_org_balance": total_org_balance,
-			"avg_org_balance": avg_org_balance,
-			"payments_trend": payments_trend,
-			"total_orgs_this_week": total_orgs_this_week,
-			"total_payments_this_week": total_payments_this_week,
-			"top_payers": top_payers,
-			# Premium analytics
-			"premium_orgs": premium_orgs,
-			"total_orgs": total_orgs,
-			"premium_percentage": premium_percentage,
-			# Pay-as-you-go analytics
-			"total_sms_sent_all": total_sms_sent_all,
-			"total_balance_all": total_balance_all,
-			"avg_sms_rate": avg_sms_rate,
+			**metrics,
 			# Pending approvals
 			"pending_approvals": pending_approvals,
 			# Enrollment requests
 			"approved_enrollment_requests": approved_enrollment_requests,
 			"pending_enrollment_requests": pending_enrollment_requests,
-			"total_enrollment_requests": total_enrollment_requests,
-			"rejected_enrollment_requests": rejected_enrollment_requests,
 			# Recent payment transactions
 			"recent_payment_transactions": recent_payment_transactions,
-			# Banned organizations
-			"banned_orgs": banned_orgs,
 		}
 		return render(request, "super_admin_dashboard.html", context)
 
@@ -723,9 +548,11 @@ def dashboard(request, school_slug=None):
 		msgs_sent_week = messages.filter(sent=True, created_at__date__gte=week_ago).count()
 		month_ago = today - timezone.timedelta(days=30)
 		msgs_sent_month = messages.filter(sent=True, created_at__date__gte=month_ago).count()
-		from .models import AlertRecipient
-		total_recipients = AlertRecipient.objects.filter(message__school=school).count()
-		sent_recipients = AlertRecipient.objects.filter(message__school=school, status='sent').count()
+		from .models import AlertRecipient, DeliveryArchive
+		from .utils.archive import archived_recipient_totals
+		archived = archived_recipient_totals(DeliveryArchive.SCHOOL_RECIPIENTS, [school.id]).get(school.id, {'total': 0, 'sent': 0})
+		total_recipients = AlertRecipient.objects.filter(message__school=school).count() + archived['total']
+		sent_recipients = AlertRecipient.objects.filter(message__school=school, status='sent').count() + archived['sent']
 		delivery_rate = (sent_recipients / total_recipients * 100) if total_recipients else 0
 		return render(request, "school_admin_dashboard.html", {
 			"school": school,
@@ -1031,50 +858,45 @@ def audit_message_logs_view(request):
     """Comprehensive audit view of all organization message logs including deleted ones"""
     from .models import OrgAlertRecipient
     
-    # filters
+    from urllib.parse import urlencode
+    from .utils.exports import parse_date
+    from .utils.message_logs import AUDIT_LOG_ONLY, filter_logs, log_page
+
+    # filters (YYYY-MM-DD dates; bad input is ignored)
     status = request.GET.get('status')
-    date_from = request.GET.get('from')
-    date_to = request.GET.get('to')
+    date_from = parse_date(request.GET.get('from'))
+    date_to = parse_date(request.GET.get('to'))
     org_slug = request.GET.get('org')
     show_deleted = request.GET.get('show_deleted', 'false') == 'true'
     
-    logs = OrgAlertRecipient.objects.select_related('message__organization', 'contact').all()
+    logs = OrgAlertRecipient.objects.select_related('message__organization', 'contact').only(*AUDIT_LOG_ONLY)
     
     # Always show deleted logs for audit purposes
     if not show_deleted:
         logs = logs.filter(is_deleted=False)
-    
-    if status:
-        logs = logs.filter(status=status)
     if org_slug:
-        logs = logs.filter(message__organization__slug=org_slug)
-        
-    # Parse date filter inputs (expected YYYY-MM-DD). Use sent_at__date to avoid timezone-aware/datetime issues.
-    import datetime as _dt
-    if date_from:
-        try:
-            dfrom = _dt.date.fromisoformat(date_from)
-            logs = logs.filter(sent_at__date__gte=dfrom)
-        except Exception:
-            # ignore bad input
-            date_from = None
-    if date_to:
-        try:
-            dto = _dt.date.fromisoformat(date_to)
-            logs = logs.filter(sent_at__date__lte=dto)
-        except Exception:
-            date_to = None
-    
-    logs = logs.order_by('-sent_at')
+        logs = logs.filter(organization__slug=org_slug)
+    logs = filter_logs(logs, status, date_from, date_to)
+
+    # One keyset page on (sent_at, id), newest first
+    page = log_page(logs, after=request.GET.get('after'), before=request.GET.get('before'))
+    filters = {
+        key: value for key, value in (
+            ('status', status), ('org', org_slug), ('from', date_from), ('to', date_to),
+            ('show_deleted', 'true' if show_deleted else None),
+        ) if value
+    }
     
     # Get organizations for filter dropdown
     organizations = Organization.objects.filter(is_active=True).order_by('name')
     
     context = {
-        'logs': logs,
+        'logs': page.items,
+        'page': page,
+        'filter_query': urlencode(filters),
         'status': status,
-        'from': date_from,
-        'to': date_to,
+        'from': date_from.isoformat() if date_from else None,
+        'to': date_to.isoformat() if date_to else None,
         'org_slug': org_slug,
         'organizations': organizations,
         'show_deleted': show_deleted,
@@ -1618,7 +1440,8 @@ def org_dashboard(request, org_slug=None):
 			if contact_name and raw_phone:
 				from .utils import normalize_phone_number
 				phone_number = normalize_phone_number(raw_phone)
-				Contact.objects.create(organization=organization, name=contact_name, phone_number=phone_number)
+				# Re-adding a known number just refreshes its name
+				Contact.objects.update_or_create(organization=organization, phone_number=phone_number, defaults={'name': contact_name})
 			elif sms_body and scheduled_time:
 				import datetime
 				from django.utils import timezone
@@ -1635,8 +1458,7 @@ def org_dashboard(request, org_slug=None):
 					contacts = Contact.objects.filter(organization=organization, phone_number__in=phone_numbers)
 				else:
 					contacts = Contact.objects.filter(organization=organization)
-				for c in contacts:
-					OrgAlertRecipient.objects.create(message=msg, contact=c, status='pending')
+				msg.create_recipients(contacts)
 
 	# Use the new metrics service
 	from .utils.dashboard_metrics import OrganizationDashboardMetrics
@@ -1873,17 +1695,12 @@ def org_send_sms(request, org_slug=None):
 	error = None
 	success = None
 
-	# Paginate contacts for better performance
-	from django.core.paginator import Paginator
-	contacts_page = request.GET.get('contacts_page', 1)
-	contacts_qs = Contact.objects.filter(organization=org).order_by('name')
-	contacts_paginator = Paginator(contacts_qs, 50)  # 50 contacts per page
-	try:
-		contacts = contacts_paginator.page(contacts_page)
-	except:
-		contacts = contacts_paginator.page(1)
+	# Individual recipients are picked through org_contact_autocomplete
+	contact_count = Contact.objects.filter(organization=org).count()
 
 	groups = ContactGroup.objects.filter(organization=org)
+	from .models import ContactSegment
+	segments = ContactSegment.objects.filter(organization=org)
 
 	if request.method == 'POST':
 		# allow selecting a template and/or typing custom message
@@ -1899,6 +1716,7 @@ def org_send_sms(request, org_slug=None):
 		action = request.POST.get('action')
 		selected_contacts = request.POST.getlist('contacts')
 		selected_groups = request.POST.getlist('groups')
+		selected_segments = list(segments.filter(id__in=[s for s in request.POST.getlist('segments') if s.isdigit()]))
 
 		# gather contact queryset
 		if selected_contacts:
@@ -1910,25 +1728,37 @@ def org_send_sms(request, org_slug=None):
 			contact_qs = contact_qs | grp_contacts
 		contact_qs = contact_qs.distinct()
 		# If no explicit recipients selected, default to all contacts
-		if not selected_contacts and not selected_groups:
+		if not selected_contacts and not selected_groups and not selected_segments:
 			contact_qs = Contact.objects.filter(organization=org)
+		# Segments are dynamic: their rules are evaluated as part of the same query
+		audience_qs = contact_qs
+		if selected_segments:
+			from django.db.models import Q
+			from .utils.segments import compile_rules
+			condition = Q(id__in=contact_qs.values('id'))
+			for segment in selected_segments:
+				condition |= compile_rules(segment.rules, org, segment.match)
+			audience_qs = Contact.objects.filter(organization=org).filter(condition)
 
 		# If action not provided (e.g., user pressed Enter), default based on presence of scheduled_time
 		if not action:
 			action = 'schedule' if scheduled_time else 'send_now'
 
-		if sms_body and contact_qs.exists():
+		if sms_body and audience_qs.exists():
 			# Validate balance BEFORE creating message records
 			if action == 'send_now':
 				from .utils import validate_sms_balance
-				is_valid, balance_error = validate_sms_balance(org, contact_qs.count(), settings)
+				from .utils.suppression import exclude_suppressed
+				# Suppressed numbers get no recipient row, so they cost nothing
+				is_valid, balance_error = validate_sms_balance(org, exclude_suppressed(audience_qs, org.id).count(), settings)
 				if not is_valid:
 					error = balance_error
 					# Return early - don't create message or send anything
 					return render(request, 'org_send_sms.html', {
 						'organization': org, 
-						'contacts': contacts, 
+						'contact_count': contact_count, 
 						'groups': groups, 
+						'segments': segments, 
 						'templates': templates, 
 						'sms_body': sms_body, 
 						'error': error, 
@@ -1952,8 +1782,12 @@ def org_send_sms(request, org_slug=None):
 				sent=False,
 				created_by=request.user,
 			)
-			for c in contact_qs:
-				OrgAlertRecipient.objects.create(message=msg, contact=c, status='pending')
+			if action == 'send_now' or not selected_segments:
+				msg.create_recipients(audience_qs)
+			else:
+				# Scheduled: segment audiences are resolved when the message is dispatched
+				msg.create_recipients(contact_qs)
+				msg.segments.set(selected_segments)
 			# If action is send_now, attempt to send immediately (synchronous)
 			if action == 'send_now':
 				from .utils.sender_utils import send_sms_through_sender_pool
@@ -2007,8 +1841,9 @@ def org_send_sms(request, org_slug=None):
 
 	return render(request, 'org_send_sms.html', {
 		'organization': org,
-		'contacts': contacts,
+		'contact_count': contact_count,
 		'groups': groups,
+		'segments': segments,
 		'templates': templates,
 		'sms_body': request.POST.get('sms_body', ''),
 		'error': error,
@@ -2031,12 +1866,36 @@ def org_groups_view(request, org_slug=None):
 		# create / edit / delete actions
 		if request.POST.get('action') == 'create':
 			name = request.POST.get('name')
-			contact_ids = request.POST.getlist('contacts')
+			contact_ids = request.POST.getlist('add_contacts') or request.POST.getlist('contacts')
 			if name:
+				from .utils.group_membership import add_members
 				group = ContactGroup.objects.create(organization=org, name=name)
-				if contact_ids:
-					group.contacts.set(Contact.objects.filter(id__in=contact_ids, organization=org))
+				add_members(group, contact_ids)
 				notice = f"Group '{name}' created."
+		elif request.POST.get('action') == 'create_segment':
+			from .models import ContactSegment
+			from .utils.segments import SegmentRuleError, compile_rules
+			name = request.POST.get('name', '').strip()
+			rules = [
+				{'type': rtype, 'value': value.strip(), 'negate': negate == 'not'}
+				for rtype, value, negate in zip(
+					request.POST.getlist('rule_type'), request.POST.getlist('rule_value'), request.POST.getlist('rule_negate'),
+				) if rtype
+			]
+			match = 'any' if request.POST.get('match') == 'any' else 'all'
+			try:
+				if not name:
+					raise SegmentRuleError('Segment name is required')
+				compile_rules(rules, org, match)
+				segment = ContactSegment.objects.create(organization=org, name=name, rules=rules, match=match)
+				notice = f"Segment '{name}' created ({segment.get_estimated_count()} contacts right now)."
+			except SegmentRuleError as e:
+				notice = f'Could not create segment: {e}'
+		elif request.POST.get('action') == 'delete_segment':
+			from .models import ContactSegment
+			segment_id = request.POST.get('segment_id', '')
+			deleted = ContactSegment.objects.filter(id=segment_id, organization=org).delete()[0] if segment_id.isdigit() else 0
+			notice = 'Segment deleted.' if deleted else 'Segment not found.'
 		elif request.POST.get('action') == 'delete':
 			gid = request.POST.get('group_id')
 			try:
@@ -2048,20 +1907,24 @@ def org_groups_view(request, org_slug=None):
 		elif request.POST.get('action') == 'edit':
 			gid = request.POST.get('group_id')
 			name = request.POST.get('name')
-			contact_ids = request.POST.getlist('contacts')
 			try:
 				g = ContactGroup.objects.get(id=gid, organization=org)
-				if name:
+				if name and name != g.name:
 					g.name = name
-				if contact_ids is not None:
-					g.contacts.set(Contact.objects.filter(id__in=contact_ids, organization=org))
-				g.save()
+					# Only the name: member_count is kept by F() updates and this copy is stale
+					g.save(update_fields=['name'])
+				# The paginated picker only sends what changed
+				from .utils.group_membership import add_members, remove_members
+				add_members(g, request.POST.getlist('add_contacts'))
+				remove_members(g, request.POST.getlist('remove_contacts'))
 				notice = 'Group updated.'
 			except ContactGroup.DoesNotExist:
 				notice = 'Group not found.'
 
-	groups = ContactGroup.objects.filter(organization=org)
-	contacts = Contact.objects.filter(organization=org)
+	# member_count is denormalized and the sample name is a subquery: one query for the whole list
+	from django.db.models import OuterRef, Subquery
+	first_member = ContactGroup.contacts.through.objects.filter(contactgroup=OuterRef('pk')).order_by('contact_id').values('contact__name')[:1]
+	groups = ContactGroup.objects.filter(organization=org).annotate(first_member_name=Subquery(first_member))
 	# support editing via ?edit=<group_id>
 	edit_group = None
 	edit_id = request.GET.get('edit')
@@ -2071,7 +1934,74 @@ def org_groups_view(request, org_slug=None):
 		except Exception:
 			edit_group = None
 
-	return render(request, 'org_groups.html', {'organization': org, 'groups': groups, 'contacts': contacts, 'notice': notice, 'edit_group': edit_group})
+	from .models import ContactSegment
+	from .utils.segments import RULE_TYPES
+	segments = list(ContactSegment.objects.filter(organization=org))
+	for segment in segments:
+		segment.member_estimate = segment.get_estimated_count()
+	rule_types = [(key, label) for key, (label, _) in RULE_TYPES.items()]
+
+	# The member picker loads contacts page by page from org_contact_search
+	return render(request, 'org_groups.html', {'organization': org, 'groups': groups, 'notice': notice, 'edit_group': edit_group, 'segments': segments, 'rule_types': rule_types})
+
+
+@login_required
+def org_group_members(request, org_slug=None, group_id=None, op=None):
+	"""Change a group's membership by delta instead of re-posting every member.
+
+	``add``/``remove`` take ``contact_ids`` and/or a ``phones`` list of existing
+	contacts. ``import`` takes a pasted ``phones`` list (unknown numbers become
+	contacts) or a ``members_file`` upload, which is queued as a background
+	import into the group.
+	"""
+	user = request.user
+	if user.role != User.ORG_ADMIN or not getattr(user, 'organization', None):
+		return JsonResponse({'error': 'forbidden'}, status=403)
+	if request.method != 'POST':
+		return JsonResponse({'error': 'POST required'}, status=405)
+	org = user.organization
+	from .models import ContactGroup, ContactImportJob
+	from .utils.contact_import import PHONE_PATTERN
+	from .utils import group_membership
+
+	try:
+		group = ContactGroup.objects.get(id=group_id, organization=org)
+	except ContactGroup.DoesNotExist:
+		return JsonResponse({'error': 'Group not found.'}, status=404)
+
+	contact_ids = []
+	for value in request.POST.getlist('contact_ids'):
+		contact_ids.extend(v for v in value.split(',') if v.strip())
+	phones = PHONE_PATTERN.findall(request.POST.get('phones', ''))
+
+	result = {'group': group.id}
+	if op == 'add':
+		contact_ids += group_membership.contact_ids_for_phones(org, phones)
+		result['added'] = group_membership.add_members(group, contact_ids)
+	elif op == 'remove':
+		contact_ids += group_membership.contact_ids_for_phones(org, phones)
+		result['removed'] = group_membership.remove_members(group, contact_ids)
+	elif op == 'import':
+		f = request.FILES.get('members_file')
+		if f:
+			if f.name.lower().endswith('.xls'):
+				return JsonResponse({'error': 'Legacy .xls files are not supported. Save the sheet as .xlsx or CSV.'}, status=400)
+			job = ContactImportJob.objects.create(
+				organization=org,
+				group=group,
+				created_by=user,
+				source_file=f,
+				original_filename=f.name[:255],
+				total_bytes=f.size or 0,
+			)
+			result['job'] = job.id
+		else:
+			importer = group_membership.GroupMembershipImporter(group)
+			importer.run((n, '', phone) for n, phone in enumerate(phones, start=1))
+			result.update(added=importer.members_added, imported=importer.rows_imported, failed=importer.rows_failed)
+	else:
+		return JsonResponse({'error': 'Unknown operation.'}, status=404)
+	return JsonResponse(result)
 
 
 @login_required
@@ -2117,7 +2047,7 @@ def org_message_logs(request, org_slug=None):
 	if request.method == 'POST' and 'delete_log' in request.POST:
 		log_id = request.POST.get('log_id')
 		try:
-			log = OrgAlertRecipient.objects.get(id=log_id, message__organization=org)
+			log = OrgAlertRecipient.objects.get(id=log_id, organization=org)
 			log.is_deleted = True
 			log.save()
 			messages.success(request, 'Message log deleted successfully.')
@@ -2125,30 +2055,21 @@ def org_message_logs(request, org_slug=None):
 			messages.error(request, 'Log not found.')
 		return redirect('org_message_logs', org_slug=org.slug)
 	
-	# filters
+	# filters (YYYY-MM-DD dates; bad input is ignored). Each filter applies on its own.
+	from urllib.parse import urlencode
+	from .utils.exports import parse_date
+	from .utils.message_logs import LOG_ONLY, filter_logs, log_page
 	status = request.GET.get('status')
-	date_from = request.GET.get('from')
-	date_to = request.GET.get('to')
-	logs = OrgAlertRecipient.objects.filter(message__organization=org, is_deleted=False)
-	if status:
-		logs = logs.filter(status=status)
-		# Parse date filter inputs (expected YYYY-MM-DD). Use sent_at__date to avoid timezone-aware/datetime issues.
-		import datetime as _dt
-		if date_from:
-			try:
-				dfrom = _dt.date.fromisoformat(date_from)
-				logs = logs.filter(sent_at__date__gte=dfrom)
-			except Exception:
-				# ignore bad input
-				date_from = None
-		if date_to:
-			try:
-				dto = _dt.date.fromisoformat(date_to)
-				logs = logs.filter(sent_at__date__lte=dto)
-			except Exception:
-				date_to = None
-	logs = logs.order_by('-sent_at')
-	return render(request, 'org_message_logs.html', {'organization': org, 'logs': logs, 'status': status, 'from': date_from, 'to': date_to})
+	date_from = parse_date(request.GET.get('from'))
+	date_to = parse_date(request.GET.get('to'))
+	logs = OrgAlertRecipient.objects.filter(organization=org, is_deleted=False)
+	logs = filter_logs(logs, status, date_from, date_to).select_related('contact', 'message').only(*LOG_ONLY)
+	page = log_page(logs, after=request.GET.get('after'), before=request.GET.get('before'))
+	filters = {key: value for key, value in (('status', status), ('from', date_from), ('to', date_to)) if value}
+	return render(request, 'org_message_logs.html', {
+		'organization': org, 'logs': page.items, 'page': page, 'filter_query': urlencode(filters),
+		'status': status, 'from': date_from.isoformat() if date_from else None, 'to': date_to.isoformat() if date_to else None,
+	})
 
 
 @login_required
@@ -2187,48 +2108,31 @@ def org_delivery_reports(request, org_slug=None):
 		except Exception:
 			date_to = None
 
-	# Pagination
+	# Pagination; each page's rows carry their report figures as annotations.
+	# The annotations are applied after counting, so the page count stays a plain COUNT.
+	from .utils.delivery_reports import annotate_report, build_report, organization_delivery_totals, organization_failure_breakdown
 	page = request.GET.get('page', 1)
 	paginator = Paginator(messages, 20)  # 20 messages per page
 	try:
 		messages_page = paginator.page(page)
 	except:
 		messages_page = paginator.page(1)
-
-	# Calculate overall statistics
-	all_messages = OrgMessage.objects.filter(organization=org)
-	total_messages = all_messages.count()
-	total_recipients = sum(msg.get_recipients_count() for msg in all_messages)
-	total_sent = sum(msg.get_sent_recipients_count() for msg in all_messages)
-	total_failed = sum(msg.get_failed_recipients_count() for msg in all_messages)
-	overall_delivery_rate = (total_sent / total_recipients * 100) if total_recipients > 0 else 0
-
-	# Recent activity (last 30 days)
-	thirty_days_ago = timezone.now() - datetime.timedelta(days=30)
-	recent_messages = all_messages.filter(created_at__gte=thirty_days_ago)
-	recent_sent = sum(msg.get_sent_recipients_count() for msg in recent_messages)
-	recent_failed = sum(msg.get_failed_recipients_count() for msg in recent_messages)
-
-	# Cost analysis
-	total_cost = sum(msg.get_cost_breakdown()['total_cost'] for msg in all_messages)
-	avg_cost_per_message = total_cost / total_messages if total_messages > 0 else 0
-
+	page_ids = [msg.id for msg in messages_page.object_list]
+	rate = org.get_current_sms_rate()
+	since = min((msg.created_at for msg in messages_page.object_list), default=None)
+	annotated = {msg.id: msg for msg in annotate_report(OrgMessage.objects.filter(id__in=page_ids), since=since)}
+	messages_page.object_list = [annotated[msg_id] for msg_id in page_ids]
+	for msg in messages_page.object_list:
+		msg.report = build_report(msg, rate)
+
+	# Overall and last-30-day statistics in one aggregate
 	context = {
 		'organization': org,
 		'messages': messages_page,
 		'date_from': date_from,
 		'date_to': date_to,
-		'stats': {
-			'total_messages': total_messages,
-			'total_recipients': total_recipients,
-			'total_sent': total_sent,
-			'total_failed': total_failed,
-			'overall_delivery_rate': overall_delivery_rate,
-			'recent_sent': recent_sent,
-			'recent_failed': recent_failed,
-			'total_cost': total_cost,
-			'avg_cost_per_message': avg_cost_per_message,
-		}
+		'stats': organization_delivery_totals(org),
+		'failure_breakdown': organization_failure_breakdown(org),
 	}
 
 	return render(request, 'org_delivery_reports.html', context)
@@ -2407,6 +2311,7 @@ def org_upload_contacts(request, org_slug=None):
 	message = None
 	from .models import Contact
 	from .utils import normalize_phone_number
+	from .utils.contact_deletion import delete_contacts
 
 	# Support multiple actions: add_contact, edit_contact, delete_contact, paste_contacts, upload_file
 	if request.method == 'POST':
@@ -2419,15 +2324,21 @@ def org_upload_contacts(request, org_slug=None):
 				email = request.POST.get('email', '').strip()
 				if phone:
 					normalized = normalize_phone_number(phone) or phone
+					duplicate = Contact.objects.filter(organization=organization, phone_number=normalized)
 					if contact_id:
 						try:
 							c = Contact.objects.get(id=contact_id, organization=organization)
-							c.name = name or c.name
-							c.phone_number = normalized
-							c.save()
-							message = 'Contact updated.'
+							if duplicate.exclude(id=c.id).exists():
+								message = 'Another contact already uses this phone number.'
+							else:
+								c.name = name or c.name
+								c.phone_number = normalized
+								c.save()
+								message = 'Contact updated.'
 						except Contact.DoesNotExist:
 							message = 'Contact not found.'
+					elif duplicate.exists():
+						message = 'A contact with this phone number already exists.'
 					else:
 						try:
 							Contact.objects.create(organization=organization, name=name or normalized, phone_number=normalized)
@@ -2441,7 +2352,7 @@ def org_upload_contacts(request, org_slug=None):
 				cid = request.POST.get('contact_id')
 				try:
 					c = Contact.objects.get(id=cid, organization=organization)
-					c.delete()
+					delete_contacts(Contact.objects.filter(pk=c.pk))
 					message = 'Contact deleted.'
 				except Exception:
 					message = 'Could not delete contact.'
@@ -2450,7 +2361,7 @@ def org_upload_contacts(request, org_slug=None):
 				selected_ids = request.POST.getlist('selected_contacts')
 				if selected_ids:
 					try:
-						deleted_count = Contact.objects.filter(id__in=selected_ids, organization=organization).delete()[0]
+						deleted_count = delete_contacts(Contact.objects.filter(id__in=selected_ids, organization=organization))
 						message = f'Successfully deleted {deleted_count} contact(s).'
 					except Exception:
 						message = 'Could not delete selected contacts.'
@@ -2460,8 +2371,8 @@ def org_upload_contacts(request, org_slug=None):
 			elif action == 'paste_contacts':
 				pasted = request.POST.get('pasted', '')
 				try:
-					created_contacts = Contact.bulk_create_from_text(pasted, organization)
-					message = f'Imported {len(created_contacts)} contacts from pasted text.'
+					imported = Contact.bulk_create_from_text(pasted, organization)
+					message = f'Imported {imported} contacts from pasted text.'
 				except Exception as e:
 					message = f'Import failed: {e}'
 
@@ -2470,27 +2381,48 @@ def org_upload_contacts(request, org_slug=None):
 				if f:
 					filename = f.name.lower()
 					try:
-						if filename.endswith('.csv'):
-							created_contacts = Contact.bulk_create_from_csv(f, organization)
-							message = f"Imported {len(created_contacts)} contacts from CSV."
+						if filename.endswith('.xls'):
+							message = 'Legacy .xls files are not supported. Save the sheet as .xlsx or CSV and upload again.'
 						else:
-							# Handle other file types (PDF, text files)
-							f.seek(0)  # Reset file pointer
-							text = f.read().decode('utf-8', errors='ignore')
-							created_contacts = Contact.bulk_create_from_text(text, organization)
-							message = f"Imported {len(created_contacts)} contacts from uploaded file."
+							# CSV, Excel and text files are all streamed in the background (process_contact_imports)
+							from .models import ContactImportJob
+							ContactImportJob.objects.create(
+								organization=organization,
+								created_by=user,
+								source_file=f,
+								original_filename=f.name[:255],
+								total_bytes=f.size or 0,
+							)
+							message = f"Import of '{f.name}' queued. Progress is shown under Recent Imports."
 					except Exception as e:
 						message = f'File import failed: {e}'
 				else:
 					message = 'No file uploaded.'
 
+			elif action in ('suppress_numbers', 'unsuppress_number'):
+				from .models import SuppressedNumber
+				from .utils.contact_import import PHONE_PATTERN
+				from .utils.suppression import suppress_numbers, unsuppress_numbers
+				numbers = PHONE_PATTERN.findall(request.POST.get('numbers', ''))
+				if action == 'suppress_numbers':
+					reason = request.POST.get('reason')
+					if reason not in dict(SuppressedNumber.REASON_CHOICES):
+						reason = 'manual'
+					added = suppress_numbers(organization, numbers, reason=reason, created_by=user)
+					message = f'{added} number(s) will no longer receive messages.'
+				else:
+					removed = unsuppress_numbers(organization, numbers)
+					message = 'Number removed from the suppression list.' if removed else 'Number was not suppressed.'
+
 			else:
 				message = 'Unknown action.'
 		except Exception as e:
 			message = f'Import failed: {e}'
 
-	# Prepare contacts list and optional edit target if requested
-	contacts = Contact.objects.filter(organization=organization).order_by('name')
+	# One keyset page of contacts (optionally filtered by ?q=) and optional edit target
+	from .utils.contact_search import contact_count, keyset_page, search_contacts
+	query = request.GET.get('q', '').strip()
+	page = keyset_page(search_contacts(organization, query), after=request.GET.get('after'), before=request.GET.get('before'))
 	edit_contact = None
 	edit_id = request.GET.get('edit')
 	if edit_id:
@@ -2499,7 +2431,163 @@ def org_upload_contacts(request, org_slug=None):
 		except Exception:
 			edit_contact = None
 
-	return render(request, 'org_upload_contacts.html', {'organization': organization, 'message': message, 'contacts': contacts, 'edit_contact': edit_contact})
+	from .models import ContactImportJob
+	import_jobs = ContactImportJob.objects.filter(organization=organization)[:5]
+	from .models import SuppressedNumber
+	suppressed = SuppressedNumber.objects.filter(organization=organization)
+
+	return render(request, 'org_upload_contacts.html', {
+		'organization': organization, 'message': message, 'contacts': page.items, 'page': page, 'query': query,
+		'contact_count': contact_count(organization.id), 'edit_contact': edit_contact, 'import_jobs': import_jobs,
+		'suppressed_numbers': suppressed[:10], 'suppressed_count': suppressed.count(),
+		'suppression_reasons': SuppressedNumber.REASON_CHOICES,
+	})
+
+
+@login_required
+def org_contact_import_status(request, org_slug=None, job_id=None):
+	"""JSON progress for a queued contact import (polled by the contacts page)"""
+	user = request.user
+	if user.role != User.ORG_ADMIN or not getattr(user, 'organization', None):
+		return JsonResponse({'error': 'forbidden'}, status=403)
+	from .models import ContactImportJob
+	try:
+		job = ContactImportJob.objects.get(id=job_id, organization=user.organization)
+	except ContactImportJob.DoesNotExist:
+		return JsonResponse({'error': 'not found'}, status=404)
+	return JsonResponse({
+		'id': job.id,
+		'status': job.status,
+		'progress': job.get_progress_percent(),
+		'rows_processed': job.rows_processed,
+		'rows_imported': job.rows_imported,
+		'rows_failed': job.rows_failed,
+		'has_error_file': bool(job.error_file),
+		'error_message': job.error_message,
+	})
+
+
+@login_required
+def org_contact_import_errors(request, org_slug=None, job_id=None):
+	"""Download the CSV of rows rejected by a contact import"""
+	user = request.user
+	if user.role != User.ORG_ADMIN or not getattr(user, 'organization', None):
+		return redirect('dashboard')
+	organization = user.organization
+	from .models import ContactImportJob
+	from django.http import FileResponse, Http404
+	job = ContactImportJob.objects.filter(id=job_id, organization=organization).first()
+	if not job or not job.error_file:
+		raise Http404('No error file for this import')
+	return FileResponse(job.error_file.open('rb'), as_attachment=True, filename=f"import_{job.id}_errors.csv")
+
+
+@login_required
+def org_contact_search(request, org_slug=None):
+	"""JSON search over the organization's contacts, keyset-paginated by (name, id).
+
+	``q`` matches a name (prefix/substring) or phone number (digits substring);
+	pass the returned ``next`` as ``after`` to fetch the following page. With
+	``group=<id>`` each result also says whether it is a member of that group.
+	"""
+	user = request.user
+	if user.role != User.ORG_ADMIN or not getattr(user, 'organization', None):
+		return JsonResponse({'error': 'forbidden'}, status=403)
+	org = user.organization
+	from .models import ContactGroup
+	from .utils.contact_search import get_page_size, keyset_page, search_contacts
+
+	try:
+		limit = max(1, min(int(request.GET.get('limit', get_page_size())), 200))
+	except ValueError:
+		limit = get_page_size()
+	contacts = search_contacts(org, request.GET.get('q')).only('id', 'name', 'phone_number')
+	page = keyset_page(contacts, after=request.GET.get('after'), before=request.GET.get('before'), page_size=limit)
+
+	member_ids = None
+	group_id = request.GET.get('group')
+	if group_id and group_id.isdigit():
+		member_ids = set(ContactGroup.contacts.through.objects.filter(
+			contactgroup_id=group_id, contactgroup__organization=org, contact_id__in=[c.id for c in page.items]
+		).values_list('contact_id', flat=True))
+
+	results = []
+	for c in page.items:
+		item = {'id': c.id, 'name': c.name, 'phone': c.phone_number}
+		if member_ids is not None:
+			item['member'] = c.id in member_ids
+		results.append(item)
+	return JsonResponse({'results': results, 'next': page.next_cursor, 'previous': page.prev_cursor})
+
+
+@login_required
+def org_contact_autocomplete(request, org_slug=None):
+	"""Compact ``[id, name, phone]`` matches for the recipient and group pickers.
+
+	Results are cached per organization and carry an ETag derived from the
+	organization's contacts version, so repeat lookups are answered with 304.
+	"""
+	user = request.user
+	if user.role != User.ORG_ADMIN or not getattr(user, 'organization', None):
+		return JsonResponse({'error': 'forbidden'}, status=403)
+	org = user.organization
+	import hashlib
+	from django.utils.cache import patch_cache_control
+	from .utils.contact_search import autocomplete_cache_key, autocomplete_contacts
+
+	query = request.GET.get('q', '')
+	try:
+		limit = max(1, min(int(request.GET.get('limit', 20)), 50))
+	except ValueError:
+		limit = 20
+
+	# The cache key changes whenever the contacts do, so it doubles as the ETag
+	etag = '"%s"' % hashlib.md5(autocomplete_cache_key(org.id, query, limit).encode('utf-8')).hexdigest()
+	if etag in [t.strip() for t in request.headers.get('If-None-Match', '').split(',')]:
+		response = HttpResponse(status=304)
+	else:
+		_, results = autocomplete_contacts(org, query, limit)
+		response = JsonResponse({'results': results})
+	response['ETag'] = etag
+	patch_cache_control(response, private=True, no_cache=True)
+	return response
+
+
+@login_required
+def org_export(request, org_slug=None, kind=None):
+	"""Stream contacts, groups, message logs or delivery reports as CSV.
+
+	Add ``?gzip=1`` for a compressed .csv.gz download. Message logs and delivery
+	reports accept the same ``status``/``from``/``to`` filters as their pages.
+	"""
+	user = request.user
+	if user.role != User.ORG_ADMIN or not getattr(user, 'organization', None):
+		return redirect('dashboard')
+	org = user.organization
+	if org_slug and org.slug != org_slug:
+		return redirect('org_export', org_slug=org.slug, kind=kind)
+
+	from django.http import Http404
+	from .utils import exports
+
+	date_from = exports.parse_date(request.GET.get('from'))
+	date_to = exports.parse_date(request.GET.get('to'))
+	if kind == 'contacts':
+		header, rows = exports.CONTACT_HEADER, exports.contact_export_rows(org)
+	elif kind == 'groups':
+		group_id = request.GET.get('group')
+		header, rows = exports.GROUP_HEADER, exports.group_export_rows(org, group_id if group_id and group_id.isdigit() else None)
+	elif kind == 'message-logs':
+		logs = exports.message_log_queryset(org, request.GET.get('status'), date_from, date_to)
+		header, rows = exports.MESSAGE_LOG_HEADER, exports.message_log_export_rows(logs)
+	elif kind == 'delivery-reports':
+		header, rows = exports.DELIVERY_REPORT_HEADER, exports.delivery_report_export_rows(org, date_from, date_to)
+	else:
+		raise Http404('Unknown export')
+
+	filename = f"{org.slug}-{kind}-{timezone.localdate():%Y%m%d}"
+	compress = request.GET.get('gzip') in ('1', 'true', 'yes')
+	return exports.csv_export_response(filename, header, rows, compress=compress)
 
 
 @login_required
@@ -2610,6 +2698,7 @@ def org_retry_failed(request, org_slug=None):
 
 	from .models import OrgAlertRecipient, OrgMessage, Contact
 	from core.hubtel_utils import send_sms
+	from .utils.daily_stats import recipient_bucket, save_recipient
 	retried = 0
 	errors = []
 	qs = OrgAlertRecipient.objects.filter(message__organization=organization, status='failed')
@@ -2619,10 +2708,13 @@ def org_retry_failed(request, org_slug=None):
 			msg = ar.message
 			contact = ar.contact
 			message_id = send_sms(contact.phone_number, msg.content, organization)
+			before = recipient_bucket(ar, msg)
 			ar.status = 'sent'
-			ar.sent_at = None
-			ar.error_message = None
-			ar.save()
+			ar.sent_at = timezone.now()
+			ar.provider_message_id = message_id
+			ar.set_error()
+			# Moves the recipient from failed to sent in the counters and rollup too
+			save_recipient(ar, msg, before)
 			retried += 1
 		except Exception as e:
 			errors.append(str(e))
@@ -2632,11 +2724,12 @@ def org_retry_failed(request, org_slug=None):
 
 @csrf_exempt
 def hubtel_webhook(request):
-	"""Handle Hubtel delivery receipts (webhook).
+	"""Accept Hubtel delivery receipts (webhook).
 
 	Hubtel may POST JSON with keys like `messageId`, `status`, `statusDescription`, `to`.
-	We try to match `messageId` against `AlertRecipient.provider_message_id` and update
-	the recipient status accordingly.
+	The receipt is only appended to the receipt buffer here; `apply_delivery_receipts`
+	matches `messageId` against `provider_message_id` and updates the recipients in
+	batches (see core.utils.receipts).
 	"""
 	if request.method != 'POST':
 		return HttpResponse(status=405)
@@ -2657,56 +2750,62 @@ def hubtel_webhook(request):
 		except Exception:
 			return JsonResponse({'error': 'signature verification failed'}, status=403)
 
-	try:
-		payload = json.loads(request.body.decode('utf-8')) if request.body else {}
-	except Exception:
-		# fallback to form-encoded POST
-		payload = request.POST.dict()
-
+	payload = _webhook_payload(request)
 	message_id = payload.get('messageId') or payload.get('message_id') or payload.get('MessageId')
 	provider_status = payload.get('status') or payload.get('statusDescription') or payload.get('deliveryStatus')
 
 	if not message_id:
 		return JsonResponse({'error': 'missing messageId'}, status=400)
 
-	# Try to find matching recipient in either school-level AlertRecipient or org-level OrgAlertRecipient
-	from .models import AlertRecipient, OrgAlertRecipient
-	try:
-		ar = AlertRecipient.objects.filter(provider_message_id=message_id).first()
-		model_used = 'AlertRecipient'
-		if not ar:
-			ar = OrgAlertRecipient.objects.filter(provider_message_id=message_id).first()
-			model_used = 'OrgAlertRecipient' if ar else None
-
-		if not ar:
-			return JsonResponse({'status': 'not_found'}, status=404)
-
-		# Persist raw provider status
-		ar.provider_status = provider_status or ''
-
-		# Map provider status to internal status
-		if provider_status:
-			ps = str(provider_status).strip().lower()
-			if ps in ('delivered', 'delivered_to_terminal', '2') or 'deliv' in ps:
-				ar.status = 'sent'
-			elif ps in ('failed', 'undelivered', '3') or 'fail' in ps:
-				ar.status = 'failed'
-
-		# If recipient became sent and doesn't have sent_at, set it
-		try:
-			from django.utils import timezone as _tz
-			if getattr(ar, 'status', None) == 'sent' and not getattr(ar, 'sent_at', None):
-				ar.sent_at = _tz.now()
-		except Exception:
-			pass
+	from .utils.receipts import record_receipt
+	record_receipt('hubtel', message_id, provider_status)
+	return JsonResponse({'status': 'accepted'})
 
-		ar.save()
-		return JsonResponse({'status': 'updated', 'model': model_used})
-	except Exception as e:
-		import logging
-		logger = logging.getLogger(__name__)
-		logger.exception('Error processing Hubtel webhook')
-		return JsonResponse({'error': str(e)}, status=500)
+
+@csrf_exempt
+def clicksend_webhook(request):
+	"""Accept ClickSend delivery receipts (DLR push webhook).
+
+	ClickSend POSTs one receipt per message (form-encoded, or JSON when the
+	receipt rule asks for it) with `message_id`, `status` ('Delivered',
+	'Undelivered', ...) and `status_text`. ClickSend does not sign receipts, so
+	the callback URL configured in ClickSend must carry CLICKSEND_WEBHOOK_TOKEN
+	as `?token=...`; without a token configured, receipts are only accepted
+	when DEBUG is on. Receipts go into the same buffer as Hubtel's (see
+	core.utils.receipts).
+	"""
+	if request.method != 'POST':
+		return HttpResponse(status=405)
+
+	token = getattr(settings, 'CLICKSEND_WEBHOOK_TOKEN', None)
+	if not token:
+		if not settings.DEBUG:
+			# Anyone could otherwise rewrite delivery outcomes
+			return JsonResponse({'error': 'webhook not configured'}, status=403)
+	else:
+		import hmac
+		if not hmac.compare_digest(token.encode('utf-8'), request.GET.get('token', '').encode('utf-8')):
+			return JsonResponse({'error': 'invalid token'}, status=403)
+
+	payload = _webhook_payload(request)
+	message_id = payload.get('message_id') or payload.get('messageid')
+	provider_status = payload.get('status') or payload.get('status_text')
+
+	if not message_id:
+		return JsonResponse({'error': 'missing message_id'}, status=400)
+
+	from .utils.receipts import record_receipt
+	record_receipt('clicksend', message_id, provider_status)
+	return JsonResponse({'status': 'accepted'})
+
+
+def _webhook_payload(request):
+	"""A webhook's JSON body, or its form fields when the body is not JSON"""
+	try:
+		payload = json.loads(request.body.decode('utf-8')) if request.body else {}
+	except Exception:
+		payload = None
+	return payload if isinstance(payload, dict) else request.POST.dict()
 
 
 
@@ -3161,6 +3260,7 @@ def edit_package_view(request, package_id):
 def sender_pool_view(request):
     """Superadmin view to manage the sender pool"""
     from .models import Sender, SenderAssignment, Organization
+    from .utils.networks import NETWORK_CHOICES, parse_network_costs
 
     message = None
     if request.method == 'POST':
@@ -3181,6 +3281,7 @@ def sender_pool_view(request):
                     clicksend_username=request.POST.get('clicksend_username'),
                     clicksend_api_key=request.POST.get('clicksend_api_key'),
                     gateway_balance=Decimal(request.POST.get('gateway_balance', '0')),
+                    network_costs=parse_network_costs(request.POST),
                 )
                 # Audit log
                 from .models import AuditLog
@@ -3269,6 +3370,8 @@ def sender_pool_view(request):
         'sender_types': Sender.SENDER_TYPE_CHOICES,
         'providers': Sender.PROVIDER_CHOICES,
         'statuses': Sender.STATUS_CHOICES,
+        'networks': [choice for choice in NETWORK_CHOICES if choice[0]],
+        'default_sms_rate': Sender.DEFAULT_SMS_RATE,
     }
     return render(request, 'sender_pool.html', context)
 
@@ -271,6 +271,9 @@ HUBTEL_DRY_RUN = _env_bool('HUBTEL_DRY_RUN', default=False)
 HUBTEL_DEFAULT_SENDER = os.environ.get('HUBTEL_DEFAULT_SENDER')
 # Webhook secret used to verify incoming Hubtel delivery receipts (HMAC-SHA256)
 HUBTEL_WEBHOOK_SECRET = os.environ.get('HUBTEL_WEBHOOK_SECRET')
+# Shared token ClickSend delivery receipts must carry as ?token=... (ClickSend does not sign them).
+# Without it the ClickSend webhook refuses every receipt unless DEBUG is on.
+CLICKSEND_WEBHOOK_TOKEN = os.environ.get('CLICKSEND_WEBHOOK_TOKEN')
 
 # Optional Google reCAPTCHA settings
 RECAPTCHA_SITE_KEY = os.environ.get('RECAPTCHA_SITE_KEY')